@@ -11,8 +11,10 @@ from flask_caching import Cache
 
 from .config import config, app_config
 from .utils.logger import LogManager
+from .utils.log_queue import parse_sampling_rates
 from .utils.thread_pool_executor import thread_pool
 from .utils.enhanced_task_queue import translation_queue
+from .utils.app_context import app_context_provider
 from .utils.lazy_http_client import http_client
 from .utils.db_session_manager import setup_db_monitoring
 
@@ -39,6 +41,9 @@ def create_app(config_name='development'):
     app.config.from_object(config[config_name])
     config[config_name].init_app(app)
 
+    # 注册应用实例，后台线程复用该实例推入应用上下文
+    app_context_provider.init_app(app)
+
     # 确保上传目录存在
     uploads_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'uploads')
     print(uploads_path)
@@ -52,7 +57,12 @@ def create_app(config_name='development'):
         date_format=os.getenv('LOG_DATE_FORMAT', '%Y-%m-%d %H:%M:%S'),
         max_bytes=int(os.getenv('LOG_MAX_BYTES', 10 * 1024 * 1024)),  # 默认10MB
         backup_count=int(os.getenv('LOG_BACKUP_COUNT', 5)),
-        log_dir=log_dir
+        log_dir=log_dir,
+        async_logging=os.getenv('LOG_ASYNC', 'true').lower() == 'true',
+        queue_size=int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+        # 热点日志记录器的速率限制（每秒条数），只作用于 INFO 及以下级别
+        sampling_rates=parse_sampling_rates(os.getenv(
+            'LOG_SAMPLING', 'app.function.local_qwen_async=20,app.function.ppt_translate_async=50'))
     )
     logger = log_manager.get_logger()
     logger.info("正在初始化应用...")
@@ -101,14 +111,27 @@ def create_app(config_name='development'):
         max_workers=int(os.getenv('THREAD_POOL_MAX_WORKERS', 32)),
         io_bound_workers=int(os.getenv('THREAD_POOL_IO_WORKERS', 24)),
         cpu_bound_workers=int(os.getenv('THREAD_POOL_CPU_WORKERS', 8)),
-        thread_name_prefix=os.getenv('THREAD_POOL_NAME_PREFIX', 'app')
+        thread_name_prefix=os.getenv('THREAD_POOL_NAME_PREFIX', 'app'),
+        # CPU密集型阶段（python-pptx解析/保存、段落匹配）在独立进程中执行
+        process_workers=int(os.getenv('THREAD_POOL_PROCESS_WORKERS', 4)),
+        process_pool_enabled=os.getenv('THREAD_POOL_PROCESS_ENABLED', 'true').lower() == 'true'
     )
 
-    # 配置任务队列 - 限制最大并发翻译任务为10个
+    # 配置任务队列 - 限制最大并发翻译任务为10个（所有worker进程共享，任务存储在SQLite中）
     translation_queue.configure(
         max_concurrent_tasks=int(os.getenv('TASK_QUEUE_MAX_CONCURRENT', 10)),
         task_timeout=int(os.getenv('TASK_QUEUE_TIMEOUT', 3600)),
-        retry_times=int(os.getenv('TASK_QUEUE_RETRY_TIMES', 3))
+        retry_times=int(os.getenv('TASK_QUEUE_RETRY_TIMES', 3)),
+        backend=os.getenv('TASK_QUEUE_BACKEND', 'sqlite'),
+        store_path=os.getenv('TASK_QUEUE_DB_PATH') or None,
+        lease_seconds=int(os.getenv('TASK_QUEUE_LEASE_SECONDS', 60)),
+        app_provider=app_context_provider,
+        retention_minutes=int(os.getenv('TASK_QUEUE_RETENTION_MINUTES', 30)),
+        retention_max_entries=int(os.getenv('TASK_QUEUE_RETENTION_MAX_ENTRIES', 1000)),
+        budget_llm_tokens=float(os.getenv('TASK_QUEUE_BUDGET_LLM_TOKENS', 400000)),
+        budget_ocr_calls=float(os.getenv('TASK_QUEUE_BUDGET_OCR_CALLS', 200)),
+        budget_office_seconds=float(os.getenv('TASK_QUEUE_BUDGET_OFFICE_SECONDS', 900)),
+        max_backlog_seconds=float(os.getenv('TASK_QUEUE_MAX_BACKLOG_SECONDS', 14400))
     )
 
     # 配置 HTTP 客户端
@@ -143,6 +166,14 @@ def create_app(config_name='development'):
         db.create_all()
         logger.info("数据库表已创建")
 
+        # 为已有的表补充新增的列和索引（create_all 不会修改已存在的表）
+        from .utils.schema_upgrade import upgrade_schema
+        upgrade_schema(db.engine)
+
+        # 词库全文索引（表结构由 create_all 创建后再建立索引）
+        from .utils.glossary_search import init_glossary_search
+        init_glossary_search(db.engine)
+
     # 启动任务处理器
     translation_queue.start_processor()
     logger.info("任务处理器已启动")
@@ -155,7 +186,7 @@ def create_app(config_name='development'):
     # 启动清理任务 - 确保在任务处理器启动后执行
     try:
         from .tasks.cleanup import schedule_cleanup_task
-        cleanup_scheduler = schedule_cleanup_task()
+        cleanup_scheduler = schedule_cleanup_task(app_context_provider)
         logger.info("文件清理任务已调度")
     except Exception as e:
         logger.error(f"调度清理任务失败: {str(e)}")
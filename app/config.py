@@ -202,14 +202,24 @@ class AppConfig:
             'max_workers': int(os.getenv('THREAD_POOL_MAX_WORKERS', '32')),
             'io_bound_workers': int(os.getenv('THREAD_POOL_IO_WORKERS', '24')),
             'cpu_bound_workers': int(os.getenv('THREAD_POOL_CPU_WORKERS', '8')),
-            'thread_name_prefix': os.getenv('THREAD_POOL_NAME_PREFIX', 'app')
+            'thread_name_prefix': os.getenv('THREAD_POOL_NAME_PREFIX', 'app'),
+            'process_workers': int(os.getenv('THREAD_POOL_PROCESS_WORKERS', '4')),
+            'process_pool_enabled': os.getenv('THREAD_POOL_PROCESS_ENABLED', 'true').lower() == 'true'
         }
         
         # 任务队列配置 - 限制最大并发翻译任务为10个
         self.task_queue = {
             'max_concurrent_tasks': int(os.getenv('TASK_QUEUE_MAX_CONCURRENT', '10')),
             'task_timeout': int(os.getenv('TASK_QUEUE_TIMEOUT', '3600')),
-            'retry_times': int(os.getenv('TASK_QUEUE_RETRY_TIMES', '3'))
+            'retry_times': int(os.getenv('TASK_QUEUE_RETRY_TIMES', '3')),
+            'backend': os.getenv('TASK_QUEUE_BACKEND', 'sqlite'),
+            'lease_seconds': int(os.getenv('TASK_QUEUE_LEASE_SECONDS', '60')),
+            'retention_minutes': int(os.getenv('TASK_QUEUE_RETENTION_MINUTES', '30')),
+            'retention_max_entries': int(os.getenv('TASK_QUEUE_RETENTION_MAX_ENTRIES', '1000')),
+            'budget_llm_tokens': float(os.getenv('TASK_QUEUE_BUDGET_LLM_TOKENS', '400000')),
+            'budget_ocr_calls': float(os.getenv('TASK_QUEUE_BUDGET_OCR_CALLS', '200')),
+            'budget_office_seconds': float(os.getenv('TASK_QUEUE_BUDGET_OFFICE_SECONDS', '900')),
+            'max_backlog_seconds': float(os.getenv('TASK_QUEUE_MAX_BACKLOG_SECONDS', '14400'))
         }
         
         # HTTP 客户端配置
@@ -348,11 +358,21 @@ class AppConfig:
             'THREAD_POOL_IO_WORKERS': str(self.thread_pool['io_bound_workers']),
             'THREAD_POOL_CPU_WORKERS': str(self.thread_pool['cpu_bound_workers']),
             'THREAD_POOL_NAME_PREFIX': self.thread_pool['thread_name_prefix'],
+            'THREAD_POOL_PROCESS_WORKERS': str(self.thread_pool['process_workers']),
+            'THREAD_POOL_PROCESS_ENABLED': str(self.thread_pool['process_pool_enabled']).lower(),
             
             # 任务队列配置
             'TASK_QUEUE_MAX_CONCURRENT': str(self.task_queue['max_concurrent_tasks']),
             'TASK_QUEUE_TIMEOUT': str(self.task_queue['task_timeout']),
             'TASK_QUEUE_RETRY_TIMES': str(self.task_queue['retry_times']),
+            'TASK_QUEUE_BACKEND': self.task_queue['backend'],
+            'TASK_QUEUE_LEASE_SECONDS': str(self.task_queue['lease_seconds']),
+            'TASK_QUEUE_RETENTION_MINUTES': str(self.task_queue['retention_minutes']),
+            'TASK_QUEUE_RETENTION_MAX_ENTRIES': str(self.task_queue['retention_max_entries']),
+            'TASK_QUEUE_BUDGET_LLM_TOKENS': str(self.task_queue['budget_llm_tokens']),
+            'TASK_QUEUE_BUDGET_OCR_CALLS': str(self.task_queue['budget_ocr_calls']),
+            'TASK_QUEUE_BUDGET_OFFICE_SECONDS': str(self.task_queue['budget_office_seconds']),
+            'TASK_QUEUE_MAX_BACKLOG_SECONDS': str(self.task_queue['max_backlog_seconds']),
             
             # HTTP 客户端配置
             'HTTP_CLIENT_MAX_CONNECTIONS': str(self.http_client['max_connections']),
@@ -424,26 +424,16 @@ class OCRProcessor:
         需要安装: sudo apt-get install libreoffice
         """
         try:
-            # 使用libreoffice将EMF转换为PNG
-            cmd = [
-                'libreoffice',
-                '--headless',
-                '--convert-to', 'png',
-                '--outdir', os.path.dirname(png_path),
-                emf_path
-            ]
-            subprocess.run(cmd, check=True, capture_output=True)
-            # LibreOffice会自动命名输出文件，我们需要重命名为目标文件名
-            base_name = os.path.splitext(os.path.basename(emf_path))[0]
-            auto_generated_path = os.path.join(os.path.dirname(png_path), f"{base_name}.png")
-            if os.path.exists(auto_generated_path):
-                os.rename(auto_generated_path, png_path)
-                logger.info(f"✅ 使用LibreOffice将EMF文件转换为PNG: {png_path}")
-                return True
-            return False
-        except (subprocess.CalledProcessError, FileNotFoundError) as e:
-            logger.warning(f"⚠️ 使用LibreOffice转换EMF失败: {e}")
+            # 通过共享转换客户端提交到常驻soffice实例（无实例时回退为命令行）
+            from app.function.office_conversion import get_conversion_client, FILTER_DRAW_PNG
+        except ImportError as e:
+            logger.warning(f"⚠️ 无法加载LibreOffice转换客户端: {e}")
             return False
+        if get_conversion_client().convert(emf_path, png_path, FILTER_DRAW_PNG):
+            logger.info(f"✅ 使用LibreOffice将EMF文件转换为PNG: {png_path}")
+            return True
+        logger.warning(f"⚠️ 使用LibreOffice转换EMF失败: {emf_path}")
+        return False
     
     def convert_emf_to_pdf(self, emf_path, pdf_path):
         """
@@ -1059,30 +1059,31 @@ class PPTImageReplacer:
                 logger.error(f"❌ 备用方案也失败: {str(backup_error)}")
 
 
-def ocr_controller(presentation_path: str, 
-                  selected_pages: Optional[List[int]] = None, 
-                  output_path: str = None,
-                  enable_translation: bool = True,
-                  target_language: str = "中文",
-                  source_language: str = "英文",
-                  enable_text_splitting: str = "False") -> str:
+def prepare_ocr_results(presentation_path: str,
+                        selected_pages: Optional[List[int]] = None,
+                        enable_translation: bool = True,
+                        target_language: str = "中文",
+                        source_language: str = "英文",
+                        enable_text_splitting: str = "False",
+                        checkpoint=None) -> Optional[Dict[str, Any]]:
     """
-    OCR主控制器：提取图片、OCR识别、文本行分割、翻译、写回PPT
-    
+    OCR准备阶段：提取图片、OCR识别、文本行分割、翻译，不修改PPT
+    只读取PPT中的图片，可以与PPT文本翻译同时执行；结果按页码写回，
+    因此可以写回到文本翻译后的PPT（apply_ocr_results）
+
     Args:
         presentation_path: PPT文件路径
         selected_pages: 真实页码（第一页为1），None表示全篇处理
-        output_path: 输出文件路径
         enable_translation: 是否启用翻译功能
         target_language: 目标语言
         source_language: 源语言
         enable_text_splitting: 是否启用文本行分割处理
-        
+        checkpoint: 任务检查点（可选），重试时复用已完成的图片OCR结果
+
     Returns:
-        处理后的PPT文件路径
+        处理结果字典（传给 apply_ocr_results），没有图片或处理失败时返回None
     """
     extractor = None
-    ocr_processor = None
     try:
         # 验证输入文件
         if not os.path.exists(presentation_path):
@@ -1107,7 +1108,8 @@ def ocr_controller(presentation_path: str,
         )
         if not image_mapping:
             logger.warning("未找到需要处理的图片")
-            return presentation_path
+            extractor.cleanup()
+            return None
         logger.info(f"✅ 图片提取完成，临时目录: {temp_dir}")
 
         # 2. 调用qwen-vl-ocr的api进行图片的文字提取
@@ -1120,7 +1122,7 @@ def ocr_controller(presentation_path: str,
         API_KEY = os.getenv("QWEN_API_KEY")
 
         # 执行批量处理
-        process_folder_with_mapping(folder_path, json_path, API_KEY)
+        process_folder_with_mapping(folder_path, json_path, API_KEY, checkpoint=checkpoint)
 
         # 3. 文本行分割处理（可选）
         if enable_text_splitting == "True_spliting":
@@ -1202,7 +1204,41 @@ def ocr_controller(presentation_path: str,
         if enable_translation:
             logger.info(f"📊 共翻译了 {translation_count} 张图片的文本")
 
+        return {
+            'extractor': extractor,
+            'image_mapping': updated_mapping,
+            'enable_translation': enable_translation,
+            'enable_text_splitting': enable_text_splitting,
+        }
+
+    except Exception as e:
+        logger.error(f"❌ OCR识别与翻译失败: {str(e)}")
+        if extractor:
+            logger.info("🧹 清理临时文件...")
+            extractor.cleanup()
+        return None
+
+
+def apply_ocr_results(presentation_path: str,
+                      prepared: Optional[Dict[str, Any]],
+                      output_path: str = None) -> str:
+    """
+    OCR写回阶段：将 prepare_ocr_results 的结果添加到PPT右侧，并清理临时文件
+
+    Args:
+        presentation_path: 要写入的PPT文件路径
+        prepared: prepare_ocr_results 的返回值，None时不做处理
+        output_path: 输出文件路径
+
+    Returns:
+        处理后的PPT文件路径
+    """
+    if not prepared:
+        return presentation_path
+    try:
         # 6. 将OCR结果和翻译添加到PPT右侧
+        enable_translation = prepared['enable_translation']
+        enable_text_splitting = prepared['enable_text_splitting']
         step_num = 6 if enable_translation else (5 if enable_text_splitting != "False" else 4)
         logger.info(f"\n" + "=" * 50)
         content_desc = "OCR识别结果和翻译" if enable_translation else "OCR识别结果"
@@ -1211,7 +1247,7 @@ def ocr_controller(presentation_path: str,
         
         PPTImageReplacer.add_ocr_text_to_slides(
             presentation_path=presentation_path,
-            image_mapping=updated_mapping,
+            image_mapping=prepared['image_mapping'],
             output_path=output_path,
             show_translation=enable_translation
         )
@@ -1222,15 +1258,48 @@ def ocr_controller(presentation_path: str,
         logger.info("🎉 处理完成！")
         logger.info("=" * 50)
         return output_path or presentation_path
-        
+
     except Exception as e:
         error_msg = f"OCR控制器处理失败: {str(e)}"
         logger.error(f"❌ {error_msg}")
         return presentation_path
     finally:
-        if extractor:
-            logger.info("🧹 清理临时文件...")
-            extractor.cleanup()
+        logger.info("🧹 清理临时文件...")
+        prepared['extractor'].cleanup()
+
+
+def ocr_controller(presentation_path: str, 
+                  selected_pages: Optional[List[int]] = None, 
+                  output_path: str = None,
+                  enable_translation: bool = True,
+                  target_language: str = "中文",
+                  source_language: str = "英文",
+                  enable_text_splitting: str = "False",
+                  checkpoint=None) -> str:
+    """
+    OCR主控制器：提取图片、OCR识别、文本行分割、翻译、写回PPT
+    
+    Args:
+        presentation_path: PPT文件路径
+        selected_pages: 真实页码（第一页为1），None表示全篇处理
+        output_path: 输出文件路径
+        enable_translation: 是否启用翻译功能
+        target_language: 目标语言
+        source_language: 源语言
+        enable_text_splitting: 是否启用文本行分割处理
+        checkpoint: 任务检查点（可选），重试时复用已完成的图片OCR结果
+        
+    Returns:
+        处理后的PPT文件路径
+    """
+    prepared = prepare_ocr_results(presentation_path,
+                                   selected_pages=selected_pages,
+                                   enable_translation=enable_translation,
+                                   target_language=target_language,
+                                   source_language=source_language,
+                                   enable_text_splitting=enable_text_splitting,
+                                   checkpoint=checkpoint)
+    return apply_ocr_results(presentation_path, prepared, output_path=output_path)
 
 
 # 使用示例
@@ -7,6 +7,7 @@ import sys
 import platform
 import re
 import ast
+import logging
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from PIL import Image
@@ -19,6 +20,13 @@ except ImportError:
     PIL_AVAILABLE = False
     print("⚠️  警告: 缺少PIL库")
 
+# 导入日志系统（逐张图片的过程信息使用DEBUG级别，参数在输出时才格式化）
+try:
+    from logger_config_ocr import get_logger
+    logger = get_logger("qwen_ocr_api")
+except ImportError:
+    logger = logging.getLogger("qwen_ocr_api")
+
 # 检查是否安装了必要的工具（根据操作系统类型）
 def check_tools():
     """检查系统上必要的工具"""
@@ -320,7 +328,7 @@ def convert_emf_to_png(emf_path):
         return convert_emf_to_png_linux(emf_path, png_path)
             
     except Exception as e:
-        print(f"⚠️  EMF转换PNG失败 ({emf_path}): {e}")
+        logger.warning("⚠️ EMF转换PNG失败 (%s): %s", emf_path, e)
         return None
 
 def convert_emf_to_png_linux(emf_path, png_path):
@@ -343,7 +351,7 @@ def convert_emf_to_png_linux(emf_path, png_path):
             ], capture_output=True, text=True, timeout=30)
             
             if result.returncode == 0 and os.path.exists(png_path):
-                print(f"✅ 使用ImageMagick成功转换 {os.path.basename(emf_path)}")
+                logger.debug("✅ 使用ImageMagick成功转换 %s", os.path.basename(emf_path))
                 return png_path
         except (subprocess.TimeoutExpired, FileNotFoundError):
             pass
@@ -359,7 +367,7 @@ def convert_emf_to_png_linux(emf_path, png_path):
             ], capture_output=True, text=True, timeout=30)
             
             if result.returncode == 0 and os.path.exists(png_path):
-                print(f"✅ 使用Inkscape成功转换 {os.path.basename(emf_path)}")
+                logger.debug("✅ 使用Inkscape成功转换 %s", os.path.basename(emf_path))
                 return png_path
         except (subprocess.TimeoutExpired, FileNotFoundError):
             pass
@@ -391,7 +399,7 @@ def convert_emf_to_png_linux(emf_path, png_path):
                     os.remove(pdf_path)
                 
                 if result2.returncode == 0 and os.path.exists(png_path):
-                    print(f"✅ 使用LibreOffice成功转换 {os.path.basename(emf_path)}")
+                    logger.debug("✅ 使用LibreOffice成功转换 %s", os.path.basename(emf_path))
                     return png_path
         except (subprocess.TimeoutExpired, FileNotFoundError):
             # 清理可能创建的临时文件
@@ -405,19 +413,19 @@ def convert_emf_to_png_linux(emf_path, png_path):
             try:
                 with Image.open(emf_path) as img:
                     img.save(png_path, 'PNG')
-                print(f"✅ 使用PIL成功转换 {os.path.basename(emf_path)}")
+                logger.debug("✅ 使用PIL成功转换 %s", os.path.basename(emf_path))
                 return png_path
             except Exception:
                 pass
         
-        print(f"❌ 所有方法都失败，无法转换EMF文件: {os.path.basename(emf_path)}")
+        logger.warning("❌ 所有方法都失败，无法转换EMF文件: %s", os.path.basename(emf_path))
         return None
         
     except Exception as e:
-        print(f"⚠️  EMF转换PNG失败 ({emf_path}): {e}")
+        logger.warning("⚠️ EMF转换PNG失败 (%s): %s", emf_path, e)
         return None
 
-def process_folder_with_mapping(folder_path, json_path, api_key):
+def process_folder_with_mapping(folder_path, json_path, api_key, checkpoint=None):
     """
     批量处理文件夹中的图片，并将OCR结果更新到JSON文件中
     
@@ -425,23 +433,24 @@ def process_folder_with_mapping(folder_path, json_path, api_key):
         folder_path (str): 包含图片文件的文件夹路径
         json_path (str): JSON映射文件路径
         api_key (str): 通义千问API密钥
+        checkpoint: 任务检查点（可选），已识别过的图片直接复用结果
     """
     # 检查文件夹和JSON文件是否存在
     if not os.path.exists(folder_path):
-        print(f"❌ 文件夹不存在: {folder_path}")
+        logger.error("❌ 文件夹不存在: %s", folder_path)
         return
     
     if not os.path.exists(json_path):
-        print(f"❌ JSON文件不存在: {json_path}")
+        logger.error("❌ JSON文件不存在: %s", json_path)
         return
     
     # 读取JSON映射文件
     try:
         with open(json_path, 'r', encoding='utf-8') as f:
             mapping_data = json.load(f)
-        print(f"✅ 成功读取JSON映射文件")
+        logger.debug("✅ 成功读取JSON映射文件")
     except Exception as e:
-        print(f"❌ 读取JSON文件失败: {e}")
+        logger.error("❌ 读取JSON文件失败: %s", e)
         return
     
     # 初始化OCR处理器
@@ -451,11 +460,9 @@ def process_folder_with_mapping(folder_path, json_path, api_key):
     available_tools = check_tools()
     
     if available_tools:
-        print(f"✅ 检测到可用工具: {', '.join(available_tools)}")
+        logger.debug("✅ 检测到可用工具: %s", ', '.join(available_tools))
     else:
-        print("⚠️  未检测到可用的EMF转换工具，将跳过EMF文件处理")
-        print("💡 建议安装以下工具之一:")
-        print("   sudo apt-get install imagemagick inkscape libreoffice")
+        logger.info("⚠️ 未检测到可用的EMF转换工具，将跳过EMF文件处理（可安装 imagemagick、inkscape 或 libreoffice）")
     
     # 收集所有需要处理的图片文件
     image_files = {}
@@ -469,31 +476,41 @@ def process_folder_with_mapping(folder_path, json_path, api_key):
         # 特殊处理EMF文件
         elif file_name.lower().endswith('.emf'):
             if not available_tools:
-                print(f"❌ 无法处理EMF文件 (缺少工具): {file_name}，跳过处理")
+                logger.debug("❌ 无法处理EMF文件 (缺少工具): %s，跳过处理", file_name)
                 continue
                 
-            print(f"🔄 检测到EMF文件: {file_name}，正在尝试转换为PNG...")
+            logger.debug("🔄 检测到EMF文件: %s，正在尝试转换为PNG...", file_name)
             png_path = convert_emf_to_png(file_path)
             if png_path and os.path.exists(png_path):
                 png_file_name = os.path.basename(png_path)
                 image_files[png_file_name] = png_path
                 temp_files.append(png_path)  # 记录临时文件
-                print(f"✅ 已将 {file_name} 转换为 {png_file_name}")
+                logger.debug("✅ 已将 %s 转换为 %s", file_name, png_file_name)
             else:
-                print(f"❌ 无法处理EMF文件: {file_name}，跳过处理")
+                logger.debug("❌ 无法处理EMF文件: %s，跳过处理", file_name)
     
-    print(f"📁 找到 {len(image_files)} 个可处理的图片文件")
+    logger.info("📁 找到 %d 个可处理的图片文件", len(image_files))
     
     # 处理每个图片文件
     ocr_results = {}
     for file_name, file_path in image_files.items():
-        print(f"🔍 正在处理: {file_name}")
+        cached_result = checkpoint.load_ocr_result(file_path) if checkpoint is not None else None
+        if cached_result is not None:
+            logger.debug("♻️ %s 使用检查点中的OCR结果", file_name)
+            ocr_results[file_name] = cached_result
+            continue
+        logger.debug("🔍 正在处理: %s", file_name)
         result = processor.ocr_image(file_path)
         ocr_results[file_name] = result
+        if checkpoint is not None:
+            try:
+                checkpoint.save_ocr_result(file_path, result)
+            except Exception as e:
+                logger.warning("⚠️ 保存OCR检查点失败: %s", e)
         if result["status"] == "success":
-            print(f"✅ {file_name} 处理成功")
+            logger.debug("✅ %s 处理成功", file_name)
         else:
-            print(f"❌ {file_name} 处理失败: {result.get('error', 'Unknown error')}")
+            logger.warning("❌ %s 处理失败: %s", file_name, result.get('error', 'Unknown error'))
     
     # 将OCR结果更新到JSON映射数据中
     updated_count = 0
@@ -508,41 +525,37 @@ def process_folder_with_mapping(folder_path, json_path, api_key):
                         if ocr_result["all_text"] and any(ocr_result["all_text"].values()):
                             image_info['all_text'] = ocr_result["all_text"]
                             updated_count += 1
-                            print(f"📝 已更新 {filename} 的OCR结果")
+                            logger.debug("📝 已更新 %s 的OCR结果", filename)
                         else:
                             # 如果没有识别到文本，确保移除可能已存在的all_text字段
                             if 'all_text' in image_info:
                                 del image_info['all_text']
-                            print(f"⚠️ {filename} 没有识别到文本，跳过更新")
+                            logger.debug("⚠️ %s 没有识别到文本，跳过更新", filename)
                     else:
-                        print(f"⚠️ {filename} OCR处理失败，跳过更新")
+                        logger.debug("⚠️ %s OCR处理失败，跳过更新", filename)
     
     # 将更新后的数据写回JSON文件
     try:
         with open(json_path, 'w', encoding='utf-8') as f:
             json.dump(mapping_data, f, ensure_ascii=False, indent=2)
-        print(f"✅ 成功更新JSON文件，共更新了 {updated_count} 个图片的OCR结果")
+        logger.debug("✅ 成功更新JSON文件，共更新了 %d 个图片的OCR结果", updated_count)
     except Exception as e:
-        print(f"❌ 写入JSON文件失败: {e}")
+        logger.error("❌ 写入JSON文件失败: %s", e)
         return
     
     # 删除临时创建的PNG文件
     for temp_file in temp_files:
         try:
             os.remove(temp_file)
-            print(f"🗑️ 已删除临时文件: {os.path.basename(temp_file)}")
+            logger.debug("🗑️ 已删除临时文件: %s", os.path.basename(temp_file))
         except Exception as e:
-            print(f"⚠️ 删除临时文件失败 {os.path.basename(temp_file)}: {e}")
+            logger.warning("⚠️ 删除临时文件失败 %s: %s", os.path.basename(temp_file), e)
     
     # 输出处理报告
     success_count = sum(1 for result in ocr_results.values() if result["status"] == "success")
     failed_count = len(ocr_results) - success_count
-    print(f"\n📊 处理报告:")
-    print(f"   成功处理: {success_count}")
-    print(f"   处理失败: {failed_count}")
-    print(f"   更新到JSON: {updated_count}")
-    if temp_files:
-        print(f"   临时文件: {len(temp_files)} 个已清理")
+    logger.info("📊 图片OCR处理报告: 成功 %d, 失败 %d, 更新到JSON %d, 清理临时文件 %d 个",
+                success_count, failed_count, updated_count, len(temp_files))
 
 # 使用示例
 if __name__ == "__main__":
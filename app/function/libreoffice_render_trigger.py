@@ -11,6 +11,11 @@ import time
 import shutil
 from typing import Optional, Dict, Any
 
+from .office_conversion import (
+    OfficeConversionClient, get_conversion_client,
+    FILTER_ODP, FILTER_PPTX, FILTER_IMPRESS_PDF
+)
+
 try:
     from pptx import Presentation
     from pptx.enum.text import MSO_AUTO_SIZE
@@ -28,8 +33,12 @@ class LibreOfficeRenderTrigger:
 
     def __init__(self):
         """初始化LibreOffice渲染触发器"""
-        # 检查LibreOffice是否可用
-        self.libreoffice_available = self._check_libreoffice()
+        # 命令行检测到的LibreOffice命令；已有常驻实例时不做检测，保持为None
+        self.libreoffice_cmd: Optional[str] = None
+        # 检查LibreOffice是否可用（已有常驻实例时无需再启动进程探测）
+        self.libreoffice_available = (
+            get_conversion_client().is_office_running() or self._check_libreoffice()
+        )
         
         # 初始化统计信息
         self.stats = {
@@ -195,6 +204,7 @@ class LibreOfficeRenderTrigger:
         """通过ODP中转转换为PDF触发渲染"""
         try:
             logger.info("步骤2: 通过LibreOffice ODP中转转换为PDF触发渲染")
+            client = self._get_conversion_client()
 
             # 创建临时目录用于中间文件和PDF输出
             with tempfile.TemporaryDirectory() as temp_dir:
@@ -208,159 +218,44 @@ class LibreOfficeRenderTrigger:
                 logger.debug(f"输出目录: {temp_dir}")
 
                 # 步骤2.1: 先转换为ODP格式
-                cmd_to_odp = [
-                    self.libreoffice_cmd,
-                    '--headless',           # 无头模式
-                    '--invisible',          # 不可见
-                    '--nodefault',          # 不使用默认设置
-                    '--nolockcheck',        # 不检查锁定
-                    '--nologo',             # 不显示logo
-                    '--norestore',          # 不恢复
-                    '--convert-to', 'odp',  # 转换为ODP
-                    '--outdir', temp_dir,   # 输出目录
-                    ppt_path                # 输入文件
-                ]
-
-                # 在Windows下，如果路径包含空格，需要特殊处理
-                if platform.system() == "Windows":
-                    # 对于Windows，确保路径被正确引用
-                    cmd_str_odp = f'"{self.libreoffice_cmd}" --headless --invisible --nodefault --nolockcheck --nologo --norestore --convert-to odp --outdir "{temp_dir}" "{ppt_path}"'
-                    logger.debug(f"Windows ODP转换命令: {cmd_str_odp}")
-                    
-                    # Windows下使用shell=True执行命令字符串
-                    result_odp = subprocess.run(
-                        cmd_str_odp,
-                        shell=True,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,  # 2分钟超时
-                        cwd=temp_dir  # 设置工作目录
-                    )
-                else:
-                    # Linux/macOS下使用列表形式
-                    logger.debug(f"执行ODP转换命令: {' '.join(cmd_to_odp)}")
-                    result_odp = subprocess.run(
-                        cmd_to_odp,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,
-                        cwd=temp_dir
-                    )
-                
-                # 检查ODP转换是否成功
-                if result_odp.returncode != 0:
-                    logger.error(f"转换为ODP失败: {result_odp.stderr}")
-                    return False
-                
-                # 检查ODP文件是否生成
                 odp_file = os.path.join(temp_dir, f"{ppt_name}.odp")
-                if not os.path.exists(odp_file):
-                    logger.error("未能生成ODP文件")
+                if not client.convert(ppt_path, odp_file, FILTER_ODP):
+                    logger.error("转换为ODP失败")
                     return False
                 
                 logger.info(f"成功转换为ODP格式: {odp_file}")
 
                 # 步骤2.2: 从ODP转换为PDF格式
-                cmd_to_pdf = [
-                    self.libreoffice_cmd,
-                    '--headless',           # 无头模式
-                    '--invisible',          # 不可见
-                    '--nodefault',          # 不使用默认设置
-                    '--nolockcheck',        # 不检查锁定
-                    '--nologo',             # 不显示logo
-                    '--norestore',          # 不恢复
-                    '--convert-to', 'pdf:writer_pdf_Export',  # 转换为PDF并指定导出过滤器
-                    '--outdir', temp_dir,   # 输出目录
-                    odp_file                # 输入文件
-                ]
-
-                # 在Windows下，如果路径包含空格，需要特殊处理
-                if platform.system() == "Windows":
-                    # 对于Windows，确保路径被正确引用
-                    cmd_str_pdf = f'"{self.libreoffice_cmd}" --headless --invisible --nodefault --nolockcheck --nologo --norestore --convert-to pdf:writer_pdf_Export --outdir "{temp_dir}" "{odp_file}"'
-                    logger.debug(f"Windows PDF转换命令: {cmd_str_pdf}")
-                    
-                    # 执行转换命令
-                    start_time = time.time()
-                    
-                    # Windows下使用shell=True执行命令字符串
-                    result = subprocess.run(
-                        cmd_str_pdf,
-                        shell=True,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,  # 2分钟超时
-                        cwd=temp_dir  # 设置工作目录
-                    )
-                else:
-                    # Linux/macOS下使用列表形式
-                    logger.debug(f"执行PDF转换命令: {' '.join(cmd_to_pdf)}")
-                    
-                    # 执行转换命令
-                    start_time = time.time()
-                    
-                    result = subprocess.run(
-                        cmd_to_pdf,
-                        capture_output=True,
-                        text=True,
-                        timeout=120,
-                        cwd=temp_dir
-                    )
-
-                end_time = time.time()
-                conversion_time = end_time - start_time
-
+                pdf_file = os.path.join(temp_dir, f"{ppt_name}.pdf")
+                start_time = time.time()
+                converted = client.convert(odp_file, pdf_file, FILTER_IMPRESS_PDF)
+                conversion_time = time.time() - start_time
                 logger.debug(f"LibreOffice转换耗时: {conversion_time:.2f}秒")
-                logger.debug(f"返回码: {result.returncode}")
 
-                if result.stdout:
-                    logger.debug(f"标准输出: {result.stdout}")
-                if result.stderr:
-                    logger.debug(f"标准错误: {result.stderr}")
+                if not converted:
+                    logger.error("LibreOffice转换PDF失败")
+                    return False
 
                 # 检查转换是否成功
-                if result.returncode == 0:
-                    # 查找生成的PDF文件
-                    try:
-                        pdf_file = os.path.join(temp_dir, f"{ppt_name}.pdf")
-                        if os.path.exists(pdf_file):
-                            pdf_size = os.path.getsize(pdf_file)
-
-                            logger.info(f"✅ PDF转换成功: {os.path.basename(pdf_file)} ({pdf_size} bytes)")
-                            logger.info("🎯 PPT已被LibreOffice完整渲染，文本框自适应设置已生效")
-
-                            self.stats['render_triggered'] = 1
-                            self.stats['pdf_generated'] = 1
-                            self.stats['pdf_deleted'] = 1  # PDF在临时目录中会自动删除
-
-                            # 步骤2.3: 从ODP转换回PPTX格式
-                            logger.info("步骤2.3: 从ODP转换回PPTX格式并覆盖原文件")
-                            pptx_result = self._convert_odp_to_pptx(odp_file, temp_dir, ppt_path)
-                            if pptx_result:
-                                logger.info("✅ 完整渲染流程成功: ODP -> PDF -> PPTX")
-                                self.stats['pptx_generated'] = 1
-                            else:
-                                logger.warning("⚠️ PDF渲染成功，但PPTX转换失败")
-
-                            return True
-                        else:
-                            logger.warning("PDF转换命令成功但未找到PDF文件")
-                            logger.debug(f"临时目录内容: {os.listdir(temp_dir)}")
-                            return False
-                    except Exception as e:
-                        logger.error(f"检查PDF文件时出错: {e}")
-                        return False
+                pdf_size = os.path.getsize(pdf_file)
+                logger.info(f"✅ PDF转换成功: {os.path.basename(pdf_file)} ({pdf_size} bytes)")
+                logger.info("🎯 PPT已被LibreOffice完整渲染，文本框自适应设置已生效")
+
+                self.stats['render_triggered'] = 1
+                self.stats['pdf_generated'] = 1
+                self.stats['pdf_deleted'] = 1  # PDF在临时目录中会自动删除
+
+                # 步骤2.3: 从ODP转换回PPTX格式
+                logger.info("步骤2.3: 从ODP转换回PPTX格式并覆盖原文件")
+                pptx_result = self._convert_odp_to_pptx(odp_file, temp_dir, ppt_path)
+                if pptx_result:
+                    logger.info("✅ 完整渲染流程成功: ODP -> PDF -> PPTX")
+                    self.stats['pptx_generated'] = 1
                 else:
-                    logger.error(f"LibreOffice转换失败，返回码: {result.returncode}")
-                    if result.stderr:
-                        logger.error(f"错误信息: {result.stderr}")
-                    if result.stdout:
-                        logger.error(f"输出信息: {result.stdout}")
-                    return False
+                    logger.warning("⚠️ PDF渲染成功，但PPTX转换失败")
+
+                return True
 
-        except subprocess.TimeoutExpired:
-            logger.error("LibreOffice转换超时（120秒）")
-            return False
         except Exception as e:
             logger.error(f"PDF转换触发渲染失败: {e}")
             import traceback
@@ -382,73 +277,27 @@ class LibreOfficeRenderTrigger:
         try:
             logger.info(f"将ODP转换回PPTX格式: {os.path.basename(odp_file)}")
             
-            # 构建转换命令
-            cmd = [
-                self.libreoffice_cmd,
-                '--headless',
-                '--invisible',
-                '--nodefault',
-                '--nolockcheck',
-                '--nologo',
-                '--norestore',
-                '--convert-to', 'pptx:Impress MS PowerPoint 2007 XML',  # 显式指定导出格式
-                '--outdir', output_dir,
-                odp_file
-            ]
-            
-            # 在Windows下，如果路径包含空格，需要特殊处理
-            if platform.system() == "Windows":
-                cmd_str = f'"{self.libreoffice_cmd}" --headless --invisible --nodefault --nolockcheck --nologo --norestore --convert-to "pptx:Impress MS PowerPoint 2007 XML" --outdir "{output_dir}" "{odp_file}"'
-                logger.debug(f"Windows PPTX转换命令: {cmd_str}")
-                
-                # Windows下使用shell=True执行命令字符串
-                result = subprocess.run(
-                    cmd_str,
-                    shell=True,
-                    capture_output=True,
-                    text=True,
-                    timeout=120,
-                    cwd=output_dir
-                )
-            else:
-                # Linux/macOS下使用列表形式
-                logger.debug(f"执行PPTX转换命令: {' '.join(cmd)}")
-                result = subprocess.run(
-                    cmd,
-                    capture_output=True,
-                    text=True,
-                    timeout=120,
-                    cwd=output_dir
-                )
+            ppt_name = os.path.splitext(os.path.basename(odp_file))[0]
+            pptx_file = os.path.join(output_dir, f"{ppt_name}.pptx")
+
+            # 显式指定导出格式
+            if not self._get_conversion_client().convert(odp_file, pptx_file, FILTER_PPTX):
+                logger.error("PPTX转换失败")
+                return ""
+
+            logger.info(f"ODP成功转换为PPTX: {pptx_file}")
             
-            if result.returncode == 0:
-                # 查找生成的PPTX文件
-                ppt_name = os.path.splitext(os.path.basename(odp_file))[0]
-                pptx_file = os.path.join(output_dir, f"{ppt_name}.pptx")
-                
-                if os.path.exists(pptx_file):
-                    logger.info(f"ODP成功转换为PPTX: {pptx_file}")
-                    
-                    # 如果提供了原始PPTX路径，则覆盖它
-                    if original_pptx_path:
-                        try:
-                            shutil.copyfile(pptx_file, original_pptx_path)
-                            logger.info(f"渲染后的PPTX已覆盖原文件: {original_pptx_path}")
-                            return original_pptx_path
-                        except Exception as e:
-                            logger.error(f"无法覆盖原PPTX文件: {e}")
-                            return pptx_file
-                    
+            # 如果提供了原始PPTX路径，则覆盖它
+            if original_pptx_path:
+                try:
+                    shutil.copyfile(pptx_file, original_pptx_path)
+                    logger.info(f"渲染后的PPTX已覆盖原文件: {original_pptx_path}")
+                    return original_pptx_path
+                except Exception as e:
+                    logger.error(f"无法覆盖原PPTX文件: {e}")
                     return pptx_file
-                else:
-                    logger.warning("PPTX转换命令成功但未找到PPTX文件")
-                    logger.debug(f"目录内容: {os.listdir(output_dir)}")
-                    return ""
-            else:
-                logger.error(f"PPTX转换失败，返回码: {result.returncode}")
-                if result.stderr:
-                    logger.error(f"错误信息: {result.stderr}")
-                return ""
+            
+            return pptx_file
                 
         except Exception as e:
             logger.error(f"ODP转换为PPTX出错: {e}")
@@ -456,6 +305,13 @@ class LibreOfficeRenderTrigger:
             logger.debug(f"详细错误: {traceback.format_exc()}")
             return ""
 
+    def _get_conversion_client(self) -> OfficeConversionClient:
+        """获取共享转换客户端，命令行回退时使用检测到的LibreOffice命令"""
+        client = get_conversion_client()
+        if not client.cli_cmd and self.libreoffice_cmd:
+            client.cli_cmd = self.libreoffice_cmd
+        return client
+
     def _log_stats(self):
         """输出统计信息"""
         logger.info("=" * 50)
@@ -481,7 +337,8 @@ class LibreOfficeRenderTrigger:
             'pdf_deleted': self.stats.get('pdf_deleted', 0),
             'pptx_generated': self.stats.get('pptx_generated', 0),
             'libreoffice_available': self.libreoffice_available,
-            'libreoffice_cmd': getattr(self, 'libreoffice_cmd', None)
+            'libreoffice_cmd': self.libreoffice_cmd,
+            'conversion_client': get_conversion_client().get_stats()
         }
 
 
@@ -542,7 +399,7 @@ def test_libreoffice_availability():
     trigger = LibreOfficeRenderTrigger()
 
     if trigger.libreoffice_available:
-        print(f"✅ LibreOffice可用: {trigger.libreoffice_cmd}")
+        print(f"✅ LibreOffice可用: {trigger.libreoffice_cmd or '常驻转换实例'}")
         return True
     else:
         print("❌ LibreOffice不可用")
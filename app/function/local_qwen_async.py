@@ -23,6 +23,7 @@ from ..utils.translation_utils import (
     build_map,
     clean_translation_text
 )
+from ..utils.log_queue import lazy_text
 
 # from ..utils.async_http_client import AsyncHttpClient
 try:
@@ -438,14 +439,14 @@ async def translate_async(text: str, field: str = None, stop_words: List[str] =
         logger.info(f"翻译API返回结果类型: {type(translation_result)}")
         logger.info(f"翻译API返回结果长度: {len(translation_result) if hasattr(translation_result, '__len__') else 'N/A'}")
         if isinstance(translation_result, str):
-            logger.info(f"翻译API返回结果前200字符: {translation_result[:200]}")
+            logger.info("翻译API返回结果前200字符: %s", lazy_text(translation_result, 200))
 
         # 清理特殊字符
         text_clean = clean_translation_text(translation_result)
         logger.info(f"清理后文本类型: {type(text_clean)}")
         logger.info(f"清理后文本长度: {len(text_clean) if hasattr(text_clean, '__len__') else 'N/A'}")
         if isinstance(text_clean, str):
-            logger.info(f"清理后文本前200字符: {text_clean[:200]}")
+            logger.info("清理后文本前200字符: %s", lazy_text(text_clean, 200))
 
         # 解析结果
         parsed_result = await parse_formatted_text_async(text_clean)
@@ -453,7 +454,7 @@ async def translate_async(text: str, field: str = None, stop_words: List[str] =
         logger.info(f"解析后结果长度: {len(parsed_result) if hasattr(parsed_result, '__len__') else 'N/A'}")
         if isinstance(parsed_result, (list, dict)) and len(parsed_result) > 0:
             if isinstance(parsed_result, list) and len(parsed_result) > 0:
-                logger.info(f"解析后结果第一个元素: {parsed_result[0]}")
+                logger.info("解析后结果第一个元素: %s", lazy_text(parsed_result[0], 200))
             elif isinstance(parsed_result, dict):
                 logger.info(f"解析后结果键示例: {list(parsed_result.keys())[:3]}")
 
@@ -0,0 +1,400 @@
+"""
+共享的LibreOffice文档转换客户端
+优先通过UNO把storeToURL任务提交给常驻的headless soffice实例（省去每次数秒的冷启动），
+只有在无法启动实例时才回退为启动 soffice --convert-to 子进程。
+- 转换使用单独的实例（OFFICE_CONVERSION_PORT，默认2003，独立的用户配置目录），
+  与翻译流程使用的2002端口实例隔离：转换超时时只结束转换实例，不影响正在进行的翻译
+- 转换实例由客户端在首次使用时启动，被结束或异常退出后在下一次转换时重新启动
+- 所有转换请求进入同一个队列，由少量后台线程（OFFICE_CONVERSION_WORKERS，默认2）并发提交，
+  并发任务的转换请求共用同一个实例和UNO连接
+"""
+import os
+import sys
+import atexit
+import shutil
+import socket
+import logging
+import pathlib
+import subprocess
+import tempfile
+import threading
+import time
+import queue
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# UNO连接管理器（可选依赖）。与 pynuo_fuc 中的模块一样按顶层模块名 uno_connection 导入，
+# 共用同一个连接管理器注册表（按包路径导入会得到另一份模块和注册表）
+_PYNUO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pynuo_fuc')
+if _PYNUO_DIR not in sys.path:
+    sys.path.insert(0, _PYNUO_DIR)
+try:
+    from uno_connection import get_connection_manager, DEFAULT_HOST, DEFAULT_PORT
+    UNO_AVAILABLE = True
+except ImportError:
+    UNO_AVAILABLE = False
+    DEFAULT_HOST, DEFAULT_PORT = "localhost", 2002
+    logger.info("UNO接口不可用，文档转换将使用LibreOffice命令行")
+
+# 转换实例的端口和并发提交线程数
+CONVERSION_PORT = int(os.getenv('OFFICE_CONVERSION_PORT', '2003'))
+CONVERSION_WORKERS = max(1, int(os.getenv('OFFICE_CONVERSION_WORKERS', '2')))
+# 等待转换实例开始监听的时间（秒）
+OFFICE_STARTUP_TIMEOUT = 30
+
+# 常用导出过滤器
+FILTER_ODP = "impress8"
+FILTER_PPTX = "Impress MS PowerPoint 2007 XML"
+FILTER_IMPRESS_PDF = "impress_pdf_Export"
+FILTER_DRAW_PNG = "draw_png_Export"
+
+# 命令行回退时每种过滤器对应的 --convert-to 参数
+_CLI_TARGETS = {
+    FILTER_ODP: "odp",
+    FILTER_PPTX: "pptx:Impress MS PowerPoint 2007 XML",
+    FILTER_IMPRESS_PDF: "pdf:impress_pdf_Export",
+    FILTER_DRAW_PNG: "png",
+}
+
+_CLI_CANDIDATES = [
+    "soffice",
+    "libreoffice",
+    "/usr/bin/soffice",
+    "/usr/lib/libreoffice/program/soffice",
+    "/opt/libreoffice/program/soffice",
+    "/Applications/LibreOffice.app/Contents/MacOS/soffice",
+    r"C:\Program Files\LibreOffice\program\soffice.exe",
+    r"C:\Program Files (x86)\LibreOffice\program\soffice.exe",
+]
+
+
+class _ConversionJob:
+    """队列中的一个转换任务"""
+
+    def __init__(self, input_path: str, output_path: str, filter_name: str, timeout: int):
+        self.input_path = os.path.abspath(input_path)
+        self.output_path = os.path.abspath(output_path)
+        self.filter_name = filter_name
+        self.timeout = timeout
+        self.future = Future()
+        self.submitted_at = time.time()
+
+
+class OfficeConversionClient:
+    """通过常驻soffice实例执行转换的客户端（进程内单例）"""
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = CONVERSION_PORT, cli_cmd: Optional[str] = None,
+                 workers: int = CONVERSION_WORKERS):
+        self.host = host
+        self.port = port
+        self.cli_cmd = cli_cmd
+        self.workers = max(1, workers)
+        self._queue = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        # 转换实例的启动和结束互斥；每次结束实例后代数加一，用于识别被其他任务的超时连带中断的转换
+        self._office_lock = threading.Lock()
+        self._office_process = None
+        self._office_generation = 0
+        self.stats = {
+            'submitted': 0,
+            'uno_conversions': 0,
+            'cli_conversions': 0,
+            'failed': 0,
+            'office_killed': 0,
+            'total_wait_time': 0.0,
+            'total_convert_time': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def submit(self, input_path: str, output_path: str, filter_name: str, timeout: int = 120) -> Future:
+        """提交转换任务，返回Future（结果为输出文件路径）"""
+        job = _ConversionJob(input_path, output_path, filter_name, timeout)
+        self._ensure_worker()
+        with self._lock:
+            self.stats['submitted'] += 1
+        self._queue.put(job)
+        return job.future
+
+    def convert(self, input_path: str, output_path: str, filter_name: str, timeout: int = 120) -> bool:
+        """同步转换，成功返回True"""
+        future = self.submit(input_path, output_path, filter_name, timeout)
+        try:
+            future.result(timeout=timeout * 2)
+            return True
+        except Exception as e:
+            logger.error(f"文档转换失败 {os.path.basename(input_path)} -> {os.path.basename(output_path)}: {e}")
+            return False
+
+    def is_office_running(self) -> bool:
+        """检查转换实例是否在监听"""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取转换统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_size'] = self._queue.qsize()
+        stats['uno_available'] = UNO_AVAILABLE
+        stats['port'] = self.port
+        stats['workers'] = self.workers
+        return stats
+
+    # ------------------------------------------------------------------
+    # 后台队列处理
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            while len(self._workers) < self.workers:
+                worker = threading.Thread(
+                    target=self._worker_loop, daemon=True,
+                    name=f"OfficeConversionWorker-{len(self._workers)}"
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def _worker_loop(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    self._run_job(job)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job: _ConversionJob):
+        started = time.time()
+        wait_time = started - job.submitted_at
+        try:
+            os.makedirs(os.path.dirname(job.output_path), exist_ok=True)
+            if UNO_AVAILABLE and self._ensure_office():
+                self._convert_via_uno(job)
+                counter = 'uno_conversions'
+            else:
+                self._convert_via_cli(job)
+                counter = 'cli_conversions'
+
+            if not os.path.exists(job.output_path):
+                raise FileNotFoundError(f"转换后未找到输出文件: {job.output_path}")
+
+            elapsed = time.time() - started
+            with self._lock:
+                self.stats[counter] += 1
+                self.stats['total_wait_time'] += wait_time
+                self.stats['total_convert_time'] += elapsed
+            logger.debug(f"转换完成({counter}): {os.path.basename(job.output_path)}，"
+                         f"排队 {wait_time:.2f}s，转换 {elapsed:.2f}s")
+            job.future.set_result(job.output_path)
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += 1
+            job.future.set_exception(e)
+
+    def _convert_via_uno(self, job: _ConversionJob, retried: bool = False):
+        """
+        通过转换实例执行 loadComponentFromURL + storeToURL。
+        UNO调用无法中断，因此在单独的线程中执行；超过 job.timeout 时结束转换实例，
+        队列继续处理后续任务（下一次转换时重新启动实例）。
+        同时在该实例上进行的转换因实例被结束而失败时，在重新启动的实例上重试一次
+        """
+        manager = get_connection_manager(self.host, self.port)
+        generation = self._office_generation
+        outcome = Future()
+
+        def _run():
+            try:
+                outcome.set_result(manager.convert_document(job.input_path, job.output_path, job.filter_name))
+            except BaseException as e:
+                outcome.set_exception(e)
+
+        threading.Thread(target=_run, daemon=True, name="OfficeConversionUno").start()
+        try:
+            outcome.result(timeout=job.timeout)
+        except FutureTimeoutError:
+            self._kill_office(manager, generation)
+            raise TimeoutError(f"LibreOffice转换超时（{job.timeout}秒）: {os.path.basename(job.input_path)}")
+        except Exception:
+            if retried or self._office_generation == generation or not self._ensure_office():
+                raise
+            logger.warning(f"转换实例已被重新启动，重试转换: {os.path.basename(job.input_path)}")
+            self._convert_via_uno(job, retried=True)
+
+    # ------------------------------------------------------------------
+    # 转换实例
+    # ------------------------------------------------------------------
+    def _ensure_office(self) -> bool:
+        """确保转换实例在监听，必要时启动；无法启动时返回False（回退为命令行转换）"""
+        if self.is_office_running():
+            return True
+        with self._office_lock:
+            if self.is_office_running():
+                return True
+            if self.port == DEFAULT_PORT:
+                # 与翻译流程共用实例时不由本客户端启动和结束
+                return False
+            try:
+                cli = self._find_cli()
+            except FileNotFoundError:
+                return False
+            # 独立的用户配置目录，避免与其他soffice实例争用配置锁
+            profile_dir = os.path.join(tempfile.gettempdir(), f"office_conversion_profile_{self.port}")
+            cmd = [
+                cli,
+                '--headless',
+                '--invisible',
+                '--nodefault',
+                '--nolockcheck',
+                '--nologo',
+                '--norestore',
+                f"-env:UserInstallation={pathlib.Path(profile_dir).as_uri()}",
+                f"--accept=socket,host={self.host},port={self.port};urp;StarOffice.ComponentContext",
+            ]
+            if self._office_process is not None:
+                # 之前启动的实例已退出或不再监听
+                self._terminate(self._office_process)
+                self._office_process = None
+            logger.info(f"启动文档转换实例: {' '.join(cmd)}")
+            try:
+                process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                           start_new_session=True)
+            except OSError as e:
+                logger.error(f"启动文档转换实例失败: {e}")
+                return False
+            deadline = time.monotonic() + OFFICE_STARTUP_TIMEOUT
+            while time.monotonic() < deadline:
+                if self.is_office_running():
+                    self._office_process = process
+                    # 旧实例的连接已失效
+                    get_connection_manager(self.host, self.port).invalidate()
+                    logger.info(f"文档转换实例已启动，PID {process.pid}，端口 {self.port}")
+                    return True
+                if process.poll() is not None:
+                    break
+                time.sleep(0.5)
+            logger.error(f"文档转换实例未能在 {OFFICE_STARTUP_TIMEOUT} 秒内开始监听端口 {self.port}")
+            self._terminate(process)
+            return False
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen) -> None:
+        if process.poll() is None:
+            process.kill()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                logger.warning(f"soffice实例 PID {process.pid} 未在5秒内退出")
+
+    def _kill_office(self, manager, generation: int):
+        """
+        结束卡住的转换实例并丢弃缓存的连接，卡住的UNO调用随桥接断开返回。
+        只结束转换端口上的实例（翻译流程使用的实例不受影响），下一次转换时重新启动
+        """
+        with self._office_lock:
+            if self._office_generation != generation:
+                # 其他超时的转换已经结束了这个实例
+                return
+            self._office_generation += 1
+            manager.invalidate()
+            with self._lock:
+                self.stats['office_killed'] += 1
+            if self.port == DEFAULT_PORT:
+                logger.error(f"转换使用翻译流程的共享实例（端口 {self.port}），不结束该实例")
+                return
+            if self._office_process is not None:
+                logger.warning(f"结束卡住的文档转换实例 PID {self._office_process.pid}（端口 {self.port}）")
+                self._terminate(self._office_process)
+                self._office_process = None
+                return
+            # 实例由同一部署的其他进程启动：按监听端口查找
+            try:
+                import psutil
+            except ImportError:
+                logger.error("缺少psutil，无法结束卡住的soffice实例")
+                return
+            try:
+                listeners = [conn.pid for conn in psutil.net_connections(kind='tcp')
+                             if conn.status == psutil.CONN_LISTEN and conn.laddr
+                             and conn.laddr.port == self.port and conn.pid]
+            except psutil.AccessDenied as e:
+                logger.error(f"无法查找监听端口 {self.port} 的进程: {e}")
+                return
+            for pid in set(listeners):
+                try:
+                    process = psutil.Process(pid)
+                    process.kill()
+                    process.wait(timeout=5)
+                    logger.warning(f"已结束卡住的文档转换实例 PID {pid}（端口 {self.port}）")
+                except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutExpired) as e:
+                    logger.warning(f"结束soffice实例 PID {pid} 失败: {e}")
+
+    def shutdown(self):
+        """结束本客户端启动的转换实例（进程退出时调用）"""
+        with self._office_lock:
+            if self._office_process is not None:
+                self._terminate(self._office_process)
+                self._office_process = None
+
+    def _find_cli(self) -> str:
+        if self.cli_cmd:
+            return self.cli_cmd
+        for candidate in _CLI_CANDIDATES:
+            resolved = shutil.which(candidate) or (candidate if os.path.exists(candidate) else None)
+            if resolved:
+                self.cli_cmd = resolved
+                return resolved
+        raise FileNotFoundError("未找到LibreOffice可执行文件")
+
+    def _convert_via_cli(self, job: _ConversionJob):
+        """无常驻实例时回退为一次性的 soffice --convert-to 子进程"""
+        target = _CLI_TARGETS.get(job.filter_name)
+        if target is None:
+            ext = os.path.splitext(job.output_path)[1].lstrip('.')
+            target = f"{ext}:{job.filter_name}"
+
+        with tempfile.TemporaryDirectory(prefix="office_convert_") as out_dir:
+            cmd = [
+                self._find_cli(),
+                '--headless',
+                '--invisible',
+                '--nodefault',
+                '--nolockcheck',
+                '--nologo',
+                '--norestore',
+                '--convert-to', target,
+                '--outdir', out_dir,
+                job.input_path
+            ]
+            logger.debug(f"执行LibreOffice命令行转换: {' '.join(cmd)}")
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=job.timeout, cwd=out_dir)
+            if result.returncode != 0:
+                raise RuntimeError(f"LibreOffice转换失败，返回码 {result.returncode}: {result.stderr}")
+
+            base_name = os.path.splitext(os.path.basename(job.input_path))[0]
+            ext = os.path.splitext(job.output_path)[1]
+            produced = os.path.join(out_dir, base_name + ext)
+            if not os.path.exists(produced):
+                raise FileNotFoundError(f"LibreOffice未生成输出文件，目录内容: {os.listdir(out_dir)}")
+            shutil.move(produced, job.output_path)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_conversion_client() -> OfficeConversionClient:
+    """获取全局转换客户端"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = OfficeConversionClient()
+            atexit.register(_client.shutdown)
+        return _client
@@ -5,13 +5,14 @@
 """
 import re
 import logging
-import difflib
 import asyncio
 from typing import Dict, List, Tuple, Optional, Any
 from dataclasses import dataclass
 from pptx import Presentation
 from pptx.enum.text import MSO_AUTO_SIZE
 
+from .paragraph_matcher import ParagraphTranslationMatcher
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -144,37 +145,6 @@ class PageBasedTranslator:
 
 
 
-    def calculate_similarity_score(self, text1: str, text2: str) -> float:
-        """计算两个文本的相似度分数"""
-        # 长度相似度 (权重: 0.3)
-        len1, len2 = len(text1), len(text2)
-        length_similarity = 1.0 - abs(len1 - len2) / max(len1, len2, 1)
-
-        # 文本相似度 (权重: 0.7)
-        text_similarity = difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-
-        # 综合相似度
-        total_similarity = length_similarity * 0.3 + text_similarity * 0.7
-
-        return total_similarity
-
-
-
-    def _normalize_text(self, text: str) -> str:
-        """标准化文本用于比较"""
-        if not text:
-            return ""
-
-        # 转换为小写
-        normalized = text.lower()
-
-        # 移除标点符号和空格
-        normalized = re.sub(r'[^\w]', '', normalized)
-
-        return normalized
-
-
-
     def match_translations_to_paragraphs_precise(self, paragraphs: List[ParagraphInfo],
                                                translation_dict: Dict[str, str]) -> Dict[int, str]:
         """
@@ -190,113 +160,23 @@ class PageBasedTranslator:
             匹配结果字典 {段落索引: 译文}
         """
         # 获取可翻译的段落
-        translatable_paragraphs = [para for para in paragraphs if para.is_translatable]
+        translatable_count = sum(1 for para in paragraphs if para.is_translatable)
 
-        if not translatable_paragraphs:
+        if not translatable_count:
             logger.info("没有可翻译的段落")
             return {}
 
-        logger.info(f"开始精确匹配: {len(translatable_paragraphs)} 个段落 vs {len(translation_dict)} 条翻译")
-
-        # 创建匹配结果字典 (段落索引 -> 译文)
-        matches = {}
-        used_translations = set()  # 已使用的原文
-
-        # 策略1: 精确匹配
-        exact_matches = 0
-        for para_idx, para in enumerate(translatable_paragraphs):
-            original_text = para.text.strip()
-
-            # 直接在翻译字典中查找
-            if original_text in translation_dict:
-                translation = translation_dict[original_text]
-                if original_text not in used_translations:
-                    # 找到原始段落在所有段落中的索引
-                    original_para_idx = paragraphs.index(para)
-                    matches[original_para_idx] = translation
-                    used_translations.add(original_text)
-                    exact_matches += 1
-                    logger.debug(f"✓ 精确匹配: '{original_text[:30]}...' -> '{translation[:30]}...'")
-
-        logger.info(f"精确匹配完成: {exact_matches} 个段落")
-
-        # 策略2: 标准化匹配（去除空格、标点等）
-        normalized_matches = 0
-        if exact_matches < len(translatable_paragraphs):
-            logger.info("开始标准化匹配...")
-
-            # 创建标准化映射
-            normalized_translation_dict = {}
-            for orig_text, trans_text in translation_dict.items():
-                normalized_orig = self._normalize_text(orig_text)
-                if normalized_orig and normalized_orig not in normalized_translation_dict:
-                    normalized_translation_dict[normalized_orig] = (orig_text, trans_text)
-
-            for para_idx, para in enumerate(translatable_paragraphs):
-                # 跳过已匹配的段落
-                original_para_idx = paragraphs.index(para)
-                if original_para_idx in matches:
-                    continue
-
-                original_text = para.text.strip()
-                normalized_original = self._normalize_text(original_text)
-
-                if normalized_original in normalized_translation_dict:
-                    orig_text, translation = normalized_translation_dict[normalized_original]
-                    if orig_text not in used_translations:
-                        matches[original_para_idx] = translation
-                        used_translations.add(orig_text)
-                        normalized_matches += 1
-                        logger.debug(f"✓ 标准化匹配: '{original_text[:30]}...' -> '{translation[:30]}...'")
-
-        logger.info(f"标准化匹配完成: {normalized_matches} 个段落")
-
-        # 策略3: 相似度匹配（最后的备选方案）
-        similarity_matches = 0
-        remaining_paragraphs = []
-        for para_idx, para in enumerate(translatable_paragraphs):
-            original_para_idx = paragraphs.index(para)
-            if original_para_idx not in matches:
-                remaining_paragraphs.append((para_idx, para, original_para_idx))
-
-        if remaining_paragraphs and len(used_translations) < len(translation_dict):
-            logger.info(f"开始相似度匹配: {len(remaining_paragraphs)} 个剩余段落")
-
-            # 获取未使用的翻译
-            unused_translations = []
-            for orig_text, trans_text in translation_dict.items():
-                if orig_text not in used_translations:
-                    unused_translations.append((orig_text, trans_text))
-
-            for para_idx, para, original_para_idx in remaining_paragraphs:
-                original_text = para.text.strip()
-                best_score = 0.0
-                best_translation = None
-                best_orig_text = None
-
-                for orig_text, trans_text in unused_translations:
-                    if orig_text in used_translations:
-                        continue
-
-                    score = self.calculate_similarity_score(original_text, orig_text)
-                    if score > best_score and score > 0.3:  # 相似度阈值
-                        best_score = score
-                        best_translation = trans_text
-                        best_orig_text = orig_text
-
-                if best_translation and best_orig_text:
-                    matches[original_para_idx] = best_translation
-                    used_translations.add(best_orig_text)
-                    similarity_matches += 1
-                    logger.debug(f"✓ 相似度匹配 (相似度: {best_score:.3f}): '{original_text[:30]}...' -> '{best_translation[:30]}...'")
-
-        logger.info(f"相似度匹配完成: {similarity_matches} 个段落")
-
-        total_matches = exact_matches + normalized_matches + similarity_matches
-        logger.info(f"精确匹配总结: {total_matches}/{len(translatable_paragraphs)} 个段落成功匹配")
-        logger.info(f"  - 精确匹配: {exact_matches}")
-        logger.info(f"  - 标准化匹配: {normalized_matches}")
-        logger.info(f"  - 相似度匹配: {similarity_matches}")
+        logger.info(f"开始精确匹配: {translatable_count} 个段落 vs {len(translation_dict)} 条翻译")
+
+        # 依次进行精确匹配、标准化匹配（哈希索引）和相似度匹配（n-gram倒排索引剪枝）
+        matcher = ParagraphTranslationMatcher(translation_dict)
+        matches, stats = matcher.match(paragraphs)
+
+        total_matches = stats['exact'] + stats['normalized'] + stats['similarity']
+        logger.info(f"精确匹配总结: {total_matches}/{translatable_count} 个段落成功匹配")
+        logger.info(f"  - 精确匹配: {stats['exact']}")
+        logger.info(f"  - 标准化匹配: {stats['normalized']}")
+        logger.info(f"  - 相似度匹配: {stats['similarity']}")
 
         return matches
 
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+段落与翻译结果的索引匹配器
+预先计算段落位置和标准化文本哈希索引，相似度回退阶段先通过字符n-gram倒排索引
+筛选候选原文，再对少量候选计算相似度，避免对所有翻译逐一比较
+"""
+import re
+import difflib
+import logging
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 相似度匹配阈值（与原逐一比较实现保持一致）
+SIMILARITY_THRESHOLD = 0.3
+# 每个段落最多对多少个候选计算完整相似度
+MAX_FUZZY_CANDIDATES = 20
+# 倒排索引中被超过该比例原文共享的n-gram视为常见n-gram
+COMMON_GRAM_RATIO = 0.3
+COMMON_GRAM_MIN_KEYS = 50
+
+
+def normalize_text(text: str) -> str:
+    """标准化文本用于比较：小写并移除标点和空格"""
+    if not text:
+        return ""
+    return re.sub(r'[^\w]', '', text.lower())
+
+
+def similarity_score(text1: str, text2: str) -> float:
+    """长度相似度(0.3) + 文本相似度(0.7)"""
+    len1, len2 = len(text1), len(text2)
+    length_similarity = 1.0 - abs(len1 - len2) / max(len1, len2, 1)
+    text_similarity = difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+    return length_similarity * 0.3 + text_similarity * 0.7
+
+
+def char_ngrams(text: str, n: int = 2) -> set:
+    """提取字符n-gram（中日韩文本按字切分同样适用），短文本退化为单字"""
+    text = text.lower()
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class ParagraphTranslationMatcher:
+    """基于索引的段落-翻译匹配器"""
+
+    def __init__(self, translation_dict: Dict[str, str],
+                 normalize: Callable[[str], str] = normalize_text,
+                 ngram_size: int = 2,
+                 max_candidates: int = MAX_FUZZY_CANDIDATES):
+        self.translation_dict = translation_dict
+        self.normalize = normalize
+        self.ngram_size = ngram_size
+        self.max_candidates = max_candidates
+
+        # 标准化文本 -> 第一个对应的原文
+        self.normalized_index: Dict[str, str] = {}
+        for orig_text in translation_dict:
+            normalized = normalize(orig_text)
+            if normalized and normalized not in self.normalized_index:
+                self.normalized_index[normalized] = orig_text
+
+        self._keys: List[str] = list(translation_dict)
+        self._ngram_index: Optional[Dict[str, List[int]]] = None
+
+    def _build_ngram_index(self):
+        """懒加载构建n-gram倒排索引（仅在需要相似度回退时构建）"""
+        index = defaultdict(list)
+        for key_id, orig_text in enumerate(self._keys):
+            for gram in char_ngrams(orig_text, self.ngram_size):
+                index[gram].append(key_id)
+        self._ngram_index = index
+
+    def _fuzzy_candidates(self, text: str, used: set) -> List[str]:
+        """通过倒排索引按共享n-gram数量选出候选原文"""
+        if self._ngram_index is None:
+            self._build_ngram_index()
+
+        # 出现在大多数原文中的n-gram区分度低，跳过以减少合并开销
+        postings = [self._ngram_index[gram] for gram in char_ngrams(text, self.ngram_size)
+                    if gram in self._ngram_index]
+        common_limit = max(COMMON_GRAM_MIN_KEYS, len(self._keys) * COMMON_GRAM_RATIO)
+        selective = [posting for posting in postings if len(posting) <= common_limit]
+
+        shared = Counter()
+        for posting in (selective or postings):
+            shared.update(posting)
+
+        candidates = []
+        for key_id, _ in shared.most_common():
+            orig_text = self._keys[key_id]
+            if orig_text in used:
+                continue
+            candidates.append(orig_text)
+            if len(candidates) >= self.max_candidates:
+                break
+        return candidates
+
+    def match(self, paragraphs: List) -> Tuple[Dict[int, str], Dict[str, int]]:
+        """
+        匹配翻译到段落
+
+        Args:
+            paragraphs: 段落信息列表（需要 text 和 is_translatable 属性）
+
+        Returns:
+            (匹配结果 {段落索引: 译文}, 各策略匹配数量统计)
+        """
+        # 预先计算段落位置，避免 list.index 带来的 O(n²)
+        translatable = [(position, para.text.strip())
+                        for position, para in enumerate(paragraphs) if para.is_translatable]
+
+        matches: Dict[int, str] = {}
+        used = set()
+        stats = {'exact': 0, 'normalized': 0, 'similarity': 0, 'translatable': len(translatable)}
+
+        # 策略1: 精确匹配
+        for position, text in translatable:
+            if text in self.translation_dict and text not in used:
+                matches[position] = self.translation_dict[text]
+                used.add(text)
+                stats['exact'] += 1
+                logger.debug(f"✓ 精确匹配: '{text[:30]}...' -> '{matches[position][:30]}...'")
+
+        # 策略2: 标准化匹配（哈希索引查找）
+        if stats['exact'] < len(translatable):
+            for position, text in translatable:
+                if position in matches:
+                    continue
+                orig_text = self.normalized_index.get(self.normalize(text))
+                if orig_text is not None and orig_text not in used:
+                    matches[position] = self.translation_dict[orig_text]
+                    used.add(orig_text)
+                    stats['normalized'] += 1
+                    logger.debug(f"✓ 标准化匹配: '{text[:30]}...' -> '{matches[position][:30]}...'")
+
+        # 策略3: 相似度匹配（n-gram倒排索引剪枝后再计算相似度）
+        remaining = [(position, text) for position, text in translatable if position not in matches]
+        if remaining and len(used) < len(self.translation_dict):
+            for position, text in remaining:
+                best_score = SIMILARITY_THRESHOLD
+                best_orig_text = None
+                len_text = len(text)
+
+                for orig_text in self._fuzzy_candidates(text, used):
+                    # 先用只依赖长度的上界排除不可能超过当前最优的候选
+                    len_orig = len(orig_text)
+                    longest = max(len_text, len_orig, 1)
+                    length_similarity = 1.0 - abs(len_text - len_orig) / longest
+                    ratio_bound = 2.0 * min(len_text, len_orig) / max(len_text + len_orig, 1)
+                    if length_similarity * 0.3 + ratio_bound * 0.7 <= best_score:
+                        continue
+
+                    score = similarity_score(text, orig_text)
+                    if score > best_score:
+                        best_score = score
+                        best_orig_text = orig_text
+
+                if best_orig_text is not None:
+                    matches[position] = self.translation_dict[best_orig_text]
+                    used.add(best_orig_text)
+                    stats['similarity'] += 1
+                    logger.debug(f"✓ 相似度匹配 (相似度: {best_score:.3f}): "
+                                 f"'{text[:30]}...' -> '{matches[position][:30]}...'")
+
+        return matches, stats
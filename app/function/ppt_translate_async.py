@@ -13,6 +13,7 @@ import json
 import platform
 from typing import Dict, List, Any, Optional, Union, Tuple
 import concurrent.futures
+from functools import partial
 from pptx import Presentation
 from pptx.enum.text import MSO_AUTO_SIZE
 from pptx.dml.color import RGBColor
@@ -29,6 +30,7 @@ from ..utils.enhanced_task_queue import translation_queue
 
 # 导入基于页面的翻译机制
 from .page_based_translation import translate_slide_by_page, get_translation_statistics
+from .pynuo_fuc.stage_timer import measure
 
 # 导入复杂形状处理函数和内容检测函数
 from .ppt_translate import (
@@ -97,6 +99,18 @@ def is_page_number(text):
         return True
     return False
 
+def _load_stage_worker():
+    """
+    以顶层模块名导入进程池阶段入口模块（与pynuo_fuc中其他模块的导入方式一致），
+    工作进程按该模块名导入时不需要导入整个app包
+    """
+    worker_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pynuo_fuc')
+    if worker_dir not in sys.path:
+        sys.path.insert(0, worker_dir)
+    import pptx_stage_worker
+    return pptx_stage_worker
+
+
 async def _adjust_ppt_layout_async(presentation_path: str) -> bool:
     """
     异步调整PPT布局，使用现有的set_textbox_autofit函数
@@ -112,17 +126,16 @@ async def _adjust_ppt_layout_async(presentation_path: str) -> bool:
         loop = asyncio.get_event_loop()
 
         def _call_set_textbox_autofit():
-            """调用现有的set_textbox_autofit函数"""
+            """在进程池中调用现有的set_textbox_autofit函数（python-pptx解析和保存是CPU密集操作）"""
             try:
-                # 导入set_textbox_autofit函数
-                from .adjust_text_size import set_textbox_autofit
+                stage_worker = _load_stage_worker()
 
                 # 获取绝对路径
                 abs_path = os.path.abspath(presentation_path)
                 logger.debug(f"调用set_textbox_autofit，文件路径: {abs_path}")
 
                 # 调用现有的布局调整函数
-                result = set_textbox_autofit(abs_path)
+                result = thread_pool.run_in_process(stage_worker.adjust_textbox_layout, (abs_path,))
 
                 if result:
                     logger.info("set_textbox_autofit调用成功")
@@ -584,6 +597,16 @@ async def translate_text_async(text: str, field: str, stop_words: List[str], cus
         return await translate_async(text, field, stop_words, custom_words, source_language, target_language)
 
 
+def _discard_ocr_results(future):
+    """丢弃未写回的图片OCR结果，清理临时文件"""
+    try:
+        prepared = future.result()
+    except BaseException:
+        return
+    if prepared:
+        prepared['extractor'].cleanup()
+
+
 async def process_presentation_async(presentation_path: str,
                                    stop_words_list: List[str],
                                    custom_translations: Dict[str, str],
@@ -594,7 +617,9 @@ async def process_presentation_async(presentation_path: str,
                                    progress_callback,
                                    model:str,
                                    enable_text_splitting:str,
-                                   enable_uno_conversion:bool) -> bool:
+                                   enable_uno_conversion:bool,
+                                   checkpoint=None,
+                                   stage_timer=None) -> bool:
     """
     异步处理演示文稿（基于页面的翻译机制）
     每页调用一次API，按段落匹配翻译结果
@@ -611,6 +636,8 @@ async def process_presentation_async(presentation_path: str,
         progress_callback: 进度回调函数，接收两个参数(current_slide, total_slides)
         enable_text_splitting: ocr图片翻译是否采用逐行渲染
         enable_uno_conversion: 是否启用UNO格式转换
+        checkpoint: 任务检查点（可选），重试时跳过已完成的页面翻译和图片OCR
+        stage_timer: 阶段耗时统计（可选），见 pynuo_fuc.stage_timer.StageTimer
     Returns:
         处理是否成功
     """
@@ -628,12 +655,43 @@ async def process_presentation_async(presentation_path: str,
     logger.info("正在进行布局调整...")
 
     # 使用COM操作进行最终的文本框调整
-    layout_result = await _adjust_ppt_layout_async(presentation_path)
+    with measure(stage_timer, "布局调整"):
+        layout_result = await _adjust_ppt_layout_async(presentation_path)
     if layout_result:
         logger.info("布局调整完成")
     else:
         logger.warning("布局调整失败，但翻译已完成")
 
+    '''
+    图片OCR识别和翻译只读取图片，与下面的文本翻译同时执行；
+    文本翻译完成后再把结果按页码写回翻译后的PPT
+    '''
+    loop = asyncio.get_event_loop()
+    ocr_future = None
+    if enable_text_splitting == "False":
+        logger.info(f"检测到ocr参数:{enable_text_splitting}，不使用ocr接口功能")
+    else:
+        logger.info(f"检测到ocr参数:{enable_text_splitting}，开始使用ocr接口功能（与文本翻译同时执行）")
+        try:
+            from .image_ocr.ocr_controller import prepare_ocr_results
+
+            def _prepare_ocr():
+                with measure(stage_timer, "图片OCR与翻译"):
+                    return prepare_ocr_results(presentation_path,
+                                               selected_pages=select_page or None,
+                                               source_language=source_language,
+                                               target_language=target_language,
+                                               enable_text_splitting=enable_text_splitting,
+                                               checkpoint=checkpoint)
+
+            # 在独立线程中执行而不是事件循环的默认执行器：事件循环在任务结束时关闭，
+            # 失败路径注册的清理回调仍会在OCR完成后（在OCR线程中）执行
+            ocr_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="ppt_ocr")
+            ocr_future = ocr_executor.submit(_prepare_ocr)
+            ocr_executor.shutdown(wait=False)
+        except Exception as e:
+            logger.error(f"使用ocr接口功能时出错: {str(e)}")
+
     '''
     添加使用pyuno接口的功能，用libreoffice渲染ppt，实现翻译转化。
     顺序如下：
@@ -652,7 +710,9 @@ async def process_presentation_async(presentation_path: str,
                         bilingual_translation, 
                         progress_callback,
                         model,
-                        enable_uno_conversion=enable_uno_conversion  # 使用传入的参数
+                        enable_uno_conversion=enable_uno_conversion,  # 使用传入的参数
+                        checkpoint=checkpoint,
+                        stage_timer=stage_timer
                         )
         logger.info(f"调用UNO接口翻译PPT文本框成功，翻译后的PPT文件地址: {uno_pptx_path}")
     except Exception as e:
@@ -666,7 +726,6 @@ async def process_presentation_async(presentation_path: str,
     try:
         # 加载演示文稿
         logger.info("正在加载演示文稿...")
-        loop = asyncio.get_event_loop()
 
         def _read_presentation():
             return Presentation(uno_pptx_path)
@@ -751,24 +810,20 @@ async def process_presentation_async(presentation_path: str,
         '''
         添加使用ocr接口的功能，用ocr实现ppt图片读取，并实现翻译转化。
         顺序如下：
-        1. 打开ppt，读取图片
-        2. 翻译
+        1. 打开ppt，读取图片（与文本翻译同时执行）
+        2. 翻译（与文本翻译同时执行）
         3. 再打开ppt，并渲染
         '''
         ocr_ppt_path = uno_pptx_path
-        if enable_text_splitting == "False":
-            logger.info(f"检测到ocr参数:{enable_text_splitting}，不使用ocr接口功能")
-            ocr_ppt_path = uno_pptx_path
-        else:
-            logger.info(f"检测到ocr参数:{enable_text_splitting}，开始使用ocr接口功能")
+        if ocr_future is not None:
             try:
-                from.image_ocr.ocr_controller import ocr_controller
-                ocr_ppt_path= ocr_controller(uno_pptx_path,
-                                            selected_pages=select_page,
-                                            output_path=None,
-                                            source_language=source_language,
-                                            target_language=target_language,
-                                            enable_text_splitting=enable_text_splitting)
+                from .image_ocr.ocr_controller import apply_ocr_results
+                with measure(stage_timer, "等待图片OCR"):
+                    prepared_ocr = await asyncio.wrap_future(ocr_future)
+                ocr_future = None
+                with measure(stage_timer, "OCR结果写入"):
+                    ocr_ppt_path = await loop.run_in_executor(
+                        None, partial(apply_ocr_results, uno_pptx_path, prepared_ocr, output_path=None))
             except Exception as e:
                 logger.error(f"使用ocr接口功能时出错: {str(e)}")
                 ocr_ppt_path = uno_pptx_path
@@ -803,6 +858,10 @@ async def process_presentation_async(presentation_path: str,
         import traceback
         logger.error(traceback.format_exc())
 
+        # 文本翻译失败时，仍在执行的图片OCR完成后清理其临时文件（已完成时立即清理）
+        if ocr_future is not None:
+            ocr_future.add_done_callback(_discard_ocr_results)
+
         # 在出错时也更新进度
         if progress_callback:
             progress_callback(0, 1)
@@ -1064,6 +1123,8 @@ def process_presentation(presentation_path: str,
                        model:str='qwen',
                        enable_text_splitting: str = "False",
                        enable_uno_conversion: bool = True,
+                       checkpoint=None,
+                       stage_timer=None,
                        **kwargs) -> bool:
     """
     处理PPT翻译（同步包装函数）
@@ -1080,6 +1141,8 @@ def process_presentation(presentation_path: str,
         progress_callback: 进度回调函数，接收两个参数(current_slide, total_slides)
         model: 模型类型
         stop_words: 停止词列表（兼容性参数）
+        checkpoint: 任务检查点（可选），见 app.function.task_checkpoint
+        stage_timer: 阶段耗时统计（可选），见 app.function.pynuo_fuc.stage_timer
 
     Returns:
         处理是否成功
@@ -1113,7 +1176,9 @@ def process_presentation(presentation_path: str,
             progress_callback,
             model,
             enable_text_splitting,
-            enable_uno_conversion
+            enable_uno_conversion,
+            checkpoint,
+            stage_timer
         )
 
         logger.info(f"演示文稿处理完成: {os.path.basename(presentation_path)}")
@@ -4,12 +4,13 @@ api_translate_uno.py
 支持段落层级的翻译API模块
 '''
 import sys, os
+import logging
 sys.path.insert(0, os.path.dirname(__file__))
 
 import json
 import re
 import requests  # 新增：用于调用后端API
-from logger_config import get_logger
+from logger_config import get_logger, lazy_text
 from openai import OpenAI
 import unicodedata
 import ast
@@ -167,7 +168,9 @@ def call_backend_translate_ppt_page(text, model, field, stop_words_str, custom_t
         response.raise_for_status()
         
         result = response.json()
-        logger.debug(f"后端API原始响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
+        # 完整响应只在DEBUG级别输出，未启用时不做序列化
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("后端API原始响应: %s", json.dumps(result, ensure_ascii=False, indent=2))
         
         # 检查响应状态
         if result.get("code") == 200:
@@ -301,9 +304,9 @@ def parse_formatted_text_async(text: str):
     Returns:
         解析结果
     """
-    logger.debug(f"原始待解析文本: {repr(text)}")
+    logger.debug("原始待解析文本: %r", text)
     cleaned_text = clean_translation_text(text)
-    logger.debug(f"清理后待解析文本: {repr(cleaned_text)}")
+    logger.debug("清理后待解析文本: %r", cleaned_text)
     
     # 先尝试直接用json解析
     try:
@@ -324,7 +327,7 @@ def parse_formatted_text_async(text: str):
                 logger.warning(f"正则提取后仍失败，尝试大模型修复: {e3}")
                 # 调用大模型修复
                 fixed_text = clean_translation_text(re_parse_formatted_text_async(json_block))
-                logger.debug(f"修复后待解析文本: {repr(fixed_text)}")
+                logger.debug("修复后待解析文本: %r", fixed_text)
                 return json.loads(fixed_text)
 
 def re_parse_formatted_text_async(text: str):
@@ -526,7 +529,110 @@ def format_page_text_for_translation(text_boxes_data, page_index):
     logger.debug(f"PPT第 {page_index + 1} 页（原始索引{page_index}）格式化了 {len(page_box_paragraphs)} 个文本框段落")
     return formatted_text.strip()
 
-def translate_pages_by_page(text_boxes_data, progress_callback, source_language, target_language, model,stop_words_list,custom_translations):
+def translate_single_page(text_boxes_data, page_index, processing_sequence, source_language, target_language,
+                          model, stop_words_list, custom_translations, checkpoint=None):
+    """
+    翻译单页内容（按页顺序翻译和流水线翻译共用）
+    
+    Args:
+        text_boxes_data: 文本框段落数据列表
+        page_index: 原始页面索引（0-based）
+        processing_sequence: 处理序号（从1开始）
+        checkpoint: 任务检查点（可选），该页已完成时直接复用，翻译完成后立即保存
+        
+    Returns:
+        dict: 该页的翻译结果（翻译失败时包含error字段），页面没有文本内容时返回None
+    """
+    # 生成该页的格式化文本
+    page_content = format_page_text_for_translation(text_boxes_data, page_index)
+    
+    if not page_content:
+        logger.warning(f"PPT第 {page_index + 1} 页（原始索引{page_index}）没有文本内容，跳过")
+        return None
+    
+    # 重试/恢复的任务：该页已在之前的执行中翻译完成
+    if checkpoint is not None:
+        cached_result = checkpoint.load_page(page_index, page_content)
+        if cached_result is not None:
+            logger.info(f"PPT第 {page_index + 1} 页已有检查点翻译结果，跳过翻译")
+            return cached_result
+    
+    logger.info(f"PPT第 {page_index + 1} 页格式化完成:")
+    logger.info(f"  格式化文本长度: {len(page_content)} 字符")
+    logger.info("-" * 40)
+    # logger.info(page_content)  # 可以取消注释查看详细内容
+    logger.info("-" * 40)
+    
+    # 编译后的词库（app/utils/glossary_cache.py 的 CompiledGlossary）用匹配自动机找出该页出现的词条，
+    # 提示词中只放这些词条；普通字典按原样全部传入
+    page_translations = custom_translations
+    if hasattr(custom_translations, 'terms_in'):
+        page_translations = custom_translations.terms_in(page_content)
+        logger.info(f"PPT第 {page_index + 1} 页使用 {len(page_translations)}/{len(custom_translations)} 个自定义词条")
+    
+    try:
+        # 调用翻译API
+        logger.info(f"正在调用翻译API翻译PPT第 {page_index + 1} 页...")
+        translated_result = translate(page_content, 
+                                      model=model,
+                                      stop_words=stop_words_list,
+                                      custom_translations=page_translations,
+                                      source_language=source_language,
+                                      target_language=target_language)          
+        logger.info(f"PPT第 {page_index + 1} 页翻译完成")
+        
+        logger.info(f"  翻译结果长度: {len(translated_result)} 字符")
+        logger.debug("翻译结果: %s", lazy_text(translated_result))
+        
+        # 解析翻译结果
+        translated_fragments = separate_translate_text(translated_result)
+        
+        # 存储翻译结果 - 使用真实的页面索引作为键
+        page_box_paragraphs = [bp for bp in text_boxes_data if bp['page_index'] == page_index]
+        
+        page_result = {
+            'original_content': page_content,
+            'translated_json': translated_result,
+            'translated_fragments': translated_fragments,
+            'box_paragraph_count': len(page_box_paragraphs),
+            'box_count': len(set(bp['box_index'] for bp in page_box_paragraphs)),
+            'ppt_page_number': page_index + 1,  # PPT中的显示页码
+            'processing_sequence': processing_sequence,  # 处理序号
+            'original_page_index': page_index  # 原始页面索引
+        }
+        
+        if checkpoint is not None:
+            try:
+                checkpoint.save_page(page_index, page_result)
+            except Exception as e:
+                logger.warning(f"保存PPT第 {page_index + 1} 页检查点失败: {e}")
+        
+        logger.info(f"PPT第 {page_index + 1} 页翻译完成，得到 {len(translated_fragments)} 个文本框段落的翻译")
+        
+        # 显示翻译结果的键值对应关系
+        logger.info("翻译结果键值映射:")
+        for key, fragments in translated_fragments.items():
+            logger.info(f"    {key}: {len(fragments)} 个片段")
+        
+    except Exception as e:
+        logger.error(f"翻译PPT第 {page_index + 1} 页时出错: {e}", exc_info=True)
+        # 如果翻译失败，记录错误信息
+        page_box_paragraphs = [bp for bp in text_boxes_data if bp['page_index'] == page_index]
+        page_result = {
+            'original_content': page_content,
+            'error': str(e),
+            'translated_fragments': {},
+            'box_paragraph_count': len(page_box_paragraphs),
+            'box_count': len(set(bp['box_index'] for bp in page_box_paragraphs)),
+            'ppt_page_number': page_index + 1,
+            'processing_sequence': processing_sequence,
+            'original_page_index': page_index
+        }
+    
+    return page_result
+
+def translate_pages_by_page(text_boxes_data, progress_callback, source_language, target_language, model,stop_words_list,custom_translations,
+                            checkpoint=None):
     """
     按页翻译文本内容，每页调用一次翻译API（支持段落层级）
     ✅ 修复版本：正确处理页面索引和进度回调
@@ -537,6 +643,7 @@ def translate_pages_by_page(text_boxes_data, progress_callback, source_language,
         source_language: 源语言
         target_language: 目标语言
         model: 使用的翻译模型
+        checkpoint: 任务检查点（可选），已完成的页面直接复用，每页翻译完成后立即保存
         
     Returns:
         dict: 翻译结果，格式为 {page_index: translated_content}
@@ -587,74 +694,17 @@ def translate_pages_by_page(text_boxes_data, progress_callback, source_language,
         if progress_callback:
             progress_callback(current_page_number - 1, total_pages)
         
-        # 生成该页的格式化文本
-        page_content = format_page_text_for_translation(text_boxes_data, page_index)
-        
-        if not page_content:
-            logger.warning(f"PPT第 {page_index + 1} 页（原始索引{page_index}）没有文本内容，跳过")
-            continue
-        
-        logger.info(f"PPT第 {page_index + 1} 页格式化完成:")
-        logger.info(f"  格式化文本长度: {len(page_content)} 字符")
-        logger.info("-" * 40)
-        # logger.info(page_content)  # 可以取消注释查看详细内容
-        logger.info("-" * 40)
-        
-        try:
-            # 调用翻译API
-            logger.info(f"正在调用翻译API翻译PPT第 {page_index + 1} 页...")
-            translated_result = translate(page_content, 
-                                          model=model,
-                                          stop_words=stop_words_list,
-                                          custom_translations=custom_translations,
-                                          source_language=source_language,
-                                          target_language=target_language)          
-            logger.info(f"PPT第 {page_index + 1} 页翻译完成")
-            
-            logger.info("翻译结果:")
-            logger.info(f"  翻译结果长度: {len(translated_result)} 字符")
-            logger.info("-" * 40)
-            logger.info(translated_result)  # 可以取消注释查看详细内容
-            logger.info("-" * 40)
-            
-            # 解析翻译结果
-            translated_fragments = separate_translate_text(translated_result)
-            
-            # 存储翻译结果 - 使用真实的页面索引作为键
-            page_box_paragraphs = [bp for bp in text_boxes_data if bp['page_index'] == page_index]
-            
-            translation_results[page_index] = {  # ✅ 使用真实的页面索引作为键
-                'original_content': page_content,
-                'translated_json': translated_result,
-                'translated_fragments': translated_fragments,
-                'box_paragraph_count': len(page_box_paragraphs),
-                'box_count': len(set(bp['box_index'] for bp in page_box_paragraphs)),
-                'ppt_page_number': page_index + 1,  # PPT中的显示页码
-                'processing_sequence': current_page_number,  # 处理序号
-                'original_page_index': page_index  # 原始页面索引
-            }
-            
-            logger.info(f"PPT第 {page_index + 1} 页翻译完成，得到 {len(translated_fragments)} 个文本框段落的翻译")
-            
-            # 显示翻译结果的键值对应关系
-            logger.info("翻译结果键值映射:")
-            for key, fragments in translated_fragments.items():
-                logger.info(f"    {key}: {len(fragments)} 个片段")
-            
-        except Exception as e:
-            logger.error(f"翻译PPT第 {page_index + 1} 页时出错: {e}", exc_info=True)
-            # 如果翻译失败，记录错误信息
-            page_box_paragraphs = [bp for bp in text_boxes_data if bp['page_index'] == page_index]
-            translation_results[page_index] = {
-                'original_content': page_content,
-                'error': str(e),
-                'translated_fragments': {},
-                'box_paragraph_count': len(page_box_paragraphs),
-                'box_count': len(set(bp['box_index'] for bp in page_box_paragraphs)),
-                'ppt_page_number': page_index + 1,
-                'processing_sequence': current_page_number,
-                'original_page_index': page_index
-            }
+        result = translate_single_page(text_boxes_data,
+                                       page_index,
+                                       current_page_number,
+                                       source_language,
+                                       target_language,
+                                       model,
+                                       stop_words_list,
+                                       custom_translations,
+                                       checkpoint=checkpoint)
+        if result is not None:
+            translation_results[page_index] = result
     
     # 完成进度回调
     if progress_callback:
@@ -7,17 +7,14 @@ import sys, os
 sys.path.insert(0, os.path.dirname(__file__))
 from logger_config import get_logger, log_function_call, log_execution_time
 from write_ppt_page_uno import write_from_presentation, validate_paragraph_structure
+from uno_connection import get_connection_manager, log_uno_calls, FILTER_ODP
+from uno_profiler import profile_if_enabled
 from datetime import datetime
 
 def connect_to_libreoffice():
-    """连接本地soffice服务"""
+    """连接本地soffice服务（复用连接管理器中的长连接）"""
     try:
-        localContext = uno.getComponentContext()
-        resolver = localContext.ServiceManager.createInstanceWithContext(
-            "com.sun.star.bridge.UnoUrlResolver", localContext)
-        context = resolver.resolve(
-            "uno:socket,host=localhost,port=2002;urp;StarOffice.ComponentContext")
-        return context
+        return get_connection_manager().get_context()
     except Exception as e:
         raise ConnectionError(f"无法连接到LibreOffice服务: {e}")
 
@@ -114,6 +111,7 @@ def validate_translated_json_structure(data, logger):
         logger.error(f"验证JSON结构时出错: {e}", exc_info=True)
         return False, "error", {}
 
+@log_uno_calls("write_entire_ppt_direct UNO调用统计")
 def write_entire_ppt_direct(input_ppt, output_ppt, translated_data, mode='paragraph_up'):
     """
     直接将翻译后的内容写入PPT文件，支持段落层级结构
@@ -139,32 +137,13 @@ def write_entire_ppt_direct(input_ppt, output_ppt, translated_data, mode='paragr
         # 1. 连接LibreOffice服务
         logger.info("连接LibreOffice服务...")
         context = connect_to_libreoffice()
+        manager = get_connection_manager()
         logger.info("已连接到LibreOffice服务")
         
-        # 2. 打开PPT文件
-        desktop = context.ServiceManager.createInstanceWithContext(
-            "com.sun.star.frame.Desktop", context)
-        file_url = uno.systemPathToFileUrl(input_ppt)
-        logger.info(f"打开PPT文件: {file_url}")
-        
-                # 设置加载属性（添加过滤器）
+        # 2. 打开PPT文件（复用Desktop，加载属性由连接管理器缓存）
         abs_input_ppt = os.path.abspath(input_ppt)
-        file_url = uno.systemPathToFileUrl(abs_input_ppt)
-
-        load_props = []
-
-        hidden_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        hidden_prop.Name = "Hidden"
-        hidden_prop.Value = True
-        load_props.append(hidden_prop)
-
-        # 指定文件过滤器
-        filter_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        filter_prop.Name = "FilterName"
-        filter_prop.Value = "impress8"  # 因为我们处理的是ODP文件
-        load_props.append(filter_prop)
-
-        presentation = desktop.loadComponentFromURL(file_url, "_blank", 0, tuple(load_props))
+        logger.info(f"打开PPT文件: {abs_input_ppt}")
+        presentation = manager.load_document(abs_input_ppt, filter_name=FILTER_ODP)  # 因为我们处理的是ODP文件
         slides = presentation.getDrawPages()
         logger.info(f"PPT总页数: {slides.getCount()}")
         
@@ -219,15 +198,16 @@ def write_entire_ppt_direct(input_ppt, output_ppt, translated_data, mode='paragr
                 else:
                     logger.info(f"  第 {page_idx+1} 页没有文本框")
                 
-                # 调用写入函数
-                write_from_presentation(
-                    context=context,
-                    slides=slides,
-                    page_index=page_idx,
-                    page_data=page,
-                    mode=mode,
-                    logger=logger
-                )
+                # 调用写入函数（开启PYUNO_PROFILE_CALLS时统计本页UNO往返次数）
+                with profile_if_enabled(f"写入第{page_idx+1}页", logger):
+                    write_from_presentation(
+                        context=context,
+                        slides=slides,
+                        page_index=page_idx,
+                        page_data=page,
+                        mode=mode,
+                        logger=logger
+                    )
                 
                 processed_pages += 1
                 logger.info(f"第 {page_idx+1} 页处理完成")
@@ -244,30 +224,14 @@ def write_entire_ppt_direct(input_ppt, output_ppt, translated_data, mode='paragr
         output_dir = os.path.dirname(abs_output_ppt)
         os.makedirs(output_dir, exist_ok=True)
 
-        file_url_save = uno.systemPathToFileUrl(abs_output_ppt)
-        logger.info(f"保存PPT到: {file_url_save}")
-
-        # 设置保存属性（关键修复）
-        save_props = []
-
-        # 指定ODP格式过滤器
-        filter_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        filter_prop.Name = "FilterName"
-        filter_prop.Value = "impress8"  # ODP格式
-        save_props.append(filter_prop)
-
-        # 允许覆盖现有文件
-        overwrite_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        overwrite_prop.Name = "Overwrite"
-        overwrite_prop.Value = True
-        save_props.append(overwrite_prop)
+        logger.info(f"保存PPT到: {abs_output_ppt}")
 
-        # 保存文件（使用正确的参数）
-        presentation.storeToURL(file_url_save, tuple(save_props))
+        # 指定ODP格式过滤器并允许覆盖现有文件
+        manager.store_document(presentation, abs_output_ppt, FILTER_ODP)
         logger.info(f"已保存到 {abs_output_ppt}")
         
         # 6. 关闭文件
-        presentation.close(True)
+        manager.close_document(presentation)
         
         # 7. 显示处理统计
         logger.info("PPT写入完成统计:")
@@ -8,8 +8,11 @@ sys.path.insert(0, os.path.dirname(__file__))
 import os
 from datetime import datetime
 from read_ppt_page_uno import connect_to_libreoffice, read_slide_texts_improved, read_slide_from_presentation
+from uno_connection import get_connection_manager, guess_load_filter, log_uno_calls, FILTER_ODP
+from uno_profiler import profile_if_enabled
 from logger_config import get_logger, log_function_call, log_execution_time
 
+@log_uno_calls("load_entire_ppt_direct UNO调用统计")
 def load_entire_ppt_direct(ppt_path, page_indices=None):
     """
     直接读入整个PPT文件，返回指定页面的内容（包含段落层级）
@@ -31,12 +34,7 @@ def load_entire_ppt_direct(ppt_path, page_indices=None):
     
     try:
         logger.debug("连接到LibreOffice...")
-        context = connect_to_libreoffice()
-        logger.info("成功连接到LibreOffice")
-        
-        # 打开PPT文件
-        desktop = context.ServiceManager.createInstanceWithContext(
-            "com.sun.star.frame.Desktop", context)
+        manager = get_connection_manager()
 
         # 确保使用绝对路径
         abs_ppt_path = os.path.abspath(ppt_path)
@@ -44,40 +42,19 @@ def load_entire_ppt_direct(ppt_path, page_indices=None):
             logger.error(f"PPT文件不存在: {abs_ppt_path}")
             return None
 
-        file_url = uno.systemPathToFileUrl(abs_ppt_path)
-
-        # 设置加载属性（关键修复）
-        properties = []
-
-        # 隐藏窗口
-        hidden_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        hidden_prop.Name = "Hidden"
-        hidden_prop.Value = True
-        properties.append(hidden_prop)
-
-        # 只读模式
-        readonly_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        readonly_prop.Name = "ReadOnly"
-        readonly_prop.Value = True
-        properties.append(readonly_prop)
-
-        # 关键：指定文件格式过滤器
-        filter_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        filter_prop.Name = "FilterName"
+        # 关键：指定文件格式过滤器（隐藏、只读，属性元组由连接管理器缓存）
         file_ext = os.path.splitext(abs_ppt_path.lower())[1]
-        if file_ext == ".odp":
-            filter_prop.Value = "impress8"
-            logger.info("设置ODP文件过滤器: impress8")
-        elif file_ext == ".pptx":
-            filter_prop.Value = "Impress MS PowerPoint 2007 XML"
-            logger.info("设置PPTX文件过滤器: Impress MS PowerPoint 2007 XML")
+        filter_name = guess_load_filter(abs_ppt_path)
+        if filter_name:
+            logger.info(f"设置{file_ext.lstrip('.').upper()}文件过滤器: {filter_name}")
         else:
-            filter_prop.Value = "impress8"
-            logger.warning(f"未知文件格式{file_ext}，使用默认过滤器: impress8")
-        properties.append(filter_prop)
+            filter_name = FILTER_ODP
+            logger.warning(f"未知文件格式{file_ext}，使用默认过滤器: {FILTER_ODP}")
 
-        logger.debug(f"打开PPT文件: {file_url}")
-        presentation = desktop.loadComponentFromURL(file_url, "_blank", 0, tuple(properties))
+        logger.debug(f"打开PPT文件: {abs_ppt_path}")
+        presentation = manager.load_document(abs_ppt_path, filter_name=filter_name, read_only=True)
+        context = manager.get_context()
+        logger.info("成功连接到LibreOffice")
         slides = presentation.getDrawPages()
         
         # 获取总页数
@@ -108,8 +85,9 @@ def load_entire_ppt_direct(ppt_path, page_indices=None):
             logger.info(f"正在处理第 {page_index + 1} 页...")
             page_start_time = datetime.now()
             
-            # 使用现有的读取函数
-            page_data = read_slide_from_presentation(context, slides, page_index=page_index)
+            # 使用现有的读取函数（开启PYUNO_PROFILE_CALLS时统计本页UNO往返次数）
+            with profile_if_enabled(f"读取第{page_index + 1}页", logger):
+                page_data = read_slide_from_presentation(context, slides, page_index=page_index)
             pages_data.append(page_data)
             
             # 统计信息
@@ -163,7 +141,7 @@ def load_entire_ppt_direct(ppt_path, page_indices=None):
         log_execution_time(logger, "load_entire_ppt_direct", start_time)
         
         # 关闭文档
-        presentation.close(True)
+        manager.close_document(presentation)
         
         # 构建返回数据结构
         result = {
@@ -6,6 +6,8 @@ logger_config.py
 import logging
 import sys
 import os
+import queue
+import atexit
 from datetime import datetime, timedelta
 import inspect
 import functools
@@ -43,8 +45,8 @@ def setup_default_logging(level=logging.INFO):
     )
     console_handler.setFormatter(formatter)
     
-    # 添加处理器到日志记录器
-    logger.addHandler(console_handler)
+    # 添加处理器到日志记录器（按页翻译等循环日志较多，放到后台线程输出）
+    logger.addHandler(_queued(console_handler))
     
     # 存储到全局字典
     _loggers["pyuno.main"] = logger
@@ -52,6 +54,36 @@ def setup_default_logging(level=logging.INFO):
     logger.info("默认日志配置初始化完成")
     return logger
 
+def _queued(handler):
+    """
+    通过队列在后台线程中输出（使用 app/utils/log_queue.py），无法导入时直接返回原处理器。
+    INFO及以下级别按 PYUNO_LOG_SAMPLING（格式同 LOG_SAMPLING，默认 pyuno=50 条/秒）限速
+    """
+    try:
+        from app.utils.log_queue import AsyncQueueHandler, SamplingFilter, TimedQueueListener, parse_sampling_rates
+    except ImportError:
+        return handler
+    log_queue = queue.Queue(maxsize=10000)
+    listener = TimedQueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    queue_handler = AsyncQueueHandler(log_queue)
+    rates = parse_sampling_rates(os.getenv('PYUNO_LOG_SAMPLING', 'pyuno=50'))
+    if rates:
+        queue_handler.addFilter(SamplingFilter(rates))
+    return queue_handler
+
+
+try:
+    from app.utils.log_queue import lazy_text
+except ImportError:
+    def lazy_text(value, limit=200):
+        """无法导入 app.utils.log_queue 时直接截断（见 log_queue.lazy_text）"""
+        text = value if isinstance(value, str) else str(value)
+        if limit and len(text) > limit:
+            return f"{text[:limit]}...（共{len(text)}字符）"
+        return text
+
 def setup_subprocess_logging(log_file, level=logging.INFO):
     """
     设置子进程的日志配置
@@ -0,0 +1,170 @@
+'''
+page_pipeline.py
+PPT文本翻译的流水线执行：翻译 -> 映射 -> 写入
+多个翻译线程按页调用翻译API，每页翻译完成后放入有界队列；写入阶段从队列取出，
+立即映射回该页的PPT数据并用python-pptx写入幻灯片，后续页面的翻译仍在进行。
+写入跟不上时队列填满，翻译线程暂停提交新的页面，内存中待写入的页面数不超过队列容量
+'''
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+from api_translate_uno import translate_single_page
+from ppt_data_utils import map_translation_results_back
+from edit_ppt_functions_pptx import backup_pptx_for_editing
+from write_ppt_page_pptx import write_page_with_pptx
+from stage_timer import StageTimer
+from pptx import Presentation
+
+# 同时翻译的页数和翻译、写入阶段之间的队列容量
+DEFAULT_TRANSLATE_WORKERS = int(os.getenv('PPT_PIPELINE_TRANSLATE_WORKERS', '3'))
+DEFAULT_QUEUE_SIZE = int(os.getenv('PPT_PIPELINE_QUEUE_SIZE', '4'))
+
+
+def pipeline_enabled():
+    """是否使用流水线翻译（PPT_PIPELINE_ENABLED=false 时按原流程先翻译全部页面再批量写入）"""
+    return os.getenv('PPT_PIPELINE_ENABLED', 'true').lower() == 'true'
+
+
+def _map_page(page_data, page_index, page_result, page_box_paragraphs):
+    """将单页翻译结果映射回该页的PPT数据，失败时使用原文"""
+    logger = get_logger("pyuno.main")
+    if not page_result:
+        return page_data
+    try:
+        mapped = map_translation_results_back({'pages': [page_data]},
+                                              {page_index: page_result},
+                                              page_box_paragraphs)
+        return mapped['pages'][0]
+    except Exception as e:
+        logger.error(f"映射第 {page_index + 1} 页翻译结果失败，使用原文: {e}")
+        return page_data
+
+
+def run_page_pipeline(ppt_data, text_boxes_data, backup_pptx_path, output_path, bilingual_translation,
+                      processed_page_indices, progress_callback, source_language, target_language, model,
+                      stop_words_list, custom_translations, checkpoint=None, stage_timer=None,
+                      translate_workers=None, queue_size=None):
+    """
+    流水线翻译并写入PPTX
+
+    Args:
+        ppt_data: 从ODP加载的PPT数据
+        text_boxes_data: 按文本框和段落分组的待翻译数据
+        backup_pptx_path: 备份的原始PPTX文件路径
+        output_path: 输出文件路径
+        bilingual_translation: 双语翻译模式
+        processed_page_indices: 需要处理的页面索引列表(0-based)，None表示全部页面
+        progress_callback: 进度回调函数，每写入一页调用一次
+        checkpoint: 任务检查点（可选）
+        stage_timer: 阶段耗时统计（可选），见 stage_timer.StageTimer
+        translate_workers: 同时翻译的页数
+        queue_size: 翻译与写入阶段之间的队列容量
+
+    Returns:
+        tuple: (输出文件路径, 翻译结果字典 {page_index: result})
+    """
+    logger = get_logger("pyuno.main")
+    timer = stage_timer if stage_timer is not None else StageTimer()
+    translate_workers = max(1, translate_workers or DEFAULT_TRANSLATE_WORKERS)
+    queue_size = max(1, queue_size or DEFAULT_QUEUE_SIZE)
+
+    pages = ppt_data.get('pages', [])
+    page_lookup = {page.get('page_index'): page for page in pages}
+    box_paragraphs_by_page = {}
+    for box_para in text_boxes_data:
+        box_paragraphs_by_page.setdefault(box_para['page_index'], []).append(box_para)
+    translate_indices = sorted(box_paragraphs_by_page)
+    total_pages = len(translate_indices)
+
+    logger.info(f"流水线翻译: {total_pages} 页待翻译，同时翻译 {translate_workers} 页，写入队列容量 {queue_size}")
+
+    # 写入阶段：在原始PPTX副本上逐页写入，全部完成后保存一次
+    backup_pptx_for_editing(backup_pptx_path, output_path)
+    with timer.measure("打开PPTX"):
+        prs = Presentation(output_path)
+    total_slides = len(prs.slides)
+    allowed_indices = set(processed_page_indices) if processed_page_indices else None
+
+    def write_page(page_data):
+        slide_index = page_data.get('original_page_index', page_data.get('page_index'))
+        if slide_index is None or slide_index >= total_slides:
+            logger.warning(f"页面索引 {slide_index} 超出范围，跳过")
+            return
+        if allowed_indices is not None and slide_index not in allowed_indices:
+            return
+        with timer.measure("页面写入"):
+            write_page_with_pptx(prs.slides[slide_index], page_data, bilingual_translation)
+
+    write_queue = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+
+    def put_result(item):
+        # 队列已满时等待写入阶段消费；流水线中止时放弃
+        while not stop_event.is_set():
+            try:
+                write_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def translate_job(sequence, page_index):
+        if stop_event.is_set():
+            return
+        try:
+            with timer.measure("文本翻译"):
+                page_result = translate_single_page(text_boxes_data, page_index, sequence,
+                                                    source_language, target_language, model,
+                                                    stop_words_list, custom_translations,
+                                                    checkpoint=checkpoint)
+        except Exception as e:
+            logger.error(f"翻译PPT第 {page_index + 1} 页时出错: {e}", exc_info=True)
+            page_result = {'error': str(e), 'translated_fragments': {}, 'original_page_index': page_index}
+        put_result((page_index, page_result))
+
+    translation_results = {}
+    executor = ThreadPoolExecutor(max_workers=translate_workers, thread_name_prefix="page_translate")
+    completed = False
+    try:
+        if progress_callback:
+            progress_callback(0, total_pages)
+
+        for sequence, page_index in enumerate(translate_indices, 1):
+            executor.submit(translate_job, sequence, page_index)
+
+        # 没有文本的页面不需要翻译，直接按原数据写入（与批量写入时一致）
+        for page_data in pages:
+            if page_data.get('page_index') not in box_paragraphs_by_page:
+                write_page(page_data)
+
+        for written in range(1, total_pages + 1):
+            wait_start = time.monotonic()
+            page_index, page_result = write_queue.get()
+            timer.add("等待翻译结果", wait_start, time.monotonic())
+
+            if page_result is not None:
+                translation_results[page_index] = page_result
+            page_data = page_lookup.get(page_index)
+            if page_data is not None:
+                write_page(_map_page(page_data, page_index, page_result, box_paragraphs_by_page[page_index]))
+            logger.info(f"流水线: PPT第 {page_index + 1} 页已写入 ({written}/{total_pages})")
+
+            if progress_callback:
+                progress_callback(written, total_pages)
+        completed = True
+    finally:
+        if not completed:
+            # 写入失败或任务被取消：通知翻译线程停止，不等待进行中的API调用
+            stop_event.set()
+        executor.shutdown(wait=completed, cancel_futures=not completed)
+
+    with timer.measure("PPTX保存"):
+        prs.save(output_path)
+    logger.info(f"PPTX文件已保存到: {output_path}")
+
+    return output_path, translation_results
@@ -0,0 +1,79 @@
+'''
+pptx_stage_worker.py
+翻译流程中CPU密集阶段的进程池入口：翻译结果映射、python-pptx写入、文本框布局调整
+工作进程按模块名导入本文件，因此这里只导入这些阶段自身需要的模块（不导入app包和UNO）；
+PPT数据和翻译结果由调用方写入文件后传递路径，工作进程只返回输出文件路径
+'''
+import os
+import sys
+import pickle
+
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+
+
+def save_stage_payload(payload_path, **payload):
+    """
+    将阶段输入写入文件，供工作进程读取
+    使用pickle而不是JSON：翻译结果以整数页索引为键，JSON会把键转换为字符串
+    """
+    with open(payload_path, 'wb') as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return payload_path
+
+
+def load_stage_payload(payload_path):
+    with open(payload_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def map_and_write_pptx(payload_path, backup_pptx_path, bilingual_translation,
+                       processed_page_indices, output_path):
+    """
+    将翻译结果映射回PPT数据结构，并使用python-pptx写入PPTX
+    Args:
+        payload_path: save_stage_payload 写入的文件，包含 ppt_data、translation_results、text_boxes_data
+        backup_pptx_path: 备份的原始PPTX文件路径
+        bilingual_translation: 双语翻译模式
+        processed_page_indices: 需要处理的页面索引列表(0-based)
+        output_path: 输出文件路径
+    Returns:
+        str: 输出文件路径
+    """
+    from ppt_data_utils import map_translation_results_back
+    from edit_ppt_functions_pptx import edit_ppt_with_pptx
+
+    logger = get_logger("pyuno.main")
+    payload = load_stage_payload(payload_path)
+    ppt_data = payload['ppt_data']
+
+    try:
+        translated_ppt_data = map_translation_results_back(ppt_data,
+                                                           payload['translation_results'],
+                                                           payload['text_boxes_data'])
+        logger.info("✅ 翻译结果映射完成")
+    except Exception as e:
+        logger.error(f"映射翻译结果失败: {e}", exc_info=True)
+        logger.info("映射失败，使用原始PPT数据")
+        translated_ppt_data = ppt_data
+
+    return edit_ppt_with_pptx(backup_pptx_path,
+                              translated_ppt_data,
+                              bilingual_translation,
+                              processed_page_indices,
+                              output_path)
+
+
+def adjust_textbox_layout(presentation_path):
+    """
+    调用 adjust_text_size.set_textbox_autofit 调整文本框自适应
+    以顶层模块名导入 adjust_text_size，避免工作进程导入整个app包
+    Returns:
+        bool: 调整是否成功
+    """
+    function_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if function_dir not in sys.path:
+        sys.path.append(function_dir)
+    from adjust_text_size import set_textbox_autofit
+
+    return set_textbox_autofit(os.path.abspath(presentation_path))
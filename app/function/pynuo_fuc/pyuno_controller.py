@@ -20,6 +20,10 @@ from ppt_data_utils import extract_texts_for_translation, call_translation_api,
 # 直接导入处理函数
 from load_ppt_functions import load_entire_ppt_direct
 from edit_ppt_functions import write_entire_ppt_direct
+from uno_connection import get_connection_manager, log_uno_calls, FILTER_ODP, FILTER_PPTX
+from pptx_stage_worker import save_stage_payload, map_and_write_pptx
+from page_pipeline import pipeline_enabled, run_page_pipeline
+from stage_timer import measure
 
 # 直接导入处理函数(pptx版本) - 新增
 try:
@@ -71,6 +75,8 @@ def kill_all_soffice_processes():
     
     if killed_count > 0:
         logger.info(f"共关闭了 {killed_count} 个soffice进程")
+        # 已有的UNO桥接随进程失效，丢弃缓存的连接
+        get_connection_manager().invalidate()
         time.sleep(2)
     
     return killed_count
@@ -190,61 +196,16 @@ def convert_pptx_to_odp_pyuno(pptx_path, output_dir=None):
     try:
         logger.info(f"使用PyUNO接口转换PPTX到ODP: {pptx_path}")
         
-        # 连接到LibreOffice
-        localContext = uno.getComponentContext()
-        resolver = localContext.ServiceManager.createInstanceWithContext(
-            "com.sun.star.bridge.UnoUrlResolver", localContext)
-        context = resolver.resolve(
-            "uno:socket,host=localhost,port=2002;urp;StarOffice.ComponentContext")
-        
-        # 获取桌面服务
-        desktop = context.ServiceManager.createInstanceWithContext(
-            "com.sun.star.frame.Desktop", context)
-        
-        # 打开PPTX文件
-        file_url = uno.systemPathToFileUrl(os.path.abspath(pptx_path))
-        logger.debug(f"打开PPTX文件: {file_url}")
-        
-        # 加载文档时设置为隐藏模式
-        props = []
-        prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        prop.Name = "Hidden"
-        prop.Value = True
-        props.append(prop)
-        
-        presentation = desktop.loadComponentFromURL(file_url, "_blank", 0, tuple(props))
-        
-        if not presentation:
-            logger.error("无法加载PPTX文件")
-            return None
+        # 复用长期存活的LibreOffice连接和Desktop
+        manager = get_connection_manager()
         
         # 生成ODP输出路径
         base_name = os.path.splitext(os.path.basename(pptx_path))[0]
         odp_path = os.path.join(output_dir, base_name + ".odp")
-        output_url = uno.systemPathToFileUrl(os.path.abspath(odp_path))
-        
-        logger.debug(f"保存为ODP文件: {output_url}")
-        
-        # 设置保存参数为ODP格式
-        save_props = []
-        
-        # 设置过滤器为ODP格式
-        filter_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        filter_prop.Name = "FilterName"
-        filter_prop.Value = "impress8"  # ODP格式的过滤器名称
-        save_props.append(filter_prop)
-        
-        # 设置覆盖已存在文件
-        overwrite_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        overwrite_prop.Name = "Overwrite"
-        overwrite_prop.Value = True
-        save_props.append(overwrite_prop)
+        logger.debug(f"保存为ODP文件: {odp_path}")
         
-        # 保存为ODP格式
-        presentation.storeToURL(output_url, tuple(save_props))
-        
-        # 关闭文档
-        presentation.close(True)
+        # 隐藏模式加载并以ODP过滤器保存（属性元组由连接管理器缓存）
+        manager.convert_document(pptx_path, odp_path, FILTER_ODP)
         
         # 验证文件是否创建成功
         if os.path.exists(odp_path):
@@ -256,12 +217,6 @@ def convert_pptx_to_odp_pyuno(pptx_path, output_dir=None):
             
     except Exception as e:
         logger.error(f"PyUNO转换PPTX到ODP时出错: {e}", exc_info=True)
-        # 尝试关闭可能打开的文档
-        try:
-            if 'presentation' in locals() and presentation:
-                presentation.close(True)
-        except:
-            pass
         return None
 
 def convert_odp_to_pptx_pyuno(odp_path, output_dir=None):
@@ -283,61 +238,16 @@ def convert_odp_to_pptx_pyuno(odp_path, output_dir=None):
     try:
         logger.info(f"使用PyUNO接口转换ODP到PPTX: {odp_path}")
         
-        # 连接到LibreOffice
-        localContext = uno.getComponentContext()
-        resolver = localContext.ServiceManager.createInstanceWithContext(
-            "com.sun.star.bridge.UnoUrlResolver", localContext)
-        context = resolver.resolve(
-            "uno:socket,host=localhost,port=2002;urp;StarOffice.ComponentContext")
-        
-        # 获取桌面服务
-        desktop = context.ServiceManager.createInstanceWithContext(
-            "com.sun.star.frame.Desktop", context)
-        
-        # 打开ODP文件
-        file_url = uno.systemPathToFileUrl(os.path.abspath(odp_path))
-        logger.debug(f"打开ODP文件: {file_url}")
-        
-        # 加载文档时设置为隐藏模式
-        props = []
-        prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        prop.Name = "Hidden"
-        prop.Value = True
-        props.append(prop)
-        
-        presentation = desktop.loadComponentFromURL(file_url, "_blank", 0, tuple(props))
-        
-        if not presentation:
-            logger.error("无法加载ODP文件")
-            return None
+        # 复用长期存活的LibreOffice连接和Desktop
+        manager = get_connection_manager()
         
         # 生成PPTX输出路径
         base_name = os.path.splitext(os.path.basename(odp_path))[0]
         pptx_path = os.path.join(output_dir, base_name + ".pptx")
-        output_url = uno.systemPathToFileUrl(os.path.abspath(pptx_path))
-        
-        logger.debug(f"保存为PPTX文件: {output_url}")
-        
-        # 设置保存参数为PPTX格式
-        save_props = []
-        
-        # 设置过滤器为PPTX格式
-        filter_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        filter_prop.Name = "FilterName"
-        filter_prop.Value = "Impress MS PowerPoint 2007 XML"  # PPTX格式的过滤器名称
-        save_props.append(filter_prop)
-        
-        # 设置覆盖已存在文件
-        overwrite_prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-        overwrite_prop.Name = "Overwrite"
-        overwrite_prop.Value = True
-        save_props.append(overwrite_prop)
+        logger.debug(f"保存为PPTX文件: {pptx_path}")
         
-        # 保存为PPTX格式
-        presentation.storeToURL(output_url, tuple(save_props))
-        
-        # 关闭文档
-        presentation.close(True)
+        # 隐藏模式加载并以PPTX过滤器保存（属性元组由连接管理器缓存）
+        manager.convert_document(odp_path, pptx_path, FILTER_PPTX)
         
         # 验证文件是否创建成功
         if os.path.exists(pptx_path):
@@ -349,14 +259,19 @@ def convert_odp_to_pptx_pyuno(odp_path, output_dir=None):
             
     except Exception as e:
         logger.error(f"PyUNO转换ODP到PPTX时出错: {e}", exc_info=True)
-        # 尝试关闭可能打开的文档
-        try:
-            if 'presentation' in locals() and presentation:
-                presentation.close(True)
-        except:
-            pass
         return None
 
+def run_cpu_stage(func, *args):
+    """
+    在线程池的进程后端执行CPU密集阶段（python-pptx解析/保存、lxml操作、段落匹配），
+    避免与翻译请求线程争用GIL；不在服务进程中运行（如直接执行本脚本）时在当前线程执行
+    """
+    try:
+        from app.utils.thread_pool_executor import thread_pool
+    except ImportError:
+        return func(*args)
+    return thread_pool.run_in_process(func, args)
+
 def _validate_and_normalize_page_indices(page_indices):
     """验证和标准化页面索引参数"""
     logger = get_logger("pyuno.main")
@@ -489,6 +404,7 @@ def apply_uno_format_conversion(result_path, original_name, timestamp, temp_dir,
 # 设置日志记录器
 logger = setup_default_logging()
 
+@log_uno_calls("pyuno_controller UNO调用统计")
 def pyuno_controller(presentation_path: str,
                      stop_words_list: List[str],
                      custom_translations: Dict[str, str],
@@ -498,7 +414,9 @@ def pyuno_controller(presentation_path: str,
                      bilingual_translation: str,
                      progress_callback,
                      model: str,
-                     enable_uno_conversion: bool):
+                     enable_uno_conversion: bool,
+                     checkpoint=None,
+                     stage_timer=None):
     """
     主控制器函数（重构版：PPTX->ODP->操作->PPTX流程）
     
@@ -513,6 +431,8 @@ def pyuno_controller(presentation_path: str,
         progress_callback: 进度回调函数
         model: 翻译模型
         enable_uno_conversion: 是否启用UNO格式转换（默认True）
+        checkpoint: 任务检查点（可选），重试时复用已提取的PPT数据和已翻译的页面
+        stage_timer: 阶段耗时统计（可选），见 stage_timer.StageTimer
     """
     start_time = datetime.now()
     
@@ -563,6 +483,9 @@ def pyuno_controller(presentation_path: str,
             shutil.rmtree(temp_dir)
         return None
     
+    # 重试/恢复的任务：检查点中已有提取好的PPT数据时，跳过ODP转换和加载
+    cached_ppt_data = checkpoint.load_ppt_data() if checkpoint is not None else None
+    
     # 将pptx转化为odp，并保存为odp_working_path
     try:
         # 生成ODP文件路径
@@ -572,8 +495,13 @@ def pyuno_controller(presentation_path: str,
         odp_filename = f"{input_filename}_working_{timestamp}.odp"
         odp_working_path = os.path.join(input_dir, odp_filename)
         
-        # 转换PPTX到ODP
-        converted_odp_path = convert_pptx_to_odp_pyuno(presentation_path, input_dir)
+        if cached_ppt_data:
+            logger.info("检查点中已有PPT数据，跳过PPTX转ODP")
+            converted_odp_path = odp_working_path
+        else:
+            # 转换PPTX到ODP
+            with measure(stage_timer, "PPTX转ODP"):
+                converted_odp_path = convert_pptx_to_odp_pyuno(presentation_path, input_dir)
         
         if not converted_odp_path:
             logger.error("PPTX转ODP失败，无法继续处理")
@@ -587,7 +515,8 @@ def pyuno_controller(presentation_path: str,
             os.rename(converted_odp_path, odp_working_path)
             logger.info(f"重命名工作文件: {odp_working_path}")
         
-        logger.info(f"✅ PPTX转ODP成功: {odp_working_path}")
+        if not cached_ppt_data:
+            logger.info(f"✅ PPTX转ODP成功: {odp_working_path}")
         
     except Exception as e:
         logger.error(f"PPTX转ODP过程失败: {e}", exc_info=True)
@@ -605,8 +534,18 @@ def pyuno_controller(presentation_path: str,
         # 验证页面索引
         validated_page_indices = _validate_and_normalize_page_indices(select_page)
         
-        # 直接调用加载函数，不使用子进程
-        ppt_data = load_entire_ppt_direct(odp_working_path, validated_page_indices)
+        if cached_ppt_data:
+            ppt_data = cached_ppt_data
+            logger.info("使用检查点中的PPT数据")
+        else:
+            # 直接调用加载函数，不使用子进程
+            with measure(stage_timer, "ODP内容加载"):
+                ppt_data = load_entire_ppt_direct(odp_working_path, validated_page_indices)
+            if ppt_data and checkpoint is not None:
+                try:
+                    checkpoint.save_ppt_data(ppt_data)
+                except Exception as e:
+                    logger.warning(f"保存PPT数据检查点失败: {e}")
         
         if not ppt_data:
             logger.error("无法从ODP加载PPT内容")
@@ -637,9 +576,17 @@ def pyuno_controller(presentation_path: str,
             shutil.rmtree(temp_dir)
         return None
     
+    # 构建最终输出路径
+    original_dir = os.path.dirname(presentation_path)
+    original_name = os.path.splitext(os.path.basename(presentation_path))[0]
+    output_path = os.path.join(original_dir, f"{original_name}_translated.pptx")
+    
+    # 流水线模式下第2~4步重叠执行：每页翻译完成后立即映射并写入PPTX
+    use_pipeline = pipeline_enabled()
+    
     # ===== 第二步：翻译PPT内容 =====
     logger.info("=" * 60)
-    logger.info("第2步：翻译PPT内容")
+    logger.info("第2步：翻译PPT内容" + ("（流水线：逐页映射并写入PPTX）" if use_pipeline else ""))
     logger.info("=" * 60)
     
     try:
@@ -655,13 +602,33 @@ def pyuno_controller(presentation_path: str,
         
         # 调用翻译API
         from api_translate_uno import translate_pages_by_page, validate_translation_result
-        translation_results = translate_pages_by_page(text_boxes_data, 
-                                                      progress_callback, 
-                                                      source_language, 
-                                                      target_language, 
-                                                      model,
-                                                      stop_words_list,
-                                                      custom_translations)
+        if use_pipeline:
+            stage_start = time.time()
+            result_path, translation_results = run_page_pipeline(ppt_data,
+                                                                 text_boxes_data,
+                                                                 backup_pptx_path,
+                                                                 output_path,
+                                                                 bilingual_translation,
+                                                                 validated_page_indices,  # 传入0-based索引
+                                                                 progress_callback,
+                                                                 source_language,
+                                                                 target_language,
+                                                                 model,
+                                                                 stop_words_list,
+                                                                 custom_translations,
+                                                                 checkpoint=checkpoint,
+                                                                 stage_timer=stage_timer)
+            logger.info(f"✅ 流水线翻译并写入PPTX成功: {result_path}，耗时 {time.time() - stage_start:.2f} 秒")
+        else:
+            with measure(stage_timer, "文本翻译"):
+                translation_results = translate_pages_by_page(text_boxes_data, 
+                                                              progress_callback, 
+                                                              source_language, 
+                                                              target_language, 
+                                                              model,
+                                                              stop_words_list,
+                                                              custom_translations,
+                                                              checkpoint=checkpoint)
         
         logger.info(f"翻译完成，共处理 {len(translation_results)} 页")
         
@@ -680,51 +647,44 @@ def pyuno_controller(presentation_path: str,
             shutil.rmtree(temp_dir)
         return None
     
-    # ===== 第三步：映射翻译结果 =====
-    logger.info("=" * 60)
-    logger.info("第3步：映射翻译结果回PPT数据结构")
-    logger.info("=" * 60)
-    
-    try:
-        translated_ppt_data = map_translation_results_back(ppt_data, translation_results, text_boxes_data)
-        logger.info("✅ 翻译结果映射完成")
-        
-    except Exception as e:
-        logger.error(f"映射翻译结果失败: {e}", exc_info=True)
-        logger.info("映射失败，使用原始PPT数据")
-        translated_ppt_data = ppt_data
-    
-    # ===== 第四步：将翻译结果写入PPTX（修改：使用python-pptx） =====
-    logger.info("=" * 60)
-    logger.info("第4步：将翻译结果写入PPTX（使用python-pptx）")
-    logger.info("=" * 60)
+    # ===== 第三、四步：映射翻译结果并写入PPTX（使用python-pptx，在进程池中执行） =====
+    if use_pipeline:
+        logger.info("第3、4步已在流水线中逐页完成")
+    else:
+        logger.info("=" * 60)
+        logger.info("第3步：映射翻译结果回PPT数据结构")
+        logger.info("第4步：将翻译结果写入PPTX（使用python-pptx）")
+        logger.info("=" * 60)
 
-    try:
-        # 构建最终输出路径
-        original_dir = os.path.dirname(presentation_path)
-        original_name = os.path.splitext(os.path.basename(presentation_path))[0]
-        output_path = os.path.join(original_dir, f"{original_name}_translated.pptx")
-        
-        # 调用新的PPTX编辑模块
-        result_path = edit_ppt_with_pptx(
-            backup_pptx_path, 
-            translated_ppt_data, 
-            bilingual_translation,
-            validated_page_indices,  # 传入0-based索引
-            output_path,
-            progress_callback
-        )
-        
-        logger.info(f"✅ 翻译内容写入PPTX成功: {result_path}")
-        
-    except Exception as e:
-        logger.error(f"写入翻译结果到PPTX失败: {e}", exc_info=True)
-        # 清理临时文件
-        if os.path.exists(odp_working_path):
-            os.remove(odp_working_path)
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        return None
+        try:
+            # PPT数据和翻译结果写入临时文件，工作进程按路径读取
+            payload_path = save_stage_payload(os.path.join(temp_dir, "write_stage_payload.pkl"),
+                                              ppt_data=ppt_data,
+                                              translation_results=translation_results,
+                                              text_boxes_data=text_boxes_data)
+            
+            # 映射失败时工作进程使用原始PPT数据写入
+            stage_start = time.time()
+            with measure(stage_timer, "映射并写入PPTX"):
+                result_path = run_cpu_stage(
+                    map_and_write_pptx,
+                    payload_path,
+                    backup_pptx_path, 
+                    bilingual_translation,
+                    validated_page_indices,  # 传入0-based索引
+                    output_path
+                )
+            
+            logger.info(f"✅ 翻译内容写入PPTX成功: {result_path}，耗时 {time.time() - stage_start:.2f} 秒")
+            
+        except Exception as e:
+            logger.error(f"写入翻译结果到PPTX失败: {e}", exc_info=True)
+            # 清理临时文件
+            if os.path.exists(odp_working_path):
+                os.remove(odp_working_path)
+            if os.path.exists(temp_dir):
+                shutil.rmtree(temp_dir)
+            return None
     
     # ===== 第五步：使用UNO接口进行格式转换（PPTX->ODP->PPTX） =====
     if enable_uno_conversion:
@@ -733,9 +693,10 @@ def pyuno_controller(presentation_path: str,
         logger.info("=" * 60)
         
         # 调用UNO格式转换函数
-        final_result_path, temp_odp_path = apply_uno_format_conversion(
-            result_path, original_name, timestamp, temp_dir, original_dir
-        )
+        with measure(stage_timer, "UNO格式转换"):
+            final_result_path, temp_odp_path = apply_uno_format_conversion(
+                result_path, original_name, timestamp, temp_dir, original_dir
+            )
         
         # 如果转换成功且生成了新文件，更新result_path
         if final_result_path != result_path:
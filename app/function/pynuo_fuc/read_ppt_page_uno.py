@@ -6,20 +6,20 @@ import uno # type: ignore
 import sys, os
 sys.path.insert(0, os.path.dirname(__file__))
 from logger_config import get_logger
+from uno_connection import get_connection_manager
+from uno_properties import read_char_attrs
+from uno_profiler import profiled
 import math
 
 # 连接到本地运行的LibreOffice（需要先启动监听服务）
+# 通过连接管理器复用长期存活的URP桥接，连接断开时自动重连
 def connect_to_libreoffice():
     logger = get_logger("pyuno.subprocess")
     logger.debug("开始连接到LibreOffice...")
     
     try:
-        local_ctx = uno.getComponentContext()
-        resolver = local_ctx.ServiceManager.createInstanceWithContext(
-            "com.sun.star.bridge.UnoUrlResolver", local_ctx)
-        context = resolver.resolve(
-            "uno:socket,host=localhost,port=2002;urp;StarOffice.ComponentContext")
-        logger.info("成功连接到LibreOffice")
+        context = get_connection_manager().get_context()
+        logger.debug("已获取LibreOffice连接")
         return context
     except Exception as e:
         logger.error(f"连接LibreOffice失败: {e}", exc_info=True)
@@ -49,17 +49,11 @@ def extract_text_and_attrs(shape):
     
     # 遍历每一个字
     for idx, char in enumerate(text_str):
-        cursor.gotoStart(False)  # 游标回到开头
-        cursor.goRight(idx, False)  # 向右移动到第idx个字符
-        cursor.goRight(1, True)     # 选中当前字符
+        cursor.collapseToEnd()   # 取消上一次选区，游标停在上一个字符之后
+        cursor.goRight(1, True)  # 选中当前字符
         
-        # 提取字体属性
-        font_color = cursor.CharColor  # 字体颜色（RGB整数）
-        underline = cursor.CharUnderline != 0  # 是否有下划线
-        bold = cursor.CharWeight > 100         # 是否加粗
-        escapement = cursor.CharEscapement     # 上下标（正数为上标，负数为下标，0为正常）
-        font_size = cursor.CharHeight          # 字体大小
-        attrs = (font_color, underline, bold, escapement, font_size)
+        # 一次往返批量提取字体属性：颜色、下划线、加粗、上下标、字号
+        attrs = read_char_attrs(cursor)
         
         # 检查是否为换行符
         is_line_break = char in ['\n', '\r']
@@ -217,13 +211,9 @@ def read_slide_texts_improved(context, ppt_path, page_index=0):
     logger.info(f"开始读取第 {page_index + 1} 页的文本内容...")
     
     try:
-        desktop = context.ServiceManager.createInstanceWithContext(
-            "com.sun.star.frame.Desktop", context)
-        file_url = uno.systemPathToFileUrl(os.path.abspath(ppt_path))  # 转为UNO文件URL
-        properties = ()
-        
-        logger.debug(f"打开PPT文件: {file_url}")
-        presentation = desktop.loadComponentFromURL(file_url, "_blank", 0, properties)  # 打开PPT
+        manager = get_connection_manager()
+        logger.debug(f"打开PPT文件: {ppt_path}")
+        presentation = manager.load_document(ppt_path)  # 复用Desktop打开PPT
         slides = presentation.getDrawPages()  # 获取所有幻灯片
         
         # 调用新的函数处理页面
@@ -262,7 +252,7 @@ def read_slide_from_presentation(context, slides, page_index=0):
         }
         
         if 0 <= page_index < slides.getCount():
-            slide = slides.getByIndex(page_index)
+            slide = profiled(slides.getByIndex(page_index))
             box_index = 0
             total_paragraphs = 0
             
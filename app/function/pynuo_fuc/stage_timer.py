@@ -0,0 +1,72 @@
+'''
+stage_timer.py
+记录一个翻译任务各处理阶段的耗时，任务结束后写入任务日志
+并发执行的阶段（如多个翻译线程）累计各自的耗时，同时记录该阶段从首次开始到最后结束的时间跨度，
+对比累计耗时和跨度即可看出阶段之间的重叠程度
+'''
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    """任务各阶段耗时统计（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages = {}  # 阶段名 -> [累计耗时, 次数, 首次开始, 最后结束]
+        self.started = time.monotonic()
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.add(stage, start, time.monotonic())
+
+    def add(self, stage, start, end):
+        with self._lock:
+            entry = self._stages.get(stage)
+            if entry is None:
+                self._stages[stage] = [end - start, 1, start, end]
+            else:
+                entry[0] += end - start
+                entry[1] += 1
+                entry[2] = min(entry[2], start)
+                entry[3] = max(entry[3], end)
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {阶段名: {'total': 累计耗时, 'count': 次数, 'span': 时间跨度, 'offset': 相对任务开始的起始时间}}
+        """
+        with self._lock:
+            return {
+                stage: {
+                    'total': total,
+                    'count': count,
+                    'span': last_end - first_start,
+                    'offset': first_start - self.started,
+                }
+                for stage, (total, count, first_start, last_end) in self._stages.items()
+            }
+
+    def summary_lines(self):
+        """按开始时间排序的阶段耗时说明，用于写入任务日志"""
+        lines = []
+        stages = sorted(self.snapshot().items(), key=lambda item: item[1]['offset'])
+        for stage, stats in stages:
+            line = f"{stage}: {stats['total']:.2f}秒"
+            if stats['count'] > 1:
+                line += f"（{stats['count']} 次累计，跨度 {stats['span']:.2f}秒）"
+            line += f"，开始于 +{stats['offset']:.2f}秒"
+            lines.append(line)
+        return lines
+
+
+def measure(stage_timer, stage):
+    """stage_timer 为None时不计时"""
+    if stage_timer is None:
+        return nullcontext()
+    return stage_timer.measure(stage)
@@ -0,0 +1,324 @@
+"""
+text_fit_estimator.py
+纯Python文本排版估算：按字体缓存字形步进宽度表（通过fontTools读取本机TTF/OTF），
+根据文本框尺寸、内边距和行距计算换行后的行数，以及译文可容纳的最大字号，
+使python-pptx写入阶段可以直接写出合适的字号，而无需LibreOffice再渲染一遍
+"""
+import sys, os
+import threading
+import unicodedata
+from functools import lru_cache
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+
+try:
+    from fontTools.ttLib import TTFont
+    FONTTOOLS_AVAILABLE = True
+except ImportError:
+    FONTTOOLS_AVAILABLE = False
+
+EMU_PER_PT = 12700
+DEFAULT_FONT_SIZE = 18.0
+DEFAULT_LINE_SPACING = 1.2
+
+# 字体目录（按平台常见位置）
+FONT_DIRECTORIES = [
+    "/usr/share/fonts",
+    "/usr/local/share/fonts",
+    os.path.expanduser("~/.fonts"),
+    os.path.expanduser("~/.local/share/fonts"),
+    "/Library/Fonts",
+    "/System/Library/Fonts",
+    os.path.expanduser("~/Library/Fonts"),
+    os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts"),
+]
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+
+# 未指定字体或字体不存在时依次尝试的后备字体
+FALLBACK_FAMILIES = ("Arial", "Liberation Sans", "DejaVu Sans", "Noto Sans CJK SC", "Microsoft YaHei")
+
+
+def _heuristic_advance(char):
+    """无字体文件时的经验宽度（单位：em）"""
+    if unicodedata.east_asian_width(char) in ("W", "F"):
+        return 1.0
+    if char == " ":
+        return 0.28
+    if char.isupper():
+        return 0.65
+    if char.isdigit():
+        return 0.56
+    if char in "iljtf.,;:'|!":
+        return 0.3
+    if char in "mwMW":
+        return 0.85
+    return 0.52
+
+
+class GlyphAdvanceTable:
+    """单个字体的字形步进宽度表（单位：em）"""
+
+    def __init__(self, family, path=None):
+        self.family = family
+        self.path = path
+        self.advances = {}
+        if path and FONTTOOLS_AVAILABLE:
+            self._load(path)
+
+    def _load(self, path):
+        font = TTFont(path, lazy=True, fontNumber=0)
+        try:
+            units_per_em = float(font["head"].unitsPerEm)
+            hmtx = font["hmtx"].metrics
+            cmap = font.getBestCmap() or {}
+            self.advances = {
+                chr(codepoint): hmtx[glyph][0] / units_per_em
+                for codepoint, glyph in cmap.items()
+                if glyph in hmtx
+            }
+        finally:
+            font.close()
+
+    def advance(self, char):
+        """字符步进宽度（em），字体中缺失的字形使用经验值"""
+        width = self.advances.get(char)
+        return width if width is not None else _heuristic_advance(char)
+
+    def text_width(self, text):
+        return sum(self.advance(char) for char in text)
+
+
+class FontRegistry:
+    """扫描本机字体目录，按字体族名查找字体文件并缓存步进宽度表"""
+
+    def __init__(self, directories=None):
+        self.directories = directories or FONT_DIRECTORIES
+        self._families = None
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.logger = get_logger("pyuno.main")
+
+    def _scan(self):
+        families = {}
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                continue
+            for root, _, files in os.walk(directory):
+                for filename in files:
+                    if not filename.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(root, filename)
+                    for name in self._family_names(path):
+                        families.setdefault(name.lower(), path)
+        self.logger.debug(f"字体扫描完成，共 {len(families)} 个字体族名")
+        return families
+
+    @staticmethod
+    def _family_names(path):
+        """读取字体族名（name表ID 1/16），失败时退回文件名"""
+        names = {os.path.splitext(os.path.basename(path))[0]}
+        if FONTTOOLS_AVAILABLE:
+            try:
+                font = TTFont(path, lazy=True, fontNumber=0)
+                try:
+                    for record in font["name"].names:
+                        if record.nameID in (1, 16):
+                            names.add(record.toUnicode())
+                finally:
+                    font.close()
+            except Exception:
+                pass
+        return names
+
+    def find_font(self, family):
+        """按字体族名查找字体文件路径"""
+        with self._lock:
+            if self._families is None:
+                self._families = self._scan()
+            return self._families.get((family or "").lower())
+
+    def get_table(self, family=None):
+        """获取（并缓存）指定字体的步进宽度表，找不到时依次尝试后备字体"""
+        key = (family or "").lower()
+        table = self._tables.get(key)
+        if table is not None:
+            return table
+
+        path = self.find_font(family) if family else None
+        if path is None:
+            for fallback in FALLBACK_FAMILIES:
+                path = self.find_font(fallback)
+                if path:
+                    break
+        try:
+            table = GlyphAdvanceTable(family, path)
+        except Exception as e:
+            self.logger.warning(f"读取字体 {path} 失败，使用经验宽度: {e}")
+            table = GlyphAdvanceTable(family)
+        self._tables[key] = table
+        return table
+
+
+_registry = FontRegistry()
+
+
+def get_font_registry():
+    """获取全局字体注册表"""
+    return _registry
+
+
+def _is_break_opportunity(char):
+    """中日韩字符之间可以任意换行"""
+    return unicodedata.east_asian_width(char) in ("W", "F")
+
+
+def _tokenize(text):
+    """拆分为可换行的最小单元：西文按单词（含后随空格），中日韩按字"""
+    tokens = []
+    word = ""
+    for char in text:
+        if _is_break_opportunity(char):
+            if word:
+                tokens.append(word)
+                word = ""
+            tokens.append(char)
+        elif char == " ":
+            tokens.append(word + char)
+            word = ""
+        else:
+            word += char
+    if word:
+        tokens.append(word)
+    return tokens
+
+
+def count_wrapped_lines(runs, width_pt, scale=1.0, registry=None):
+    """
+    计算一行逻辑文本（不含硬换行）在指定宽度下折行后的行数及最大字号
+
+    Args:
+        runs: [(文本, 字号pt, 字体族名)]
+        width_pt: 可用宽度（磅）
+        scale: 字号缩放比例
+
+    Returns:
+        (行数, 各行最大字号列表)
+    """
+    registry = registry or _registry
+    lines = 1
+    line_width = 0.0
+    line_max_size = 0.0
+    line_sizes = []
+
+    for text, size, family in runs:
+        size = size * scale
+        table = registry.get_table(family)
+        line_max_size = max(line_max_size, size)
+        for token in _tokenize(text):
+            token_width = table.text_width(token) * size
+            trailing = table.advance(" ") * size if token.endswith(" ") else 0.0
+            if line_width > 0 and line_width + token_width - trailing > width_pt:
+                line_sizes.append(line_max_size)
+                lines += 1
+                line_width = 0.0
+                line_max_size = size
+            # 单个单元比整行还宽时按字符强制断开
+            while token_width - trailing > width_pt and len(token) > 1:
+                fit = 0
+                consumed = 0.0
+                for char in token:
+                    char_width = table.advance(char) * size
+                    if consumed + char_width > width_pt and fit > 0:
+                        break
+                    consumed += char_width
+                    fit += 1
+                line_sizes.append(size)
+                lines += 1
+                token = token[fit:]
+                token_width = table.text_width(token) * size
+                trailing = table.advance(" ") * size if token.endswith(" ") else 0.0
+            line_width += token_width
+
+    line_sizes.append(line_max_size or DEFAULT_FONT_SIZE * scale)
+    return lines, line_sizes
+
+
+class TextFitEstimator:
+    """根据文本框几何尺寸估算换行行数和可容纳的最大字号"""
+
+    def __init__(self, registry=None, line_spacing=DEFAULT_LINE_SPACING, min_font_size=6.0):
+        self.registry = registry or _registry
+        self.line_spacing = line_spacing
+        self.min_font_size = min_font_size
+
+    def measure(self, paragraphs, width_pt, scale=1.0):
+        """
+        计算给定缩放下文本总高度
+
+        Args:
+            paragraphs: 段落列表，每个段落是 [(文本, 字号pt, 字体族名)]，文本中的换行符表示软换行
+
+        Returns:
+            (总行数, 总高度pt)
+        """
+        total_lines = 0
+        total_height = 0.0
+        for runs in paragraphs:
+            for line_runs in self._split_hard_breaks(runs):
+                lines, sizes = count_wrapped_lines(line_runs, width_pt, scale, self.registry)
+                total_lines += lines
+                total_height += sum(sizes) * self.line_spacing
+        return total_lines, total_height
+
+    @staticmethod
+    def _split_hard_breaks(runs):
+        """按段内换行符（\\n、\\v）拆分为多行逻辑文本"""
+        current = []
+        last_size, last_family = DEFAULT_FONT_SIZE, None
+        for text, size, family in runs:
+            last_size, last_family = size, family
+            parts = text.replace("\v", "\n").split("\n")
+            for index, part in enumerate(parts):
+                if index > 0:
+                    yield current or [("", size, family)]
+                    current = []
+                if part:
+                    current.append((part, size, family))
+        yield current or [("", last_size, last_family)]
+
+    def fit_scale(self, paragraphs, width_pt, height_pt, precision=0.01):
+        """
+        计算使文本完整放入文本框的最大字号缩放比例（不放大，最大为1.0）
+        """
+        if width_pt <= 0 or height_pt <= 0:
+            return 1.0
+        _, height = self.measure(paragraphs, width_pt)
+        if height <= height_pt:
+            return 1.0
+
+        max_size = max((size for runs in paragraphs for _, size, _ in runs), default=DEFAULT_FONT_SIZE)
+        low = min(1.0, self.min_font_size / max_size)
+        high = 1.0
+        while high - low > precision:
+            middle = (low + high) / 2
+            _, height = self.measure(paragraphs, width_pt, middle)
+            if height <= height_pt:
+                low = middle
+            else:
+                high = middle
+        return low
+
+    def fit_box(self, paragraphs, width_emu, height_emu, insets_emu=(91440, 91440, 45720, 45720)):
+        """
+        按文本框EMU尺寸和内边距（左、右、上、下）计算缩放比例
+        """
+        left, right, top, bottom = insets_emu
+        width_pt = (width_emu - left - right) / EMU_PER_PT
+        height_pt = (height_emu - top - bottom) / EMU_PER_PT
+        return self.fit_scale(paragraphs, width_pt, height_pt)
+
+
+@lru_cache(maxsize=1)
+def get_text_fit_estimator():
+    """获取全局文本排版估算器"""
+    return TextFitEstimator()
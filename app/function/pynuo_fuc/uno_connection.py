@@ -0,0 +1,341 @@
+"""
+uno_connection.py
+UNO桥接连接管理器：为每个soffice实例维护一个长期存活、带健康检查的连接
+复用ComponentContext和Desktop，缓存服务实例与常用加载/保存PropertyValue元组，
+并统计每种UNO操作的调用次数（进程累计，以及按线程统计某次操作期间的调用，见 log_uno_calls）
+"""
+import uno  # type: ignore
+import sys, os
+import threading
+import time
+import functools
+from collections import Counter
+from contextlib import contextmanager
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+
+from com.sun.star.lang import DisposedException  # type: ignore
+from com.sun.star.connection import NoConnectException  # type: ignore
+
+DEFAULT_HOST = "localhost"
+DEFAULT_PORT = 2002
+
+# 常用文件格式过滤器
+FILTER_ODP = "impress8"
+FILTER_PPTX = "Impress MS PowerPoint 2007 XML"
+FILTER_PDF = "impress_pdf_Export"
+
+# 按扩展名推断加载过滤器
+LOAD_FILTERS_BY_EXT = {
+    ".odp": FILTER_ODP,
+    ".pptx": FILTER_PPTX,
+}
+
+
+def _make_property_values(**kwargs):
+    """根据关键字参数构建PropertyValue元组"""
+    props = []
+    for name, value in kwargs.items():
+        prop = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
+        prop.Name = name
+        prop.Value = value
+        props.append(prop)
+    return tuple(props)
+
+
+def _is_bridge_disposed(error):
+    """判断异常是否由URP桥接断开引起"""
+    if isinstance(error, DisposedException):
+        return True
+    message = str(error)
+    return 'Binary URP bridge disposed' in message or 'Binary URP bridge already disposed' in message
+
+
+class UnoConnectionManager:
+    """单个soffice实例的UNO连接管理器（线程安全）"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, health_check_interval=5.0):
+        self.host = host
+        self.port = port
+        self.health_check_interval = health_check_interval
+        self.connection_string = (
+            f"uno:socket,host={host},port={port};urp;StarOffice.ComponentContext"
+        )
+        self.logger = get_logger("pyuno.main")
+
+        self._lock = threading.RLock()
+        self._context = None
+        self._desktop = None
+        self._services = {}
+        self._property_cache = {}
+        self._last_health_check = 0.0
+        self._call_counts = Counter()
+        # 当前线程正在统计的调用计数（call_scope 嵌套时同时计入每一层）
+        self._scopes = threading.local()
+        self._reconnect_count = 0
+
+    # ------------------------------------------------------------------
+    # 调用统计
+    # ------------------------------------------------------------------
+    def record_call(self, operation, count=1):
+        """记录一次UNO操作调用"""
+        with self._lock:
+            self._call_counts[operation] += count
+        for counts in getattr(self._scopes, 'stack', ()):
+            counts[operation] += count
+
+    @contextmanager
+    def call_scope(self):
+        """
+        统计当前线程在 with 块中的UNO调用次数
+        连接管理器由进程内的并发任务共用，按线程统计时其他任务的调用不会计入
+        """
+        stack = self._scopes.__dict__.setdefault('stack', [])
+        counts = Counter()
+        stack.append(counts)
+        try:
+            yield counts
+        finally:
+            # 按对象移除（内容相同的计数在比较时相等）
+            del stack[next(i for i, item in enumerate(stack) if item is counts)]
+
+    def get_call_stats(self):
+        """获取按操作分类的UNO调用次数统计（进程启动以来所有任务的累计）"""
+        with self._lock:
+            return {
+                'host': self.host,
+                'port': self.port,
+                'connected': self._context is not None,
+                'reconnect_count': self._reconnect_count,
+                'total_calls': sum(self._call_counts.values()),
+                'calls': dict(self._call_counts),
+            }
+
+    def log_call_stats(self, operation_name="UNO调用统计", counts=None):
+        """
+        将调用统计写入日志
+
+        Args:
+            counts: call_scope 统计的本次操作的调用次数；为None时输出进程累计
+        """
+        if counts is None:
+            stats = self.get_call_stats()
+            details = ", ".join(f"{op}={count}" for op, count in sorted(stats['calls'].items()))
+            self.logger.info(f"{operation_name}（进程累计）: 共 {stats['total_calls']} 次 ({details})，"
+                             f"重连 {stats['reconnect_count']} 次")
+            return
+        details = ", ".join(f"{op}={count}" for op, count in sorted(counts.items()))
+        self.logger.info(f"{operation_name}: 共 {sum(counts.values())} 次 ({details})")
+
+    # ------------------------------------------------------------------
+    # 连接管理
+    # ------------------------------------------------------------------
+    def _connect(self):
+        """建立新的URP连接并解析Desktop"""
+        local_ctx = uno.getComponentContext()
+        resolver = local_ctx.ServiceManager.createInstanceWithContext(
+            "com.sun.star.bridge.UnoUrlResolver", local_ctx)
+        context = resolver.resolve(self.connection_string)
+        self.record_call('resolve')
+        desktop = context.ServiceManager.createInstanceWithContext(
+            "com.sun.star.frame.Desktop", context)
+        self.record_call('createInstance')
+
+        self._context = context
+        self._desktop = desktop
+        self._services = {}
+        self._last_health_check = time.monotonic()
+        self.logger.info(f"成功连接到LibreOffice: {self.host}:{self.port}")
+
+    def _is_healthy(self):
+        """轻量级健康检查：通过Desktop的一次调用确认桥接仍然可用"""
+        if self._context is None or self._desktop is None:
+            return False
+        now = time.monotonic()
+        if now - self._last_health_check < self.health_check_interval:
+            return True
+        try:
+            self._desktop.getComponents()
+            self.record_call('healthCheck')
+            self._last_health_check = now
+            return True
+        except Exception as e:
+            self.logger.warning(f"LibreOffice连接健康检查失败: {e}")
+            return False
+
+    def invalidate(self):
+        """丢弃当前连接，下次访问时重新建立"""
+        with self._lock:
+            self._context = None
+            self._desktop = None
+            self._services = {}
+
+    def reconnect(self):
+        """强制重新连接"""
+        with self._lock:
+            self.invalidate()
+            self._reconnect_count += 1
+            self.logger.info(f"重新连接LibreOffice: {self.host}:{self.port}")
+            self._connect()
+
+    def get_context(self):
+        """获取远端ComponentContext，连接失效时自动重连"""
+        with self._lock:
+            if not self._is_healthy():
+                if self._context is not None:
+                    self._reconnect_count += 1
+                self.invalidate()
+                try:
+                    self._connect()
+                except NoConnectException as e:
+                    self.logger.error(f"连接LibreOffice失败: {e}")
+                    raise
+            return self._context
+
+    def get_desktop(self):
+        """获取复用的Desktop实例"""
+        with self._lock:
+            self.get_context()
+            return self._desktop
+
+    def get_service(self, service_name):
+        """获取（并缓存）指定服务的实例"""
+        with self._lock:
+            context = self.get_context()
+            service = self._services.get(service_name)
+            if service is None:
+                service = context.ServiceManager.createInstanceWithContext(service_name, context)
+                self.record_call('createInstance')
+                self._services[service_name] = service
+            return service
+
+    def call(self, operation, func, *args, **kwargs):
+        """
+        执行一次UNO操作，桥接断开时透明重连并重试一次
+
+        Args:
+            operation: 操作名称（用于调用统计）
+            func: 接收 (context, desktop, *args, **kwargs) 的可调用对象
+        """
+        for attempt in range(2):
+            context = self.get_context()
+            desktop = self._desktop
+            try:
+                self.record_call(operation)
+                return func(context, desktop, *args, **kwargs)
+            except Exception as e:
+                if attempt == 0 and _is_bridge_disposed(e):
+                    self.logger.warning(f"UNO桥接已断开（{operation}），尝试重连: {e}")
+                    self.reconnect()
+                    continue
+                raise
+
+    # ------------------------------------------------------------------
+    # PropertyValue缓存
+    # ------------------------------------------------------------------
+    def load_properties(self, filter_name=None, hidden=True, read_only=False):
+        """获取缓存的文档加载属性元组"""
+        key = ('load', filter_name, hidden, read_only)
+        props = self._property_cache.get(key)
+        if props is None:
+            kwargs = {'Hidden': hidden}
+            if read_only:
+                kwargs['ReadOnly'] = True
+            if filter_name:
+                kwargs['FilterName'] = filter_name
+            props = _make_property_values(**kwargs)
+            self._property_cache[key] = props
+        return props
+
+    def store_properties(self, filter_name, overwrite=True):
+        """获取缓存的文档保存属性元组"""
+        key = ('store', filter_name, overwrite)
+        props = self._property_cache.get(key)
+        if props is None:
+            props = _make_property_values(FilterName=filter_name, Overwrite=overwrite)
+            self._property_cache[key] = props
+        return props
+
+    # ------------------------------------------------------------------
+    # 文档操作
+    # ------------------------------------------------------------------
+    def load_document(self, path, filter_name=None, hidden=True, read_only=False):
+        """通过复用的Desktop打开文档"""
+        file_url = uno.systemPathToFileUrl(os.path.abspath(path))
+        props = self.load_properties(filter_name, hidden=hidden, read_only=read_only)
+        return self.call(
+            'loadComponentFromURL',
+            lambda context, desktop: desktop.loadComponentFromURL(file_url, "_blank", 0, props)
+        )
+
+    def store_document(self, document, path, filter_name, overwrite=True):
+        """将文档保存到指定路径"""
+        file_url = uno.systemPathToFileUrl(os.path.abspath(path))
+        props = self.store_properties(filter_name, overwrite=overwrite)
+        self.record_call('storeToURL')
+        document.storeToURL(file_url, props)
+
+    def close_document(self, document):
+        """关闭文档，忽略已断开连接导致的异常"""
+        if document is None:
+            return
+        try:
+            self.record_call('close')
+            document.close(True)
+        except Exception as e:
+            self.logger.debug(f"关闭文档时出错（已忽略）: {e}")
+
+    def convert_document(self, input_path, output_path, filter_name, load_filter=None):
+        """打开文档并以指定过滤器另存"""
+        document = self.load_document(input_path, filter_name=load_filter)
+        if not document:
+            raise RuntimeError(f"无法加载文档: {input_path}")
+        try:
+            self.store_document(document, output_path, filter_name)
+        finally:
+            self.close_document(document)
+        return output_path
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """获取指定soffice实例的全局连接管理器"""
+    key = (host, port)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = UnoConnectionManager(host, port)
+            _managers[key] = manager
+        return manager
+
+
+def log_uno_calls(operation_name, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    装饰器：统计函数执行期间当前线程通过连接管理器发起的UNO调用，结束时（包括出错）写入日志
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            manager = get_connection_manager(host, port)
+            with manager.call_scope() as counts:
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    manager.log_call_stats(operation_name, counts)
+        return wrapper
+    return decorator
+
+
+def get_all_call_stats():
+    """获取所有连接管理器的UNO调用统计"""
+    with _managers_lock:
+        managers = list(_managers.values())
+    return [manager.get_call_stats() for manager in managers]
+
+
+def guess_load_filter(path):
+    """按文件扩展名推断加载过滤器"""
+    return LOAD_FILTERS_BY_EXT.get(os.path.splitext(path.lower())[1])
@@ -0,0 +1,150 @@
+"""
+uno_profiler.py
+UNO调用次数分析器：通过代理对象包装UNO桥接对象，统计每次属性读写和方法调用
+（每一次都是一次跨进程的桥接往返），用于比较优化前后每页的往返次数
+
+用法:
+    with UnoCallProfiler("读取第1页") as profiler:
+        slide = profiler.wrap(slides.getByIndex(0))
+        ...
+    profiler.summary()
+
+设置环境变量 PYUNO_PROFILE_CALLS=1 后，读取和写入流程会自动按页统计
+"""
+import sys, os
+import threading
+import time
+from collections import Counter
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+
+_local = threading.local()
+
+
+def profiling_enabled():
+    """是否通过环境变量开启了按页UNO调用统计"""
+    return os.environ.get("PYUNO_PROFILE_CALLS", "").lower() in ("1", "true", "yes")
+
+
+def current_profiler():
+    """获取当前线程正在生效的分析器"""
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else None
+
+
+def profiled(obj):
+    """若当前线程有生效的分析器，则返回包装后的对象，否则原样返回"""
+    profiler = current_profiler()
+    return profiler.wrap(obj) if profiler is not None else obj
+
+
+def _is_uno_object(value):
+    return type(value).__name__ == "pyuno"
+
+
+def _unwrap(value):
+    if isinstance(value, _CountingProxy):
+        return object.__getattribute__(value, "_target")
+    if isinstance(value, tuple):
+        return tuple(_unwrap(item) for item in value)
+    return value
+
+
+class _CountingProxy:
+    """包装UNO对象，每次属性访问或方法调用都计为一次桥接往返"""
+
+    __slots__ = ("_target", "_profiler")
+
+    def __init__(self, target, profiler):
+        object.__setattr__(self, "_target", target)
+        object.__setattr__(self, "_profiler", profiler)
+
+    def __getattr__(self, name):
+        target = object.__getattribute__(self, "_target")
+        profiler = object.__getattribute__(self, "_profiler")
+        value = getattr(target, name)
+
+        if callable(value) and not _is_uno_object(value):
+            def counted_call(*args, **kwargs):
+                profiler.record(f"{name}()")
+                result = value(*[_unwrap(arg) for arg in args], **kwargs)
+                return profiler.wrap(result) if _is_uno_object(result) else result
+            return counted_call
+
+        profiler.record(f"get:{name}")
+        return profiler.wrap(value) if _is_uno_object(value) else value
+
+    def __setattr__(self, name, value):
+        profiler = object.__getattribute__(self, "_profiler")
+        profiler.record(f"set:{name}")
+        setattr(object.__getattribute__(self, "_target"), name, _unwrap(value))
+
+    def __repr__(self):
+        return f"<UNO代理 {object.__getattribute__(self, '_target')!r}>"
+
+
+class UnoCallProfiler:
+    """统计一段代码中的UNO桥接往返次数（上下文管理器）"""
+
+    def __init__(self, name="UNO调用", logger=None):
+        self.name = name
+        self.logger = logger or get_logger("pyuno.main")
+        self.counts = Counter()
+        self.start_time = None
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, operation, count=1):
+        """记录一次桥接往返"""
+        with self._lock:
+            self.counts[operation] += count
+
+    def wrap(self, obj):
+        """包装UNO对象以统计其调用"""
+        if obj is None or isinstance(obj, _CountingProxy):
+            return obj
+        return _CountingProxy(obj, self)
+
+    @property
+    def total_calls(self):
+        return sum(self.counts.values())
+
+    def summary(self, top=10):
+        """返回统计摘要"""
+        return {
+            "name": self.name,
+            "total_calls": self.total_calls,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "top_operations": self.counts.most_common(top),
+        }
+
+    def __enter__(self):
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+        _local.stack.append(self)
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start_time
+        _local.stack.remove(self)
+        top = ", ".join(f"{op}={count}" for op, count in self.counts.most_common(5))
+        self.logger.info(f"{self.name}: UNO往返 {self.total_calls} 次，耗时 {self.elapsed:.2f} 秒 ({top})")
+        return False
+
+
+class _NullProfiler:
+    """未开启统计时使用的空上下文"""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+def profile_if_enabled(name, logger=None):
+    """开启PYUNO_PROFILE_CALLS时返回分析器，否则返回空上下文"""
+    if profiling_enabled():
+        return UnoCallProfiler(name, logger)
+    return _NullProfiler()
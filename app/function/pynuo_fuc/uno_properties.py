@@ -0,0 +1,70 @@
+"""
+uno_properties.py
+通过XMultiPropertySet批量读写字符属性，将每个字符/片段的多次桥接往返合并为一次
+"""
+import uno  # type: ignore
+from com.sun.star.uno import Exception as UnoException  # type: ignore
+import sys, os
+sys.path.insert(0, os.path.dirname(__file__))
+from logger_config import get_logger
+
+logger = get_logger("pyuno")
+
+# setPropertyValues 要求属性名按字母升序排列
+CHAR_ATTR_NAMES = ("CharColor", "CharEscapement", "CharHeight", "CharUnderline", "CharWeight")
+
+# 各属性在UNO中的实际类型，批量写入时需显式指定
+# （pyuno 在普通方法调用中不接受 uno.Any 参数，带类型的值只能通过 uno.invoke 传递）
+_CHAR_ATTR_TYPES = {
+    "CharColor": "long",
+    "CharEscapement": "short",
+    "CharHeight": "float",
+    "CharUnderline": "short",
+    "CharWeight": "float",
+}
+
+
+def read_char_attrs(cursor):
+    """
+    读取游标选区的字符属性
+
+    Returns:
+        tuple: (font_color, underline, bold, escapement, font_size)
+    """
+    try:
+        color, escapement, height, underline, weight = cursor.getPropertyValues(CHAR_ATTR_NAMES)
+    except (UnoException, AttributeError):
+        # 个别实现不支持XMultiPropertySet时逐个读取
+        color = cursor.CharColor
+        escapement = cursor.CharEscapement
+        height = cursor.CharHeight
+        underline = cursor.CharUnderline
+        weight = cursor.CharWeight
+    return (color, underline != 0, weight > 100, escapement, height)
+
+
+# 退回逐个设置的情况只记录一次
+_batch_fallback_logged = False
+
+
+def write_char_attrs(cursor, color, underline, bold, escapement, font_size):
+    """一次往返写入游标选区的字符属性"""
+    global _batch_fallback_logged
+    values = {
+        "CharColor": int(color),
+        "CharEscapement": int(escapement),
+        "CharHeight": float(font_size),
+        "CharUnderline": 1 if underline else 0,
+        "CharWeight": 150 if bold else 100,
+    }
+    typed_values = tuple(uno.Any(_CHAR_ATTR_TYPES[name], values[name]) for name in CHAR_ATTR_NAMES)
+    try:
+        uno.invoke(cursor, "setPropertyValues",
+                   (uno.Any("[]string", CHAR_ATTR_NAMES), uno.Any("[]any", typed_values)))
+    except (UnoException, AttributeError) as e:
+        # 批量写入失败时退回逐个属性设置
+        if not _batch_fallback_logged:
+            _batch_fallback_logged = True
+            logger.warning("批量写入字符属性失败，改为逐个属性设置（之后的失败不再记录）: %s", e)
+        for name in CHAR_ATTR_NAMES:
+            setattr(cursor, name, values[name])
@@ -6,13 +6,19 @@ import logging
 import difflib
 from pptx.util import Pt
 from pptx.dml.color import RGBColor
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
+from pptx.enum.text import PP_ALIGN, MSO_ANCHOR, MSO_AUTO_SIZE
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.oxml.ns import qn
 from pptx_format_utils import (
     rgb_to_pptx_color, 
     apply_superscript_subscript,
     set_font_properties,
     calculate_text_similarity
 )
+from text_fit_estimator import get_text_fit_estimator
+
+# 使用母版标题样式的占位符类型，其余占位符使用正文样式
+TITLE_PLACEHOLDER_TYPES = (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE, PP_PLACEHOLDER.VERTICAL_TITLE)
 
 def write_page_with_pptx(slide, page_data, bilingual_translation):
     """
@@ -244,8 +250,8 @@ def process_textbox_pptx(pptx_shape, textbox_data, bilingual_translation):
                 existing_paragraphs[i].clear()
                 logging.debug(f"清空多余段落 {i} 的内容")
         
-        # 4. 应用文本自适应并修复（新增）
-        logging.debug("开始应用文本自适应修复...") #无效
+        # 4. 本地估算译文排版，字号超出文本框时直接写入缩小后的字号
+        apply_estimated_font_fit(pptx_shape)
         # apply_text_autofit_fix(pptx_shape)
         # text_frame.fit_text()
         
@@ -255,6 +261,114 @@ def process_textbox_pptx(pptx_shape, textbox_data, bilingual_translation):
         logging.error(f"处理文本框失败: {str(e)}")
         raise
 
+def _inherited_list_styles(shape):
+    """
+    文本框字号的继承链（按优先级）：文本框自身的 a:lstStyle，
+    占位符继承的版式和母版占位符的 a:lstStyle，母版的标题/正文样式，演示文稿默认文本样式
+    """
+    styles = [shape.text_frame._txBody.find(qn('a:lstStyle'))]
+    try:
+        master = shape.part.slide_layout.slide_master
+        text_styles = master._element.find(qn('p:txStyles'))
+        if shape.is_placeholder:
+            base = shape._base_placeholder
+            while base is not None:
+                if base._element.txBody is not None:
+                    styles.append(base._element.txBody.find(qn('a:lstStyle')))
+                base = getattr(base, '_base_placeholder', None)
+            if text_styles is not None:
+                style_tag = 'p:titleStyle' if shape.placeholder_format.type in TITLE_PLACEHOLDER_TYPES else 'p:bodyStyle'
+                styles.append(text_styles.find(qn(style_tag)))
+        styles.append(shape.part.package.presentation_part._element.find(qn('p:defaultTextStyle')))
+    except Exception as e:
+        logging.debug(f"读取继承的文本样式失败: {e}")
+    return [style for style in styles if style is not None]
+
+def _inherited_font_size(list_styles, level):
+    """继承链中第一个定义了该段落级别字号的样式，都未定义时返回None"""
+    for style in list_styles:
+        level_pPr = style.find(qn(f'a:lvl{level + 1}pPr'))
+        defRPr = level_pPr.find(qn('a:defRPr')) if level_pPr is not None else None
+        if defRPr is not None and defRPr.get('sz'):
+            return int(defRPr.get('sz')) / 100.0
+    return None
+
+def _collect_paragraph_runs(text_frame, list_styles=()):
+    """
+    读取文本框各段落的 (文本, 字号pt, 字体族名) 列表，a:br 记为换行符；
+    run未指定字号时按 list_styles 继承链取段落级别的字号，仍无法确定时字号为None
+    """
+    paragraphs = []
+    for paragraph in text_frame.paragraphs:
+        runs = []
+        inherited_size = _inherited_font_size(list_styles, paragraph.level)
+        for child in paragraph._p:
+            if child.tag == qn('a:br'):
+                runs.append(("\n", inherited_size if not runs else runs[-1][1], None))
+            elif child.tag == qn('a:r'):
+                text_element = child.find(qn('a:t'))
+                rPr = child.find(qn('a:rPr'))
+                size = inherited_size
+                family = None
+                if rPr is not None:
+                    if rPr.get('sz'):
+                        size = int(rPr.get('sz')) / 100.0
+                    latin = rPr.find(qn('a:latin'))
+                    if latin is not None:
+                        family = latin.get('typeface')
+                runs.append((text_element.text or "" if text_element is not None else "", size, family))
+        paragraphs.append(runs)
+    return paragraphs
+
+def apply_estimated_font_fit(shape):
+    """
+    使用本地文本排版估算器计算译文可容纳的最大字号，并直接写入各run的字号，
+    替代依赖LibreOffice重新渲染或PowerPoint打开时的自动缩放
+    
+    Args:
+        shape: python-pptx的Shape对象
+    
+    Returns:
+        float: 应用的缩放比例（1.0表示未缩放）
+    """
+    try:
+        if not shape.has_text_frame or not shape.width or not shape.height:
+            return 1.0
+        
+        text_frame = shape.text_frame
+        # 形状随文字增高的文本框不需要缩小字号
+        if text_frame.auto_size == MSO_AUTO_SIZE.SHAPE_TO_FIT_TEXT:
+            return 1.0
+        
+        paragraphs = _collect_paragraph_runs(text_frame, _inherited_list_styles(shape))
+        # 无法确定实际字号时不写入估算字号，避免按默认字号写入后放大继承了较小字号的文字
+        if any(size is None for runs in paragraphs for _, size, _ in runs):
+            logging.debug("文本框存在无法确定字号的文字，跳过估算排版")
+            return 1.0
+        insets = (
+            text_frame.margin_left, text_frame.margin_right,
+            text_frame.margin_top, text_frame.margin_bottom
+        )
+        scale = get_text_fit_estimator().fit_box(paragraphs, shape.width, shape.height, insets)
+        if scale >= 1.0:
+            return 1.0
+        
+        for paragraph, runs in zip(text_frame.paragraphs, paragraphs):
+            sizes = iter(size for text, size, _ in runs if text != "\n")
+            for run in paragraph.runs:
+                size = next(sizes, None)
+                if size is not None:
+                    run.font.size = Pt(round(size * scale * 2) / 2)
+        
+        # 字号已按估算写入，关闭PowerPoint/LibreOffice的自动缩放
+        text_frame.auto_size = MSO_AUTO_SIZE.NONE
+        logging.debug(f"估算排版后字号缩放比例: {scale:.2f}")
+        return scale
+        
+    except Exception as e:
+        logging.warning(f"估算文本框字号失败: {e}")
+        return 1.0
+
 def apply_text_autofit_fix(shape):
     """
     应用文本自适应修复
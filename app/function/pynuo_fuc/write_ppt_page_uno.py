@@ -2,6 +2,8 @@ import sys, os
 import difflib
 sys.path.insert(0, os.path.dirname(__file__))
 from logger_config import get_logger
+from uno_properties import write_char_attrs
+from uno_profiler import profiled
 
 def calculate_similarity_score(text1: str, text2: str) -> float:
     """计算两个文本的相似度分数"""
@@ -395,17 +397,20 @@ def write_paragraph_fragments(text, cursor, paragraph, text_field, logger):
                 # 选中刚插入的文本
                 cursor.goLeft(len(content), True)
                 
-                # 应用字体格式
-                cursor.CharColor = fragment.get("color", 0)
-                cursor.CharUnderline = 1 if fragment.get("underline", False) else 0
-                cursor.CharWeight = 150 if fragment.get("bold", False) else 100
-                cursor.CharEscapement = fragment.get("escapement", 0)
-                
                 # 处理字体大小（上下标时缩小）
                 font_size = fragment.get("font_size", 12)
                 if fragment.get("escapement", 0) != 0:
                     font_size *= 0.6
-                cursor.CharHeight = font_size
+                
+                # 应用字体格式（通过setPropertyValues一次往返写入）
+                write_char_attrs(
+                    cursor,
+                    fragment.get("color", 0),
+                    fragment.get("underline", False),
+                    fragment.get("bold", False),
+                    fragment.get("escapement", 0),
+                    font_size
+                )
                 
                 # 重置光标到末尾，取消选中状态
                 cursor.goRight(0, False)
@@ -480,7 +485,7 @@ def write_from_presentation(context, slides, page_index, page_data, mode="paragr
         return
     
     logger.info(f"开始为第 {page_index+1} 页写入译文，模式: {mode}")
-    slide = slides.getByIndex(page_index)
+    slide = profiled(slides.getByIndex(page_index))
     shape_count = slide.getCount()
     logger.info(f"第 {page_index+1} 页有 {shape_count} 个形状元素")
     
@@ -0,0 +1,185 @@
+"""
+翻译任务检查点
+为每个任务在作业目录中保存中间结果，任务失败重试或进程重启后恢复时跳过已完成的工作：
+
+    <检查点根目录>/<task_id>/
+        manifest.json       任务参数指纹，参数变化时检查点作废
+        source.pptx         原始文件副本（处理流程会原地修改上传文件）
+        ppt_data.json       从ODP提取的PPT数据
+        pages/<页索引>.json  每页完成后立即写入的翻译结果
+        ocr/<图片哈希>.json  每张图片的OCR识别结果
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# 默认检查点根目录：项目根目录下的 instance/task_checkpoints，可通过环境变量 TASK_CHECKPOINT_DIR 覆盖
+DEFAULT_CHECKPOINT_ROOT = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'task_checkpoints'
+)
+
+
+def get_checkpoint_root() -> str:
+    return os.getenv('TASK_CHECKPOINT_DIR') or DEFAULT_CHECKPOINT_ROOT
+
+
+def _fingerprint(params: Dict[str, Any]) -> str:
+    data = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """计算文件内容的SHA1"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class TaskCheckpoint:
+    """单个任务的检查点目录"""
+
+    def __init__(self, task_id: str, root: Optional[str] = None):
+        self.task_id = task_id
+        self.job_dir = os.path.join(root or get_checkpoint_root(), task_id)
+        self.pages_dir = os.path.join(self.job_dir, 'pages')
+        self.ocr_dir = os.path.join(self.job_dir, 'ocr')
+        self.source_path = os.path.join(self.job_dir, 'source.pptx')
+        self.ppt_data_path = os.path.join(self.job_dir, 'ppt_data.json')
+        self.manifest_path = os.path.join(self.job_dir, 'manifest.json')
+        self._lock = threading.Lock()
+        self.resumed_pages = 0
+        self.resumed_ocr = 0
+
+    # ------------------------------------------------------------------
+    # 生命周期
+    # ------------------------------------------------------------------
+    def prepare(self, presentation_path: str, params: Dict[str, Any]) -> bool:
+        """
+        准备检查点：首次执行时保存原始文件副本，重试时把原始文件恢复到上传路径
+
+        Args:
+            presentation_path: 任务处理的PPT文件路径
+            params: 影响翻译结果的参数（语言、模型、页面等），变化时旧检查点作废
+
+        Returns:
+            是否从已有检查点恢复
+        """
+        fingerprint = _fingerprint(params)
+        manifest = self._read_json(self.manifest_path)
+        if manifest and manifest.get('fingerprint') != fingerprint:
+            logger.info(f"任务参数已变化，丢弃旧检查点: {self.task_id}")
+            self.discard()
+            manifest = None
+
+        os.makedirs(self.pages_dir, exist_ok=True)
+        os.makedirs(self.ocr_dir, exist_ok=True)
+
+        if manifest and os.path.exists(self.source_path):
+            # 之前的执行可能已经原地修改了上传文件，恢复为原始版本后重新处理
+            shutil.copy2(self.source_path, presentation_path)
+            logger.info(f"从检查点恢复任务 {self.task_id}: 已完成 {len(self._page_files())} 页翻译")
+            return True
+
+        shutil.copy2(presentation_path, self.source_path)
+        self._write_json(self.manifest_path, {'task_id': self.task_id, 'fingerprint': fingerprint})
+        return False
+
+    def discard(self) -> None:
+        """删除检查点目录（任务最终完成、失败或取消时调用）"""
+        if os.path.isdir(self.job_dir):
+            shutil.rmtree(self.job_dir, ignore_errors=True)
+
+    @classmethod
+    def discard_task(cls, task_id: str) -> None:
+        cls(task_id).discard()
+
+    # ------------------------------------------------------------------
+    # PPT数据
+    # ------------------------------------------------------------------
+    def load_ppt_data(self) -> Optional[Dict[str, Any]]:
+        return self._read_json(self.ppt_data_path)
+
+    def save_ppt_data(self, ppt_data: Dict[str, Any]) -> None:
+        self._write_json(self.ppt_data_path, ppt_data)
+
+    # ------------------------------------------------------------------
+    # 逐页翻译结果
+    # ------------------------------------------------------------------
+    def _page_path(self, page_index: int) -> str:
+        return os.path.join(self.pages_dir, f"{int(page_index)}.json")
+
+    def _page_files(self):
+        if not os.path.isdir(self.pages_dir):
+            return []
+        return [name for name in os.listdir(self.pages_dir) if name.endswith('.json')]
+
+    def load_page(self, page_index: int, original_content: str) -> Optional[Dict[str, Any]]:
+        """读取已完成页面的翻译结果，原文与保存时不一致则视为无效"""
+        result = self._read_json(self._page_path(page_index))
+        if not result or result.get('original_content') != original_content:
+            return None
+        self.resumed_pages += 1
+        return result
+
+    def save_page(self, page_index: int, result: Dict[str, Any]) -> None:
+        """保存单页翻译结果（失败页面不保存，重试时重新翻译）"""
+        if 'error' in result:
+            return
+        self._write_json(self._page_path(page_index), result)
+
+    # ------------------------------------------------------------------
+    # OCR结果
+    # ------------------------------------------------------------------
+    def _ocr_path(self, image_path: str) -> str:
+        # 以图片内容哈希为键：每次执行提取出的临时图片文件名可能不同
+        return os.path.join(self.ocr_dir, f"{file_digest(image_path)}.json")
+
+    def load_ocr_result(self, image_path: str) -> Optional[Dict[str, Any]]:
+        result = self._read_json(self._ocr_path(image_path))
+        if result is not None:
+            self.resumed_ocr += 1
+        return result
+
+    def save_ocr_result(self, image_path: str, result: Dict[str, Any]) -> None:
+        """保存单张图片的OCR结果（识别失败的不保存）"""
+        if result.get('status') != 'success':
+            return
+        self._write_json(self._ocr_path(image_path), result)
+
+    # ------------------------------------------------------------------
+    # 文件读写（写入临时文件后原子替换，避免崩溃时留下半个文件）
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _read_json(path: str):
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"读取检查点文件失败，忽略: {path}, 错误: {e}")
+            return None
+
+    def _write_json(self, path: str, data) -> None:
+        directory = os.path.dirname(path)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, default=str)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
@@ -3,5 +3,8 @@ from .user import User, Role, Permission
 from .upload_record import UploadRecord
 from .translation import Translation
 from .stop_word import StopWord
+from .storage_usage import UserStorageUsage
+from .glossary_version import GlossaryVersion
 
-__all__ = ['db', 'User', 'Role', 'Permission', 'UploadRecord', 'Translation', 'StopWord'] 
\ No newline at end of file
+__all__ = ['db', 'User', 'Role', 'Permission', 'UploadRecord', 'Translation', 'StopWord', 'UserStorageUsage',
+           'GlossaryVersion'] 
\ No newline at end of file
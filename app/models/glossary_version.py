@@ -0,0 +1,20 @@
+"""
+词库版本模型
+"""
+from app import db
+from app.utils.timezone_helper import now_with_timezone
+
+# 公共词条使用的范围（私有词条的范围为所属用户ID）
+PUBLIC_SCOPE = 0
+
+
+class GlossaryVersion(db.Model):
+    """词库版本号（由 app/utils/glossary_cache.py 维护），修改、删除词条时在同一事务中递增"""
+    __tablename__ = 'glossary_versions'
+
+    scope_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # 0 表示公共词条，否则为用户ID
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime(timezone=True), default=now_with_timezone, onupdate=now_with_timezone)
+
+    def __repr__(self):
+        return f'<GlossaryVersion scope={self.scope_id} version={self.version}>'
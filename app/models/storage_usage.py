@@ -0,0 +1,19 @@
+"""
+用户存储用量模型
+"""
+from app import db
+from app.utils.timezone_helper import now_with_timezone
+
+
+class UserStorageUsage(db.Model):
+    """每个用户目录的存储用量计数（由 app/utils/storage_accounting.py 维护）"""
+    __tablename__ = 'user_storage_usage'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    bytes_used = db.Column(db.BigInteger, nullable=False, default=0)  # 使用的字节数
+    file_count = db.Column(db.Integer, nullable=False, default=0)  # 文件数量
+    reconciled_at = db.Column(db.DateTime(timezone=True), default=now_with_timezone)  # 最近一次扫描目录对账的时间
+    updated_at = db.Column(db.DateTime(timezone=True), default=now_with_timezone, onupdate=now_with_timezone)
+
+    def __repr__(self):
+        return f'<UserStorageUsage user={self.user_id} bytes={self.bytes_used} files={self.file_count}>'
@@ -1,6 +1,7 @@
 """
 文件上传记录模型
 """
+import os
 from datetime import datetime
 from app import db
 from app.utils.timezone_helper import now_with_timezone, datetime_to_isoformat, format_datetime
@@ -8,6 +9,19 @@ from app.utils.timezone_helper import now_with_timezone, datetime_to_isoformat,
 class UploadRecord(db.Model):
     """文件上传记录"""
     __tablename__ = 'upload_records'
+    __table_args__ = (
+        # 历史记录和管理员文件列表按 (upload_time, id) 倒序做游标分页
+        db.Index('idx_upload_time', 'upload_time'),
+        db.Index('idx_upload_user_time', 'user_id', 'upload_time', 'id'),
+        db.Index('idx_upload_type_time', 'file_type', 'upload_time', 'id'),
+    )
+
+    # 记录类型
+    TYPE_PPT = 'ppt_translation'
+    TYPE_PDF = 'pdf_translation'
+    # 文件状态（由清理任务、下载和删除接口维护，列表接口不再逐条检查文件是否存在）
+    FILE_PRESENT = 'present'
+    FILE_MISSING = 'missing'
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -18,13 +32,29 @@ class UploadRecord(db.Model):
     upload_time = db.Column(db.DateTime(timezone=True), default=now_with_timezone)  # 上传时间
     status = db.Column(db.String(20), default='pending')  # 状态: pending, completed, failed
     error_message = db.Column(db.String(255))  # 错误信息
+    # 旧版本数据库中由 schema_upgrade.upgrade_upload_records 补充以下两列
+    file_type = db.Column(db.String(50))  # 文件类型: pdf_translation, ppt_translation
+    file_state = db.Column(db.String(20), nullable=False, default=FILE_PRESENT,
+                           server_default=FILE_PRESENT)  # 文件状态: present, missing
     # 注意：以下字段在旧版本数据库中可能不存在
-    # file_type = db.Column(db.String(50))  # 文件类型: pdf_translation, ppt_translation等
     # original_filename = db.Column(db.String(255))  # 原始上传文件名
 
     def __repr__(self):
         return f'<UploadRecord {self.filename}>'
 
+    @classmethod
+    def type_for_path(cls, file_path: str) -> str:
+        """按存储目录判断记录类型（PDF翻译的输出保存在 pdf_outputs 目录）"""
+        return cls.TYPE_PDF if 'pdf_outputs' in (file_path or '') else cls.TYPE_PPT
+
+    @property
+    def full_path(self) -> str:
+        return os.path.join(self.file_path, self.stored_filename)
+
+    @property
+    def file_exists(self) -> bool:
+        return self.file_state != self.FILE_MISSING
+
     def to_dict(self):
         """转换为字典"""
         return {
@@ -36,8 +66,9 @@ class UploadRecord(db.Model):
             'file_size': self.file_size,
             'upload_time': format_datetime(self.upload_time),
             'status': self.status,
-            'error_message': self.error_message
+            'error_message': self.error_message,
+            'file_type': self.file_type,
+            'file_exists': self.file_exists
             # 注意：以下字段在旧版本数据库中可能不存在
-            # 'file_type': self.file_type,
             # 'original_filename': self.original_filename
         }
\ No newline at end of file
@@ -56,6 +56,7 @@ def query_logs():
 
         level = data.get('level')
         limit = int(data.get('limit', 100))
+        cursor = data.get('cursor') or None
 
         # 添加调试信息
         print(f"日志查询参数:")
@@ -65,13 +66,17 @@ def query_logs():
         print(f"  level: {level}")
         print(f"  limit: {limit}")
 
-        logs = log_manager.get_logs(
-            name=logger_name,
-            start_time=start_time,
-            end_time=end_time,
-            level=level,
-            limit=limit
-        )
+        try:
+            logs, next_cursor = log_manager.query_logs(
+                name=logger_name,
+                start_time=start_time,
+                end_time=end_time,
+                level=level,
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e), 'logs': [], 'total': 0}), 400
 
         print(f"查询结果: {len(logs)} 条日志")
         if logs:
@@ -79,7 +84,8 @@ def query_logs():
             print(f"最后一条日志时间: {logs[-1].get('timestamp_str', 'N/A')}")
 
         # 确保响应是可序列化的JSON格式
-        return jsonify({'logs': logs, 'total': len(logs)})
+        return jsonify({'logs': logs, 'total': len(logs), 'next_cursor': next_cursor,
+                        'has_more': next_cursor is not None})
 
     except Exception as e:
         import logging
@@ -9,89 +9,59 @@ from pytz import timezone
 
 logger = logging.getLogger(__name__)
 
-def cleanup_expired_files():
-    """清理过期文件"""
-    # 获取Flask应用实例
-    from app import create_app
-
-    # 创建应用实例
-    app = create_app()
-
-    # 在应用上下文中执行清理任务
-    with app.app_context():
+def cleanup_expired_files(app_provider=None):
+    """
+    清理过期文件：过期上传记录、遗留的任务临时目录和上传临时文件（见 app/utils/cleanup.py）
+
+    Args:
+        app_provider: 应用上下文提供器，默认使用全局实例
+    """
+    if app_provider is None:
+        from ..utils.app_context import app_context_provider as app_provider
+
+    # 在应用上下文中执行清理任务（复用启动时创建的应用实例）
+    with app_provider.app_context():
         try:
             logger.info("开始清理过期文件")
 
-            # 导入模型（在应用上下文中）
-            from ..models import User, UploadRecord, db
-            from ..utils.storage_manager import create_storage_manager
-
-            # 获取所有用户
-            users = User.query.all()
-            total_success = 0
-            total_fail = 0
-
-            for user in users:
-                try:
-                    # 创建存储管理器
-                    storage = create_storage_manager(user.id)
-
-                    # 清理文件
-                    success, fail = storage.cleanup_expired_files()
-                    total_success += success
-                    total_fail += fail
-
-                    logger.info(f"用户 {user.id} 清理完成: 成功 {success}, 失败 {fail}")
+            from ..utils.cleanup import file_cleanup
+            stats = file_cleanup.sweep()
 
-                except Exception as e:
-                    logger.error(f"清理用户 {user.id} 的文件时出错: {str(e)}")
-                    total_fail += 1
+            # 更新上传记录的文件状态（历史记录和文件列表接口读取该状态，不再逐条检查文件）
+            from ..utils.upload_listing import refresh_file_states
+            refresh_file_states()
 
-            # 额外清理：删除临时文件和孤立文件
-            cleanup_temp_files()
-
-            logger.info(f"清理完成: 总成功 {total_success}, 总失败 {total_fail}")
+            logger.info(f"清理完成: 删除记录 {stats.records}, 删除文件 {stats.files}, "
+                        f"删除临时文件 {stats.temp_entries}, 失败 {stats.failed}")
 
         except Exception as e:
             logger.error(f"清理过期文件时出错: {str(e)}")
             raise
 
-def cleanup_temp_files():
-    """清理临时文件"""
-    try:
-        upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
-        temp_folder = os.path.join(upload_folder, 'temp')
-
-        if not os.path.exists(temp_folder):
-            return
+def reconcile_storage_usage(app_provider=None):
+    """
+    存储用量对账：重新扫描用户目录，修正数据库中的用量计数
 
-        # 清理超过24小时的临时文件
-        cutoff_time = datetime.now() - timedelta(hours=24)
-        cleaned_count = 0
-
-        for filename in os.listdir(temp_folder):
-            file_path = os.path.join(temp_folder, filename)
-            try:
-                if os.path.isfile(file_path):
-                    # 获取文件修改时间
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
+    Args:
+        app_provider: 应用上下文提供器，默认使用全局实例
+    """
+    if app_provider is None:
+        from ..utils.app_context import app_context_provider as app_provider
 
-                    if file_mtime < cutoff_time:
-                        os.remove(file_path)
-                        cleaned_count += 1
-                        logger.debug(f"删除临时文件: {filename}")
-
-            except Exception as e:
-                logger.error(f"删除临时文件 {filename} 时出错: {str(e)}")
-
-        if cleaned_count > 0:
-            logger.info(f"清理了 {cleaned_count} 个临时文件")
+    with app_provider.app_context():
+        try:
+            from ..utils.storage_accounting import reconcile_all
+            reconcile_all()
+        except Exception as e:
+            logger.error(f"存储用量对账失败: {str(e)}")
 
-    except Exception as e:
-        logger.error(f"清理临时文件时出错: {str(e)}")
+def schedule_cleanup_task(app_provider=None):
+    """
+    调度清理任务
 
-def schedule_cleanup_task():
-    """调度清理任务"""
+    Args:
+        app_provider: 应用上下文提供器，定时任务从中获取应用上下文
+    """
     try:
         from apscheduler.schedulers.background import BackgroundScheduler
         from apscheduler.triggers.cron import CronTrigger
@@ -132,7 +102,7 @@ def schedule_cleanup_task():
                 # 再次检查线程池健康状态
                 if thread_pool.initialized and thread_pool.get_health_status().get('healthy', False):
                     logger.info("开始执行定时清理任务")
-                    cleanup_expired_files()
+                    cleanup_expired_files(app_provider)
                     logger.info("定时清理任务完成")
                 else:
                     logger.error("线程池状态异常，跳过定时清理任务")
@@ -149,9 +119,23 @@ def schedule_cleanup_task():
             max_instances=1  # 确保同时只有一个实例运行
         )
 
+        # 定时对账存储用量计数
+        with app_provider.app_context():
+            reconcile_hours = current_app.config.get('STORAGE_RECONCILE_HOURS', 6)
+        scheduler.add_job(
+            reconcile_storage_usage,
+            trigger='interval',
+            hours=reconcile_hours,
+            args=[app_provider],
+            id='reconcile_storage_usage',
+            name='存储用量对账',
+            replace_existing=True,
+            max_instances=1
+        )
+
         # 启动调度器
         scheduler.start()
-        logger.info("文件清理任务已调度，每天凌晨3点执行")
+        logger.info(f"文件清理任务已调度，每天凌晨3点执行；存储用量每 {reconcile_hours} 小时对账一次")
 
         return scheduler
 
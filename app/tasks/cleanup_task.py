@@ -7,14 +7,12 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def setup_cleanup_task():
+def setup_cleanup_task(app_provider=None):
     """设置文件清理定时任务"""
     try:
-        # 获取Flask应用实例
-        from app import create_app
-
-        # 创建应用实例
-        app = create_app()
+        # 复用启动时注册的Flask应用实例
+        if app_provider is None:
+            from ..utils.app_context import app_context_provider as app_provider
 
         scheduler = BackgroundScheduler()
 
@@ -27,7 +25,7 @@ def setup_cleanup_task():
         def cleanup_job():
             """执行清理任务"""
             # 在应用上下文中执行
-            with app.app_context():
+            with app_provider.app_context():
                 try:
                     logger.info("开始执行文件清理任务")
                     from ..utils.cleanup import file_cleanup
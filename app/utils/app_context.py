@@ -0,0 +1,79 @@
+"""
+应用上下文提供器
+应用启动时创建一次并注册Flask应用实例，任务队列、定时任务等后台线程
+从已有的应用实例推入轻量的应用上下文，而不是每次都调用 create_app()
+（create_app 会重新配置日志、注册蓝图、执行 db.create_all()、重配线程池并启动任务处理器）
+"""
+import threading
+import logging
+from contextlib import contextmanager
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+
+class AppContextProvider:
+    """为后台线程提供应用上下文"""
+
+    def __init__(self):
+        self._app = None
+        self._lock = threading.Lock()
+        self.contexts_pushed = 0
+        self.apps_created = 0
+
+    def init_app(self, app) -> None:
+        """注册应用实例（在 create_app 中调用）"""
+        with self._lock:
+            self._app = app
+        logger.info("应用上下文提供器已注册应用实例")
+
+    @property
+    def initialized(self) -> bool:
+        return self._app is not None
+
+    def get_app(self):
+        """
+        获取已注册的应用实例
+
+        独立脚本等未经 create_app 启动的场景下，首次调用时创建一次应用实例并缓存
+        """
+        if self._app is None:
+            with self._lock:
+                if self._app is None:
+                    logger.warning("应用实例尚未注册，创建新的应用实例")
+                    from app import create_app
+                    app = create_app()
+                    # create_app 内部已调用 init_app 注册实例，这里兜底
+                    if self._app is None:
+                        self._app = app
+                    self.apps_created += 1
+        return self._app
+
+    def push_context(self):
+        """
+        推入一个新的应用上下文
+
+        Returns:
+            已推入的上下文对象，调用方使用完毕后需调用其 pop()
+        """
+        ctx = self.get_app().app_context()
+        ctx.push()
+        self.contexts_pushed += 1
+        return ctx
+
+    @contextmanager
+    def app_context(self):
+        """在应用上下文中执行：已在上下文中时直接复用，否则临时推入并在退出时弹出"""
+        if has_app_context():
+            yield current_app._get_current_object()
+            return
+        ctx = self.push_context()
+        try:
+            yield ctx.app
+        finally:
+            ctx.pop()
+
+
+# 全局应用上下文提供器
+app_context_provider = AppContextProvider()
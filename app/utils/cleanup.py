@@ -1,89 +1,314 @@
-
+"""
+过期文件清理引擎
+原实现按用户逐个创建 StorageManager 查询过期记录，另外再遍历临时目录，FileCleanup 又单独查询一遍。
+这里统一为一次清理（sweep）：
+- 过期上传记录用一个按 (upload_time, id) 游标分批的查询获取（使用 upload_time 索引），不再按用户循环
+- 任务临时目录（ppt_translate_*、ppt_ocr_*、md_ocr_*、pdf_processor_* 等）和遗留的任务检查点目录
+  在注册表中登记前缀，只列出所在目录一层，不遍历
+- 每批删除的文件数有上限，删除按速率限制进行，工作时间使用更低的速率，避免清理占满磁盘IO
+"""
 import os
 import time
-from datetime import datetime, timedelta
+import shutil
+import tempfile
 import logging
-from typing import List, Tuple
-from ..models import UploadRecord, db
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
 from flask import current_app
 
+from ..models import UploadRecord, db
+from ..function.task_checkpoint import get_checkpoint_root
+from . import storage_accounting
+from .timezone_helper import now_with_timezone
+
 logger = logging.getLogger(__name__)
 
+# 可以清理的上传记录状态（进行中的任务不清理）
+EXPIRED_STATUSES = ('completed', 'failed')
+
+
+@dataclass
+class SweepStats:
+    """一次清理的统计"""
+    records: int = 0  # 删除的上传记录数
+    files: int = 0  # 删除的文件数
+    temp_entries: int = 0  # 删除的临时文件和临时目录数
+    failed: int = 0
+    bytes_freed: int = 0
+    elapsed: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict:
+        return {
+            'records': self.records,
+            'files': self.files,
+            'temp_entries': self.temp_entries,
+            'failed': self.failed,
+            'bytes_freed': self.bytes_freed,
+            'elapsed': round(self.elapsed, 2),
+        }
+
+
+class DeleteRateLimiter:
+    """
+    删除速率限制
+    business_hours 时间段内（本地时间，[开始, 结束) 小时）使用 business_rate，其他时间使用 rate；速率为0表示不限制
+    """
+
+    def __init__(self, rate: float = 50, business_rate: float = 10, business_hours: Tuple[int, int] = (9, 18)):
+        self.rate = rate
+        self.business_rate = business_rate
+        self.business_hours = business_hours
+        self._next_time = 0.0
+
+    def current_rate(self, now: Optional[datetime] = None) -> float:
+        hour = (now or datetime.now()).hour
+        start, end = self.business_hours
+        in_business_hours = start <= hour < end if start <= end else (hour >= start or hour < end)
+        return self.business_rate if in_business_hours else self.rate
+
+    def wait(self) -> None:
+        """每次删除前调用，必要时等待"""
+        rate = self.current_rate()
+        if rate <= 0:
+            return
+        now = time.monotonic()
+        if self._next_time > now:
+            time.sleep(self._next_time - now)
+            now = self._next_time
+        self._next_time = now + 1.0 / rate
+
+
+def parse_hours(value: str, default: Tuple[int, int] = (9, 18)) -> Tuple[int, int]:
+    """解析 '9-18' 格式的时间段"""
+    try:
+        start, end = (int(part) for part in value.split('-', 1))
+        return start % 24, end % 24
+    except (AttributeError, ValueError):
+        return default
+
+
+class TempDirRegistry:
+    """
+    任务临时目录注册表
+    各任务用 tempfile.mkdtemp(prefix=...) 创建临时目录，异常退出时可能遗留。
+    按前缀登记后，清理时只列出所在目录一层，删除超过保留时间的条目
+    """
+
+    def __init__(self):
+        self._patterns: Dict[str, Tuple[str, Optional[float]]] = {}
+
+    def register(self, prefix: str, base_dir: Optional[str] = None, max_age_hours: Optional[float] = None) -> None:
+        """
+        Args:
+            prefix: 目录名前缀
+            base_dir: 所在目录，默认为系统临时目录
+            max_age_hours: 保留时间，默认使用 TEMP_FILE_CLEANUP_HOURS
+        """
+        self._patterns[prefix] = (base_dir or tempfile.gettempdir(), max_age_hours)
+
+    def patterns(self) -> Dict[str, Tuple[str, Optional[float]]]:
+        return dict(self._patterns)
+
+    def expired_entries(self, default_max_age_hours: float, now: Optional[float] = None) -> List[str]:
+        """超过保留时间的临时目录（按修改时间判断）"""
+        now = now or time.time()
+        by_dir: Dict[str, List[Tuple[str, float]]] = {}
+        for prefix, (base_dir, max_age_hours) in self._patterns.items():
+            max_age = (max_age_hours if max_age_hours is not None else default_max_age_hours) * 3600
+            by_dir.setdefault(base_dir, []).append((prefix, max_age))
+
+        expired = []
+        for base_dir, prefixes in by_dir.items():
+            try:
+                entries = os.scandir(base_dir)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    for prefix, max_age in prefixes:
+                        if not entry.name.startswith(prefix):
+                            continue
+                        try:
+                            if now - entry.stat(follow_symlinks=False).st_mtime > max_age:
+                                expired.append(entry.path)
+                        except OSError:
+                            pass
+                        break
+        return expired
+
+
+temp_dir_registry = TempDirRegistry()
+temp_dir_registry.register('ppt_translate_')
+temp_dir_registry.register('ppt_ocr_')
+temp_dir_registry.register('md_ocr_')
+temp_dir_registry.register('pdf_processor_')
+# 任务检查点在任务完成、失败或取消时删除，进程异常退出时遗留；重试和重启恢复需要保留，保留时间较长
+temp_dir_registry.register('task_', base_dir=get_checkpoint_root(),
+                           max_age_hours=float(os.getenv('TASK_CHECKPOINT_MAX_AGE_HOURS', '72')))
+
+
 class FileCleanup:
-    """文件清理管理器"""
+    """文件清理引擎"""
 
-    def __init__(self, max_age_days: int = 7):
+    def __init__(self, max_age_days: Optional[int] = None, batch_size: int = 200,
+                 rate_limiter: Optional[DeleteRateLimiter] = None,
+                 registry: Optional[TempDirRegistry] = None):
         """
-        初始化清理管理器
+        初始化清理引擎
 
         Args:
-            max_age_days: 文件保留的最大天数
+            max_age_days: 文件保留的最大天数，默认使用 FILE_CLEANUP_DAYS
+            batch_size: 每批处理的上传记录数（每批提交一次）
+            rate_limiter: 删除速率限制，默认按应用配置创建
+            registry: 任务临时目录注册表
         """
         self.max_age_days = max_age_days
+        self.batch_size = max(1, batch_size)
+        self.rate_limiter = rate_limiter
+        self.registry = registry or temp_dir_registry
 
-    def get_expired_files(self) -> List[Tuple[str, UploadRecord]]:
-        """获取过期文件列表"""
-        expired_time = datetime.utcnow() - timedelta(days=self.max_age_days)
-        expired_records = UploadRecord.query.filter(
-            UploadRecord.upload_time < expired_time,
-            UploadRecord.status.in_(['completed', 'failed'])
-        ).all()
-
-        expired_files = []
-        for record in expired_records:
-            file_path = os.path.join(record.file_path, record.stored_filename)
-            if os.path.exists(file_path):
-                expired_files.append((file_path, record))
+    def _limiter(self) -> DeleteRateLimiter:
+        if self.rate_limiter is None:
+            config = current_app.config
+            self.rate_limiter = DeleteRateLimiter(
+                rate=config.get('CLEANUP_DELETES_PER_SECOND', 50),
+                business_rate=config.get('CLEANUP_BUSINESS_DELETES_PER_SECOND', 10),
+                business_hours=parse_hours(config.get('CLEANUP_BUSINESS_HOURS', '9-18'))
+            )
+        return self.rate_limiter
 
-        return expired_files
+    def _remove_file(self, path: str, stats: SweepStats) -> Optional[int]:
+        """删除文件，返回删除前的大小（文件不存在时返回 None）"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        self._limiter().wait()
+        os.remove(path)
+        stats.files += 1
+        stats.bytes_freed += size
+        return size
 
-    def cleanup_files(self) -> Tuple[int, int]:
+    def expired_batches(self, cutoff: datetime, user_id: Optional[int] = None):
         """
-        清理过期文件
+        按 (upload_time, id) 游标分批返回过期记录
+        每批处理后记录会被删除，但删除失败的记录仍然存在，所以用游标而不是重复查询第一页
+        """
+        last_time, last_id = None, None
+        while True:
+            query = UploadRecord.query.filter(
+                UploadRecord.upload_time < cutoff,
+                UploadRecord.status.in_(EXPIRED_STATUSES)
+            )
+            if user_id is not None:
+                query = query.filter(UploadRecord.user_id == user_id)
+            if last_time is not None:
+                query = query.filter(db.or_(
+                    UploadRecord.upload_time > last_time,
+                    db.and_(UploadRecord.upload_time == last_time, UploadRecord.id > last_id)
+                ))
+            batch = query.order_by(UploadRecord.upload_time, UploadRecord.id).limit(self.batch_size).all()
+            if not batch:
+                return
+            last_time, last_id = batch[-1].upload_time, batch[-1].id
+            yield batch
 
-        Returns:
-            (成功清理数量, 失败清理数量)
+    def sweep_expired(self, user_id: Optional[int] = None, stats: Optional[SweepStats] = None) -> SweepStats:
         """
-        success_count = 0
-        fail_count = 0
+        删除过期的上传记录和对应文件
 
-        try:
-            expired_files = self.get_expired_files()
+        Args:
+            user_id: 只清理该用户的记录，为 None 时清理所有用户
+        """
+        stats = stats or SweepStats()
+        max_age_days = self.max_age_days or current_app.config.get('FILE_CLEANUP_DAYS', 7)
+        cutoff = now_with_timezone() - timedelta(days=max_age_days)
 
-            for file_path, record in expired_files:
+        for batch in self.expired_batches(cutoff, user_id):
+            deleted_ids = []
+            for record in batch:
+                file_path = record.full_path
                 try:
-                    # 删除文件
-                    os.remove(file_path)
-
-                    # 检查是否有关联的注释文件
-                    annotation_path = os.path.join(
-                        record.file_path,
-                        f"annotation_{record.stored_filename}.json"
-                    )
-                    if os.path.exists(annotation_path):
-                        os.remove(annotation_path)
-
-                    # 删除数据库记录
-                    db.session.delete(record)
-                    success_count += 1
-
-                    logger.info(f"已清理过期文件: {file_path}")
+                    size = self._remove_file(file_path, stats)
+                    if size is not None:
+                        storage_accounting.file_removed(record.user_id, file_path, size)
+                    # 关联的注释文件
+                    annotation_path = os.path.join(record.file_path, f"annotation_{record.stored_filename}.json")
+                    size = self._remove_file(annotation_path, stats)
+                    if size is not None:
+                        storage_accounting.file_removed(record.user_id, annotation_path, size)
+                    deleted_ids.append(record.id)
                 except Exception as e:
+                    stats.failed += 1
+                    stats.errors.append(f"{file_path}: {str(e)}")
                     logger.error(f"清理文件失败 {file_path}: {str(e)}")
-                    fail_count += 1
 
-            # 提交数据库更改
-            db.session.commit()
+            if deleted_ids:
+                UploadRecord.query.filter(UploadRecord.id.in_(deleted_ids)).delete(synchronize_session=False)
+            try:
+                db.session.commit()
+                stats.records += len(deleted_ids)
+            except Exception as e:
+                db.session.rollback()
+                stats.failed += len(deleted_ids)
+                logger.error(f"删除过期上传记录失败: {str(e)}")
+            # 处理过的记录不再需要保留在会话中
+            for record in batch:
+                db.session.expunge(record)
+        return stats
 
-            # 清理空的用户目录
-            self.cleanup_empty_dirs()
+    def sweep_temp(self, stats: Optional[SweepStats] = None) -> SweepStats:
+        """删除遗留的任务临时目录和上传临时目录中的过期文件"""
+        stats = stats or SweepStats()
+        max_age_hours = current_app.config.get('TEMP_FILE_CLEANUP_HOURS', 24)
 
-            return success_count, fail_count
+        entries = self.registry.expired_entries(max_age_hours)
+        upload_temp = os.path.join(current_app.config.get('UPLOAD_FOLDER', 'uploads'), 'temp')
+        cutoff = time.time() - max_age_hours * 3600
+        try:
+            with os.scandir(upload_temp) as it:
+                entries.extend(entry.path for entry in it
+                               if entry.is_file(follow_symlinks=False) and entry.stat().st_mtime < cutoff)
+        except OSError:
+            pass
 
-        except Exception as e:
-            logger.error(f"文件清理过程出错: {str(e)}")
-            db.session.rollback()
-            return success_count, fail_count
+        for path in entries:
+            try:
+                self._limiter().wait()
+                if os.path.isdir(path) and not os.path.islink(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                stats.temp_entries += 1
+                logger.debug(f"删除临时文件: {path}")
+            except Exception as e:
+                stats.failed += 1
+                logger.error(f"删除临时文件 {path} 时出错: {str(e)}")
+        return stats
+
+    def sweep(self) -> SweepStats:
+        """执行一次完整清理：过期上传记录、临时目录、空的用户目录"""
+        started = time.time()
+        stats = SweepStats()
+        self.sweep_expired(stats=stats)
+        self.sweep_temp(stats=stats)
+        self.cleanup_empty_dirs()
+        stats.elapsed = time.time() - started
+        logger.info(f"文件清理完成: {stats.to_dict()}")
+        return stats
+
+    def cleanup_files(self) -> Tuple[int, int]:
+        """
+        清理过期文件
+
+        Returns:
+            (成功清理数量, 失败清理数量)
+        """
+        stats = self.sweep()
+        return stats.records + stats.temp_entries, stats.failed
 
     def cleanup_empty_dirs(self):
         """清理空的用户上传目录"""
@@ -5,21 +5,48 @@
 import asyncio
 import threading
 import time
-from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 import os
+import json
 import logging
 from concurrent.futures import ThreadPoolExecutor
 import uuid
+import socket
 import traceback
 import weakref
 
 from .thread_pool_executor import thread_pool, TaskType, TaskStatus, Task
-from app.utils.timezone_helper import now_with_timezone
+from .task_queue_store import (
+    TaskQueueStore, MemoryTaskStore, create_task_store, DEFAULT_LEASE_SECONDS
+)
+from app.utils.timezone_helper import now_with_timezone, datetime_from_timestamp
+from app.function.task_checkpoint import TaskCheckpoint
+from app.function.pynuo_fuc.stage_timer import StageTimer
+from .app_context import app_context_provider, AppContextProvider
+from .task_events import task_events, EVENT_STATUS, EVENT_PROGRESS
+from .job_cost import CostBudget, estimate_job_cost, estimate_start_offsets, cost_from_record
+from .eta_model import EtaModel
+from .glossary_cache import compiled_glossary
+from .log_queue import log_stats, describe_overhead
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
 
+
+class QueueFullError(RuntimeError):
+    """排队任务的预计剩余耗时超过上限，拒绝新任务"""
+
+    def __init__(self, backlog_seconds: float, max_backlog_seconds: float):
+        super().__init__(f"任务队列已满，当前排队任务预计还需 {backlog_seconds / 60:.0f} 分钟，请稍后再试")
+        self.backlog_seconds = backlog_seconds
+        self.max_backlog_seconds = max_backlog_seconds
+
+    @property
+    def retry_after_seconds(self) -> int:
+        """积压降到上限以内（可以再次提交）的预计秒数"""
+        return max(1, int(self.backlog_seconds - self.max_backlog_seconds))
+
+
 class TranslationTask:
     """翻译任务类，用于存储任务信息"""
 
@@ -67,6 +94,8 @@ class TranslationTask:
         self.enable_text_splitting = enable_text_splitting
         self.enable_uno_conversion = enable_uno_conversion
         self.custom_translations = custom_translations or {}  # 添加自定义翻译词典
+        # 词库指纹（见 glossary_cache），作为检查点参数的一部分，词库变化时不复用旧的翻译结果
+        self.glossary_fingerprint = kwargs.get('glossary_fingerprint', '')
 
         # PDF注释相关参数
         self.annotations = kwargs.get('annotations', [])
@@ -97,8 +126,13 @@ class TranslationTask:
         # 处理结果
         self.result = None
 
+        # 预计成本（见 job_cost.estimate_job_cost），用于准入、调度和等待时间估算
+        self.estimated_cost: Dict[str, Any] = {}
+
         # 执行此任务的Thread Task对象
         self.thread_task: Optional[Task] = None
+        # 租约已被其他进程回收：本进程停止执行，且不再写入状态和结果
+        self.lease_lost = False
 
         # 详细日志
         self.logs = []
@@ -109,6 +143,56 @@ class TranslationTask:
         self.logger = logging.getLogger(f"{__name__}.task.{user_id}")
         self.logger.info(f"创建新任务: 用户={user_name}, 文件={os.path.basename(file_path)}, 模型={model}, 词典条目={len(self.custom_translations)}")
 
+    def to_record(self) -> Dict[str, Any]:
+        """转换为持久化存储记录（任务参数序列化到payload）"""
+        return {
+            'task_id': self.task_id,
+            'user_id': self.user_id,
+            'user_name': self.user_name,
+            'task_type': self.task_type,
+            'priority': self.priority,
+            'retry_count': self.retry_count,
+            'created_at': self.created_at.timestamp(),
+            **cost_from_record(self.estimated_cost),
+            'payload': {
+                'file_path': self.file_path,
+                'model': self.model,
+                'source_language': self.source_language,
+                'target_language': self.target_language,
+                'annotation_filename': self.annotation_filename,
+                'annotation_json': self.annotation_json,
+                'select_page': self.select_page,
+                'bilingual_translation': self.bilingual_translation,
+                'enable_text_splitting': self.enable_text_splitting,
+                'enable_uno_conversion': self.enable_uno_conversion,
+                'custom_translations': self.custom_translations,
+                'glossary_fingerprint': self.glossary_fingerprint,
+                'annotations': self.annotations,
+                'output_path': self.output_path,
+                'ocr_language': self.ocr_language,
+            }
+        }
+
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> 'TranslationTask':
+        """从持久化存储记录恢复任务（例如由其他进程提交或崩溃后被回收的任务）"""
+        payload = record['payload']
+        if isinstance(payload, str):
+            payload = json.loads(payload)
+        task = cls(
+            task_id=record['task_id'],
+            user_id=record['user_id'],
+            user_name=record['user_name'],
+            task_type=record['task_type'],
+            priority=record['priority'],
+            **payload
+        )
+        task.retry_count = record.get('retry_count') or 0
+        task.estimated_cost = cost_from_record(record)
+        if record.get('created_at'):
+            task.created_at = datetime_from_timestamp(record['created_at'])
+        return task
+
 class EnhancedTranslationQueue:
     """增强版翻译任务队列，支持多线程并发处理"""
 
@@ -116,6 +200,8 @@ class EnhancedTranslationQueue:
         """初始化翻译队列，但不创建处理器，等待配置"""
         # 默认配置 - 限制最大并发翻译任务为10个
         self.max_concurrent_tasks = 10
+        # 按预计成本（LLM tokens、OCR调用、Office处理时间）控制同时执行的任务和排队积压
+        self.cost_budget = CostBudget()
         self.task_timeout = 3600  # 1小时
         self.retry_times = 3
 
@@ -124,6 +210,21 @@ class EnhancedTranslationQueue:
         self.user_tasks: Dict[int, str] = {}
         self.active_tasks: Dict[str, TranslationTask] = {}
 
+        # 持久化存储（多进程共享），configure时按配置替换；默认内存存储用于测试
+        self.store: TaskQueueStore = MemoryTaskStore()
+        # 按历史阶段耗时预测任务耗时（记录保存在任务存储中）
+        self.eta_model = EtaModel(self.store)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = DEFAULT_LEASE_SECONDS
+        self.heartbeat_interval = DEFAULT_LEASE_SECONDS / 4
+        self.store_poll_interval = 2.0  # 多进程共享存储时检查其他进程提交任务的间隔（秒）
+
+        # 已结束任务的保留策略：结束超过保留时长或超出保留条数的任务归档并从内存中移除
+        self.retention_seconds = 30 * 60
+        self.retention_max_entries = 1000
+        self.retention_check_interval = 60
+        self._last_retention_check = 0.0
+
         # 状态控制
         self.initialized = False
         self.running = False
@@ -135,21 +236,46 @@ class EnhancedTranslationQueue:
         self.pool_check_interval = 300  # 5分钟检查一次线程池健康状态
         self.db_recycle_interval = 1800  # 30分钟回收一次数据库连接
 
+        # 后台线程使用的应用上下文提供器
+        self.app_provider: AppContextProvider = app_context_provider
+
         # 日志记录器
         self.logger = logging.getLogger(f"{__name__}.queue")
 
     def configure(self, max_concurrent_tasks: Optional[int] = None,
                 task_timeout: Optional[int] = None,
-                retry_times: Optional[int] = None) -> None:
+                retry_times: Optional[int] = None,
+                backend: Optional[str] = None,
+                store_path: Optional[str] = None,
+                lease_seconds: Optional[float] = None,
+                app_provider: Optional[AppContextProvider] = None,
+                retention_minutes: Optional[float] = None,
+                retention_max_entries: Optional[int] = None,
+                budget_llm_tokens: Optional[float] = None,
+                budget_ocr_calls: Optional[float] = None,
+                budget_office_seconds: Optional[float] = None,
+                max_backlog_seconds: Optional[float] = None) -> None:
         """
         配置任务队列参数
 
         Args:
-            max_concurrent_tasks: 最大并发任务数
+            max_concurrent_tasks: 最大并发任务数（所有进程共享的全局上限）
             task_timeout: 任务超时时间（秒）
             retry_times: 任务重试次数
+            backend: 任务存储后端 (sqlite, memory)
+            store_path: SQLite任务存储文件路径
+            lease_seconds: 任务租约时长（秒），持有进程需在过期前续约
+            app_provider: 应用上下文提供器，后台线程从中获取应用上下文
+            retention_minutes: 已结束任务的保留时长（分钟），超过后归档
+            retention_max_entries: 保留的已结束任务最大条数，超出的最早任务归档
+            budget_llm_tokens: 同时执行的任务预计消耗的LLM tokens上限
+            budget_ocr_calls: 同时执行的任务预计OCR调用次数上限
+            budget_office_seconds: 同时执行的任务预计Office处理时间上限（秒）
+            max_backlog_seconds: 排队任务预计剩余耗时超过该值时拒绝新任务（秒）
         """
         with self.lock:
+            if app_provider is not None:
+                self.app_provider = app_provider
             # 更新配置
             if max_concurrent_tasks is not None:
                 self.max_concurrent_tasks = max_concurrent_tasks
@@ -157,6 +283,22 @@ class EnhancedTranslationQueue:
                 self.task_timeout = task_timeout
             if retry_times is not None:
                 self.retry_times = retry_times
+            if lease_seconds is not None:
+                self.lease_seconds = lease_seconds
+                self.heartbeat_interval = lease_seconds / 4
+            if retention_minutes is not None:
+                self.retention_seconds = retention_minutes * 60
+            if retention_max_entries is not None:
+                self.retention_max_entries = retention_max_entries
+            self.cost_budget.configure(llm_tokens=budget_llm_tokens,
+                                       ocr_calls=budget_ocr_calls,
+                                       office_seconds=budget_office_seconds,
+                                       max_backlog_seconds=max_backlog_seconds)
+            if backend is not None:
+                self.store.close()
+                self.store = create_task_store(backend, store_path)
+                self.eta_model.bind_store(self.store)
+                self.logger.info(f"任务队列存储后端: {self.store.backend}, 进程标识: {self.worker_id}")
 
             # 如果已经初始化，需要重新启动处理器
             if self.initialized:
@@ -175,7 +317,7 @@ class EnhancedTranslationQueue:
                 annotation_filename: str = None, annotation_json: Dict = None,
                 select_page: List[int] = None, bilingual_translation: str = "paragraph_up",
                 enable_text_splitting: str = "False", enable_uno_conversion: bool = True,
-                custom_translations: Dict[str, str] = None, **kwargs) -> int:
+                custom_translations: Dict[str, str] = None, **kwargs) -> str:
         """
         添加任务到队列
 
@@ -196,26 +338,23 @@ class EnhancedTranslationQueue:
             **kwargs: 其他参数
 
         Returns:
-            队列位置
+            任务ID（预计开始时间用 estimate_wait_seconds 查询）
+
+        Raises:
+            QueueFullError: 排队任务的预计剩余耗时超过上限
         """
         if not self.initialized:
             raise RuntimeError("任务队列未初始化")
 
-        with self.lock:
-            # 检查当前活跃任务数量，确保不超过限制
-            active_count = len(self.active_tasks)
-            waiting_count = len([t for t in self.tasks.values() if t.status == "waiting"])
-            total_count = active_count + waiting_count
-
-            if total_count >= self.max_concurrent_tasks:
-                self.logger.warning(
-                    f"任务队列已满 - 活跃任务: {active_count}, 等待任务: {waiting_count}, "
-                    f"最大限制: {self.max_concurrent_tasks}"
-                )
-                raise RuntimeError(f"任务队列已满，当前有 {total_count} 个任务，最大限制为 {self.max_concurrent_tasks} 个")
+        # 上传时估算任务成本（只读取PPTX中的幻灯片XML），不持有队列锁
+        estimated_cost = estimate_job_cost(file_path, task_type, select_page,
+                                           enable_text_splitting, enable_uno_conversion)
+        # 有历史记录时按各阶段的实际吞吐修正预计耗时
+        estimated_cost['cost_seconds'] = round(self.eta_model.predict_duration(estimated_cost), 1)
 
-            # 生成任务ID
-            task_id = f"task_{int(time.time())}_{user_id}"
+        with self.lock:
+            # 生成任务ID（附加随机后缀，避免多个进程同一秒内生成相同ID）
+            task_id = f"task_{int(time.time())}_{user_id}_{uuid.uuid4().hex[:6]}"
 
             # 创建任务对象
             task = TranslationTask(
@@ -237,6 +376,7 @@ class EnhancedTranslationQueue:
                 custom_translations=custom_translations,  # 传递自定义翻译词典
                 **kwargs
             )
+            task.estimated_cost = estimated_cost
             
             # 记录任务创建信息
             self.logger.info(f"创建任务 {task_id}，参数:")
@@ -244,6 +384,21 @@ class EnhancedTranslationQueue:
             self.logger.info(f"  - 文本分割: {enable_text_splitting}")
             self.logger.info(f"  - UNO转换: {enable_uno_conversion}")
             self.logger.info(f"  - 词典条目数: {len(custom_translations) if custom_translations else 0}")
+            self.logger.info(
+                f"  - 预计成本: {estimated_cost['slides']} 页, {estimated_cost['pictures']} 张图片, "
+                f"{estimated_cost['cost_tokens']:.0f} tokens, {estimated_cost['cost_ocr_calls']:.0f} 次OCR, "
+                f"Office {estimated_cost['cost_office_seconds']:.0f}秒, 预计耗时 {estimated_cost['cost_seconds']:.0f}秒"
+            )
+
+            # 写入共享存储：按所有进程等待+处理中任务的预计剩余耗时进行准入，
+            # 超出并发预算的大任务也会入队，返回预计开始时间而不是拒绝
+            accepted, backlog_seconds = self.store.enqueue(task.to_record(), self.cost_budget.max_backlog_seconds)
+            if not accepted:
+                self.logger.warning(
+                    f"任务队列已满 - 排队任务预计剩余耗时: {backlog_seconds:.0f}秒, "
+                    f"上限: {self.cost_budget.max_backlog_seconds:.0f}秒"
+                )
+                raise QueueFullError(backlog_seconds, self.cost_budget.max_backlog_seconds)
 
             # 存储任务
             self.tasks[task_id] = task
@@ -251,14 +406,43 @@ class EnhancedTranslationQueue:
 
             # 通知处理器有新任务
             self.task_available.set()
+            task_events.publish(task_id, EVENT_STATUS)
 
             self.logger.info(
                 f"新任务已添加 - ID: {task_id}, 用户: {user_name}, "
                 f"文件: {os.path.basename(file_path)}"
             )
 
-            # 返回队列中等待的任务数
-            return len([t for t in self.tasks.values() if t.status == "waiting"])
+            return task_id
+
+    def cancel_task(self, task_id: str, user_name: str) -> bool:
+        """
+        取消尚未开始处理的任务（任何进程提交的任务都可以取消）
+
+        Args:
+            task_id: 任务ID
+            user_name: 发起取消的用户名，只能取消自己的任务
+
+        Returns:
+            是否已取消；任务不存在、不属于该用户或已经开始处理时返回False
+        """
+        record = self.store.get(task_id)
+        if record is None or record['user_name'] != user_name:
+            return False
+        # 存储中只有等待状态的任务会被取消，与认领互斥
+        if not self.store.cancel(task_id):
+            return False
+
+        with self.lock:
+            task = self.tasks.get(task_id)
+        if task is not None:
+            task.status = "canceled"
+            task.completed_at = now_with_timezone()
+            task.event.set()
+        self.logger.info(f"任务已取消: {task_id}, 用户: {user_name}")
+        task_events.publish(task_id, EVENT_STATUS)
+        self._discard_checkpoint(task_id)
+        return True
 
     def start_processor(self) -> None:
         """启动任务处理器"""
@@ -278,6 +462,14 @@ class EnhancedTranslationQueue:
                 )
                 self.processor_thread.start()
 
+                # 租约维护线程：为本进程持有的任务续约，并回收其他进程遗留的过期任务
+                self.lease_thread = threading.Thread(
+                    target=self._lease_maintenance_loop,
+                    name="translation_lease_keeper",
+                    daemon=True
+                )
+                self.lease_thread.start()
+
                 self.logger.info(
                     f"任务处理器已启动 - 最大并发任务数: {self.max_concurrent_tasks}, "
                     f"超时时间: {self.task_timeout}秒"
@@ -309,8 +501,9 @@ class EnhancedTranslationQueue:
                     self.logger.info("检测到终止信号，处理器线程退出")
                     break
                     
-                # 等待新任务或检查间隔，使用较短的超时确保能及时响应终止请求
-                self.task_available.wait(timeout=0.5)  # 减少超时时间，提高响应性
+                # 阻塞等待事件：新任务提交、任务完成释放槽位、租约回收或关闭时被唤醒。
+                # 共享存储中其他进程提交的任务无法通知本进程，因此按store_poll_interval兜底检查
+                self.task_available.wait(timeout=self._dispatch_wait_timeout())
                 self.task_available.clear()
                 
                 # 再次检查running标志
@@ -334,27 +527,15 @@ class EnhancedTranslationQueue:
                     continue
 
                 with self.lock:
-                    # 检查是否可以启动新任务
-                    if len(self.active_tasks) >= self.max_concurrent_tasks:
-                        continue
-
-                    # 获取等待中的任务
-                    waiting_tasks = [
-                        t for t in self.tasks.values()
-                        if t.status == "waiting"
-                    ]
-
-                    if not waiting_tasks:
-                        continue
-
-                    # 按优先级排序
-                    waiting_tasks.sort(key=lambda x: x.priority)
-
-                    # 选择要处理的任务
-                    for task in waiting_tasks:
-                        if len(self.active_tasks) >= self.max_concurrent_tasks:
+                    # 从共享存储认领任务，全局并发上限和成本预算由存储在认领时原子检查；
+                    # 队首任务超出剩余预算时等待处理中的任务结束（任务结束时会唤醒处理器）
+                    while len(self.active_tasks) < self.max_concurrent_tasks:
+                        record = self.store.claim(self.worker_id, self.max_concurrent_tasks,
+                                                  self.lease_seconds, self.cost_budget)
+                        if record is None:
                             break
 
+                        task = self._task_from_record(record)
                         if task.task_id not in self.active_tasks:
                             # 提交任务到线程池
                             self._process_task(task)
@@ -369,6 +550,130 @@ class EnhancedTranslationQueue:
         # 线程退出前记录日志
         self.logger.info(f"处理器线程已退出，线程ID: {processor_thread_id}")
 
+    def _dispatch_wait_timeout(self) -> float:
+        """处理器空闲等待的最长时间：进程内存储只需定期健康检查，共享存储需要兜底检查其他进程的任务"""
+        if self.store.shared:
+            return self.store_poll_interval
+        return self.pool_check_interval
+
+    def _task_from_record(self, record: Dict[str, Any]) -> TranslationTask:
+        """
+        获取认领到的任务对象：本进程提交的任务复用已有对象，
+        其他进程提交或崩溃后回收的任务从存储记录重建
+        """
+        task = self.tasks.get(record['task_id'])
+        if task is None or task.lease_lost:
+            task = TranslationTask.from_record(record)
+            self.tasks[task.task_id] = task
+            self.user_tasks[task.user_id] = task.task_id
+            self.logger.info(f"从共享存储认领任务: {task.task_id}, 用户: {task.user_name}, 重试次数: {task.retry_count}")
+        else:
+            task.retry_count = record.get('retry_count') or 0
+        task.status = "waiting"
+        return task
+
+    def _lease_maintenance_loop(self) -> None:
+        """定期为本进程正在处理的任务续约，回收租约过期（持有进程已退出）的任务，并执行保留策略"""
+        self._recover_expired_tasks()
+        while self.running:
+            time.sleep(self.heartbeat_interval)
+            if not self.running:
+                break
+            try:
+                with self.lock:
+                    task_ids = list(self.active_tasks)
+                lost = self.store.heartbeat(task_ids, self.worker_id, self.lease_seconds)
+                for task_id in lost:
+                    self._abandon_task(task_id)
+                self._recover_expired_tasks()
+                if time.time() - self._last_retention_check >= self.retention_check_interval:
+                    self._last_retention_check = time.time()
+                    self._apply_retention()
+            except Exception as e:
+                self.logger.error(f"任务租约维护出错: {str(e)}")
+
+    def _abandon_task(self, task_id: str) -> None:
+        """租约已丢失的任务：通知执行线程停止，之后的状态和结果不再写入存储和数据库"""
+        self.logger.warning(f"任务租约已丢失（可能已被其他进程回收），停止本进程的执行: {task_id}")
+        with self.lock:
+            task = self.active_tasks.get(task_id)
+        if task is None:
+            return
+        task.lease_lost = True
+        if task.thread_task:
+            task.thread_task.cancel()
+
+    def _recover_expired_tasks(self) -> None:
+        """回收过期租约的任务，重新排队或标记为失败"""
+        try:
+            requeued, failed = self.store.recover_expired(self.retry_times)
+            if requeued:
+                self.logger.warning(f"已重新排队租约过期的任务: {requeued}")
+                self.task_available.set()
+            if failed:
+                self.logger.error(f"租约过期且超过重试次数，标记为失败: {failed}")
+                for task_id in failed:
+                    self._discard_checkpoint(task_id)
+        except Exception as e:
+            self.logger.error(f"回收过期任务失败: {str(e)}")
+
+    def _apply_retention(self) -> None:
+        """
+        执行已结束任务的保留策略：共享存储中的记录移入归档表（丢弃任务参数），
+        本进程内存中的任务对象（含日志和词典等数据）一并移除
+        """
+        try:
+            archived = self.store.archive_finished(self.retention_seconds, self.retention_max_entries)
+            if archived:
+                self.logger.info(f"已归档 {len(archived)} 个已结束的任务")
+        except Exception as e:
+            self.logger.error(f"归档已结束任务失败: {str(e)}")
+            archived = []
+
+        cutoff = now_with_timezone().timestamp() - self.retention_seconds
+        with self.lock:
+            finished = [task for task in self.tasks.values()
+                        if task.status in ("completed", "failed", "canceled")
+                        and task.task_id not in self.active_tasks]
+            finished.sort(key=lambda t: t.completed_at.timestamp() if t.completed_at else 0)
+            excess = len(finished) - self.retention_max_entries
+            evict = set(archived)
+            for index, task in enumerate(finished):
+                completed = task.completed_at.timestamp() if task.completed_at else 0
+                if index < excess or completed < cutoff:
+                    evict.add(task.task_id)
+            for task_id in evict:
+                task = self.tasks.pop(task_id, None)
+                if task is not None and self.user_tasks.get(task.user_id) == task_id:
+                    del self.user_tasks[task.user_id]
+                task_events.discard(task_id)
+        if evict:
+            self.logger.debug(f"已从内存中移除 {len(evict)} 个已结束的任务")
+
+    def _persist_task_state(self, task: TranslationTask) -> None:
+        """将任务的最终状态写入共享存储，任务结束时删除其检查点"""
+        if task.lease_lost:
+            # 任务已由新的持有者执行，检查点也归新的持有者使用
+            self.logger.warning(f"任务租约已丢失，不写入本进程的执行状态: {task.task_id}")
+            return
+        try:
+            if task.status == "waiting":
+                self.store.requeue(task.task_id, task.retry_count, task.error)
+            elif task.status in ("completed", "failed", "canceled"):
+                self.store.finish(task.task_id, task.status, task.error)
+        except Exception as e:
+            self.logger.error(f"写入任务状态失败: {task.task_id}, 错误: {str(e)}")
+        task_events.publish(task.task_id, EVENT_STATUS)
+        if task.status in ("completed", "failed", "canceled"):
+            self._discard_checkpoint(task.task_id)
+
+    def _discard_checkpoint(self, task_id: str) -> None:
+        """删除任务检查点（重新排队的任务保留检查点，用于重试时恢复）"""
+        try:
+            TaskCheckpoint.discard_task(task_id)
+        except Exception as e:
+            self.logger.warning(f"删除任务检查点失败: {task_id}, 错误: {str(e)}")
+
     def _check_thread_pool_health(self) -> bool:
         """
         检查线程池健康状态，如果异常则尝试重新初始化
@@ -490,6 +795,7 @@ class EnhancedTranslationQueue:
             # 如果任务已经取消或失败，直接返回
             if task.status in ["canceled", "failed"]:
                 self.logger.debug(f"跳过已取消或失败的任务: {task.task_id}")
+                self._persist_task_state(task)
                 return
             
             # 更新任务状态
@@ -499,6 +805,7 @@ class EnhancedTranslationQueue:
             # 添加到活跃任务列表
             with self.lock:
                 self.active_tasks[task.task_id] = task
+            task_events.publish(task.task_id, EVENT_STATUS)
             
             # 检查线程池健康状态
             if not self._check_thread_pool_health():
@@ -551,6 +858,13 @@ class EnhancedTranslationQueue:
                             f"回调在任务执行线程中运行，这可能导致问题 - 任务: {task.task_id}"
                         )
                     
+                    # 执行函数返回False表示处理失败：交给错误处理按重试次数重新排队，
+                    # 重试时从任务检查点恢复，跳过已完成的页面
+                    if (thread_task.status == TaskStatus.COMPLETED and thread_task.result is False
+                            and task.status != "canceled"):
+                        queue_instance._handle_task_error(task, task.error or "任务执行失败")
+                        return
+                    
                     # 更新任务状态
                     if thread_task.status == TaskStatus.COMPLETED:
                         task.status = "completed"
@@ -558,6 +872,7 @@ class EnhancedTranslationQueue:
                         task.event.set()
                         queue_instance.logger.info(f"任务完成: {task.task_id}")
                         # 更新数据库记录状态
+                        queue_instance._persist_task_state(task)
                         queue_instance._schedule_database_update(task)
                     elif thread_task.status == TaskStatus.FAILED:
                         task.status = "failed"
@@ -566,6 +881,7 @@ class EnhancedTranslationQueue:
                         task.event.set()
                         queue_instance.logger.error(f"任务失败: {task.task_id}, 错误: {task.error}")
                         # 更新数据库记录状态
+                        queue_instance._persist_task_state(task)
                         queue_instance._schedule_database_update(task)
                     elif thread_task.status == TaskStatus.CANCELED:
                         task.status = "canceled"
@@ -573,6 +889,7 @@ class EnhancedTranslationQueue:
                         task.event.set()
                         queue_instance.logger.info(f"任务已取消: {task.task_id}")
                         # 更新数据库记录状态
+                        queue_instance._persist_task_state(task)
                         queue_instance._schedule_database_update(task)
                     
                     # 确保全局清理线程池存在
@@ -761,10 +1078,13 @@ class EnhancedTranslationQueue:
         
         # 标记应用上下文状态
         app_context_created = False
+        app_context = None
         
         try:
             # 设置任务开始时间
             task_start_time = time.time()
+            log_stats_before = log_stats.snapshot()
+            active_at_start = len(self.active_tasks)
             self.logger.info(
                 f"开始执行任务: {task.task_id}, "
                 f"类型: {task.task_type}, "
@@ -780,6 +1100,9 @@ class EnhancedTranslationQueue:
             })
             
             # 检查任务是否被取消
+            if task.lease_lost:
+                self.logger.info(f"任务租约已丢失，跳过执行: {task.task_id}")
+                return False
             if task.status == "canceled" or (task.thread_task and task.thread_task.should_cancel()):
                 self.logger.info(f"任务已被取消，跳过执行: {task.task_id}")
                 task.status = "canceled"
@@ -795,9 +1118,8 @@ class EnhancedTranslationQueue:
             except RuntimeError:
                 # 如果不在应用上下文中，创建一个新的
                 try:
-                    from app import create_app
-                    app = create_app()
-                    app.app_context().push()  # 使用push而不是with语句，避免线程问题
+                    # 从启动时注册的应用实例推入上下文，避免每次重新执行create_app()
+                    app_context = self.app_provider.push_context()
                     app_context_created = True
                     self.logger.debug(f"任务 {task.task_id} 创建了新的应用上下文")
                 except Exception as e:
@@ -812,14 +1134,25 @@ class EnhancedTranslationQueue:
                 # 进度回调函数
                 def progress_callback(current, total):
                     # 检查任务是否被取消
+                    if task.lease_lost:
+                        raise RuntimeError("任务租约已丢失，已由其他进程接管")
                     if task.status == "canceled" or (task.thread_task and task.thread_task.should_cancel()):
                         raise RuntimeError("任务已被用户取消")
 
                     progress = int((current / total) * 100) if total > 0 else 0
+                    progress_changed = (progress != task.progress or current != task.current_slide)
                     task.progress = progress
                     task.current_slide = current
                     task.total_slides = total
 
+                    # 同步进度到共享存储，其他进程的状态查询也能看到；通知本进程的事件流订阅者
+                    if progress_changed:
+                        try:
+                            self.store.update_progress(task.task_id, progress, current, total)
+                        except Exception as e:
+                            self.logger.warning(f"写入任务进度失败: {task.task_id}, 错误: {str(e)}")
+                        task_events.publish(task.task_id, EVENT_PROGRESS)
+
                     # 记录任务进度
                     if progress % 10 == 0 or progress == 100:  # 每10%记录一次
                         log_message = f"处理进度: {current}/{total} ({progress}%)"
@@ -874,6 +1207,19 @@ class EnhancedTranslationQueue:
                     'level': log_level
                 })
 
+                # 日志统计是进程级的，无法区分各任务：说明期间同时处理的任务数，避免当作本任务单独的开销
+                concurrent_tasks = max(active_at_start, len(self.active_tasks))
+                overhead_message = (
+                    f"任务期间本进程的日志开销（进程级统计，期间同时处理 {concurrent_tasks} 个任务）: "
+                    f"{describe_overhead(log_stats.since(log_stats_before))}"
+                )
+                task.logger.info(overhead_message)
+                task.logs.append({
+                    'timestamp': now_with_timezone(),
+                    'message': overhead_message,
+                    'level': 'info'
+                })
+
                 # 对于特别长时间运行的任务，进行垃圾回收
                 if elapsed_time > 1800:  # 30分钟
                     self._perform_gc()
@@ -910,6 +1256,14 @@ class EnhancedTranslationQueue:
             })
 
             return False
+
+        finally:
+            # 弹出本任务推入的应用上下文，避免在线程池线程中累积
+            if app_context_created:
+                try:
+                    app_context.pop()
+                except Exception as e:
+                    self.logger.error(f"弹出应用上下文失败: {str(e)}")
         
     def _get_db_connection_info(self):
         """获取数据库连接信息"""
@@ -969,8 +1323,10 @@ class EnhancedTranslationQueue:
 
             # 停止词列表和自定义翻译字典
             stop_words_list = []
-            # 使用任务中的自定义翻译词典
-            custom_translations = task.custom_translations or {}
+            # 使用任务中的自定义翻译词典：转换为编译后的词库（按指纹复用），翻译每页时只使用该页出现的词条
+            custom_translations = compiled_glossary(task.custom_translations or {},
+                                                    task.glossary_fingerprint or None,
+                                                    task.source_language, task.target_language)
             
             # 记录使用的词典信息
             if custom_translations:
@@ -1006,6 +1362,25 @@ class EnhancedTranslationQueue:
                 self.logger.info(f"  - UNO转换: {task.enable_uno_conversion}")
                 self.logger.info(f"  - 词典条目数: {len(custom_translations)}")
                 
+                # 任务检查点：首次执行保存原始文件，重试时恢复原始文件并跳过已完成的页面和图片
+                checkpoint = None
+                try:
+                    checkpoint = TaskCheckpoint(task.task_id)
+                    resumed = checkpoint.prepare(task.file_path, {
+                        'source_language': task.source_language,
+                        'target_language': task.target_language,
+                        'model': task.model,
+                        'select_page': task.select_page,
+                        'glossary': custom_translations.fingerprint,
+                    })
+                    if resumed:
+                        task.logger.info(f"从检查点恢复任务 (第{task.retry_count}次重试)")
+                except Exception as e:
+                    self.logger.warning(f"准备任务检查点失败，不使用检查点: {task.task_id}, 错误: {str(e)}")
+                    checkpoint = None
+                
+                # 记录各处理阶段耗时（流水线模式下各阶段相互重叠）
+                stage_timer = StageTimer()
                 result = process_presentation(
                     presentation_path=task.file_path,
                     stop_words=stop_words_list,
@@ -1017,8 +1392,19 @@ class EnhancedTranslationQueue:
                     progress_callback=progress_callback,
                     model=task.model,
                     enable_text_splitting=task.enable_text_splitting,
-                    enable_uno_conversion=task.enable_uno_conversion
+                    enable_uno_conversion=task.enable_uno_conversion,
+                    checkpoint=checkpoint,
+                    stage_timer=stage_timer
                 )
+                self._log_stage_timings(task, stage_timer)
+                if result:
+                    self.eta_model.record_task(task.task_id, stage_timer.snapshot(), task.estimated_cost)
+                
+                if checkpoint is not None and (checkpoint.resumed_pages or checkpoint.resumed_ocr):
+                    self.logger.info(
+                        f"任务 {task.task_id} 复用检查点: {checkpoint.resumed_pages} 页翻译, "
+                        f"{checkpoint.resumed_ocr} 张图片OCR"
+                    )
 
             return result
 
@@ -1026,6 +1412,21 @@ class EnhancedTranslationQueue:
             self.logger.error(f"执行PPT翻译任务时出错: {str(e)}")
             return False
 
+    def _log_stage_timings(self, task: TranslationTask, stage_timer: StageTimer) -> None:
+        """将各阶段耗时写入任务日志"""
+        lines = stage_timer.summary_lines()
+        if not lines:
+            return
+        for line in lines:
+            task.logger.info(f"阶段耗时 - {line}")
+        task.logs.append({
+            'timestamp': now_with_timezone(),
+            'message': "阶段耗时: " + "；".join(lines),
+            'level': 'info'
+        })
+        if len(task.logs) > 50:
+            task.logs = task.logs[-50:]
+
     def _execute_pdf_annotation_task(self, task: TranslationTask, progress_callback) -> bool:
         """
         执行PDF注释任务
@@ -1076,11 +1477,16 @@ class EnhancedTranslationQueue:
         Args:
             task: 翻译任务对象
         """
+        if task.lease_lost:
+            self.logger.warning(f"任务租约已丢失，不更新数据库记录: {task.task_id}")
+            return
+
         # 记录基本信息（不需要应用上下文）
         self.logger.info(f"任务完成 - ID: {task.task_id}, 用户: {task.user_name}, 文件: {os.path.basename(task.file_path)}")
         
         # 检查是否已经在应用上下文中
         app_context_created = False
+        app_context = None
         try:
             from flask import current_app
             # 尝试直接访问current_app，如果已在应用上下文中则不需要创建新的上下文
@@ -1089,9 +1495,8 @@ class EnhancedTranslationQueue:
         except RuntimeError:
             # 如果不在应用上下文中，创建一个新的
             try:
-                from app import create_app
-                app = create_app()
-                app.app_context().push()  # 使用push而不是with语句，避免线程问题
+                # 从启动时注册的应用实例推入上下文，避免每次重新执行create_app()
+                app_context = self.app_provider.push_context()
                 app_context_created = True
                 self.logger.info(f"数据库更新 {task.task_id} 创建了新的应用上下文")
             except Exception as e:
@@ -1119,6 +1524,12 @@ class EnhancedTranslationQueue:
                 # 根据任务状态更新记录状态
                 if task.status == "completed":
                     record.status = 'completed'
+                    # 翻译结果写回原文件，按输出文件的大小更新记录和用户的存储用量
+                    if os.path.exists(file_path):
+                        from .storage_accounting import file_resized
+                        output_size = os.path.getsize(file_path)
+                        file_resized(record.user_id, file_path, record.file_size or 0, output_size)
+                        record.file_size = output_size
                     self.logger.info(f"更新记录状态为completed: {record.id}, 文件: {record.filename}")
                 elif task.status == "failed":
                     record.status = 'failed'
@@ -1150,8 +1561,7 @@ class EnhancedTranslationQueue:
             # 如果我们创建了应用上下文，需要弹出它
             if app_context_created:
                 try:
-                    from flask import current_app
-                    current_app.app_context().pop()
+                    app_context.pop()
                     self.logger.info(f"数据库更新 {task.task_id} 弹出了应用上下文")
                 except Exception as e:
                     self.logger.error(f"弹出应用上下文失败: {str(e)}")
@@ -1164,6 +1574,15 @@ class EnhancedTranslationQueue:
             task: 出错的任务
             error: 错误信息
         """
+        if task.lease_lost:
+            # 不重试也不标记失败（重试次数由回收租约的进程计入），只释放本进程的处理槽位
+            self.logger.warning(f"任务租约已丢失，放弃本进程的执行结果: {task.task_id}, 错误: {error}")
+            with self.lock:
+                if task.task_id in self.active_tasks:
+                    del self.active_tasks[task.task_id]
+            self.task_available.set()
+            return
+
         self.logger.error(f"任务错误: {task.task_id}, 错误: {error}")
         task.logger.error(f"翻译任务失败: {error}")
         
@@ -1172,6 +1591,7 @@ class EnhancedTranslationQueue:
         
         # 检查是否已经在应用上下文中
         app_context_created = False
+        app_context = None
         try:
             from flask import current_app
             # 尝试直接访问current_app，如果已在应用上下文中则不需要创建新的上下文
@@ -1180,9 +1600,8 @@ class EnhancedTranslationQueue:
         except RuntimeError:
             # 如果不在应用上下文中，创建一个新的
             try:
-                from app import create_app
-                app = create_app()
-                app.app_context().push()  # 使用push而不是with语句，避免线程问题
+                # 从启动时注册的应用实例推入上下文，避免每次重新执行create_app()
+                app_context = self.app_provider.push_context()
                 app_context_created = True
                 self.logger.info(f"任务错误处理 {task.task_id} 创建了新的应用上下文")
             except Exception as e:
@@ -1216,6 +1635,9 @@ class EnhancedTranslationQueue:
                     if task.task_id in self.active_tasks:
                         del self.active_tasks[task.task_id]
                 
+                # 重新排队，任何进程都可以认领重试
+                self._persist_task_state(task)
+                
                 # 通知任务队列有新的处理空间
                 self.task_available.set()
                 
@@ -1249,6 +1671,7 @@ class EnhancedTranslationQueue:
                 self.task_available.set()
                 
                 # 更新数据库中的任务状态
+                self._persist_task_state(task)
                 self._schedule_database_update(task)
         
         except Exception as e:
@@ -1260,8 +1683,7 @@ class EnhancedTranslationQueue:
             # 如果我们创建了应用上下文，需要弹出它
             if app_context_created:
                 try:
-                    from flask import current_app
-                    current_app.app_context().pop()
+                    app_context.pop()
                     self.logger.info(f"任务错误处理 {task.task_id} 弹出了应用上下文")
                 except Exception as e:
                     self.logger.error(f"弹出应用上下文失败: {str(e)}")
@@ -1297,25 +1719,32 @@ class EnhancedTranslationQueue:
         
         # 尝试更新数据库记录状态
         try:
+            self._persist_task_state(task)
             self._schedule_database_update(task)
         except Exception as e:
             self.logger.error(f"无应用上下文时更新数据库记录失败: {str(e)}")
 
-    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+    def _get_status_source(self, task_id: str):
         """
-        获取任务状态
+        获取用于状态查询的任务数据
 
-        Args:
-            task_id: 任务ID
+        本进程正在执行的任务使用内存对象（包含最新日志和进度），
+        其余任务以共享存储为准（可能由其他进程执行）
 
         Returns:
-            任务状态信息字典
+            (内存任务对象或None, 存储记录或None)
         """
-        with self.lock:
-            task = self.tasks.get(task_id)
-            if not task:
-                return None
-
+        task = self.active_tasks.get(task_id)
+        if task is not None and not task.lease_lost:
+            return task, None
+        record = self.store.get(task_id)
+        if record is None:
+            return self.tasks.get(task_id), None
+        return None, record
+
+    def _build_status(self, task: Optional[TranslationTask], record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """将内存任务或存储记录转换为状态字典"""
+        if task is not None:
             return {
                 'task_id': task.task_id,
                 'status': task.status,
@@ -1325,12 +1754,75 @@ class EnhancedTranslationQueue:
                 'error': task.error,
                 'start_time': task.start_time,
                 'end_time': task.end_time,
-                'retry_count': task.retry_count
+                'retry_count': task.retry_count,
+                'created_at': task.created_at,
+                'started_at': getattr(task, 'started_at', None),
+                'completed_at': getattr(task, 'completed_at', None)
             }
 
+        started_at = datetime_from_timestamp(record.get('started_at'))
+        completed_at = datetime_from_timestamp(record.get('completed_at'))
+        return {
+            'task_id': record['task_id'],
+            'status': record['status'],
+            'progress': record.get('progress') or 0,
+            'current_slide': record.get('current_slide') or 0,
+            'total_slides': record.get('total_slides') or 0,
+            'error': record.get('error'),
+            'start_time': started_at,
+            'end_time': completed_at,
+            'retry_count': record.get('retry_count') or 0,
+            'created_at': datetime_from_timestamp(record.get('created_at')),
+            'started_at': started_at,
+            'completed_at': completed_at
+        }
+
+    def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态
+
+        Args:
+            task_id: 任务ID
+
+        Returns:
+            任务状态信息字典
+        """
+        # 只读查询：内存字典的单次读取是原子的，共享存储自带并发控制，不需要持有队列全局锁
+        task, record = self._get_status_source(task_id)
+        if task is None and record is None:
+            return None
+
+        status = self._build_status(task, record)
+        for key in ('created_at', 'started_at', 'completed_at'):
+            status.pop(key, None)
+        return status
+
+    def get_task_owner(self, task_id: str) -> Optional[int]:
+        """获取任务所属的用户ID，任务不存在时返回None"""
+        task = self.tasks.get(task_id)
+        if task is not None:
+            return task.user_id
+        record = self.store.get(task_id)
+        return record['user_id'] if record else None
+
+    def get_task_snapshot(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        任务状态快照（用于事件流推送），包含等待中任务的排队位置
+
+        Returns:
+            状态字典，任务不存在时返回None
+        """
+        status = self.get_task_status(task_id)
+        if status is None:
+            return None
+        status['task_id'] = task_id
+        status['position'] = self.store.waiting_position(task_id) if status['status'] == "waiting" else 0
+        self._add_time_estimates(task_id, status)
+        return status
+
     def get_task_status_by_user(self, user_id: int) -> Optional[Dict[str, Any]]:
         """
-        按用户ID获取任务状态
+        按用户ID获取任务状态（包括其他进程提交或执行的任务）
 
         Args:
             user_id: 用户ID
@@ -1338,68 +1830,102 @@ class EnhancedTranslationQueue:
         Returns:
             任务状态信息字典
         """
-        with self.lock:
-            # 从用户任务映射中获取任务ID
-            task_id = self.user_tasks.get(user_id)
-            if not task_id:
-                return None
+        # 共享存储中该用户最新的任务，存储不可用时回退到本进程映射
+        try:
+            latest = self.store.get_latest_for_user(user_id)
+        except Exception as e:
+            self.logger.warning(f"查询共享任务存储失败: {str(e)}")
+            latest = None
+        task_id = latest['task_id'] if latest else self.user_tasks.get(user_id)
+        if not task_id:
+            return None
 
-            # 获取任务对象
-            task = self.tasks.get(task_id)
-            if not task:
-                return None
+        task, record = self._get_status_source(task_id)
+        if task is None and record is None:
+            return None
 
-            # 计算队列位置（仅对等待中的任务）
-            position = 0
-            if task.status == "waiting":
-                waiting_tasks = [t for t in self.tasks.values() if t.status == "waiting"]
-                waiting_tasks.sort(key=lambda x: x.created_at)
-                for i, waiting_task in enumerate(waiting_tasks):
-                    if waiting_task.task_id == task_id:
-                        position = i + 1
-                        break
+        status = self._build_status(task, record)
 
-            return {
-                'task_id': task.task_id,
-                'status': task.status,
-                'progress': task.progress,
-                'current_slide': getattr(task, 'current_slide', 0),
-                'total_slides': getattr(task, 'total_slides', 0),
-                'position': position,
-                'error': task.error,
-                'start_time': task.start_time,
-                'end_time': task.end_time,
-                'retry_count': task.retry_count,
-                'created_at': task.created_at,
-                'started_at': getattr(task, 'started_at', None),
-                'completed_at': getattr(task, 'completed_at', None)
-            }
+        # 计算队列位置（仅对等待中的任务，见 TaskQueueStore.waiting_position）
+        position = 0
+        if status['status'] == "waiting":
+            position = self.store.waiting_position(task_id)
+        status['position'] = position
+        self._add_time_estimates(task_id, status)
+        return status
+
+    def _add_time_estimates(self, task_id: str, status: Dict[str, Any]) -> None:
+        """等待中任务附加预计开始时间，处理中任务附加预计剩余时间（秒）"""
+        try:
+            if status['status'] == "waiting":
+                status['estimated_wait_seconds'] = self.estimate_wait_seconds(task_id)
+            elif status['status'] == "processing":
+                status['estimated_remaining_seconds'] = self.estimate_remaining_seconds(task_id)
+        except Exception as e:
+            self.logger.warning(f"估算任务时间失败: {task_id}, 错误: {str(e)}")
+
+    def estimate_remaining_seconds(self, task_id: str) -> Optional[float]:
+        """
+        处理中任务的预计剩余时间（秒），随已完成页数更新
+
+        Returns:
+            预计秒数，任务不在处理状态时返回None
+        """
+        record = self.store.get(task_id)
+        if not record or record['status'] != "processing":
+            return None
+        return round(self.eta_model.remaining_seconds(record))
+
+    def estimate_wait_seconds(self, task_id: str) -> Optional[float]:
+        """
+        等待中任务的预计开始时间（距现在的秒数）
+        按处理中任务的预计剩余时间和排在前面的任务的预计耗时（历史阶段耗时模型），
+        以认领规则（并发上限、成本预算）模拟调度
+
+        Returns:
+            预计秒数，任务不在等待状态时返回None
+        """
+        try:
+            processing, waiting = self.store.pending_records()
+        except Exception as e:
+            self.logger.warning(f"查询等待中任务失败: {str(e)}")
+            return None
+        now = time.time()
+        processing = [record for record in processing if (record.get('lease_expires') or 0) >= now]
+        for index, record in enumerate(waiting):
+            if record['task_id'] == task_id:
+                offsets = estimate_start_offsets(processing, waiting[:index + 1], self.cost_budget,
+                                                 self.max_concurrent_tasks, now,
+                                                 duration=self.eta_model.predict_duration,
+                                                 remaining=self.eta_model.remaining_seconds)
+                return round(offsets[task_id])
+        return None
 
     def get_queue_stats(self) -> Dict[str, Any]:
         """
-        获取队列统计信息
+        获取队列统计信息（所有进程共享的全局统计）
 
         Returns:
             统计信息字典
         """
-        with self.lock:
-            waiting_tasks = len([t for t in self.tasks.values() if t.status == "waiting"])
-            processing_tasks = len(self.active_tasks)
-            completed_tasks = len([t for t in self.tasks.values() if t.status == "completed"])
-            failed_tasks = len([t for t in self.tasks.values() if t.status == "failed"])
-            canceled_tasks = len([t for t in self.tasks.values() if t.status == "canceled"])
-
-            return {
-                'waiting': waiting_tasks,
-                'processing': processing_tasks,
-                'completed': completed_tasks,
-                'failed': failed_tasks,
-                'canceled': canceled_tasks,
-                'total': len(self.tasks),
-                'max_concurrent': self.max_concurrent_tasks,
-                'task_timeout': self.task_timeout,
-                'retry_times': self.retry_times
-            }
+        # 状态计数由存储增量维护，不需要遍历任务，也不需要持有队列全局锁
+        counts = self.store.count_by_status()
+
+        return {
+            'waiting': counts.get('waiting', 0),
+            'processing': counts.get('processing', 0),
+            'completed': counts.get('completed', 0),
+            'failed': counts.get('failed', 0),
+            'canceled': counts.get('canceled', 0),
+            'total': sum(counts.values()),
+            'local_processing': len(self.active_tasks),
+            'max_concurrent': self.max_concurrent_tasks,
+            'cost_budget': self.cost_budget.to_dict(),
+            'task_timeout': self.task_timeout,
+            'retry_times': self.retry_times,
+            'backend': self.store.backend,
+            'worker_id': self.worker_id
+        }
 
     def get_queue_size(self) -> int:
         """
@@ -1408,18 +1934,16 @@ class EnhancedTranslationQueue:
         Returns:
             队列中的任务总数
         """
-        with self.lock:
-            return len(self.tasks)
+        return sum(self.store.count_by_status().values())
     
     def get_active_count(self) -> int:
         """
         获取活动任务数
         
         Returns:
-            当前正在处理的任务数
+            当前正在处理的任务数（所有进程）
         """
-        with self.lock:
-            return len(self.active_tasks)
+        return self.store.count_by_status().get('processing', 0)
     
     def get_waiting_count(self) -> int:
         """
@@ -1428,8 +1952,7 @@ class EnhancedTranslationQueue:
         Returns:
             等待处理的任务数
         """
-        with self.lock:
-            return len([t for t in self.tasks.values() if t.status == "waiting"])
+        return self.store.count_by_status().get('waiting', 0)
     
     def get_completed_count(self) -> int:
         """
@@ -1438,8 +1961,7 @@ class EnhancedTranslationQueue:
         Returns:
             已完成的任务数
         """
-        with self.lock:
-            return len([t for t in self.tasks.values() if t.status == "completed"])
+        return self.store.count_by_status().get('completed', 0)
     
     def get_failed_count(self) -> int:
         """
@@ -1448,8 +1970,7 @@ class EnhancedTranslationQueue:
         Returns:
             失败的任务数
         """
-        with self.lock:
-            return len([t for t in self.tasks.values() if t.status == "failed"])
+        return self.store.count_by_status().get('failed', 0)
 
     def recycle_idle_connections(self) -> Dict[str, Any]:
         """
@@ -1463,6 +1984,7 @@ class EnhancedTranslationQueue:
         """
         # 检查是否已经在应用上下文中
         app_context_created = False
+        app_context = None
         try:
             from flask import current_app
             # 尝试直接访问current_app，如果已在应用上下文中则不需要创建新的上下文
@@ -1471,9 +1993,8 @@ class EnhancedTranslationQueue:
         except RuntimeError:
             # 如果不在应用上下文中，创建一个新的
             try:
-                from app import create_app
-                app = create_app()
-                app.app_context().push()  # 使用push而不是with语句，避免线程问题
+                # 从启动时注册的应用实例推入上下文，避免每次重新执行create_app()
+                app_context = self.app_provider.push_context()
                 app_context_created = True
                 self.logger.info("回收连接创建了新的应用上下文")
             except Exception as e:
@@ -1541,8 +2062,7 @@ class EnhancedTranslationQueue:
             # 如果我们创建了应用上下文，需要弹出它
             if app_context_created:
                 try:
-                    from flask import current_app
-                    current_app.app_context().pop()
+                    app_context.pop()
                     self.logger.info("回收连接弹出了应用上下文")
                 except Exception as e:
                     self.logger.error(f"弹出应用上下文失败: {str(e)}")
@@ -1562,6 +2082,7 @@ class EnhancedTranslationQueue:
             
             # 检查是否已经在应用上下文中
             app_context_created = False
+            app_context = None
             try:
                 from flask import current_app
                 # 尝试直接访问current_app，如果已在应用上下文中则不需要创建新的上下文
@@ -1582,9 +2103,8 @@ class EnhancedTranslationQueue:
             except RuntimeError:
                 # 如果不在应用上下文中，创建一个新的
                 try:
-                    from app import create_app
-                    app = create_app()
-                    app.app_context().push()  # 使用push而不是with语句，避免线程问题
+                    # 从启动时注册的应用实例推入上下文，避免每次重新执行create_app()
+                    app_context = self.app_provider.push_context()
                     app_context_created = True
                     self.logger.info(f"资源清理 {task.task_id} 创建了新的应用上下文")
                     
@@ -1624,8 +2144,7 @@ class EnhancedTranslationQueue:
             # 如果我们创建了应用上下文，需要弹出它
             if app_context_created:
                 try:
-                    from flask import current_app
-                    current_app.app_context().pop()
+                    app_context.pop()
                     self.logger.info(f"资源清理 {task.task_id} 弹出了应用上下文")
                 except Exception as e:
                     self.logger.error(f"弹出应用上下文失败: {str(e)}")
@@ -0,0 +1,219 @@
+"""
+基于历史记录的任务耗时预测
+任务完成后把各阶段耗时（提取、逐页翻译、写入、图片OCR、保存）写入任务存储的阶段统计表，
+按阶段拟合 耗时 = 固定开销 + 单位耗时 × 数量 的线性模型，用于：
+- 处理中任务的剩余时间（按已完成页数的实际速度修正）
+- 等待中任务的预计开始时间（按认领规则模拟调度，见 job_cost.estimate_start_offsets）
+- 入队时的预计耗时（替代 job_cost 的静态估算参数）
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+from .job_cost import (
+    OFFICE_BASE_SECONDS, OFFICE_SECONDS_PER_SLIDE, OCR_SECONDS_PER_CALL,
+    PAGE_PROMPT_TOKENS, LLM_TOKENS_PER_SECOND, cost_from_record
+)
+
+logger = logging.getLogger(__name__)
+
+# 模型阶段 -> (StageTimer中对应的阶段名, 取值方式, 数量单位)
+# 逐页翻译由多个线程同时执行，取时间跨度（墙钟时间）；其他阶段取累计耗时
+STAGES = {
+    'extract': (('布局调整', 'PPTX转ODP', 'ODP内容加载', '打开PPTX'), 'total', 'slides'),
+    'translate': (('文本翻译',), 'span', 'pages'),
+    'write': (('页面写入', '映射并写入PPTX'), 'total', 'slides'),
+    'ocr': (('图片OCR与翻译',), 'total', 'images'),
+    'save': (('PPTX保存', 'UNO格式转换', 'OCR结果写入'), 'total', 'slides'),
+}
+
+# 没有历史记录时的默认参数: (固定开销秒数, 每单位秒数)
+PRIOR_RATES = {
+    'extract': (OFFICE_BASE_SECONDS, OFFICE_SECONDS_PER_SLIDE / 2),
+    'translate': (0.0, PAGE_PROMPT_TOKENS * 2 / LLM_TOKENS_PER_SECOND),
+    'write': (0.0, 0.1),
+    'ocr': (0.0, OCR_SECONDS_PER_CALL),
+    'save': (1.0, OFFICE_SECONDS_PER_SLIDE / 2),
+}
+
+# 参与拟合的每阶段最近记录数，少于 MIN_SAMPLES 时使用默认参数
+MAX_SAMPLES = 200
+MIN_SAMPLES = 3
+
+
+def stage_rows(stage_snapshot: Dict[str, Dict[str, float]], cost: Dict[str, Any]) -> List[Tuple[str, float, float]]:
+    """
+    将一次任务的 StageTimer.snapshot() 转换为模型阶段记录
+
+    Args:
+        stage_snapshot: {阶段名: {'total', 'count', 'span', 'offset'}}
+        cost: 任务的成本字段（cost_slides、cost_ocr_calls）
+
+    Returns:
+        [(模型阶段, 数量, 耗时秒数)]，没有执行或数量为0的阶段不记录
+    """
+    slides = float(cost.get('cost_slides') or 0)
+    translated = stage_snapshot.get('文本翻译', {}).get('count', 0)
+    # 逐页流水线每页记录一次"文本翻译"；非流水线模式整份文档只记录一次，按任务页数计
+    pages = slides if translated == 1 and slides else translated
+    units = {
+        'slides': slides or translated,
+        'pages': pages,
+        'images': float(cost.get('cost_ocr_calls') or 0),
+    }
+    rows = []
+    for stage, (sources, measure, unit) in STAGES.items():
+        entries = [stage_snapshot[name] for name in sources if name in stage_snapshot]
+        if not entries or units[unit] <= 0:
+            continue
+        seconds = sum(entry[measure] for entry in entries)
+        rows.append((stage, units[unit], seconds))
+    return rows
+
+
+def fit_linear(samples: List[Tuple[float, float]], prior: Tuple[float, float]) -> Tuple[float, float]:
+    """
+    最小二乘拟合 seconds = base + per_unit × units（两个参数都不小于0）
+
+    Args:
+        samples: [(数量, 耗时)]
+        prior: 样本不足时使用的 (base, per_unit)
+    """
+    if len(samples) < MIN_SAMPLES:
+        return prior
+    n = len(samples)
+    sum_x = sum(units for units, _ in samples)
+    sum_y = sum(seconds for _, seconds in samples)
+    sum_xx = sum(units * units for units, _ in samples)
+    sum_xy = sum(units * seconds for units, seconds in samples)
+    denominator = n * sum_xx - sum_x * sum_x
+    if denominator <= 1e-9:
+        # 数量都相同时无法区分固定开销和单位耗时，按比例计算
+        return (0.0, sum_y / sum_x) if sum_x > 0 else prior
+    per_unit = (n * sum_xy - sum_x * sum_y) / denominator
+    base = (sum_y - per_unit * sum_x) / n
+    if per_unit < 0:
+        return max(sum_y / n, 0.0), 0.0
+    if base < 0:
+        return 0.0, sum_xy / sum_xx
+    return base, per_unit
+
+
+class EtaModel:
+    """
+    阶段吞吐模型
+
+    记录写入任务存储（多进程共享），拟合结果在本进程缓存，
+    记录新数据或超过 refit_interval 后重新拟合
+    """
+
+    def __init__(self, store=None, refit_interval: float = 300.0):
+        self.store = store
+        self.refit_interval = refit_interval
+        self._lock = threading.Lock()
+        self._rates: Dict[str, Tuple[float, float]] = dict(PRIOR_RATES)
+        self._samples: Dict[str, int] = {stage: 0 for stage in STAGES}
+        self._fitted_at = 0.0
+
+    def bind_store(self, store) -> None:
+        with self._lock:
+            self.store = store
+            self._fitted_at = 0.0
+
+    def record_task(self, task_id: str, stage_snapshot: Dict[str, Dict[str, float]], cost: Dict[str, Any]) -> None:
+        """记录一次成功任务的阶段耗时"""
+        rows = stage_rows(stage_snapshot, cost)
+        if not rows or self.store is None:
+            return
+        try:
+            self.store.record_stage_stats(task_id, rows, keep=MAX_SAMPLES)
+        except Exception as e:
+            logger.warning(f"记录任务阶段耗时失败: {task_id}, 错误: {str(e)}")
+            return
+        with self._lock:
+            self._fitted_at = 0.0
+
+    def _refresh(self) -> None:
+        if self.store is None or time.time() - self._fitted_at < self.refit_interval:
+            return
+        with self._lock:
+            if time.time() - self._fitted_at < self.refit_interval:
+                return
+            try:
+                samples = self.store.recent_stage_stats(list(STAGES), MAX_SAMPLES)
+            except Exception as e:
+                logger.warning(f"读取任务阶段统计失败，使用当前模型参数: {str(e)}")
+                self._fitted_at = time.time()
+                return
+            for stage in STAGES:
+                stage_samples = samples.get(stage, [])
+                self._rates[stage] = fit_linear(stage_samples, PRIOR_RATES[stage])
+                self._samples[stage] = len(stage_samples)
+            self._fitted_at = time.time()
+
+    def stage_seconds(self, stage: str, units: float) -> float:
+        self._refresh()
+        if units <= 0:
+            return 0.0
+        base, per_unit = self._rates[stage]
+        return base + per_unit * units
+
+    def _phases(self, cost: Dict[str, Any]) -> Tuple[float, float, float]:
+        """(提取阶段, 文本翻译/写入/OCR并行阶段, 保存阶段) 的预计耗时"""
+        slides = float(cost.get('cost_slides') or 0)
+        images = float(cost.get('cost_ocr_calls') or 0)
+        before = self.stage_seconds('extract', slides)
+        # 流水线中逐页写入与翻译重叠，图片OCR与文本翻译同时执行
+        overlapped = max(self.stage_seconds('translate', slides),
+                         self.stage_seconds('write', slides),
+                         self.stage_seconds('ocr', images))
+        after = self.stage_seconds('save', slides)
+        return before, overlapped, after
+
+    def predict_duration(self, cost: Dict[str, Any]) -> float:
+        """
+        任务的预计总耗时；成本中没有页数（非PPT任务或无法读取结构）时使用成本估算的耗时
+        """
+        if not cost.get('cost_slides'):
+            return float(cost.get('cost_seconds') or 0)
+        return sum(self._phases(cost))
+
+    def remaining_seconds(self, record: Dict[str, Any], now: Optional[float] = None) -> float:
+        """
+        处理中任务的剩余时间
+
+        翻译开始后按已完成页数的实际速度推算剩余页面的耗时，再加上保存阶段的预计耗时；
+        尚未开始翻译时按预计总耗时扣减已执行时间
+        """
+        now = now or time.time()
+        cost = cost_from_record(record)
+        if not cost.get('cost_slides'):
+            total = float(cost.get('cost_seconds') or 0)
+            progress = record.get('progress') or 0
+            return total * (100 - min(progress, 100)) / 100
+        before, overlapped, after = self._phases(cost)
+        elapsed = max(now - (record.get('started_at') or now), 0.0)
+        done = record.get('current_slide') or 0
+        total_pages = record.get('total_slides') or 0
+        if done > 0 and total_pages > 0:
+            # 已完成页面的实际耗时（扣除提取阶段）推算剩余页面
+            text_elapsed = max(elapsed - before, 0.0)
+            per_page = text_elapsed / done if text_elapsed > 0 else overlapped / total_pages
+            return max(total_pages - done, 0) * per_page + after
+        return max(before + overlapped + after - elapsed, after)
+
+    def rates(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段当前的拟合参数（用于系统状态接口）"""
+        self._refresh()
+        with self._lock:
+            return {
+                stage: {
+                    'unit': STAGES[stage][2],
+                    'base_seconds': round(self._rates[stage][0], 3),
+                    'seconds_per_unit': round(self._rates[stage][1], 3),
+                    'samples': self._samples[stage],
+                    'fitted': self._samples[stage] >= MIN_SAMPLES,
+                }
+                for stage in STAGES
+            }
@@ -0,0 +1,302 @@
+"""
+上传翻译时使用的词库缓存
+原实现每次上传都按选中的词条ID查询词库、在Python中按语言方向逐条构建 custom_translations 字典。
+这里把构建结果编译为不可变的 CompiledGlossary，按 (用户, 选中的词条集合, 语言方向, 词库版本) 缓存：
+- 词条修改、删除时在同一数据库事务中提升词库版本（glossary_versions 表，公共词条提升全局版本，
+  私有词条提升所属用户的版本），查询缓存前读取当前版本，旧缓存自然失效；多进程部署时各进程读取同一份版本
+- 预先计算词库指纹，用于任务检查点等翻译结果缓存的键（词库变化时不复用旧的翻译结果）
+- 预先构建多模式匹配自动机（Aho-Corasick），翻译每页时只把该页出现的词条放入提示词
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+# 语言方向 -> (源文本字段, 目标文本字段)
+LANGUAGE_FIELDS = {
+    ('English', 'Chinese'): ('english', 'chinese'),
+    ('Chinese', 'English'): ('chinese', 'english'),
+    ('English', 'Dutch'): ('english', 'dutch'),
+    ('Dutch', 'English'): ('dutch', 'english'),
+    ('Chinese', 'Dutch'): ('chinese', 'dutch'),
+    ('Dutch', 'Chinese'): ('dutch', 'chinese'),
+}
+
+# 页面文本中区分字体格式的分隔符，匹配词条前去掉，避免词条被格式分段拆开后匹配不到
+BLOCK_MARKER = '[block]'
+
+
+def glossary_fingerprint(entries: Mapping[str, str], source_language: str = '', target_language: str = '') -> str:
+    """词库内容指纹（与词条顺序无关）"""
+    data = json.dumps([source_language, target_language, sorted(entries.items())], ensure_ascii=False)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class GlossaryMatcher:
+    """
+    Aho-Corasick 多模式匹配自动机（不区分大小写）
+    一次扫描文本即可找出所有出现的词条，耗时与词条数量无关
+    """
+
+    def __init__(self, terms: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[str, ...]] = [()]
+        for term in terms:
+            self._add(term)
+        self._build()
+
+    def _add(self, term: str) -> None:
+        key = term.casefold()
+        if not key:
+            return
+        node = 0
+        for char in key:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+            node = next_node
+        self._output[node] += (term,)
+
+    def _build(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, child in self._goto[node].items():
+                pending.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] += self._output[self._fail[child]]
+
+    def find(self, text: str) -> List[str]:
+        """文本中出现的词条（按首次匹配结束的位置排列，不重复）"""
+        found = {}
+        node = 0
+        for char in text.casefold():
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for term in self._output[node]:
+                found.setdefault(term, None)
+        return list(found)
+
+
+class CompiledGlossary(Mapping):
+    """
+    编译后的词库（只读映射 {源文本: 目标文本}）
+    可以直接作为 custom_translations 传给翻译流程；匹配自动机在首次使用时构建
+    """
+
+    def __init__(self, entries: Mapping[str, str], source_language: str = '', target_language: str = ''):
+        self._entries = dict(entries)
+        self.source_language = source_language
+        self.target_language = target_language
+        self.fingerprint = glossary_fingerprint(self._entries, source_language, target_language)
+        self._matcher: Optional[GlossaryMatcher] = None
+        self._matcher_lock = threading.Lock()
+
+    def __getitem__(self, key: str) -> str:
+        return self._entries[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getstate__(self):
+        return {'entries': self._entries, 'source_language': self.source_language,
+                'target_language': self.target_language, 'fingerprint': self.fingerprint}
+
+    def __setstate__(self, state):
+        self._entries = state['entries']
+        self.source_language = state['source_language']
+        self.target_language = state['target_language']
+        self.fingerprint = state['fingerprint']
+        self._matcher = None
+        self._matcher_lock = threading.Lock()
+
+    @property
+    def matcher(self) -> GlossaryMatcher:
+        if self._matcher is None:
+            with self._matcher_lock:
+                if self._matcher is None:
+                    self._matcher = GlossaryMatcher(self._entries)
+        return self._matcher
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(self._entries)
+
+    def terms_in(self, text: str) -> Dict[str, str]:
+        """文本中出现的词条"""
+        if not self._entries or not text:
+            return {}
+        return {term: self._entries[term] for term in self.matcher.find(text.replace(BLOCK_MARKER, ''))}
+
+    def merged(self, extra: Mapping[str, str]) -> 'CompiledGlossary':
+        """合并用户手动输入的词条（同名时以手动输入为准）"""
+        if not extra:
+            return self
+        entries = dict(self._entries)
+        entries.update(extra)
+        return CompiledGlossary(entries, self.source_language, self.target_language)
+
+
+def build_entries(rows: Iterable, source_language: str, target_language: str) -> Dict[str, str]:
+    """按语言方向从词条记录构建 {源文本: 目标文本}，不支持的语言方向返回空字典"""
+    fields = LANGUAGE_FIELDS.get((source_language, target_language))
+    entries = {}
+    if fields is None:
+        return entries
+    source_field, target_field = fields
+    for row in rows:
+        source_text = getattr(row, source_field)
+        target_text = getattr(row, target_field)
+        # 确保源文本和目标文本都存在且不为空
+        if source_text and target_text and source_text.strip() and target_text.strip():
+            entries[source_text.strip()] = target_text.strip()
+    return entries
+
+
+class GlossaryService:
+    """
+    每个用户选中词库的编译缓存（LRU + TTL）
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._cache: 'OrderedDict[tuple, Tuple[float, CompiledGlossary]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def invalidate(user_id: Optional[int] = None, public: bool = False) -> None:
+        """
+        词条修改、删除时在提交之前调用（版本号与词条修改在同一事务中提交，回滚时一起回滚）：
+        公共词条的修改影响所有用户，私有词条只影响所属用户
+        新增词条不需要调用（缓存按词条ID集合区分，新增的词条一定不在已缓存的集合中）
+        """
+        from ..models import GlossaryVersion, db
+        from ..models.glossary_version import PUBLIC_SCOPE
+
+        scope_id = PUBLIC_SCOPE if public or user_id is None else user_id
+        bump = {GlossaryVersion.version: GlossaryVersion.version + 1}
+        if db.session.query(GlossaryVersion).filter_by(scope_id=scope_id).update(bump, synchronize_session=False):
+            return
+        try:
+            # 该范围第一次修改：插入版本行，并发插入时改为递增对方插入的行
+            with db.session.begin_nested():
+                db.session.add(GlossaryVersion(scope_id=scope_id, version=1))
+        except IntegrityError:
+            db.session.query(GlossaryVersion).filter_by(scope_id=scope_id).update(bump, synchronize_session=False)
+
+    @staticmethod
+    def current_versions(user_id: int) -> Tuple[int, int]:
+        """
+        从数据库读取 (全局版本, 用户版本)（按主键查询两行）
+
+        Returns:
+            (全局版本, 用户版本)，没有修改过时为 0
+        """
+        from ..models import GlossaryVersion, db
+        from ..models.glossary_version import PUBLIC_SCOPE
+
+        rows = dict(db.session.query(GlossaryVersion.scope_id, GlossaryVersion.version)
+                    .filter(GlossaryVersion.scope_id.in_((PUBLIC_SCOPE, user_id))).all())
+        return rows.get(PUBLIC_SCOPE, 0), rows.get(user_id, 0)
+
+    @staticmethod
+    def _key(user_id: int, vocabulary_ids: Iterable[int], source_language: str, target_language: str,
+             versions: Tuple[int, int]) -> tuple:
+        return (user_id, frozenset(vocabulary_ids), source_language, target_language) + tuple(versions)
+
+    def get(self, user_id: int, vocabulary_ids: Iterable[int], source_language: str, target_language: str,
+            loader) -> CompiledGlossary:
+        """
+        获取编译后的词库，缓存未命中时调用 loader(vocabulary_ids) 查询词条记录
+
+        Args:
+            loader: 按词条ID列表返回该用户可见词条记录的函数（只在未命中时访问数据库）
+        """
+        vocabulary_ids = sorted(set(vocabulary_ids))
+        key = self._key(user_id, vocabulary_ids, source_language, target_language, self.current_versions(user_id))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and time.time() - cached[0] <= self.ttl_seconds:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        rows = loader(vocabulary_ids) if vocabulary_ids else []
+        glossary = CompiledGlossary(build_entries(rows, source_language, target_language),
+                                    source_language, target_language)
+        logger.info(f"编译词库: 用户 {user_id}, {len(vocabulary_ids)} 个词条ID, "
+                    f"{source_language}->{target_language}, {len(glossary)} 个词汇对, 指纹 {glossary.fingerprint[:12]}")
+
+        with self._lock:
+            # 查询期间词库版本可能已变化，按查询前读取的版本写入，之后的请求不会命中
+            self._cache[key] = (time.time(), glossary)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return glossary
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+# 执行翻译时按指纹复用编译结果（任务参数中保存的是普通字典），避免同一词库重复构建匹配自动机
+_compiled_by_fingerprint: 'OrderedDict[str, CompiledGlossary]' = OrderedDict()
+_compiled_lock = threading.Lock()
+_COMPILED_KEEP = 64
+
+
+def compiled_glossary(entries: Mapping[str, str], fingerprint: Optional[str] = None,
+                      source_language: str = '', target_language: str = '') -> CompiledGlossary:
+    """
+    把任务中的词典转换为 CompiledGlossary
+
+    Args:
+        fingerprint: 上传时计算的指纹，提供时直接按指纹查找，不需要重新计算
+    """
+    if isinstance(entries, CompiledGlossary):
+        return entries
+    fingerprint = fingerprint or glossary_fingerprint(entries, source_language, target_language)
+    with _compiled_lock:
+        glossary = _compiled_by_fingerprint.get(fingerprint)
+        if glossary is not None:
+            _compiled_by_fingerprint.move_to_end(fingerprint)
+            return glossary
+    glossary = CompiledGlossary(entries, source_language, target_language)
+    glossary.fingerprint = fingerprint
+    with _compiled_lock:
+        _compiled_by_fingerprint[fingerprint] = glossary
+        while len(_compiled_by_fingerprint) > _COMPILED_KEEP:
+            _compiled_by_fingerprint.popitem(last=False)
+    return glossary
+
+
+glossary_service = GlossaryService(
+    max_entries=int(os.getenv('GLOSSARY_CACHE_SIZE', '256')),
+    ttl_seconds=float(os.getenv('GLOSSARY_CACHE_TTL', '300'))
+)
@@ -0,0 +1,307 @@
+"""
+词库Excel批量导入
+原实现先用 openpyxl 加载整个工作簿、把所有行解析到列表中，再对每一行单独查询是否已存在（2万行即2万次SELECT），
+最后逐个 session.add 并一次提交。这里改为流水线方式：
+- 以只读模式逐行读取工作表，不加载整个工作簿
+- 每 chunk_size 行为一批，用分批的 IN 查询预取这一批中已存在的英文词条
+- 新词条用 bulk_insert_mappings 插入，每批提交一次，单批失败只影响该批
+- 每批完成后通过回调报告进度，供前端轮询
+已存在的词条与原实现一样跳过并计入失败（不覆盖已有翻译）
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, Callable, Iterator, List, Optional, Set, Tuple
+
+import openpyxl
+
+from ..models import Translation, db
+
+logger = logging.getLogger(__name__)
+
+EXPECTED_HEADERS = ['english', 'chinese', 'dutch', 'category', 'is_public']
+DEFAULT_CHUNK_SIZE = 1000
+# IN 查询每次最多携带的参数个数（SQLite 旧版本上限为999）
+IN_QUERY_BATCH = 500
+
+
+class GlossaryImportError(Exception):
+    """文件无法解析（表头不匹配等），整个导入不执行"""
+
+    def __init__(self, errors: List[str]):
+        super().__init__('; '.join(errors))
+        self.errors = errors
+
+
+def _parse_is_public(value, is_admin: bool) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, str):
+        result = value.lower() in ('1', 'true', 'yes', '是')
+    elif isinstance(value, (int, float)):
+        result = bool(value)
+    else:
+        result = False
+    # 普通用户不能添加公共翻译
+    return result and is_admin
+
+
+def iter_excel_rows(file_path: str, is_admin: bool) -> Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    以只读模式逐行读取词库Excel
+
+    Yields:
+        (行号, 词条数据, 错误信息)：有效行的错误信息为 None，无效行的词条数据为 None；
+        空行不返回
+
+    Raises:
+        GlossaryImportError: 表头不匹配
+    """
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        rows = ws.iter_rows(values_only=True)
+        header_row = next(rows, ())
+        actual_headers = []
+        for col in range(len(EXPECTED_HEADERS)):
+            cell_value = header_row[col] if col < len(header_row) else None
+            actual_headers.append(str(cell_value).strip().lower() if cell_value else '')
+        if actual_headers != EXPECTED_HEADERS:
+            raise GlossaryImportError([f"表头不匹配。期望: {EXPECTED_HEADERS}, 实际: {actual_headers}"])
+
+        for row_num, values in enumerate(rows, 2):
+            try:
+                row_data = {}
+                has_data = False
+                for col, header in enumerate(EXPECTED_HEADERS):
+                    cell_value = values[col] if col < len(values) else None
+                    if isinstance(cell_value, str):
+                        cell_value = cell_value.strip()
+                    row_data[header] = cell_value
+                    if header in ('english', 'chinese') and cell_value:
+                        has_data = True
+
+                # 检查必填字段
+                if not row_data.get('english') or not row_data.get('chinese'):
+                    if has_data:  # 如果有其他数据但必填字段为空
+                        yield row_num, None, f"第{row_num}行: 英文和中文为必填字段"
+                    continue
+
+                row_data['is_public'] = _parse_is_public(row_data.get('is_public'), is_admin)
+                yield row_num, row_data, None
+            except Exception as e:
+                yield row_num, None, f"第{row_num}行解析失败: {str(e)}"
+    finally:
+        wb.close()
+
+
+def validate_excel_file(file_path: str, is_admin: bool) -> Tuple[int, List[str]]:
+    """
+    逐行检查整个文件（不访问数据库），与原实现一样有错误时不导入任何数据
+
+    Returns:
+        (有效行数, 错误信息列表)
+    """
+    valid_rows = 0
+    errors = []
+    try:
+        for _, item, error in iter_excel_rows(file_path, is_admin):
+            if error:
+                errors.append(error)
+            else:
+                valid_rows += 1
+    except GlossaryImportError as e:
+        errors.extend(e.errors)
+    return valid_rows, errors
+
+
+def _existing_keys(user_id: int, public_english: List[str], private_english: List[str]) -> Tuple[Set[str], Set[str]]:
+    """
+    预取这一批中已存在的英文词条
+
+    Returns:
+        (已存在的公共词条英文, 当前用户已存在的词条英文)
+    """
+    existing_public, existing_private = set(), set()
+    for start in range(0, len(public_english), IN_QUERY_BATCH):
+        batch = public_english[start:start + IN_QUERY_BATCH]
+        rows = db.session.query(Translation.english).filter(
+            Translation.is_public == True,  # noqa: E712
+            Translation.english.in_(batch)
+        ).all()
+        existing_public.update(row[0] for row in rows)
+    for start in range(0, len(private_english), IN_QUERY_BATCH):
+        batch = private_english[start:start + IN_QUERY_BATCH]
+        rows = db.session.query(Translation.english).filter(
+            Translation.user_id == user_id,
+            Translation.english.in_(batch)
+        ).all()
+        existing_private.update(row[0] for row in rows)
+    return existing_public, existing_private
+
+
+class GlossaryImporter:
+    """
+    按批导入词条
+
+    查重规则与原实现一致：管理员导入的公共词条按英文在公共词条中查重，
+    其他词条按英文在当前用户的词条中查重；同一文件中重复的英文也只导入第一条
+    """
+
+    def __init__(self, user_id: int, is_admin: bool, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.chunk_size = max(1, chunk_size)
+        self.progress_callback = progress_callback
+        self.success_count = 0
+        self.error_count = 0
+        self.processed_rows = 0
+        self.errors: List[str] = []
+        # 本次导入中已插入的英文，用于文件内查重
+        self._seen_public: Set[str] = set()
+        self._seen_private: Set[str] = set()
+
+    def _report(self, total_rows: int, done: bool = False) -> None:
+        if self.progress_callback:
+            self.progress_callback({
+                'processed_rows': self.processed_rows,
+                'total_rows': max(total_rows, self.processed_rows),
+                'success_count': self.success_count,
+                'error_count': self.error_count,
+                'done': done,
+            })
+
+    def _flush(self, chunk: List[Tuple[int, Dict[str, Any]]]) -> None:
+        public_keys = list({item['english'] for _, item in chunk if item['is_public']})
+        private_keys = list({item['english'] for _, item in chunk if not item['is_public']})
+        try:
+            existing_public, existing_private = _existing_keys(self.user_id, public_keys, private_keys)
+        except Exception as e:
+            db.session.rollback()
+            self.error_count += len(chunk)
+            self.errors.append(f"第{chunk[0][0]}-{chunk[-1][0]}行查询已有词条失败: {str(e)}")
+            return
+
+        mappings = []
+        inserted_public, inserted_private = set(), set()
+        for _, item in chunk:
+            english = item['english']
+            if item['is_public']:
+                exists = english in existing_public or english in self._seen_public or english in inserted_public
+            else:
+                exists = (english in existing_private or english in self._seen_private
+                          or english in inserted_private or english in inserted_public)
+            if exists:
+                self.error_count += 1
+                self.errors.append(f"英文 '{english}' 已存在")
+                continue
+            mappings.append({
+                'english': english,
+                'chinese': item['chinese'],
+                'dutch': item.get('dutch'),
+                'category': item.get('category'),
+                'is_public': item['is_public'],
+                'user_id': self.user_id,
+            })
+            (inserted_public if item['is_public'] else inserted_private).add(english)
+
+        if not mappings:
+            return
+        try:
+            db.session.bulk_insert_mappings(Translation, mappings)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            self.error_count += len(mappings)
+            self.errors.append(f"第{chunk[0][0]}-{chunk[-1][0]}行写入数据库失败: {str(e)}")
+            return
+        self.success_count += len(mappings)
+        # 公共词条的创建者也是当前用户，之后同一英文的私有词条同样视为已存在
+        self._seen_public.update(inserted_public)
+        self._seen_private.update(inserted_public)
+        self._seen_private.update(inserted_private)
+
+    def run(self, rows: Iterator[Tuple[int, Optional[Dict[str, Any]], Optional[str]]],
+            total_rows: int = 0) -> Dict[str, Any]:
+        """
+        导入 iter_excel_rows 产生的行
+
+        Returns:
+            {'success_count', 'error_count', 'errors', 'processed_rows', 'elapsed'}
+        """
+        started = time.time()
+        chunk: List[Tuple[int, Dict[str, Any]]] = []
+        self._report(total_rows)
+        for row_num, item, error in rows:
+            self.processed_rows += 1
+            if error:
+                self.error_count += 1
+                self.errors.append(error)
+                continue
+            chunk.append((row_num, item))
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+                self._report(total_rows)
+        if chunk:
+            self._flush(chunk)
+        self._report(total_rows, done=True)
+
+        elapsed = time.time() - started
+        logger.info(f"词库导入完成: 用户 {self.user_id}, 处理 {self.processed_rows} 行, "
+                    f"成功 {self.success_count}, 失败 {self.error_count}, 耗时 {elapsed:.2f}秒")
+        return {
+            'success_count': self.success_count,
+            'error_count': self.error_count,
+            'errors': self.errors,
+            'processed_rows': self.processed_rows,
+            'elapsed': round(elapsed, 2),
+        }
+
+
+class ImportProgressRegistry:
+    """
+    进行中导入的进度（本进程内），前端上传时附带 import_id，上传请求处理期间轮询进度接口
+    """
+
+    def __init__(self, keep_seconds: float = 600):
+        self._lock = threading.Lock()
+        self._progress: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self.keep_seconds = keep_seconds
+
+    def update(self, user_id: int, import_id: str, progress: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._progress[(user_id, import_id)] = dict(progress, updated_at=now)
+            expired = [key for key, value in self._progress.items()
+                       if now - value['updated_at'] > self.keep_seconds]
+            for key in expired:
+                del self._progress[key]
+
+    def get(self, user_id: int, import_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            progress = self._progress.get((user_id, import_id))
+            return dict(progress) if progress else None
+
+
+import_progress = ImportProgressRegistry()
+
+
+def import_glossary_excel(file_path: str, user_id: int, is_admin: bool, total_rows: int = 0,
+                          import_id: Optional[str] = None,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    导入已通过 validate_excel_file 检查的词库Excel文件
+
+    Args:
+        total_rows: 有效行数（用于进度显示）
+        import_id: 前端生成的导入标识，提供时在 import_progress 中记录进度
+    """
+    callback = None
+    if import_id:
+        def callback(progress):
+            import_progress.update(user_id, import_id, progress)
+
+    importer = GlossaryImporter(user_id, is_admin, chunk_size=chunk_size, progress_callback=callback)
+    return importer.run(iter_excel_rows(file_path, is_admin), total_rows=total_rows)
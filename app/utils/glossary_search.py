@@ -0,0 +1,159 @@
+"""
+词库全文检索
+/api/translations 的搜索原来对四个字段执行 ILIKE '%关键词%'，每次都要扫描整张词库表。
+这里为词库表建立子串索引，并按相关度排序结果：
+- SQLite: FTS5 外部内容表（trigram 分词，支持任意位置的子串匹配），
+  由词库表上的触发器同步，新增、修改、删除和批量导入都不需要额外处理
+- MySQL: InnoDB FULLTEXT 索引（ngram 分词），由数据库自动维护
+关键词短于分词长度、数据库不支持或索引创建失败时回退到 ILIKE 扫描
+"""
+import os
+import logging
+from typing import Optional
+
+from sqlalchemy import text, inspect, Integer, Float
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'translation'
+FTS_TABLE = 'translation_fts'
+MYSQL_INDEX = 'ft_translation_search'
+SEARCH_COLUMNS = ('english', 'chinese', 'dutch', 'category')
+
+# trigram 分词的最短可索引长度；MySQL ngram_token_size 默认为2
+MIN_TERM_LENGTH = {'fts5': 3, 'mysql_ngram': 2}
+
+_COLUMNS = ', '.join(SEARCH_COLUMNS)
+_NEW_VALUES = ', '.join(f'new.{column}' for column in SEARCH_COLUMNS)
+_OLD_VALUES = ', '.join(f'old.{column}' for column in SEARCH_COLUMNS)
+
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{_COLUMNS}, content='{TABLE}', content_rowid='id', tokenize='trigram')"
+)
+SQLITE_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_COLUMNS} ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); "
+    f"INSERT INTO {FTS_TABLE}(rowid, {_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+)
+SQLITE_REBUILD = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+# bm25 越小越相关
+SQLITE_MATCH = (
+    f"SELECT rowid AS id, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} "
+    f"WHERE {FTS_TABLE} MATCH :match"
+)
+
+MYSQL_DDL = f"ALTER TABLE {TABLE} ADD FULLTEXT INDEX {MYSQL_INDEX} ({_COLUMNS}) WITH PARSER ngram"
+_MYSQL_AGAINST = f"MATCH ({_COLUMNS}) AGAINST (:match IN BOOLEAN MODE)"
+# MATCH 的相关度越大越相关，取负值后与 SQLite 一样按升序排列
+MYSQL_MATCH = f"SELECT id, -{_MYSQL_AGAINST} AS score FROM {TABLE} WHERE {_MYSQL_AGAINST}"
+
+# 当前使用的检索方式: 'fts5' / 'mysql_ngram' / 'like'
+_mode = 'like'
+
+
+def search_mode() -> str:
+    return _mode
+
+
+def _init_sqlite(engine) -> bool:
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first() is not None
+        conn.execute(text(SQLITE_FTS_DDL))
+        for trigger in SQLITE_TRIGGERS:
+            conn.execute(text(trigger))
+        if not exists:
+            # 新建索引时导入已有词条
+            conn.execute(text(SQLITE_REBUILD))
+            logger.info("词库全文索引已创建并导入现有词条")
+    return True
+
+
+def _init_mysql(engine) -> bool:
+    indexes = inspect(engine).get_indexes(TABLE)
+    if any(index.get('name') == MYSQL_INDEX for index in indexes):
+        return True
+    with engine.begin() as conn:
+        conn.execute(text(MYSQL_DDL))
+    logger.info("词库全文索引已创建")
+    return True
+
+
+def init_glossary_search(engine, enabled: Optional[bool] = None) -> str:
+    """
+    创建词库全文索引（已存在时跳过），在 db.create_all() 之后调用
+
+    Args:
+        engine: SQLAlchemy 引擎
+        enabled: 是否使用索引检索，默认读取环境变量 GLOSSARY_SEARCH_INDEX
+
+    Returns:
+        实际使用的检索方式
+    """
+    global _mode
+    if enabled is None:
+        enabled = os.getenv('GLOSSARY_SEARCH_INDEX', 'true').lower() == 'true'
+    _mode = 'like'
+    if not enabled:
+        logger.info("词库全文索引已禁用，搜索使用 LIKE 扫描")
+        return _mode
+
+    try:
+        if engine.dialect.name == 'sqlite':
+            if _init_sqlite(engine):
+                _mode = 'fts5'
+        elif engine.dialect.name == 'mysql':
+            if _init_mysql(engine):
+                _mode = 'mysql_ngram'
+        else:
+            logger.info(f"数据库 {engine.dialect.name} 不支持词库全文索引，搜索使用 LIKE 扫描")
+    except SQLAlchemyError as e:
+        # 例如 SQLite 未编译 trigram 分词器（3.34 以前）或 MySQL 不支持 ngram 解析器
+        logger.warning(f"创建词库全文索引失败，搜索使用 LIKE 扫描: {str(e)}")
+        _mode = 'like'
+    else:
+        if _mode != 'like':
+            logger.info(f"词库搜索使用全文索引: {_mode}")
+    return _mode
+
+
+def _match_expression(term: str) -> str:
+    """将关键词转换为短语查询（按子串匹配，关键词中的运算符不生效）"""
+    if _mode == 'fts5':
+        return '"' + term.replace('"', '""') + '"'
+    return '"' + term.replace('"', ' ') + '"'
+
+
+def ranked_search_query(query, model, term: str):
+    """
+    在词条查询上加入全文检索条件，结果按相关度排序（相关度相同时新词条在前）
+
+    Args:
+        query: 已加上可见范围条件的 Translation 查询
+        model: Translation 模型
+        term: 搜索关键词
+
+    Returns:
+        加上检索条件和排序的查询；无法使用索引时返回 None，由调用方使用 ILIKE
+    """
+    term = (term or '').strip()
+    min_length = MIN_TERM_LENGTH.get(_mode)
+    if min_length is None or len(term) < min_length:
+        return None
+    sql = SQLITE_MATCH if _mode == 'fts5' else MYSQL_MATCH
+    matched = (
+        text(sql)
+        .bindparams(match=_match_expression(term))
+        .columns(id=Integer, score=Float)
+        .subquery('glossary_match')
+    )
+    return (query.join(matched, model.id == matched.c.id)
+            .order_by(matched.c.score, model.id.desc()))
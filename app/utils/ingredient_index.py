@@ -0,0 +1,205 @@
+"""
+保健食品成分搜索索引
+原实现每次搜索遍历注册和备案数据中的全部产品，逐个把成分和产品名称转为小写做子串匹配，
+再对匹配结果重新切分成分生成摘要，最后才分页。这里在加载数据时建立一次索引：
+- 预先计算每个产品的小写产品名称、小写成分和主要成分摘要
+- 按字符二元组（bigram）建立倒排索引，中文按单个汉字切分（不依赖分词），英文同样按字符切分；
+  单字关键词使用单字倒排表
+- 查询时取关键词各二元组倒排表的交集作为候选，再用子串匹配确认（结果与原实现的子串匹配一致）
+- 先分页，只为当前页的产品生成返回结果
+"""
+import logging
+import threading
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SOURCE_REGISTRATION = '注册'
+SOURCE_FILING = '备案'
+
+NO_IMAGE_PATH = '无截图路径'
+NO_INGREDIENT = '无成分信息'
+
+
+def ingredient_summary(ingredients: str) -> str:
+    """主要成分摘要：前3个成分，超过3个时加“等”"""
+    if not ingredients:
+        return NO_INGREDIENT
+    parts = [ing.strip() for ing in ingredients.split(',')]
+    return "、".join(parts[:3]) + ("等" if len(parts) > 3 else "")
+
+
+def bigrams(text: str) -> set:
+    """文本中的字符二元组"""
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def merge_sources(registration: Dict[str, dict], filing: Dict[str, dict]) -> List[Tuple[str, str, dict, str]]:
+    """
+    合并注册和备案数据（与原 load_both_ingredient_data 的合并规则一致：备案产品与注册产品同名时加“(备案)”后缀）
+
+    Returns:
+        [(合并后的产品名称, 原产品名称, 产品信息, 数据源)]
+    """
+    merged: Dict[str, Tuple[str, dict, str]] = {}
+    for product_name, product_info in registration.items():
+        merged[product_name] = (product_name, product_info, SOURCE_REGISTRATION)
+    for product_name, product_info in filing.items():
+        name = f"{product_name}(备案)" if product_name in merged else product_name
+        merged[name] = (product_name, product_info, SOURCE_FILING)
+    return [(name, raw_name, info, source) for name, (raw_name, info, source) in merged.items()]
+
+
+class IngredientIndex:
+    """
+    成分搜索索引（只读，建立后可在多个线程中同时查询）
+    产品按合并后的顺序编号（注册在前、备案在后），查询结果按编号排列，与原实现的遍历顺序一致
+    """
+
+    def __init__(self, products: Iterable[Tuple[str, str, dict, str]]):
+        """
+        Args:
+            products: merge_sources 返回的产品列表
+        """
+        self.names: List[str] = []
+        self.raw_names: List[str] = []
+        self.ingredients: List[str] = []
+        self.summaries: List[str] = []
+        self.paths: List[str] = []
+        self.detail_urls: List[str] = []
+        self.sources: List[str] = []
+        self._names_lower: List[str] = []
+        self._raw_names_lower: List[str] = []
+        self._ingredients_lower: List[str] = []
+        self._postings: Dict[str, array] = {}
+
+        for doc_id, (name, raw_name, info, source) in enumerate(products):
+            ingredients = info.get('ingredient', '') or ''
+            self.names.append(name)
+            self.raw_names.append(raw_name)
+            self.ingredients.append(ingredients)
+            self.summaries.append(ingredient_summary(ingredients))
+            self.paths.append(info.get('path', NO_IMAGE_PATH))
+            self.detail_urls.append(info.get('detail_url', ''))
+            self.sources.append(source)
+
+            name_lower = name.lower()
+            ingredients_lower = ingredients.lower()
+            self._names_lower.append(name_lower)
+            self._raw_names_lower.append(raw_name.lower())
+            self._ingredients_lower.append(ingredients_lower)
+
+            # 产品名称和成分分别切分，不产生跨越两者的二元组
+            grams = bigrams(name_lower) | bigrams(ingredients_lower)
+            grams.update(name_lower)
+            grams.update(ingredients_lower)
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    posting = self._postings[gram] = array('I')
+                posting.append(doc_id)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _candidates(self, keyword: str) -> List[int]:
+        """关键词各二元组倒排表的交集（按编号排序）"""
+        grams = bigrams(keyword) if len(keyword) > 1 else {keyword}
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result.intersection_update(posting)
+            if not result:
+                return []
+        return sorted(result)
+
+    def search(self, keyword: str, data_source: str = 'all') -> List[int]:
+        """
+        产品名称或成分中包含关键词的产品编号（不区分大小写）
+
+        Args:
+            data_source: 'registration' 只查注册数据，'filing' 只查备案数据，其他值查全部
+        """
+        keyword = keyword.lower()
+        if not keyword:
+            return []
+        source = {'registration': SOURCE_REGISTRATION, 'filing': SOURCE_FILING}.get(data_source)
+        # 只查单个数据源时与原实现一样匹配原产品名称（不含“(备案)”后缀）
+        names_lower = self._raw_names_lower if source else self._names_lower
+        candidates = self._candidates(keyword)
+        ingredients_lower = self._ingredients_lower
+        sources = self.sources
+        return [doc_id for doc_id in candidates
+                if (source is None or sources[doc_id] == source)
+                and (keyword in ingredients_lower[doc_id] or keyword in names_lower[doc_id])]
+
+    def product(self, doc_id: int, data_source: str = 'all') -> Dict[str, str]:
+        """产品的基本字段（data_source 为单个数据源时使用原产品名称）"""
+        single_source = data_source in ('registration', 'filing')
+        return {
+            'name': self.raw_names[doc_id] if single_source else self.names[doc_id],
+            'summary': self.summaries[doc_id],
+            'ingredients': self.ingredients[doc_id],
+            'path': self.paths[doc_id],
+            'detail_url': self.detail_urls[doc_id],
+            'source': self.sources[doc_id],
+        }
+
+    def page(self, keyword: str, data_source: str = 'all', offset: int = 0,
+             limit: int = 12) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        分页查询（只为当前页的产品生成结果）
+
+        Returns:
+            (匹配总数, 当前页产品列表)
+        """
+        matched_ids = self.search(keyword, data_source)
+        return len(matched_ids), [self.product(doc_id, data_source)
+                                  for doc_id in matched_ids[offset:offset + limit]]
+
+    def iter_postings(self) -> Iterator[Tuple[str, array]]:
+        """倒排表（供 ingredient_store 写入磁盘）"""
+        return iter(self._postings.items())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'products': len(self.names),
+            'grams': len(self._postings),
+            'postings': sum(len(posting) for posting in self._postings.values()),
+        }
+
+
+class IngredientIndexCache:
+    """按数据文件的标识（路径和修改时间）缓存索引，数据文件更新后重新建立"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._index: Optional[IngredientIndex] = None
+
+    def get(self, key, loader) -> IngredientIndex:
+        """
+        Args:
+            key: 数据文件标识
+            loader: 返回 (注册数据, 备案数据) 的函数，只在需要重新建立索引时调用
+        """
+        index = self._index
+        if index is not None and self._key == key:
+            return index
+        with self._lock:
+            if self._index is None or self._key != key:
+                registration, filing = loader()
+                index = IngredientIndex(merge_sources(registration, filing))
+                logger.info(f"成分搜索索引已建立: {index.stats()}")
+                self._index, self._key = index, key
+            return self._index
+
+
+ingredient_index_cache = IngredientIndexCache()
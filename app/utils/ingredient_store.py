@@ -0,0 +1,267 @@
+"""
+保健食品成分数据的只读SQLite存储
+原实现每个工作进程都要解析完整的注册和备案JSON并常驻内存，启动后第一次搜索还要建立倒排索引。
+这里增加一次性的构建步骤（scripts/build_ingredient_store.py），把两份JSON转换为一个SQLite文件：
+- products 表：每个产品一行（合并后的顺序编号，注册在前、备案在后），包含预先计算的小写文本和主要成分摘要
+- postings 表：字符二元组倒排表，每个二元组的产品编号列表压缩为一个BLOB
+- meta 表：构建时的数据文件大小和修改时间、注册产品数量等
+查询时以只读方式打开文件，只读取用到的倒排表和当前页的产品，进程内存与数据量无关，打开文件只需几毫秒
+"""
+import os
+import sys
+import json
+import sqlite3
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .ingredient_index import IngredientIndex, SOURCE_REGISTRATION, bigrams, merge_sources
+
+logger = logging.getLogger(__name__)
+
+STORE_FILENAME = 'ingredient_store.sqlite3'
+STORE_VERSION = '1'
+# 确认候选产品时每条 IN 查询携带的编号数量
+VERIFY_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    raw_name TEXT NOT NULL,
+    source TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    path TEXT,
+    detail_url TEXT,
+    name_lower TEXT NOT NULL,
+    raw_name_lower TEXT NOT NULL,
+    ingredient_lower TEXT NOT NULL
+);
+CREATE TABLE postings (
+    gram TEXT PRIMARY KEY,
+    ids BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+) WITHOUT ROWID;
+"""
+
+
+def source_signature(paths: List[str]) -> str:
+    """数据文件的大小和修改时间，用于判断存储文件是否需要重新构建"""
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append([os.path.basename(path), stat.st_size, int(stat.st_mtime)])
+        except OSError:
+            signature.append([os.path.basename(path), None, None])
+    return json.dumps(signature, ensure_ascii=False)
+
+
+def build_store(registration_path: str, filing_path: str, output_path: str) -> Dict[str, int]:
+    """
+    把注册和备案JSON构建为SQLite存储文件
+    先写入临时文件再替换，构建期间正在运行的进程仍然读取旧文件
+
+    Returns:
+        索引统计
+    """
+    with open(registration_path, 'r', encoding='utf-8') as f:
+        registration = json.load(f)
+    with open(filing_path, 'r', encoding='utf-8') as f:
+        filing = json.load(f)
+
+    products = merge_sources(registration, filing)
+    index = IngredientIndex(products)
+
+    temp_path = f"{output_path}.building"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+    conn = sqlite3.connect(temp_path)
+    try:
+        conn.executescript(SCHEMA)
+        conn.executemany(
+            "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((doc_id, index.names[doc_id], index.raw_names[doc_id], index.sources[doc_id],
+              index.ingredients[doc_id], index.summaries[doc_id], index.paths[doc_id], index.detail_urls[doc_id],
+              index.names[doc_id].lower(), index.raw_names[doc_id].lower(), index.ingredients[doc_id].lower())
+             for doc_id in range(len(index)))
+        )
+        conn.executemany("INSERT INTO postings VALUES (?, ?)",
+                         ((gram, posting.tobytes()) for gram, posting in index.iter_postings()))
+        meta = {
+            'version': STORE_VERSION,
+            'byteorder': sys.byteorder,
+            'itemsize': str(array('I').itemsize),
+            'products': str(len(index)),
+            'registration_count': str(sum(1 for source in index.sources if source == SOURCE_REGISTRATION)),
+            'renamed_count': str(sum(1 for name, raw_name in zip(index.names, index.raw_names) if name != raw_name)),
+            'source_signature': source_signature([registration_path, filing_path]),
+        }
+        conn.executemany("INSERT INTO meta VALUES (?, ?)", meta.items())
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(temp_path, output_path)
+
+    stats = index.stats()
+    logger.info(f"成分数据存储已构建: {output_path}, {stats}")
+    return stats
+
+
+class IngredientStore:
+    """
+    只读的成分数据存储，查询接口与 IngredientIndex.page 一致
+    每个线程使用单独的只读连接
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connect()
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"成分数据存储版本不匹配: {meta.get('version')}，请重新构建")
+        self.meta = meta
+        self.product_count = int(meta['products'])
+        self.registration_count = int(meta['registration_count'])
+        self.has_renamed = int(meta.get('renamed_count', 0)) > 0
+        self._swap_bytes = meta['byteorder'] != sys.byteorder
+        # 是否已检查过数据文件有无更新（每次打开只检查一次）
+        self.stale_checked = False
+        if int(meta['itemsize']) != array('I').itemsize:
+            raise ValueError("成分数据存储的整数长度与当前平台不一致，请重新构建")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def __len__(self) -> int:
+        return self.product_count
+
+    def is_stale(self, source_paths: List[str]) -> bool:
+        """数据文件在构建后是否有变化"""
+        return self.meta.get('source_signature') != source_signature(source_paths)
+
+    def _posting(self, conn: sqlite3.Connection, gram: str) -> Optional[array]:
+        row = conn.execute("SELECT ids FROM postings WHERE gram = ?", (gram,)).fetchone()
+        if row is None:
+            return None
+        posting = array('I')
+        posting.frombytes(row[0])
+        if self._swap_bytes:
+            posting.byteswap()
+        return posting
+
+    def _id_range(self, data_source: str) -> Tuple[int, int]:
+        """数据源对应的编号范围（注册产品在前、备案产品在后）"""
+        if data_source == 'registration':
+            return 0, self.registration_count
+        if data_source == 'filing':
+            return self.registration_count, self.product_count
+        return 0, self.product_count
+
+    def search(self, keyword: str, data_source: str = 'all') -> List[int]:
+        """产品名称或成分中包含关键词的产品编号（与 IngredientIndex.search 结果一致）"""
+        keyword = keyword.lower()
+        if not keyword:
+            return []
+        conn = self._connect()
+        grams = bigrams(keyword) if len(keyword) > 1 else {keyword}
+        postings = []
+        for gram in grams:
+            posting = self._posting(conn, gram)
+            if posting is None:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+
+        low, high = self._id_range(data_source)
+        if len(postings) == 1:
+            candidates = [doc_id for doc_id in postings[0] if low <= doc_id < high]
+        else:
+            result = {doc_id for doc_id in postings[0] if low <= doc_id < high}
+            for posting in postings[1:]:
+                result.intersection_update(posting)
+                if not result:
+                    return []
+            candidates = sorted(result)
+
+        # 关键词不超过两个字符时，它的单字或二元组倒排表就是精确结果；更长的关键词即使只有一个
+        # 不同的二元组（如“哈哈哈”）也要按完整关键词确认。只查备案数据且有改名的产品时，
+        # 倒排表按合并后的名称建立，仍需按原产品名称确认
+        if len(keyword) <= 2 and not (data_source == 'filing' and self.has_renamed):
+            return candidates
+
+        name_column = 'raw_name_lower' if data_source in ('registration', 'filing') else 'name_lower'
+        matched = []
+        for start in range(0, len(candidates), VERIFY_BATCH):
+            batch = candidates[start:start + VERIFY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = conn.execute(
+                f"SELECT id FROM products WHERE id IN ({placeholders}) "
+                f"AND (instr(ingredient_lower, ?) > 0 OR instr({name_column}, ?) > 0) ORDER BY id",
+                (*batch, keyword, keyword)
+            ).fetchall()
+            matched.extend(row[0] for row in rows)
+        return matched
+
+    def products(self, doc_ids: List[int], data_source: str = 'all') -> List[Dict[str, str]]:
+        """按编号读取产品（字段与 IngredientIndex.product 一致）"""
+        if not doc_ids:
+            return []
+        name_column = 'raw_name' if data_source in ('registration', 'filing') else 'name'
+        placeholders = ','.join('?' * len(doc_ids))
+        rows = self._connect().execute(
+            f"SELECT id, {name_column}, summary, ingredient, path, detail_url, source "
+            f"FROM products WHERE id IN ({placeholders})", doc_ids
+        ).fetchall()
+        by_id = {row[0]: {'name': row[1], 'summary': row[2], 'ingredients': row[3], 'path': row[4],
+                          'detail_url': row[5], 'source': row[6]} for row in rows}
+        return [by_id[doc_id] for doc_id in doc_ids if doc_id in by_id]
+
+    def page(self, keyword: str, data_source: str = 'all', offset: int = 0,
+             limit: int = 12) -> Tuple[int, List[Dict[str, str]]]:
+        """
+        分页查询
+
+        Returns:
+            (匹配总数, 当前页产品列表)
+        """
+        matched_ids = self.search(keyword, data_source)
+        return len(matched_ids), self.products(matched_ids[offset:offset + limit], data_source)
+
+
+_store_lock = threading.Lock()
+_stores: Dict[Tuple[str, float], IngredientStore] = {}
+
+
+def open_store(path: str) -> Optional[IngredientStore]:
+    """
+    打开存储文件（按路径和修改时间缓存，重新构建后自动打开新文件），文件不存在时返回 None
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    key = (path, mtime)
+    store = _stores.get(key)
+    if store is not None:
+        return store
+    with _store_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = IngredientStore(path)
+            _stores.clear()
+            _stores[key] = store
+            logger.info(f"已打开成分数据存储: {path}, 产品 {len(store)} 个")
+    return store
+
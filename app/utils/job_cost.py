@@ -0,0 +1,213 @@
+"""
+翻译任务成本估算
+上传时直接读取PPTX压缩包中的幻灯片XML（不解析完整文档），统计幻灯片数、文本量和图片数，
+结合OCR开关估算任务消耗的LLM tokens、OCR调用次数和Office处理时间（LibreOffice转换、python-pptx读写）。
+任务队列按这些成本的预算而不是任务数量进行准入和调度，并据此估算排队任务的开始时间
+"""
+import os
+import re
+import heapq
+import zipfile
+import logging
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 任务记录中的成本字段（cost_slides 为需要处理的页数，用于按历史记录预测耗时，见 eta_model）
+COST_FIELDS = ('cost_tokens', 'cost_ocr_calls', 'cost_office_seconds', 'cost_seconds', 'cost_slides')
+# 参与预算检查的资源维度（cost_seconds 是单个任务的预计耗时，只用于估算等待时间）
+BUDGET_FIELDS = ('cost_tokens', 'cost_ocr_calls', 'cost_office_seconds')
+
+# 估算参数：按现有模型和LibreOffice的实测量级设定
+CHARS_PER_TOKEN = 2.5             # 中英文混合文本平均每token字符数
+PAGE_PROMPT_TOKENS = 600          # 每页翻译请求的提示词开销
+OCR_TRANSLATE_TOKENS = 400        # 每张图片OCR文本的翻译开销
+LLM_TOKENS_PER_SECOND = 150.0     # 单个任务的翻译吞吐（含并发翻译的页面）
+OCR_SECONDS_PER_CALL = 6.0        # 每次OCR调用耗时
+OFFICE_BASE_SECONDS = 5.0         # ODP转换、打开与保存的固定开销
+OFFICE_SECONDS_PER_SLIDE = 0.4    # 每页的转换、加载和写入耗时
+UNO_SECONDS_PER_SLIDE = 0.3       # 启用UNO格式转换时每页的额外耗时
+SECONDS_PER_MB = 4.0              # 无法读取PPTX结构时按文件大小估算
+
+_SLIDE_NAME = re.compile(r'^ppt/slides/slide(\d+)\.xml$')
+_TEXT_RUN = re.compile(rb'<a:t>([^<]*)</a:t>')
+_PICTURE = re.compile(rb'<p:pic[\s>]')
+
+
+def _empty_cost() -> Dict[str, float]:
+    return {field: 0.0 for field in COST_FIELDS}
+
+
+def _scan_pptx(file_path: str, select_page: Optional[List[int]]) -> Tuple[int, int, int]:
+    """
+    统计幻灯片数、文本字符数和图片数
+
+    Args:
+        select_page: 选择的页码（从1开始），为空时统计全部页面
+
+    Returns:
+        (幻灯片数, 字符数, 图片数)
+    """
+    selected = set(select_page) if select_page else None
+    slides = chars = pictures = 0
+    with zipfile.ZipFile(file_path) as archive:
+        for name in archive.namelist():
+            match = _SLIDE_NAME.match(name)
+            if not match:
+                continue
+            if selected is not None and int(match.group(1)) not in selected:
+                continue
+            xml = archive.read(name)
+            slides += 1
+            chars += sum(len(text.decode('utf-8', 'ignore')) for text in _TEXT_RUN.findall(xml))
+            pictures += len(_PICTURE.findall(xml))
+    return slides, chars, pictures
+
+
+def estimate_job_cost(file_path: str, task_type: str = 'ppt_translate',
+                      select_page: Optional[List[int]] = None,
+                      enable_text_splitting: str = "False",
+                      enable_uno_conversion: bool = True) -> Dict[str, Any]:
+    """
+    估算任务成本
+
+    Returns:
+        成本字典：cost_tokens（LLM tokens）、cost_ocr_calls（OCR调用次数）、
+        cost_office_seconds（Office处理秒数）、cost_seconds（单独执行时的预计耗时）、
+        cost_slides（页数），以及统计到的 slides、chars、pictures
+    """
+    cost = _empty_cost()
+    cost.update(slides=0, chars=0, pictures=0)
+    try:
+        file_size = os.path.getsize(file_path)
+    except OSError:
+        file_size = 0
+
+    if task_type == 'ppt_translate' and file_path.lower().endswith('.pptx'):
+        try:
+            slides, chars, pictures = _scan_pptx(file_path, select_page)
+            ocr_enabled = enable_text_splitting != "False"
+            ocr_calls = pictures if ocr_enabled else 0
+            tokens = chars / CHARS_PER_TOKEN * 2 + slides * PAGE_PROMPT_TOKENS + ocr_calls * OCR_TRANSLATE_TOKENS
+            office = OFFICE_BASE_SECONDS + slides * (
+                OFFICE_SECONDS_PER_SLIDE + (UNO_SECONDS_PER_SLIDE if enable_uno_conversion else 0))
+            cost.update(slides=slides, chars=chars, pictures=pictures, cost_slides=slides,
+                        cost_tokens=round(tokens), cost_ocr_calls=ocr_calls,
+                        cost_office_seconds=round(office, 1))
+            # 图片OCR与文本翻译同时执行，耗时取两者中较长的一个
+            cost['cost_seconds'] = round(office + max(tokens / LLM_TOKENS_PER_SECOND,
+                                                      ocr_calls * OCR_SECONDS_PER_CALL), 1)
+            return cost
+        except (zipfile.BadZipFile, OSError, KeyError) as e:
+            logger.warning(f"读取PPTX结构失败，按文件大小估算任务成本: {os.path.basename(file_path)}, 错误: {str(e)}")
+
+    seconds = OFFICE_BASE_SECONDS + file_size / (1024 * 1024) * SECONDS_PER_MB
+    cost.update(cost_office_seconds=round(seconds, 1), cost_seconds=round(seconds, 1))
+    return cost
+
+
+def cost_from_record(record: Dict[str, Any]) -> Dict[str, float]:
+    """从任务记录中取出成本字段"""
+    return {field: float(record.get(field) or 0) for field in COST_FIELDS}
+
+
+class CostBudget:
+    """
+    并发执行任务的成本预算
+
+    处理中任务的成本之和加上新任务的成本不超过各维度的上限时才开始新任务；
+    没有任务在处理时总是允许开始，因此超出预算的大任务会单独执行而不会被拒绝。
+    上限为0表示该维度不限制
+    """
+
+    def __init__(self, llm_tokens: float = 400000, ocr_calls: float = 200,
+                 office_seconds: float = 900, max_backlog_seconds: float = 4 * 3600):
+        self.limits = {
+            'cost_tokens': llm_tokens,
+            'cost_ocr_calls': ocr_calls,
+            'cost_office_seconds': office_seconds,
+        }
+        # 已排队任务的预计剩余耗时超过该值时拒绝新任务（背压），0表示不限制
+        self.max_backlog_seconds = max_backlog_seconds
+
+    def configure(self, llm_tokens: Optional[float] = None, ocr_calls: Optional[float] = None,
+                  office_seconds: Optional[float] = None,
+                  max_backlog_seconds: Optional[float] = None) -> None:
+        if llm_tokens is not None:
+            self.limits['cost_tokens'] = llm_tokens
+        if ocr_calls is not None:
+            self.limits['cost_ocr_calls'] = ocr_calls
+        if office_seconds is not None:
+            self.limits['cost_office_seconds'] = office_seconds
+        if max_backlog_seconds is not None:
+            self.max_backlog_seconds = max_backlog_seconds
+
+    def fits(self, in_use: Dict[str, float], active_count: int, cost: Dict[str, float]) -> bool:
+        """处理中任务的成本为 in_use 时，成本为 cost 的任务能否开始"""
+        if active_count == 0:
+            return True
+        for field in BUDGET_FIELDS:
+            limit = self.limits.get(field)
+            if limit and in_use.get(field, 0) + cost.get(field, 0) > limit:
+                return False
+        return True
+
+    def accepts_backlog(self, backlog_seconds: float) -> bool:
+        return not self.max_backlog_seconds or backlog_seconds <= self.max_backlog_seconds
+
+    def to_dict(self) -> Dict[str, float]:
+        return dict(self.limits, max_backlog_seconds=self.max_backlog_seconds)
+
+
+def remaining_seconds(record: Dict[str, Any], now: float) -> float:
+    """处理中任务的预计剩余耗时：有进度时按进度比例，否则按已执行时间扣减"""
+    total = float(record.get('cost_seconds') or 0)
+    progress = record.get('progress') or 0
+    if progress > 0:
+        return total * (100 - min(progress, 100)) / 100
+    started = record.get('started_at') or now
+    return max(total - (now - started), total * 0.1)
+
+
+def estimate_start_offsets(processing: List[Dict[str, Any]], waiting: List[Dict[str, Any]],
+                           budget: CostBudget, max_active: int, now: float,
+                           duration: Optional[Callable[[Dict[str, float]], float]] = None,
+                           remaining: Optional[Callable[[Dict[str, Any], float], float]] = None) -> Dict[str, float]:
+    """
+    按认领规则（先进先出、并发数上限和成本预算）模拟调度，估算等待中任务的开始时间
+
+    Args:
+        processing: 处理中任务的记录
+        waiting: 等待中任务的记录，按认领顺序排列
+        duration: 任务预计耗时函数（参数为成本字典），默认使用成本估算的 cost_seconds
+        remaining: 处理中任务剩余时间函数（参数为任务记录和当前时间），默认为 remaining_seconds
+
+    Returns:
+        {task_id: 距现在的预计开始秒数}
+    """
+    duration = duration or (lambda cost: cost['cost_seconds'])
+    remaining = remaining or remaining_seconds
+    running: List[Tuple[float, int, Dict[str, float]]] = []
+    in_use = {field: 0.0 for field in BUDGET_FIELDS}
+    for index, record in enumerate(processing):
+        cost = cost_from_record(record)
+        heapq.heappush(running, (remaining(record, now), index, cost))
+        for field in BUDGET_FIELDS:
+            in_use[field] += cost[field]
+
+    clock = 0.0
+    sequence = len(processing)
+    offsets = {}
+    for record in waiting:
+        cost = cost_from_record(record)
+        while running and (len(running) >= max_active or not budget.fits(in_use, len(running), cost)):
+            finished_at, _, finished_cost = heapq.heappop(running)
+            clock = max(clock, finished_at)
+            for field in BUDGET_FIELDS:
+                in_use[field] -= finished_cost[field]
+        offsets[record['task_id']] = clock
+        heapq.heappush(running, (clock + duration(cost), sequence, cost))
+        sequence += 1
+        for field in BUDGET_FIELDS:
+            in_use[field] += cost[field]
+    return offsets
@@ -0,0 +1,233 @@
+"""
+异步日志队列和采样
+原实现中每条日志都在调用线程里同步完成格式化、过滤和写文件（控制台、app.log、error.log、app.jsonl），
+翻译和OCR等热点循环大量输出INFO日志时，这部分开销直接计入任务耗时。这里：
+- 调用线程只经过采样过滤后把日志记录放入队列（QueueHandler），格式化和写文件在监听线程（QueueListener）中完成
+- 消息参数都是不可变类型时不在调用线程格式化消息；大段内容用 lazy_text 包装，输出时才转换并截断
+- 按日志记录器前缀限制INFO及以下级别的速率（每秒条数），超出的记录直接丢弃；WARNING及以上不采样
+- 统计调用线程和监听线程的日志耗时、丢弃数量（进程级累计），任务结束时把任务期间的增量写入任务日志
+"""
+import time
+import queue
+import logging
+import logging.handlers
+import threading
+from typing import Any, Dict, Optional
+
+# lazy_text 默认截断长度
+DEFAULT_PAYLOAD_LIMIT = 200
+# 可以留到监听线程再格式化的参数类型
+_IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+_exception_formatter = logging.Formatter()
+
+
+class LazyText:
+    """延迟生成并截断的日志内容，只有日志真正输出时才转换为字符串"""
+
+    __slots__ = ('value', 'limit')
+
+    def __init__(self, value: Any, limit: int = DEFAULT_PAYLOAD_LIMIT):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        text = self.value if isinstance(self.value, str) else str(self.value)
+        if self.limit and len(text) > self.limit:
+            return f"{text[:self.limit]}...（共{len(text)}字符）"
+        return text
+
+    __repr__ = __str__
+
+
+def lazy_text(value: Any, limit: int = DEFAULT_PAYLOAD_LIMIT) -> LazyText:
+    """
+    用作日志参数：logger.info("翻译结果: %s", lazy_text(result))
+    日志被级别或采样过滤时不会转换，输出时最多保留 limit 个字符
+    """
+    return LazyText(value, limit)
+
+
+def _immutable_arg(arg: Any) -> bool:
+    if isinstance(arg, LazyText):
+        return isinstance(arg.value, _IMMUTABLE_ARG_TYPES)
+    return isinstance(arg, _IMMUTABLE_ARG_TYPES)
+
+
+def parse_sampling_rates(value: Optional[str]) -> Dict[str, float]:
+    """解析 'app.function.local_qwen_async=20,app.function.ppt_translate_async=50' 格式的采样配置"""
+    rates = {}
+    for item in (value or '').split(','):
+        name, _, rate = item.partition('=')
+        try:
+            if name.strip():
+                rates[name.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+class LogStats:
+    """日志开销统计（进程内累计）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.records = 0  # 进入队列或直接输出的记录数
+        self.sampled = 0  # 采样丢弃的记录数
+        self.overflow = 0  # 队列已满丢弃的记录数
+        self.caller_seconds = 0.0  # 调用线程中的耗时
+        self.listener_seconds = 0.0  # 监听线程中格式化和写文件的耗时
+
+    def add_caller(self, seconds: float, accepted: bool) -> None:
+        with self._lock:
+            self.caller_seconds += seconds
+            if accepted:
+                self.records += 1
+
+    def add_listener(self, seconds: float) -> None:
+        with self._lock:
+            self.listener_seconds += seconds
+
+    def add_sampled(self) -> None:
+        with self._lock:
+            self.sampled += 1
+
+    def add_overflow(self) -> None:
+        with self._lock:
+            self.overflow += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'records': self.records,
+                'sampled': self.sampled,
+                'overflow': self.overflow,
+                'caller_seconds': self.caller_seconds,
+                'listener_seconds': self.listener_seconds,
+            }
+
+    def since(self, before: Dict[str, float]) -> Dict[str, float]:
+        """从 before 快照到现在的增量"""
+        now = self.snapshot()
+        return {key: now[key] - before.get(key, 0) for key in now}
+
+
+log_stats = LogStats()
+
+
+def describe_overhead(delta: Dict[str, float]) -> str:
+    """日志开销说明，用于写入任务日志"""
+    text = (f"日志 {int(delta['records'])} 条，调用线程耗时 {delta['caller_seconds'] * 1000:.1f}ms，"
+            f"后台写入耗时 {delta['listener_seconds'] * 1000:.1f}ms")
+    if delta['sampled'] or delta['overflow']:
+        text += f"，采样丢弃 {int(delta['sampled'])} 条，队列满丢弃 {int(delta['overflow'])} 条"
+    return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    按日志记录器前缀限制速率（令牌桶，每秒条数，允许1秒的突发）
+    最长的匹配前缀生效；WARNING 及以上级别不采样。
+    同一条记录经过多个处理器时只判断一次
+    """
+
+    def __init__(self, rates: Dict[str, float], stats: Optional[LogStats] = None):
+        super().__init__()
+        self.rates = {name: rate for name, rate in rates.items() if rate > 0}
+        self.stats = stats or log_stats
+        self._lock = threading.Lock()
+        self._rate_cache: Dict[str, Optional[str]] = {}
+        # 前缀 -> [令牌数, 上次补充时间]
+        self._buckets: Dict[str, list] = {}
+
+    def _prefix_for(self, name: str) -> Optional[str]:
+        if name not in self._rate_cache:
+            matched = None
+            for prefix in self.rates:
+                if (name == prefix or name.startswith(prefix + '.')) and \
+                        (matched is None or len(prefix) > len(matched)):
+                    matched = prefix
+            self._rate_cache[name] = matched
+        return self._rate_cache[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        decision = getattr(record, '_sampling_passed', None)
+        if decision is not None:
+            return decision
+        decision = True
+        if record.levelno < logging.WARNING and self.rates:
+            prefix = self._prefix_for(record.name)
+            if prefix is not None:
+                rate = self.rates[prefix]
+                now = time.monotonic()
+                with self._lock:
+                    bucket = self._buckets.setdefault(prefix, [rate, now])
+                    bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                    bucket[1] = now
+                    if bucket[0] >= 1:
+                        bucket[0] -= 1
+                    else:
+                        decision = False
+                if not decision:
+                    self.stats.add_sampled()
+        record._sampling_passed = decision
+        return decision
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """调用线程中的处理器：只做采样过滤并放入队列"""
+
+    def __init__(self, log_queue: queue.Queue, stats: Optional[LogStats] = None):
+        super().__init__(log_queue)
+        self.stats = stats or log_stats
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        start = time.perf_counter()
+        accepted = False
+        try:
+            accepted = bool(super().handle(record))
+            return accepted
+        finally:
+            self.stats.add_caller(time.perf_counter() - start, accepted)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 参数可能在入队后被修改时才在调用线程格式化消息
+        if record.args and not all(_immutable_arg(arg) for arg in
+                                   (record.args if isinstance(record.args, tuple) else (record.args,))):
+            record.msg = record.getMessage()
+            record.args = None
+        # 异常堆栈必须在调用线程中展开
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # 队列满时丢弃低级别日志，WARNING 及以上等待写入
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record)
+            else:
+                self.stats.add_overflow()
+
+
+class TimedQueueListener(logging.handlers.QueueListener):
+    """在后台线程中把记录交给实际的处理器，并统计耗时"""
+
+    def __init__(self, log_queue: queue.Queue, *handlers: logging.Handler, stats: Optional[LogStats] = None):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.stats = stats or log_stats
+
+    def handle(self, record: logging.LogRecord) -> None:
+        start = time.perf_counter()
+        try:
+            super().handle(record)
+        finally:
+            self.stats.add_listener(time.perf_counter() - start)
+
+    def enqueue_sentinel(self) -> None:
+        # 队列已满时等待，确保停止时写完队列中的日志
+        self.queue.put(self._sentinel)
@@ -0,0 +1,302 @@
+"""
+结构化日志存储
+原实现查询日志时逐行读取 app.log 和全部轮转备份，用正则解析每一行、为每条日志解析时间，排序后才取前 limit 条。
+这里另外写一份JSON行格式的日志（app.jsonl，与 app.log 使用相同的轮转设置）：
+- 每行一条日志，以 {"t":时间戳,"level":..,"logger":..,"message":..} 开头，读取时间和级别不需要完整解析JSON
+- 旁路索引文件（app.jsonl.idx）每隔 INDEX_INTERVAL 条记录一个 (时间戳, 文件偏移)，按时间范围查询时直接定位
+- 查询从文件末尾向前读取，取到 limit 条即停止；早于开始时间后不再读取更早的内容和备份文件
+- 查询结果带游标（文件标识和偏移），下一页从上一页最后一条之前继续读取
+"""
+import os
+import json
+import base64
+import struct
+import bisect
+import logging
+import logging.handlers
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+INDEX_SUFFIX = '.idx'
+# 索引项：(时间戳, 行首偏移)
+INDEX_ENTRY = struct.Struct('<dQ')
+# 每隔多少条日志写一个索引项
+INDEX_INTERVAL = 128
+# 反向读取的块大小
+READ_BLOCK = 64 * 1024
+# 多个进程写同一个文件时时间戳不严格有序，按时间定位和停止读取时留出的余量（秒）
+ORDER_SLACK = 5.0
+
+_exception_formatter = logging.Formatter()
+
+
+class JsonLinesHandler(logging.handlers.RotatingFileHandler):
+    """JSON行格式的日志处理器，同时维护时间索引，轮转时索引文件一起轮转"""
+
+    def __init__(self, filename: str, maxBytes: int = 0, backupCount: int = 0,
+                 index_interval: int = INDEX_INTERVAL):
+        super().__init__(filename, maxBytes=maxBytes, backupCount=backupCount, encoding='utf-8')
+        self.index_interval = max(1, index_interval)
+        # 打开文件后的第一条日志总是写入索引
+        self._since_index = self.index_interval
+        self._index_stream = None
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        # 固定字段顺序，读取时可以直接截取时间戳和匹配级别
+        return json.dumps({
+            't': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': message,
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record) + '\n'
+            if self.stream is None:
+                self.stream = self._open()
+            # 其他进程可能也在追加，以文件末尾作为本行的偏移
+            self.stream.seek(0, 2)
+            offset = self.stream.tell()
+            if self.maxBytes > 0 and offset > 0 and offset + len(line.encode('utf-8')) >= self.maxBytes:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                offset = 0
+            self.stream.write(line)
+            self.stream.flush()
+
+            self._since_index += 1
+            if self._since_index >= self.index_interval:
+                self._write_index(record.created, offset)
+                self._since_index = 0
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _write_index(self, created: float, offset: int) -> None:
+        if self._index_stream is None:
+            self._index_stream = open(self.baseFilename + INDEX_SUFFIX, 'ab')
+        self._index_stream.write(INDEX_ENTRY.pack(created, offset))
+        self._index_stream.flush()
+
+    def _close_index(self) -> None:
+        if self._index_stream is not None:
+            self._index_stream.close()
+            self._index_stream = None
+
+    def doRollover(self) -> None:
+        self._close_index()
+        super().doRollover()
+        if self.backupCount > 0:
+            for i in range(self.backupCount - 1, 0, -1):
+                source = f"{self.baseFilename}.{i}{INDEX_SUFFIX}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.baseFilename}.{i + 1}{INDEX_SUFFIX}")
+            if os.path.exists(self.baseFilename + INDEX_SUFFIX):
+                os.replace(self.baseFilename + INDEX_SUFFIX, f"{self.baseFilename}.1{INDEX_SUFFIX}")
+        self._since_index = self.index_interval
+
+    def close(self) -> None:
+        self.acquire()
+        try:
+            self._close_index()
+        finally:
+            self.release()
+        super().close()
+
+
+def encode_cursor(file_id: int, offset: int) -> str:
+    raw = f"{file_id}|{offset}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[int, int]:
+    """
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        file_part, offset_part = raw.split('|', 1)
+        return int(file_part), int(offset_part)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def logger_matches(logger_name: Optional[str], entry_logger: str) -> bool:
+    """日志记录器过滤（与文本日志查询一致：精确匹配、前缀匹配或包含）"""
+    if not logger_name or logger_name == 'all':
+        return True
+    return (logger_name == entry_logger or
+            entry_logger.startswith(logger_name + '.') or
+            logger_name in entry_logger)
+
+
+def _line_time(line: bytes) -> Optional[float]:
+    """从行首截取时间戳（不解析整行JSON）"""
+    if not line.startswith(b'{"t":'):
+        return None
+    end = line.find(b',', 5)
+    try:
+        return float(line[5:end])
+    except ValueError:
+        return None
+
+
+def _reverse_lines(f, end: int) -> Iterator[Tuple[int, bytes]]:
+    """从 end 位置向前逐行读取，返回 (行首偏移, 行内容)"""
+    position = end
+    remainder = b''
+    while position > 0:
+        size = min(READ_BLOCK, position)
+        position -= size
+        f.seek(position)
+        chunk = f.read(size) + remainder
+        lines = chunk.split(b'\n')
+        # 第一段可能是不完整的行，留到下一块拼接
+        remainder = lines[0]
+        line_end = position + len(chunk)
+        for line in reversed(lines[1:]):
+            line_end -= len(line) + 1
+            if line:
+                yield line_end + 1, line
+    if remainder:
+        yield 0, remainder
+
+
+def format_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """转换为与文本日志解析结果相同的字段"""
+    created = datetime.fromtimestamp(entry['t'])
+    timestamp_str = f"{created.strftime('%Y-%m-%d %H:%M:%S')},{created.microsecond // 1000:03d}"
+    return {
+        'timestamp': created.isoformat(),
+        'timestamp_str': timestamp_str,
+        'logger': entry.get('logger', ''),
+        'level': entry.get('level', ''),
+        'message': entry.get('message', ''),
+        'raw_line': f"{timestamp_str} - {entry.get('logger', '')} - {entry.get('level', '')} - {entry.get('message', '')}",
+    }
+
+
+class LogStore:
+    """JSON行日志的查询（结果按时间倒序）"""
+
+    def __init__(self, path: str, backup_count: int = 5):
+        self.path = path
+        self.backup_count = backup_count
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def files(self) -> List[str]:
+        """当前文件和轮转备份（从新到旧）"""
+        paths = [self.path] + [f"{self.path}.{i}" for i in range(1, self.backup_count + 1)]
+        return [path for path in paths if os.path.exists(path)]
+
+    @staticmethod
+    def _load_index(path: str) -> List[Tuple[int, float]]:
+        """读取索引，返回按偏移排序的 (偏移, 时间戳)"""
+        try:
+            with open(path + INDEX_SUFFIX, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return []
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return sorted((offset, created) for created, offset in INDEX_ENTRY.iter_unpack(data[:usable]))
+
+    def _seek_end(self, path: str, size: int, end_ts: Optional[float]) -> int:
+        """结束时间之后的第一个索引项的偏移（之后的内容不需要读取）"""
+        if end_ts is None:
+            return size
+        index = self._load_index(path)
+        if not index:
+            return size
+        # 时间戳按偏移大致递增，取从该索引项起的最小时间，避免多进程交错导致误判
+        limit = end_ts + ORDER_SLACK
+        suffix_min = []
+        lowest = float('inf')
+        for _, created in reversed(index):
+            lowest = min(lowest, created)
+            suffix_min.append(lowest)
+        suffix_min.reverse()
+        position = bisect.bisect_right(suffix_min, limit)
+        if position >= len(index):
+            return size
+        return min(index[position][0], size)
+
+    def query(self, logger_name: Optional[str] = None, start_time: Optional[datetime] = None,
+              end_time: Optional[datetime] = None, level: Optional[str] = None,
+              limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        查询日志
+
+        Args:
+            cursor: 上一页返回的游标，从上一页最后一条之前继续
+
+        Returns:
+            (日志列表, 下一页游标；没有更多时为 None)
+
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        start_ts = start_time.timestamp() if start_time else None
+        end_ts = end_time.timestamp() if end_time else None
+        level = level.upper() if level and level != 'all' else None
+        level_marker = f'"level":"{level}"'.encode('utf-8') if level else None
+        cursor_file, cursor_offset = decode_cursor(cursor) if cursor else (None, None)
+
+        results = []
+        last_position = None
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+                f = open(path, 'rb')
+            except OSError:
+                continue
+            with f:
+                if cursor_file is not None:
+                    if stat.st_ino != cursor_file:
+                        # 比游标所在文件更新的文件已经读过（游标所在文件已被轮转删除时没有结果）
+                        continue
+                    end = min(cursor_offset, stat.st_size)
+                    cursor_file = None
+                else:
+                    end = self._seek_end(path, stat.st_size, end_ts)
+
+                reached_start = False
+                for offset, line in _reverse_lines(f, end):
+                    created = _line_time(line)
+                    if created is None:
+                        continue
+                    if end_ts is not None and created > end_ts:
+                        continue
+                    if start_ts is not None and created < start_ts:
+                        if created < start_ts - ORDER_SLACK:
+                            reached_start = True
+                            break
+                        continue
+                    if level_marker and level_marker not in line:
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if level and entry.get('level') != level:
+                        continue
+                    if not logger_matches(logger_name, entry.get('logger', '')):
+                        continue
+                    # 多取一条判断是否还有下一页
+                    if len(results) >= limit:
+                        return results, encode_cursor(*last_position)
+                    results.append(format_entry(entry))
+                    last_position = (stat.st_ino, offset)
+                if reached_start:
+                    break
+        return results, None
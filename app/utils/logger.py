@@ -1,16 +1,21 @@
 """
 日志管理模块
 支持多级别日志记录和文件轮转
+默认通过队列异步写日志（见 log_queue.py），调用线程只做采样过滤和入队
 """
 import os
 import sys
+import queue
+import atexit
 import logging
 import logging.handlers
 import re
 import glob
-from typing import Optional, Dict, Any, Union, List
+from typing import Optional, Dict, Any, Union, List, Tuple
 from datetime import datetime
 from app.utils.timezone_helper import parse_datetime
+from app.utils.log_store import JsonLinesHandler, LogStore
+from app.utils.log_queue import AsyncQueueHandler, SamplingFilter, TimedQueueListener, log_stats
 
 class LogManager:
     """日志管理器，支持控制台和文件输出"""
@@ -24,13 +29,19 @@ class LogManager:
         self.max_bytes = 10 * 1024 * 1024  # 10MB
         self.backup_count = 5
         self.log_dir = 'logs'
+        self.async_logging = True
+        self.queue_size = 10000
+        self.sampling_rates: Dict[str, float] = {}
 
         # 日志记录器
         self.logger = logging.getLogger('app')
         self.initialized = False
 
-        # 处理器列表
+        # 处理器列表（实际输出的处理器，异步模式下由监听线程调用）
         self.handlers = []
+        self._queue_handler = None
+        self._listener = None
+        self._atexit_registered = False
 
         # 日志记录器注册表
         self._loggers = {}
@@ -43,7 +54,10 @@ class LogManager:
                 date_format: Optional[str] = None,
                 max_bytes: Optional[int] = None,
                 backup_count: Optional[int] = None,
-                log_dir: Optional[str] = None) -> None:
+                log_dir: Optional[str] = None,
+                async_logging: Optional[bool] = None,
+                queue_size: Optional[int] = None,
+                sampling_rates: Optional[Dict[str, float]] = None) -> None:
         """
         配置日志管理器
 
@@ -54,6 +68,9 @@ class LogManager:
             max_bytes: 单个日志文件最大字节数
             backup_count: 保留的备份文件数量
             log_dir: 日志文件目录
+            async_logging: 是否通过队列在后台线程中写日志
+            queue_size: 日志队列长度，队列满时丢弃 INFO 及以下级别的日志
+            sampling_rates: 按日志记录器前缀的速率限制（每秒条数），只作用于 INFO 及以下级别
         """
         # 更新配置
         if log_level is not None:
@@ -71,6 +88,12 @@ class LogManager:
             self.backup_count = backup_count
         if log_dir is not None:
             self.log_dir = log_dir
+        if async_logging is not None:
+            self.async_logging = async_logging
+        if queue_size is not None:
+            self.queue_size = queue_size
+        if sampling_rates is not None:
+            self.sampling_rates = sampling_rates
 
         # 如果已经初始化，需要重新创建处理器
         if self.initialized:
@@ -82,7 +105,8 @@ class LogManager:
 
         self.logger.info(
             f"日志管理器已配置 - 级别: {logging.getLevelName(self.log_level)}, "
-            f"目录: {self.log_dir}, 最大文件大小: {self.max_bytes/1024/1024:.1f}MB"
+            f"目录: {self.log_dir}, 最大文件大小: {self.max_bytes/1024/1024:.1f}MB, "
+            f"异步: {self.async_logging}, 采样: {self.sampling_rates or '无'}"
         )
 
     def _setup_logger(self) -> None:
@@ -104,7 +128,6 @@ class LogManager:
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setFormatter(formatter)
         self.handlers.append(console_handler)
-        self.logger.addHandler(console_handler)
 
         # 创建文件处理器
         log_file = os.path.join(self.log_dir, 'app.log')
@@ -116,7 +139,6 @@ class LogManager:
         )
         file_handler.setFormatter(formatter)
         self.handlers.append(file_handler)
-        self.logger.addHandler(file_handler)
 
         # 创建错误日志文件处理器
         error_log_file = os.path.join(self.log_dir, 'error.log')
@@ -129,15 +151,59 @@ class LogManager:
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(formatter)
         self.handlers.append(error_handler)
-        self.logger.addHandler(error_handler)
+
+        # 创建结构化日志处理器（供日志查询接口使用）
+        json_handler = JsonLinesHandler(
+            filename=os.path.join(self.log_dir, 'app.jsonl'),
+            maxBytes=self.max_bytes,
+            backupCount=self.backup_count
+        )
+        self.handlers.append(json_handler)
+
+        sampling_filter = SamplingFilter(self.sampling_rates) if self.sampling_rates else None
+        if self.async_logging:
+            # 调用线程只经过采样过滤后入队，格式化和写文件在监听线程中完成
+            log_queue = queue.Queue(maxsize=self.queue_size)
+            self._queue_handler = AsyncQueueHandler(log_queue)
+            if sampling_filter:
+                self._queue_handler.addFilter(sampling_filter)
+            self.logger.addHandler(self._queue_handler)
+            self._listener = TimedQueueListener(log_queue, *self.handlers)
+            self._listener.start()
+            if not self._atexit_registered:
+                atexit.register(self.shutdown)
+                self._atexit_registered = True
+        else:
+            for handler in self.handlers:
+                if sampling_filter:
+                    handler.addFilter(sampling_filter)
+                self.logger.addHandler(handler)
 
     def _remove_handlers(self) -> None:
         """移除所有处理器"""
+        if self._queue_handler is not None:
+            self.logger.removeHandler(self._queue_handler)
+            self._queue_handler = None
+        if self._listener is not None:
+            # 等待队列中的日志写完
+            self._listener.stop()
+            self._listener = None
         for handler in self.handlers:
             self.logger.removeHandler(handler)
             handler.close()
         self.handlers.clear()
 
+    def shutdown(self) -> None:
+        """停止后台写日志的线程（进程退出时调用，写完队列中剩余的日志）"""
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+            if self._queue_handler is not None:
+                self.logger.removeHandler(self._queue_handler)
+                self._queue_handler = None
+            for handler in self.handlers:
+                self.logger.addHandler(handler)
+
     def get_logger(self, name: str = None) -> logging.Logger:
         """
         获取日志记录器
@@ -216,6 +282,43 @@ class LogManager:
         Returns:
             日志记录列表
         """
+        try:
+            store = self.get_log_store()
+            if store.exists():
+                return store.query(name, start_time, end_time, level, limit)[0]
+        except Exception as e:
+            return [{'error': f'读取日志失败: {str(e)}'}]
+        return self._get_text_logs(name, start_time, end_time, level, limit)
+
+    def get_log_store(self) -> LogStore:
+        """结构化日志存储（app.jsonl）"""
+        return LogStore(os.path.join(self.log_dir, 'app.jsonl'), self.backup_count)
+
+    def query_logs(self, name: str, start_time: Optional[datetime] = None,
+                   end_time: Optional[datetime] = None, level: Optional[str] = None,
+                   limit: int = 100, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        分页查询日志（按时间倒序）
+
+        Args:
+            cursor: 上一页返回的游标
+
+        Returns:
+            (日志记录列表, 下一页游标；没有更多时为 None)
+
+        Raises:
+            ValueError: 游标格式不正确
+        """
+        store = self.get_log_store()
+        if store.exists():
+            return store.query(name, start_time, end_time, level, limit, cursor)
+        # 还没有结构化日志时读取文本日志（不支持翻页）
+        return self._get_text_logs(name, start_time, end_time, level, limit), None
+
+    def _get_text_logs(self, name: str, start_time: Optional[datetime] = None,
+                       end_time: Optional[datetime] = None, level: Optional[str] = None,
+                       limit: int = 100) -> List[Dict[str, Any]]:
+        """逐行解析文本日志 app.log 及其备份"""
         logs = []
 
         try:
@@ -381,14 +484,15 @@ class LogManager:
             # 设置记录器级别
             logger.setLevel(log_level)
 
-            # 设置处理器级别
+            # 设置处理器级别（异步模式下 app 的实际处理器在监听线程中）
+            handlers = self.handlers if logger is self.logger else logger.handlers
             if handler_type in ['console', 'both']:
-                for handler in logger.handlers:
+                for handler in handlers:
                     if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
                         handler.setLevel(log_level)
 
             if handler_type in ['file', 'both']:
-                for handler in logger.handlers:
+                for handler in handlers:
                     if isinstance(handler, logging.FileHandler):
                         handler.setLevel(log_level)
 
@@ -482,6 +586,10 @@ class LogManager:
             'backup_count': self.backup_count,
             'log_dir': self.log_dir,
             'handlers': len(self.handlers),
+            'async': self._listener is not None,
+            'queue_pending': self._queue_handler.queue.qsize() if self._queue_handler else 0,
+            'sampling_rates': self.sampling_rates,
+            'overhead': log_stats.snapshot(),
             'registered_loggers': len(self._loggers),
             'active_loggers': len(self.get_loggers())
         }
@@ -0,0 +1,65 @@
+"""
+已有数据库的表结构补充
+db.create_all() 只创建不存在的表，不会为已有的表增加列和索引。
+这里在启动时检查模型新增的列和索引，缺失时用 ALTER TABLE / CREATE INDEX 补充（MySQL 和 SQLite 通用），
+并回填新列的数据
+"""
+import logging
+from typing import Dict, Tuple
+
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_RECORDS = 'upload_records'
+
+# 列名 -> 列定义
+UPLOAD_RECORD_COLUMNS: Dict[str, str] = {
+    'file_type': "VARCHAR(50) NULL",
+    'file_state': "VARCHAR(20) NOT NULL DEFAULT 'present'",
+}
+
+# 索引名 -> 列（与 UploadRecord.__table_args__ 一致）
+UPLOAD_RECORD_INDEXES: Dict[str, Tuple[str, ...]] = {
+    'idx_upload_time': ('upload_time',),
+    'idx_upload_user_time': ('user_id', 'upload_time', 'id'),
+    'idx_upload_type_time': ('file_type', 'upload_time', 'id'),
+}
+
+# 旧记录的类型按存储目录回填（与 UploadRecord.type_for_path 一致）
+BACKFILL_FILE_TYPE = (
+    f"UPDATE {UPLOAD_RECORDS} SET file_type = CASE "
+    f"WHEN file_path LIKE '%pdf_outputs%' THEN 'pdf_translation' ELSE 'ppt_translation' END "
+    f"WHERE file_type IS NULL"
+)
+
+
+def upgrade_upload_records(engine) -> None:
+    """补充 upload_records 表的 file_type、file_state 列和分页索引"""
+    inspector = inspect(engine)
+    if not inspector.has_table(UPLOAD_RECORDS):
+        return
+    columns = {column['name'] for column in inspector.get_columns(UPLOAD_RECORDS)}
+    indexes = {index['name'] for index in inspector.get_indexes(UPLOAD_RECORDS)}
+
+    with engine.begin() as conn:
+        for name, definition in UPLOAD_RECORD_COLUMNS.items():
+            if name not in columns:
+                conn.execute(text(f"ALTER TABLE {UPLOAD_RECORDS} ADD COLUMN {name} {definition}"))
+                logger.info(f"已添加 {name} 列到 {UPLOAD_RECORDS} 表")
+        result = conn.execute(text(BACKFILL_FILE_TYPE))
+        if result.rowcount:
+            logger.info(f"已回填 {result.rowcount} 条上传记录的 file_type")
+        for name, index_columns in UPLOAD_RECORD_INDEXES.items():
+            if name not in indexes:
+                conn.execute(text(f"CREATE INDEX {name} ON {UPLOAD_RECORDS} ({', '.join(index_columns)})"))
+                logger.info(f"已创建索引 {name}")
+
+
+def upgrade_schema(engine) -> None:
+    """启动时执行的表结构补充，失败时记录错误但不影响启动"""
+    try:
+        upgrade_upload_records(engine)
+    except SQLAlchemyError as e:
+        logger.error(f"补充 {UPLOAD_RECORDS} 表结构失败: {str(e)}")
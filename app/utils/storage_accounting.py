@@ -0,0 +1,177 @@
+"""
+用户存储用量统计
+原实现每次查询用量（/api/storage/usage）和上传时检查配额都遍历整个用户目录并逐个 stat 文件。
+这里在 user_storage_usage 表中维护每个用户目录的字节数和文件数：
+- 保存、删除、清理文件和翻译任务生成输出时增减计数，计数更新与上传记录的增删在同一个数据库事务中提交
+- 某个用户第一次查询用量时扫描一次用户目录作为初始值
+- 定时对账（reconcile_all）重新扫描目录，修正文件操作失败、手动删除文件等造成的偏差
+只统计用户目录（UPLOAD_FOLDER/user_<id>）中的文件，与原来遍历的范围一致
+"""
+import os
+import logging
+from typing import Dict, Optional, Tuple
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from ..models import User, UserStorageUsage, db
+from .timezone_helper import now_with_timezone
+
+logger = logging.getLogger(__name__)
+
+
+def user_root(user_id: int) -> str:
+    """用户目录"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], f"user_{user_id}")
+
+
+def in_user_root(user_id: int, path: str) -> bool:
+    """路径是否在用户目录中（只有用户目录中的文件计入用量）"""
+    root = os.path.abspath(user_root(user_id))
+    return os.path.abspath(path).startswith(root + os.sep)
+
+
+def scan_directory(path: str) -> Tuple[int, int]:
+    """
+    遍历目录统计用量（只在初始化和对账时使用）
+
+    Returns:
+        (字节数, 文件数)
+    """
+    total_size = 0
+    file_count = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total_size += os.path.getsize(os.path.join(root, file))
+                file_count += 1
+            except OSError:
+                # 遍历期间被删除的文件
+                continue
+    return total_size, file_count
+
+
+def adjust_usage(user_id: int, bytes_delta: int, files_delta: int = 0) -> bool:
+    """
+    在当前会话中增减用户的用量计数（不提交，随调用方的事务一起提交）
+    计数尚未初始化时不做处理，第一次查询用量时扫描目录得到的初始值已经包含这次的变化
+
+    Returns:
+        是否更新了计数
+    """
+    if not bytes_delta and not files_delta:
+        return False
+    new_bytes = UserStorageUsage.bytes_used + bytes_delta
+    new_files = UserStorageUsage.file_count + files_delta
+    updated = UserStorageUsage.query.filter_by(user_id=user_id).update({
+        UserStorageUsage.bytes_used: db.case((new_bytes < 0, 0), else_=new_bytes),
+        UserStorageUsage.file_count: db.case((new_files < 0, 0), else_=new_files),
+        UserStorageUsage.updated_at: now_with_timezone(),
+    }, synchronize_session=False)
+    return bool(updated)
+
+
+def file_added(user_id: int, file_path: str, size: Optional[int] = None) -> None:
+    """文件已保存到用户目录（不提交）"""
+    if not in_user_root(user_id, file_path):
+        return
+    if size is None:
+        size = os.path.getsize(file_path)
+    adjust_usage(user_id, size, 1)
+
+
+def file_removed(user_id: int, file_path: str, size: int) -> None:
+    """
+    文件已从用户目录删除（不提交）
+
+    Args:
+        size: 删除前读取的文件大小
+    """
+    if in_user_root(user_id, file_path):
+        adjust_usage(user_id, -size, -1)
+
+
+def file_resized(user_id: int, file_path: str, old_size: int, new_size: int) -> None:
+    """文件被原地改写（如翻译任务写回PPT），按大小变化调整（不提交）"""
+    if in_user_root(user_id, file_path):
+        adjust_usage(user_id, new_size - old_size)
+
+
+def _store_scan(user_id: int) -> Tuple[int, int]:
+    """
+    扫描用户目录作为初始计数，在独立的连接和事务中写入，
+    不会提交或回滚调用方会话中尚未提交的修改
+    """
+    bytes_used, file_count = scan_directory(user_root(user_id))
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(UserStorageUsage.__table__.insert().values(
+                user_id=user_id, bytes_used=bytes_used, file_count=file_count,
+                reconciled_at=now_with_timezone()
+            ))
+    except IntegrityError:
+        # 其他请求同时完成了初始化，以已写入的计数为准（当前事务读不到时使用本次扫描结果）
+        usage = UserStorageUsage.query.get(user_id)
+        if usage is not None:
+            return usage.bytes_used, usage.file_count
+        return bytes_used, file_count
+    logger.info(f"初始化用户 {user_id} 的存储用量: {bytes_used} 字节, {file_count} 个文件")
+    return bytes_used, file_count
+
+
+def get_usage(user_id: int) -> Tuple[int, int]:
+    """
+    用户的存储用量，计数尚未初始化时扫描一次用户目录写入初始值
+
+    Returns:
+        (字节数, 文件数)
+    """
+    usage = UserStorageUsage.query.get(user_id)
+    if usage is None:
+        return _store_scan(user_id)
+    return usage.bytes_used, usage.file_count
+
+
+def reconcile_user(user_id: int) -> Tuple[int, int]:
+    """
+    扫描用户目录修正计数（不提交）
+    扫描期间其他请求的增减会被扫描结果覆盖，偏差在下一次对账时修正
+
+    Returns:
+        (字节数偏差, 文件数偏差)：扫描结果减去原计数
+    """
+    bytes_used, file_count = scan_directory(user_root(user_id))
+    usage = UserStorageUsage.query.get(user_id)
+    if usage is None:
+        usage = UserStorageUsage(user_id=user_id, bytes_used=0, file_count=0)
+        db.session.add(usage)
+    drift = (bytes_used - (usage.bytes_used or 0), file_count - (usage.file_count or 0))
+    usage.bytes_used = bytes_used
+    usage.file_count = file_count
+    usage.reconciled_at = now_with_timezone()
+    return drift
+
+
+def reconcile_all() -> Dict[str, int]:
+    """
+    对所有用户的存储用量对账（由定时任务调用），每个用户单独提交
+
+    Returns:
+        {'users': 对账的用户数, 'drifted': 计数有偏差的用户数, 'failed': 失败的用户数}
+    """
+    stats = {'users': 0, 'drifted': 0, 'failed': 0}
+    user_ids = [row[0] for row in db.session.query(User.id).all()]
+    for user_id in user_ids:
+        try:
+            bytes_drift, files_drift = reconcile_user(user_id)
+            db.session.commit()
+            stats['users'] += 1
+            if bytes_drift or files_drift:
+                stats['drifted'] += 1
+                logger.info(f"修正用户 {user_id} 的存储用量: 字节数偏差 {bytes_drift}, 文件数偏差 {files_drift}")
+        except Exception as e:
+            db.session.rollback()
+            stats['failed'] += 1
+            logger.error(f"用户 {user_id} 存储用量对账失败: {str(e)}")
+    logger.info(f"存储用量对账完成: {stats}")
+    return stats
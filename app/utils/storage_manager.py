@@ -12,6 +12,7 @@ import uuid
 
 from flask import current_app
 from ..models import User, UploadRecord, db
+from . import storage_accounting
 
 logger = logging.getLogger(__name__)
 
@@ -85,17 +86,13 @@ class StorageManager:
     
     def get_storage_usage(self) -> int:
         """
-        获取当前存储使用量
+        获取当前存储使用量（读取数据库中的用量计数，不再遍历用户目录）
         
         Returns:
             使用的字节数
         """
-        total_size = 0
-        for root, _, files in os.walk(self.user_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                total_size += os.path.getsize(file_path)
-        return total_size
+        bytes_used, _ = storage_accounting.get_usage(self.user_id)
+        return bytes_used
     
     def store_file(self, file, file_type: str, original_filename: str = None) -> Tuple[str, str]:
         """
@@ -143,10 +140,13 @@ class StorageManager:
             stored_filename=stored_filename,
             file_path=store_dir,
             file_size=file_size,
-            status='pending'
+            status='pending',
+            file_type=UploadRecord.type_for_path(store_dir)
         )
         
         db.session.add(record)
+        # 用量计数与上传记录一起提交
+        storage_accounting.file_added(self.user_id, file_path, file_size)
         db.session.commit()
         
         return stored_filename, store_dir
@@ -179,52 +179,23 @@ class StorageManager:
         """
         file_path = self.get_file_path(stored_filename, file_type)
         if file_path and os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
             os.remove(file_path)
+            # 用量计数随调用方删除上传记录时一起提交
+            storage_accounting.file_removed(self.user_id, file_path, file_size)
             return True
         return False
     
     def cleanup_expired_files(self) -> Tuple[int, int]:
         """
-        清理过期文件
+        清理该用户的过期文件（使用清理引擎，按批删除并限制删除速率）
         
         Returns:
             (清理成功数量, 失败数量)
         """
-        success_count = 0
-        fail_count = 0
-        
-        # 清理临时文件
-        temp_expire_time = datetime.now() - timedelta(
-            hours=current_app.config['TEMP_FILE_CLEANUP_HOURS']
-        )
-        
-        # 清理正常文件
-        expire_time = datetime.now() - timedelta(
-            days=current_app.config['FILE_CLEANUP_DAYS']
-        )
-        
-        # 获取过期记录
-        expired_records = UploadRecord.query.filter(
-            UploadRecord.user_id == self.user_id,
-            UploadRecord.upload_time < expire_time,
-            UploadRecord.status.in_(['completed', 'failed'])
-        ).all()
-        
-        for record in expired_records:
-            try:
-                file_path = os.path.join(record.file_path, record.stored_filename)
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    success_count += 1
-                
-                db.session.delete(record)
-                
-            except Exception as e:
-                logger.error(f"清理文件失败 {file_path}: {str(e)}")
-                fail_count += 1
-        
-        db.session.commit()
-        return success_count, fail_count
+        from .cleanup import file_cleanup
+        stats = file_cleanup.sweep_expired(user_id=self.user_id)
+        return stats.records, stats.failed
 
 # 创建存储管理器工厂函数
 def create_storage_manager(user_id: int) -> StorageManager:
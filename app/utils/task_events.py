@@ -0,0 +1,177 @@
+"""
+任务进度事件流（Server-Sent Events）
+任务队列在进度回调和状态变化时发布事件，SSE连接等待事件后推送任务状态快照，
+取代前端每秒轮询 /task_status
+
+- 每个连接按 max_rate 合并推送：两次推送之间到达的多个进度事件只推送最新状态
+- 事件ID是状态快照的指纹，客户端携带 Last-Event-ID 重连时，状态未变化则不重复推送
+- 任务在其他进程执行时（共享任务存储），本进程收不到事件，按 poll_interval 读取存储中的状态
+"""
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# 任务结束状态，推送后关闭事件流
+TERMINAL_STATUSES = ("completed", "failed", "canceled")
+
+# 事件类型
+EVENT_STATUS = "status"
+EVENT_PROGRESS = "progress"
+
+
+class TaskEventBroker:
+    """
+    任务事件通知中心
+
+    只记录每个任务的版本号，不保存事件内容：订阅方被唤醒后自行读取最新状态，
+    因此无论发布多频繁，内存占用都只与任务数量有关
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._versions: Dict[str, int] = {}
+        # 任意任务状态变化（入队、开始、结束）时递增，等待中任务的排队位置随之变化
+        self._queue_version = 0
+
+    def publish(self, task_id: str, event_type: str = EVENT_STATUS) -> None:
+        with self._cond:
+            self._versions[task_id] = self._versions.get(task_id, 0) + 1
+            if event_type == EVENT_STATUS:
+                self._queue_version += 1
+            self._cond.notify_all()
+
+    def version(self, task_id: str, follow_queue: bool = False) -> int:
+        with self._cond:
+            return self._current(task_id, follow_queue)
+
+    def _current(self, task_id: str, follow_queue: bool) -> int:
+        version = self._versions.get(task_id, 0)
+        return version + self._queue_version if follow_queue else version
+
+    def wait(self, task_id: str, since: int, timeout: float, follow_queue: bool = False) -> int:
+        """
+        等待任务版本号超过 since
+
+        Args:
+            follow_queue: 同时关注队列中任意任务的状态变化（等待中的任务用于更新排队位置）
+
+        Returns:
+            当前版本号（超时未变化时等于 since）
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                current = self._current(task_id, follow_queue)
+                if current != since:
+                    return current
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return current
+                self._cond.wait(remaining)
+
+    def discard(self, task_id: str) -> None:
+        with self._cond:
+            self._versions.pop(task_id, None)
+
+
+def snapshot_id(snapshot: Dict[str, Any]) -> str:
+    """状态快照指纹，用作SSE事件ID"""
+    key = "|".join(str(snapshot.get(field)) for field in
+                   ('status', 'progress', 'current_slide', 'total_slides', 'position', 'retry_count', 'error'))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None, event_id: Optional[str] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event is not None:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream_task_events(task_id: str,
+                       get_snapshot: Callable[[str], Optional[Dict[str, Any]]],
+                       broker: TaskEventBroker,
+                       last_event_id: Optional[str] = None,
+                       max_rate: float = 2.0,
+                       poll_interval: Optional[float] = None,
+                       keepalive_interval: float = 15.0,
+                       max_duration: float = 600.0,
+                       retry_ms: int = 3000) -> Iterator[str]:
+    """
+    生成任务的SSE事件流
+
+    Args:
+        task_id: 任务ID
+        get_snapshot: 读取任务当前状态的函数，任务不存在时返回None
+        broker: 事件通知中心
+        last_event_id: 客户端重连时携带的 Last-Event-ID
+        max_rate: 每秒最多推送的事件数
+        poll_interval: 读取共享存储的间隔（秒），None表示只依赖本进程的事件通知
+        keepalive_interval: 无事件时发送注释保持连接的间隔（秒）
+        max_duration: 单个连接的最长时间（秒），到期后关闭，由客户端携带 Last-Event-ID 重连
+        retry_ms: 建议客户端的重连间隔（毫秒）
+    """
+    min_interval = 1.0 / max_rate if max_rate > 0 else 0.0
+    wait_timeout = min(poll_interval, keepalive_interval) if poll_interval else keepalive_interval
+    started = time.monotonic()
+    last_sent = 0.0
+    last_activity = started
+    last_status = None
+    sent_id = last_event_id
+    follow_queue = False
+    version = broker.version(task_id)
+
+    yield f"retry: {retry_ms}\n\n"
+
+    while True:
+        snapshot = get_snapshot(task_id)
+        if snapshot is None:
+            # 不使用 "error" 作为事件名，避免与 EventSource 的连接错误事件混淆
+            yield format_sse({'task_id': task_id, 'status': 'not_found'}, event="not_found")
+            return
+
+        event_id = snapshot_id(snapshot)
+        if event_id != sent_id:
+            status = snapshot.get('status')
+            event = EVENT_STATUS if status != last_status else EVENT_PROGRESS
+            yield format_sse(snapshot, event=event, event_id=event_id)
+            sent_id = event_id
+            last_status = status
+            last_sent = last_activity = time.monotonic()
+
+        if snapshot.get('status') in TERMINAL_STATUSES:
+            return
+
+        now = time.monotonic()
+        if now - started >= max_duration:
+            return
+
+        # 等待中的任务还需要关注其他任务的状态变化（排队位置）
+        queue_follow = snapshot.get('status') == "waiting"
+        if queue_follow != follow_queue:
+            follow_queue = queue_follow
+            version = broker.version(task_id, follow_queue)
+
+        new_version = broker.wait(task_id, version, wait_timeout, follow_queue)
+        if new_version == version:
+            # 超时：共享存储模式下重新读取状态，否则发送保活注释
+            if time.monotonic() - last_activity >= keepalive_interval:
+                yield ": keepalive\n\n"
+                last_activity = time.monotonic()
+            continue
+        version = new_version
+
+        # 合并推送：距上次推送不足最小间隔时先等待，期间到达的事件合并为一次推送
+        delay = min_interval - (time.monotonic() - last_sent)
+        if delay > 0:
+            time.sleep(delay)
+            version = broker.version(task_id, follow_queue)
+
+
+# 全局事件通知中心
+task_events = TaskEventBroker()
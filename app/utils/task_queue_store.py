@@ -0,0 +1,832 @@
+"""
+翻译任务队列的持久化存储
+多个服务进程（Hypercorn workers）共享同一个任务表：任务入队、认领（租约）、
+心跳续约、完成状态都写入存储，进程崩溃或重启后过期租约的任务会被重新排队。
+
+提供两种后端：
+- SQLiteTaskStore: 默认后端，WAL模式，跨进程共享
+- MemoryTaskStore: 进程内存储，用于测试或单进程运行
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import bisect
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Tuple
+
+from .job_cost import COST_FIELDS, BUDGET_FIELDS, CostBudget, cost_from_record, remaining_seconds
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+STATUS_WAITING = "waiting"
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELED = "canceled"
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELED)
+
+# 默认租约时长（秒），持有者需要在过期前续约
+DEFAULT_LEASE_SECONDS = 60
+
+# 默认数据库位置：项目根目录下的 instance/task_queue.db
+DEFAULT_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'instance', 'task_queue.db'
+)
+
+_RECORD_FIELDS = (
+    'task_id', 'user_id', 'user_name', 'task_type', 'priority', 'status', 'payload',
+    'progress', 'current_slide', 'total_slides', 'error', 'retry_count',
+    'worker_id', 'lease_expires', 'created_at', 'started_at', 'completed_at', 'updated_at'
+) + COST_FIELDS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue_tasks (
+    task_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    user_name TEXT,
+    task_type TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    progress INTEGER NOT NULL DEFAULT 0,
+    current_slide INTEGER NOT NULL DEFAULT 0,
+    total_slides INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    worker_id TEXT,
+    lease_expires REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    completed_at REAL,
+    updated_at REAL,
+    cost_tokens REAL NOT NULL DEFAULT 0,
+    cost_ocr_calls REAL NOT NULL DEFAULT 0,
+    cost_office_seconds REAL NOT NULL DEFAULT 0,
+    cost_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_queue_tasks_dispatch ON queue_tasks (status, priority, created_at);
+CREATE INDEX IF NOT EXISTS idx_queue_tasks_lease ON queue_tasks (status, lease_expires);
+CREATE INDEX IF NOT EXISTS idx_queue_tasks_user ON queue_tasks (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_queue_tasks_completed ON queue_tasks (completed_at);
+
+CREATE TABLE IF NOT EXISTS queue_task_archive (
+    task_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    user_name TEXT,
+    task_type TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    total_slides INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    completed_at REAL,
+    archived_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_queue_task_archive_user ON queue_task_archive (user_id, created_at);
+
+CREATE TABLE IF NOT EXISTS task_stage_stats (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    units REAL NOT NULL,
+    seconds REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_stage_stats_stage ON task_stage_stats (stage, id);
+"""
+
+# 状态计数表由触发器随任务状态变化增量维护，统计查询为O(1)；
+# 删除（归档）已结束任务时不扣减，已结束状态的计数为累计值
+_COUNTER_TRIGGERS = """
+CREATE TRIGGER IF NOT EXISTS trg_queue_tasks_count_insert AFTER INSERT ON queue_tasks
+BEGIN
+    UPDATE queue_counters SET total = total + 1 WHERE status = NEW.status;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_queue_tasks_count_update AFTER UPDATE OF status ON queue_tasks
+WHEN OLD.status <> NEW.status
+BEGIN
+    UPDATE queue_counters SET total = total - 1 WHERE status = OLD.status;
+    UPDATE queue_counters SET total = total + 1 WHERE status = NEW.status;
+END;
+CREATE TRIGGER IF NOT EXISTS trg_queue_tasks_count_delete AFTER DELETE ON queue_tasks
+WHEN OLD.status IN ('waiting', 'processing')
+BEGIN
+    UPDATE queue_counters SET total = total - 1 WHERE status = OLD.status;
+END;
+"""
+
+_ARCHIVE_COLUMNS = (
+    'task_id', 'user_id', 'user_name', 'task_type', 'status', 'error', 'retry_count',
+    'total_slides', 'created_at', 'started_at', 'completed_at'
+)
+
+
+class TaskQueueStore:
+    """任务存储接口，所有方法都必须是原子的（跨线程，SQLite后端还需跨进程）"""
+
+    backend = "base"
+    shared = False  # 是否在多个进程之间共享
+
+    def enqueue(self, record: Dict[str, Any], max_backlog_seconds: float = 0) -> Tuple[bool, float]:
+        """
+        入队新任务，已有等待+处理中任务的预计剩余耗时超过 max_backlog_seconds 时拒绝（0表示不限制）；
+        新任务自身的成本不影响准入，超出预算的大任务也会入队
+
+        Returns:
+            (是否入队成功, 入队前等待+处理中任务的预计剩余耗时（秒）)
+        """
+        raise NotImplementedError
+
+    def claim(self, worker_id: str, max_active: int,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              budget: Optional[CostBudget] = None) -> Optional[Dict[str, Any]]:
+        """
+        在全局并发上限和成本预算内认领一个等待中的任务（按优先级、创建时间），
+        没有可认领任务或队首任务超出剩余预算时返回None（不跳过队首，避免大任务一直等待）
+        """
+        raise NotImplementedError
+
+    def pending_records(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        处理中和等待中任务的调度字段（task_id、进度、started_at、lease_expires、成本），用于估算剩余和等待时间
+
+        Returns:
+            (处理中任务, 按认领顺序排列的等待中任务)
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, task_ids: List[str], worker_id: str,
+                  lease_seconds: float = DEFAULT_LEASE_SECONDS) -> List[str]:
+        """为持有的任务续约，返回续约失败（租约已丢失）的任务ID"""
+        raise NotImplementedError
+
+    def update_progress(self, task_id: str, progress: int, current_slide: int, total_slides: int) -> None:
+        raise NotImplementedError
+
+    def finish(self, task_id: str, status: str, error: Optional[str] = None) -> None:
+        """标记任务结束（completed/failed/canceled）并释放租约"""
+        raise NotImplementedError
+
+    def requeue(self, task_id: str, retry_count: int, error: Optional[str] = None) -> None:
+        """任务失败后重新排队等待重试"""
+        raise NotImplementedError
+
+    def cancel(self, task_id: str) -> bool:
+        """取消尚未开始的任务"""
+        raise NotImplementedError
+
+    def recover_expired(self, max_retries: int) -> Tuple[List[str], List[str]]:
+        """
+        回收租约已过期的任务（持有进程崩溃或被重启）
+
+        Returns:
+            (重新排队的任务ID, 超过重试次数被标记为失败的任务ID)
+        """
+        raise NotImplementedError
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_latest_for_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def waiting_position(self, task_id: str) -> int:
+        """
+        等待中任务的排队位置（从1开始），不在等待状态时返回0
+        MemoryTaskStore 在有序索引中二分查找；SQLiteTaskStore 在认领索引上计数排在前面的任务，
+        耗时与排在前面的任务数成正比（等待队列总量受 max_backlog_seconds 限制）
+        """
+        raise NotImplementedError
+
+    def record_stage_stats(self, task_id: str, rows: List[Tuple[str, float, float]], keep: int = 200) -> None:
+        """
+        记录任务各阶段的耗时，每个阶段只保留最近 keep 条
+
+        Args:
+            rows: [(阶段, 数量, 耗时秒数)]
+        """
+        raise NotImplementedError
+
+    def recent_stage_stats(self, stages: List[str], limit: int) -> Dict[str, List[Tuple[float, float]]]:
+        """各阶段最近 limit 条记录: {阶段: [(数量, 耗时秒数)]}"""
+        raise NotImplementedError
+
+    def count_by_status(self) -> Dict[str, int]:
+        """
+        各状态的任务数：等待和处理中为当前数量，已结束状态为累计数量（包括已归档的任务）
+        """
+        raise NotImplementedError
+
+    def archive_finished(self, max_age_seconds: float, max_entries: int) -> List[str]:
+        """
+        保留策略：结束超过 max_age_seconds 的任务，以及超出 max_entries 条的最早结束的任务
+        从活动任务表移入归档
+
+        Returns:
+            被归档的任务ID
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {status: 0 for status in (STATUS_WAITING, STATUS_PROCESSING) + FINISHED_STATUSES}
+
+
+def _archived_record(row) -> Optional[Dict[str, Any]]:
+    """归档记录转换为与活动任务相同的字段（归档时已丢弃任务参数）"""
+    if row is None:
+        return None
+    record = {field: None for field in _RECORD_FIELDS}
+    record.update(dict(row))
+    record.pop('archived_at', None)
+    record['progress'] = 100 if record['status'] == STATUS_COMPLETED else 0
+    record['current_slide'] = record['total_slides'] if record['status'] == STATUS_COMPLETED else 0
+    return record
+
+
+class MemoryTaskStore(TaskQueueStore):
+    """
+    进程内任务存储（测试或单进程部署使用）
+
+    状态计数、等待队列有序索引、处理中任务集合和用户最新任务都随状态变化增量维护，
+    统计和排队位置查询不需要遍历全部任务
+    """
+
+    backend = "memory"
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self._counts = _empty_counts()
+        # 等待队列有序索引: [(priority, created_at, task_id)]，按认领顺序排列
+        self._waiting: List[Tuple[int, float, str]] = []
+        self._processing = set()
+        self._latest_by_user: Dict[Any, str] = {}
+        # 已结束任务按结束顺序排列，用于保留策略
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        # 归档的任务只保留 _ARCHIVE_COLUMNS 字段，查询时与 SQLiteTaskStore 的归档表行为一致
+        self._archive: Dict[str, Dict[str, Any]] = {}
+        self._archived_latest_by_user: Dict[Any, str] = {}
+        self._stage_stats: Dict[str, deque] = {}
+
+    @staticmethod
+    def _waiting_key(record) -> Tuple[int, float, str]:
+        return (record['priority'], record['created_at'], record['task_id'])
+
+    def _set_status(self, record, status) -> None:
+        """修改任务状态并同步更新计数和索引"""
+        old = record['status']
+        if old == status:
+            return
+        task_id = record['task_id']
+        if old == STATUS_WAITING:
+            key = self._waiting_key(record)
+            index = bisect.bisect_left(self._waiting, key)
+            if index < len(self._waiting) and self._waiting[index] == key:
+                del self._waiting[index]
+        elif old == STATUS_PROCESSING:
+            self._processing.discard(task_id)
+        elif old in FINISHED_STATUSES:
+            self._finished.pop(task_id, None)
+        self._counts[old] -= 1
+
+        record['status'] = status
+        self._counts[status] = self._counts.get(status, 0) + 1
+        if status == STATUS_WAITING:
+            bisect.insort(self._waiting, self._waiting_key(record))
+        elif status == STATUS_PROCESSING:
+            self._processing.add(task_id)
+        elif status in FINISHED_STATUSES:
+            self._finished[task_id] = record.get('completed_at') or time.time()
+
+    def enqueue(self, record, max_backlog_seconds=0):
+        with self._lock:
+            now = time.time()
+            backlog = sum(remaining_seconds(self._records[task_id], now) for task_id in self._processing)
+            backlog += sum(self._records[key[2]]['cost_seconds'] or 0 for key in self._waiting)
+            if max_backlog_seconds and backlog > max_backlog_seconds:
+                return False, backlog
+            stored = {field: None for field in _RECORD_FIELDS}
+            stored.update(progress=0, current_slide=0, total_slides=0, retry_count=0,
+                          created_at=now, updated_at=now)
+            stored.update({field: 0 for field in COST_FIELDS})
+            stored.update(record)
+            stored['status'] = STATUS_WAITING
+            self._records[stored['task_id']] = stored
+            self._counts[STATUS_WAITING] += 1
+            bisect.insort(self._waiting, self._waiting_key(stored))
+            self._latest_by_user[stored['user_id']] = stored['task_id']
+            return True, backlog
+
+    def claim(self, worker_id, max_active, lease_seconds=DEFAULT_LEASE_SECONDS, budget=None):
+        with self._lock:
+            now = time.time()
+            active = [self._records[task_id] for task_id in self._processing
+                      if (self._records[task_id]['lease_expires'] or 0) >= now]
+            if len(active) >= max_active or not self._waiting:
+                return None
+            record = self._records[self._waiting[0][2]]
+            if budget is not None:
+                in_use = {field: sum(r[field] or 0 for r in active) for field in BUDGET_FIELDS}
+                if not budget.fits(in_use, len(active), cost_from_record(record)):
+                    return None
+            record.update(worker_id=worker_id, lease_expires=now + lease_seconds,
+                          started_at=now, updated_at=now)
+            self._set_status(record, STATUS_PROCESSING)
+            return dict(record)
+
+    def heartbeat(self, task_ids, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        lost = []
+        with self._lock:
+            now = time.time()
+            for task_id in task_ids:
+                record = self._records.get(task_id)
+                if record and record['status'] == STATUS_PROCESSING and record['worker_id'] == worker_id:
+                    record['lease_expires'] = now + lease_seconds
+                    record['updated_at'] = now
+                else:
+                    lost.append(task_id)
+        return lost
+
+    def update_progress(self, task_id, progress, current_slide, total_slides):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record:
+                record.update(progress=progress, current_slide=current_slide,
+                              total_slides=total_slides, updated_at=time.time())
+
+    def finish(self, task_id, status, error=None):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record:
+                now = time.time()
+                record.update(error=error, worker_id=None, lease_expires=None,
+                              completed_at=now, updated_at=now)
+                self._set_status(record, status)
+
+    def requeue(self, task_id, retry_count, error=None):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record:
+                record.update(retry_count=retry_count, error=error, progress=0,
+                              worker_id=None, lease_expires=None, updated_at=time.time())
+                self._set_status(record, STATUS_WAITING)
+
+    def cancel(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            if not record or record['status'] != STATUS_WAITING:
+                return False
+            now = time.time()
+            record.update(completed_at=now, updated_at=now)
+            self._set_status(record, STATUS_CANCELED)
+            return True
+
+    def recover_expired(self, max_retries):
+        requeued, failed = [], []
+        with self._lock:
+            now = time.time()
+            expired = [self._records[task_id] for task_id in self._processing
+                       if (self._records[task_id]['lease_expires'] or 0) < now]
+            for record in expired:
+                if record['retry_count'] < max_retries:
+                    record.update(retry_count=record['retry_count'] + 1,
+                                  worker_id=None, lease_expires=None, updated_at=now)
+                    self._set_status(record, STATUS_WAITING)
+                    requeued.append(record['task_id'])
+                else:
+                    record.update(error="任务租约过期且超过重试次数",
+                                  worker_id=None, lease_expires=None, completed_at=now, updated_at=now)
+                    self._set_status(record, STATUS_FAILED)
+                    failed.append(record['task_id'])
+        return requeued, failed
+
+    def get(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            if record:
+                return dict(record)
+            return _archived_record(self._archive.get(task_id))
+
+    def get_latest_for_user(self, user_id):
+        with self._lock:
+            record = self._records.get(self._latest_by_user.get(user_id))
+            if record:
+                return dict(record)
+            return _archived_record(self._archive.get(self._archived_latest_by_user.get(user_id)))
+
+    def waiting_position(self, task_id):
+        with self._lock:
+            record = self._records.get(task_id)
+            if not record or record['status'] != STATUS_WAITING:
+                return 0
+            return bisect.bisect_left(self._waiting, self._waiting_key(record)) + 1
+
+    def count_by_status(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def record_stage_stats(self, task_id, rows, keep=200):
+        with self._lock:
+            for stage, units, seconds in rows:
+                samples = self._stage_stats.get(stage)
+                if samples is None or samples.maxlen != keep:
+                    samples = self._stage_stats[stage] = deque(samples or (), maxlen=keep)
+                samples.append((units, seconds))
+
+    def recent_stage_stats(self, stages, limit):
+        with self._lock:
+            return {stage: list(self._stage_stats.get(stage, ()))[-limit:] for stage in stages}
+
+    def pending_records(self):
+        with self._lock:
+            processing = [dict(self._records[task_id]) for task_id in self._processing]
+            waiting = [dict(self._records[key[2]]) for key in self._waiting]
+            return processing, waiting
+
+    def archive_finished(self, max_age_seconds, max_entries):
+        archived = []
+        with self._lock:
+            now = time.time()
+            cutoff = now - max_age_seconds
+            while self._finished:
+                task_id, completed_at = next(iter(self._finished.items()))
+                if completed_at >= cutoff and len(self._finished) <= max_entries:
+                    break
+                self._finished.popitem(last=False)
+                record = self._records.pop(task_id)
+                user_id = record['user_id']
+                if self._latest_by_user.get(user_id) == task_id:
+                    del self._latest_by_user[user_id]
+                self._archive[task_id] = dict({field: record[field] for field in _ARCHIVE_COLUMNS}, archived_at=now)
+                latest = self._archive.get(self._archived_latest_by_user.get(user_id))
+                if latest is None or latest['created_at'] <= record['created_at']:
+                    self._archived_latest_by_user[user_id] = task_id
+                archived.append(task_id)
+        return archived
+
+
+class SQLiteTaskStore(TaskQueueStore):
+    """
+    基于SQLite（WAL模式）的跨进程任务存储
+
+    每个线程使用独立连接；认领和入队在 BEGIN IMMEDIATE 事务中完成，
+    由SQLite的写锁保证多个进程之间的原子性和全局并发上限。
+    """
+
+    backend = "sqlite"
+    shared = True
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connection()
+        conn.executescript(_SCHEMA)
+        self._ensure_cost_columns()
+        self._init_counters()
+        logger.info(f"任务队列存储已初始化: {os.path.abspath(path)} (WAL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: 由我们显式控制事务
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None,
+                                   check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _ImmediateTransaction(self._connection())
+
+    def _ensure_cost_columns(self) -> None:
+        """为旧版本创建的任务表补充成本字段"""
+        conn = self._connection()
+        existing = {row['name'] for row in conn.execute("PRAGMA table_info(queue_tasks)")}
+        for field in COST_FIELDS:
+            if field not in existing:
+                conn.execute(f"ALTER TABLE queue_tasks ADD COLUMN {field} REAL NOT NULL DEFAULT 0")
+
+    def _init_counters(self) -> None:
+        """创建状态计数表和维护触发器；首次创建时按现有任务初始化计数"""
+        with self._transaction() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'queue_counters'"
+            ).fetchone()
+            if exists is None:
+                conn.execute("CREATE TABLE queue_counters (status TEXT PRIMARY KEY, total INTEGER NOT NULL)")
+                existing = {row['status']: row['total'] for row in conn.execute(
+                    "SELECT status, COUNT(*) AS total FROM queue_tasks GROUP BY status")}
+                archived = {row['status']: row['total'] for row in conn.execute(
+                    "SELECT status, COUNT(*) AS total FROM queue_task_archive GROUP BY status")}
+                conn.executemany(
+                    "INSERT INTO queue_counters (status, total) VALUES (?, ?)",
+                    [(status, existing.get(status, 0) + archived.get(status, 0)) for status in _empty_counts()]
+                )
+            for statement in _COUNTER_TRIGGERS.split("END;"):
+                if statement.strip():
+                    conn.execute(statement + "END;")
+
+    @staticmethod
+    def _row_to_dict(row) -> Optional[Dict[str, Any]]:
+        return dict(row) if row is not None else None
+
+    def enqueue(self, record, max_backlog_seconds=0):
+        now = time.time()
+        values = {field: None for field in _RECORD_FIELDS}
+        values.update(progress=0, current_slide=0, total_slides=0, retry_count=0,
+                      created_at=now, updated_at=now)
+        values.update({field: 0 for field in COST_FIELDS})
+        values.update(record)
+        values['status'] = STATUS_WAITING
+        if not isinstance(values['payload'], str):
+            values['payload'] = json.dumps(values['payload'], ensure_ascii=False, default=str)
+
+        with self._transaction() as conn:
+            backlog = conn.execute(
+                "SELECT COALESCE(SUM(cost_seconds), 0) FROM queue_tasks WHERE status = ?",
+                (STATUS_WAITING,)
+            ).fetchone()[0]
+            backlog += sum(remaining_seconds(dict(row), now) for row in conn.execute(
+                "SELECT cost_seconds, progress, started_at FROM queue_tasks WHERE status = ?",
+                (STATUS_PROCESSING,)
+            ))
+            if max_backlog_seconds and backlog > max_backlog_seconds:
+                return False, backlog
+            columns = ", ".join(_RECORD_FIELDS)
+            placeholders = ", ".join(f":{field}" for field in _RECORD_FIELDS)
+            conn.execute(f"INSERT INTO queue_tasks ({columns}) VALUES ({placeholders})", values)
+            return True, backlog
+
+    def claim(self, worker_id, max_active, lease_seconds=DEFAULT_LEASE_SECONDS, budget=None):
+        sums = ", ".join(f"COALESCE(SUM({field}), 0) AS {field}" for field in BUDGET_FIELDS)
+        with self._transaction() as conn:
+            now = time.time()
+            active = conn.execute(
+                f"SELECT COUNT(*) AS active, {sums} FROM queue_tasks WHERE status = ? AND lease_expires >= ?",
+                (STATUS_PROCESSING, now)
+            ).fetchone()
+            if active['active'] >= max_active:
+                return None
+            row = conn.execute(
+                f"SELECT task_id, {', '.join(COST_FIELDS)} FROM queue_tasks WHERE status = ? "
+                "ORDER BY priority, created_at LIMIT 1",
+                (STATUS_WAITING,)
+            ).fetchone()
+            if row is None:
+                return None
+            if budget is not None and not budget.fits(dict(active), active['active'], cost_from_record(dict(row))):
+                return None
+            conn.execute(
+                "UPDATE queue_tasks SET status = ?, worker_id = ?, lease_expires = ?, "
+                "started_at = ?, updated_at = ? WHERE task_id = ?",
+                (STATUS_PROCESSING, worker_id, now + lease_seconds, now, now, row['task_id'])
+            )
+            return self._row_to_dict(conn.execute(
+                "SELECT * FROM queue_tasks WHERE task_id = ?", (row['task_id'],)
+            ).fetchone())
+
+    def heartbeat(self, task_ids, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        if not task_ids:
+            return []
+        lost = []
+        with self._transaction() as conn:
+            now = time.time()
+            for task_id in task_ids:
+                cursor = conn.execute(
+                    "UPDATE queue_tasks SET lease_expires = ?, updated_at = ? "
+                    "WHERE task_id = ? AND status = ? AND worker_id = ?",
+                    (now + lease_seconds, now, task_id, STATUS_PROCESSING, worker_id)
+                )
+                if cursor.rowcount == 0:
+                    lost.append(task_id)
+        return lost
+
+    def update_progress(self, task_id, progress, current_slide, total_slides):
+        self._connection().execute(
+            "UPDATE queue_tasks SET progress = ?, current_slide = ?, total_slides = ?, updated_at = ? "
+            "WHERE task_id = ?",
+            (progress, current_slide, total_slides, time.time(), task_id)
+        )
+
+    def finish(self, task_id, status, error=None):
+        now = time.time()
+        self._connection().execute(
+            "UPDATE queue_tasks SET status = ?, error = ?, worker_id = NULL, lease_expires = NULL, "
+            "completed_at = ?, updated_at = ? WHERE task_id = ?",
+            (status, error, now, now, task_id)
+        )
+
+    def requeue(self, task_id, retry_count, error=None):
+        self._connection().execute(
+            "UPDATE queue_tasks SET status = ?, retry_count = ?, error = ?, progress = 0, "
+            "worker_id = NULL, lease_expires = NULL, updated_at = ? WHERE task_id = ?",
+            (STATUS_WAITING, retry_count, error, time.time(), task_id)
+        )
+
+    def cancel(self, task_id):
+        now = time.time()
+        cursor = self._connection().execute(
+            "UPDATE queue_tasks SET status = ?, completed_at = ?, updated_at = ? "
+            "WHERE task_id = ? AND status = ?",
+            (STATUS_CANCELED, now, now, task_id, STATUS_WAITING)
+        )
+        return cursor.rowcount > 0
+
+    def recover_expired(self, max_retries):
+        with self._transaction() as conn:
+            now = time.time()
+            rows = conn.execute(
+                "SELECT task_id, retry_count FROM queue_tasks WHERE status = ? AND lease_expires < ?",
+                (STATUS_PROCESSING, now)
+            ).fetchall()
+            requeued, failed = [], []
+            for row in rows:
+                if row['retry_count'] < max_retries:
+                    conn.execute(
+                        "UPDATE queue_tasks SET status = ?, retry_count = retry_count + 1, "
+                        "worker_id = NULL, lease_expires = NULL, updated_at = ? WHERE task_id = ?",
+                        (STATUS_WAITING, now, row['task_id'])
+                    )
+                    requeued.append(row['task_id'])
+                else:
+                    conn.execute(
+                        "UPDATE queue_tasks SET status = ?, error = ?, worker_id = NULL, "
+                        "lease_expires = NULL, completed_at = ?, updated_at = ? WHERE task_id = ?",
+                        (STATUS_FAILED, "任务租约过期且超过重试次数", now, now, row['task_id'])
+                    )
+                    failed.append(row['task_id'])
+            return requeued, failed
+
+    def get(self, task_id):
+        conn = self._connection()
+        record = self._row_to_dict(conn.execute(
+            "SELECT * FROM queue_tasks WHERE task_id = ?", (task_id,)
+        ).fetchone())
+        if record is None:
+            record = _archived_record(conn.execute(
+                "SELECT * FROM queue_task_archive WHERE task_id = ?", (task_id,)
+            ).fetchone())
+        return record
+
+    def get_latest_for_user(self, user_id):
+        conn = self._connection()
+        record = self._row_to_dict(conn.execute(
+            "SELECT * FROM queue_tasks WHERE user_id = ? ORDER BY created_at DESC LIMIT 1", (user_id,)
+        ).fetchone())
+        if record is None:
+            record = _archived_record(conn.execute(
+                "SELECT * FROM queue_task_archive WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
+                (user_id,)
+            ).fetchone())
+        return record
+
+    def waiting_position(self, task_id):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT priority, created_at FROM queue_tasks WHERE task_id = ? AND status = ?",
+            (task_id, STATUS_WAITING)
+        ).fetchone()
+        if row is None:
+            return 0
+        # 拆成两个范围计数，每个都只扫描 idx_queue_tasks_dispatch 中排在前面的条目
+        # （合并为 OR 条件时只能按 status 使用索引，会扫描全部等待中的任务）
+        ahead = conn.execute(
+            "SELECT (SELECT COUNT(*) FROM queue_tasks WHERE status = ? AND priority < ?) + "
+            "(SELECT COUNT(*) FROM queue_tasks WHERE status = ? AND priority = ? AND created_at < ?)",
+            (STATUS_WAITING, row['priority'], STATUS_WAITING, row['priority'], row['created_at'])
+        ).fetchone()[0]
+        return ahead + 1
+
+    def record_stage_stats(self, task_id, rows, keep=200):
+        with self._transaction() as conn:
+            now = time.time()
+            conn.executemany(
+                "INSERT INTO task_stage_stats (task_id, stage, units, seconds, recorded_at) VALUES (?, ?, ?, ?, ?)",
+                [(task_id, stage, units, seconds, now) for stage, units, seconds in rows]
+            )
+            for stage in {row[0] for row in rows}:
+                conn.execute(
+                    "DELETE FROM task_stage_stats WHERE stage = ? AND id <= "
+                    "(SELECT id FROM task_stage_stats WHERE stage = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (stage, stage, keep)
+                )
+
+    def recent_stage_stats(self, stages, limit):
+        conn = self._connection()
+        return {
+            stage: [(row['units'], row['seconds']) for row in conn.execute(
+                "SELECT units, seconds FROM task_stage_stats WHERE stage = ? ORDER BY id DESC LIMIT ?",
+                (stage, limit)
+            )]
+            for stage in stages
+        }
+
+    def pending_records(self):
+        columns = ("task_id, status, progress, current_slide, total_slides, started_at, lease_expires, "
+                   + ", ".join(COST_FIELDS))
+        conn = self._connection()
+        processing = [dict(row) for row in conn.execute(
+            f"SELECT {columns} FROM queue_tasks WHERE status = ?", (STATUS_PROCESSING,)
+        )]
+        waiting = [dict(row) for row in conn.execute(
+            f"SELECT {columns} FROM queue_tasks WHERE status = ? ORDER BY priority, created_at",
+            (STATUS_WAITING,)
+        )]
+        return processing, waiting
+
+    def count_by_status(self):
+        counts = _empty_counts()
+        for row in self._connection().execute("SELECT status, total FROM queue_counters"):
+            counts[row['status']] = row['total']
+        return counts
+
+    def archive_finished(self, max_age_seconds, max_entries):
+        finished = tuple(FINISHED_STATUSES)
+        placeholders = ", ".join("?" for _ in finished)
+        with self._transaction() as conn:
+            now = time.time()
+            expired = [row['task_id'] for row in conn.execute(
+                f"SELECT task_id FROM queue_tasks WHERE completed_at < ? AND status IN ({placeholders})",
+                (now - max_age_seconds,) + finished
+            )]
+            kept = conn.execute(
+                f"SELECT COUNT(*) FROM queue_tasks WHERE completed_at >= ? AND status IN ({placeholders})",
+                (now - max_age_seconds,) + finished
+            ).fetchone()[0]
+            if kept > max_entries:
+                expired.extend(row['task_id'] for row in conn.execute(
+                    f"SELECT task_id FROM queue_tasks WHERE completed_at >= ? AND status IN ({placeholders}) "
+                    f"ORDER BY completed_at LIMIT ?",
+                    (now - max_age_seconds,) + finished + (kept - max_entries,)
+                ))
+            if not expired:
+                return []
+
+            columns = ", ".join(_ARCHIVE_COLUMNS)
+            for start in range(0, len(expired), 500):
+                batch = expired[start:start + 500]
+                ids = ", ".join("?" for _ in batch)
+                conn.execute(
+                    f"INSERT OR REPLACE INTO queue_task_archive ({columns}, archived_at) "
+                    f"SELECT {columns}, ? FROM queue_tasks WHERE task_id IN ({ids})",
+                    [now] + batch
+                )
+                conn.execute(f"DELETE FROM queue_tasks WHERE task_id IN ({ids})", batch)
+            return expired
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class _ImmediateTransaction:
+    """BEGIN IMMEDIATE 事务：立即获取写锁，避免认领时的读后写竞争"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+def create_task_store(backend: str = "sqlite", path: Optional[str] = None) -> TaskQueueStore:
+    """
+    按名称创建任务存储
+
+    Args:
+        backend: sqlite 或 memory
+        path: SQLite数据库文件路径，默认为 instance/task_queue.db
+    """
+    backend = (backend or "sqlite").lower()
+    if backend == "memory":
+        return MemoryTaskStore()
+    if backend == "sqlite":
+        return SQLiteTaskStore(path or DEFAULT_STORE_PATH)
+    raise ValueError(f"不支持的任务队列存储后端: {backend}")
@@ -1,13 +1,17 @@
 """
 增强型线程池执行器
 支持优先级任务、任务状态跟踪和异步I/O操作
+CPU密集型任务（TaskType.CPU_BOUND）在进程池中执行
 """
 import threading
 import queue
 import time
 import os
+import pickle
+import multiprocessing
 import concurrent.futures
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from enum import Enum, auto
 from typing import Dict, Any, Callable, List, Optional, Union, TypeVar, Generic
 import logging
@@ -15,6 +19,7 @@ import asyncio
 from functools import partial
 import traceback
 import copy
+import itertools
 
 # 任务类型定义
 class TaskType(Enum):
@@ -147,6 +152,25 @@ class EnhancedThreadPoolExecutor:
             TaskType.CPU_BOUND: queue.PriorityQueue(),
             TaskType.LOW_PRIORITY: queue.PriorityQueue(),
         }
+        # 同优先级任务按提交顺序排列（也避免比较Task对象）
+        self._sequence = itertools.count()
+        
+        # 事件驱动调度：提交、任务完成、关闭时通知调度线程，空闲时不轮询
+        self._dispatch_cond = threading.Condition()
+        self._inflight = {'io': 0, 'cpu': 0}
+        self.scheduler_idle_timeout = 30.0  # 空闲时的兜底唤醒间隔（秒）
+        self.scheduler_wakeups = 0
+        self.dispatch_prefetch_ratio = 1.0  # 每个线程预先派发的任务数（超出部分在优先级队列中等待）
+        
+        # CPU密集型任务的进程池（首次使用时创建）：在独立进程中执行，不与翻译请求线程争用GIL
+        self.process_pool_enabled = True
+        self.process_workers = max(1, min(4, os.cpu_count() or 1))
+        self.process_max_tasks_per_child = 50  # 工作进程执行一定数量任务后重建，释放python-pptx/lxml累积的内存
+        self.process_preload = ['pptx', 'lxml.etree']  # forkserver服务进程预先导入的模块，工作进程fork后无需重复导入
+        self.process_executor: Optional[ProcessPoolExecutor] = None
+        self._process_lock = threading.Lock()
+        self.process_tasks_completed = 0
+        self.process_fallbacks = 0
         
         # 监控指标
         self.last_error_time = 0
@@ -161,15 +185,19 @@ class EnhancedThreadPoolExecutor:
     def configure(self, max_workers: Optional[int] = None, 
                 io_bound_workers: Optional[int] = None,
                 cpu_bound_workers: Optional[int] = None,
-                thread_name_prefix: Optional[str] = None) -> None:
+                thread_name_prefix: Optional[str] = None,
+                process_workers: Optional[int] = None,
+                process_pool_enabled: Optional[bool] = None) -> None:
         """
         配置线程池参数
         
         Args:
             max_workers: 最大工作线程数
             io_bound_workers: IO密集型任务线程数
-            cpu_bound_workers: CPU密集型任务线程数
+            cpu_bound_workers: CPU密集型任务线程数（等待进程池结果的线程）
             thread_name_prefix: 线程名称前缀
+            process_workers: CPU密集型任务的工作进程数
+            process_pool_enabled: 是否在进程池中执行CPU密集型任务
         """
         with self.lock:
             # 更新配置
@@ -181,6 +209,10 @@ class EnhancedThreadPoolExecutor:
                 self.cpu_bound_workers = cpu_bound_workers
             if thread_name_prefix is not None:
                 self.thread_name_prefix = thread_name_prefix
+            if process_workers is not None:
+                self.process_workers = max(1, process_workers)
+            if process_pool_enabled is not None:
+                self.process_pool_enabled = process_pool_enabled
                 
             # 如果已经初始化，需要先关闭现有的执行器
             if self.initialized:
@@ -195,12 +227,14 @@ class EnhancedThreadPoolExecutor:
             self.initialized = False
             
             # 清空任务队列
-            for task_type in TaskType:
-                while not self.task_queues[task_type].empty():
-                    try:
-                        self.task_queues[task_type].get_nowait()
-                    except:
-                        pass
+            with self._dispatch_cond:
+                for task_type in TaskType:
+                    while not self.task_queues[task_type].empty():
+                        try:
+                            self.task_queues[task_type].get_nowait()
+                        except:
+                            pass
+                self._inflight = {'io': 0, 'cpu': 0}
             
             # 创建新的执行器
             try:
@@ -210,7 +244,8 @@ class EnhancedThreadPoolExecutor:
                 self.executor_creation_time = time.time()
                 self.logger.info(
                     f"线程池已配置 - IO线程: {self.io_bound_workers}, "
-                    f"CPU线程: {self.cpu_bound_workers}"
+                    f"CPU线程: {self.cpu_bound_workers}, "
+                    f"工作进程: {self.process_workers if self.process_pool_enabled else '禁用'}"
                 )
             except Exception as e:
                 self.logger.error(f"创建执行器失败: {str(e)}")
@@ -306,6 +341,10 @@ class EnhancedThreadPoolExecutor:
         self.logger.info("正在关闭线程池执行器...")
         self.running = False
         
+        # 唤醒调度线程，使其检测到running=False后退出
+        with self._dispatch_cond:
+            self._dispatch_cond.notify_all()
+        
         # 获取当前线程ID，用于安全检查
         current_thread_id = threading.get_ident()
         
@@ -371,6 +410,9 @@ class EnhancedThreadPoolExecutor:
             except Exception as e:
                 self.logger.error(f"关闭CPU线程池时出错: {str(e)}")
         
+        # 关闭进程池（不等待正在执行的CPU任务，未开始的任务直接取消）
+        self._shutdown_process_executor()
+        
         # 关闭回调线程池
         if hasattr(self, '_callback_executor'):
             try:
@@ -442,8 +484,10 @@ class EnhancedThreadPoolExecutor:
             self.tasks[task.task_id] = task
             self.task_count += 1
             
-            # 添加到任务队列
-            self.task_queues[task_type].put((priority, task))
+            # 添加到任务队列并唤醒调度线程
+            with self._dispatch_cond:
+                self.task_queues[task_type].put((priority, next(self._sequence), task))
+                self._dispatch_cond.notify()
             
             # 记录任务提交信息
             self.logger.debug(
@@ -453,49 +497,207 @@ class EnhancedThreadPoolExecutor:
             
             return task
     
+    def _get_process_executor(self) -> Optional[ProcessPoolExecutor]:
+        """
+        获取CPU密集型任务的进程池，首次调用时创建
+
+        工作进程由forkserver服务进程fork（不支持时使用spawn），不继承服务进程的线程、锁和数据库连接；
+        forkserver服务进程只预先导入 process_preload 中的模块。
+        工作进程会以 __mp_main__ 的名字重新导入入口脚本，入口脚本不能在导入时创建应用（见 run.py）
+
+        Returns:
+            进程池，不可用时返回None
+        """
+        if not self.process_pool_enabled:
+            return None
+        with self._process_lock:
+            if self.process_executor is not None:
+                return self.process_executor
+
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(self.process_preload)
+            else:
+                context = multiprocessing.get_context('spawn')
+            options = {'max_workers': self.process_workers, 'mp_context': context}
+            if self.process_max_tasks_per_child:
+                options['max_tasks_per_child'] = self.process_max_tasks_per_child
+            try:
+                self.process_executor = ProcessPoolExecutor(**options)
+            except TypeError:
+                # Python 3.11 之前不支持 max_tasks_per_child
+                options.pop('max_tasks_per_child', None)
+                self.process_executor = ProcessPoolExecutor(**options)
+            self.logger.info(f"进程池已创建 - 工作进程: {self.process_workers}")
+            return self.process_executor
+
+    def _reset_process_executor(self, executor: ProcessPoolExecutor) -> None:
+        """丢弃已损坏的进程池（工作进程异常退出），下次使用时重新创建"""
+        with self._process_lock:
+            if self.process_executor is executor:
+                self.process_executor = None
+        try:
+            executor.shutdown(wait=False, cancel_futures=True)
+        except Exception as e:
+            self.logger.warning(f"关闭损坏的进程池时出错: {str(e)}")
+
+    def _shutdown_process_executor(self) -> None:
+        with self._process_lock:
+            executor, self.process_executor = self.process_executor, None
+        if executor is None:
+            return
+        try:
+            self.logger.debug("正在关闭进程池...")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.logger.debug("进程池已关闭")
+        except Exception as e:
+            self.logger.error(f"关闭进程池时出错: {str(e)}")
+
+    def run_in_process(self, func: Callable, args: tuple = (),
+                       kwargs: Dict[str, Any] = None,
+                       timeout: float = None) -> Any:
+        """
+        在进程池中执行CPU密集型函数并等待结果
+
+        func 必须是模块顶层函数，工作进程按模块名导入它，所在模块应只导入自身需要的依赖；
+        大数据（PPT数据、翻译结果等）应由调用方写入文件后传递路径，参数只包含路径和少量选项。
+        进程池不可用、函数或参数无法序列化、工作进程异常退出时，在当前线程执行
+
+        Args:
+            func: 要执行的函数
+            args: 位置参数
+            kwargs: 关键字参数
+            timeout: 等待结果的超时时间（秒）
+
+        Returns:
+            函数返回值
+        """
+        kwargs = kwargs or {}
+        name = getattr(func, '__qualname__', repr(func))
+        executor = self._get_process_executor()
+        if executor is None:
+            return func(*args, **kwargs)
+
+        try:
+            pickle.dumps((func, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            self.process_fallbacks += 1
+            self.logger.warning(f"函数或参数无法序列化，在当前线程执行 {name}: {str(e)}")
+            return func(*args, **kwargs)
+
+        try:
+            future = executor.submit(func, *args, **kwargs)
+        except (BrokenProcessPool, RuntimeError) as e:
+            # 进程池已损坏或已关闭
+            self._reset_process_executor(executor)
+            self.process_fallbacks += 1
+            self.logger.warning(f"进程池不可用，在当前线程执行 {name}: {str(e)}")
+            return func(*args, **kwargs)
+
+        try:
+            result = future.result(timeout=timeout)
+        except BrokenProcessPool as e:
+            # 工作进程崩溃（如内存耗尽被杀死）：重建进程池，本次在当前线程重新执行
+            self.logger.error(f"工作进程异常退出，在当前线程重新执行 {name}: {str(e)}")
+            self._reset_process_executor(executor)
+            self.process_fallbacks += 1
+            return func(*args, **kwargs)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+        self.process_tasks_completed += 1
+        return result
+
+    @staticmethod
+    def _executor_key(task_type: TaskType) -> str:
+        """IO密集型和高优先级任务使用IO执行器，其余使用CPU执行器"""
+        return 'io' if task_type in (TaskType.IO_BOUND, TaskType.HIGH_PRIORITY) else 'cpu'
+
+    def _executor_capacity(self, key: str) -> int:
+        """每个执行器允许的在途任务数：线程数加少量预取，避免线程等待调度线程"""
+        workers = max(1, self.io_bound_workers if key == 'io' else self.cpu_bound_workers)
+        return workers + max(1, int(workers * self.dispatch_prefetch_ratio))
+
+    def _collect_dispatchable(self) -> List[Task]:
+        """
+        取出当前可以派发的所有任务（需持有_dispatch_cond）
+
+        按TaskType顺序（高优先级、IO、CPU、低优先级）和队列内优先级依次取出，
+        直到对应执行器没有空闲线程为止；未派发的任务留在优先级队列中，
+        保证空闲线程出现时仍按优先级选择下一个任务
+        """
+        batch = []
+        for task_type in TaskType:
+            task_queue = self.task_queues[task_type]
+            key = self._executor_key(task_type)
+            capacity = self._executor_capacity(key)
+            while self._inflight[key] < capacity:
+                try:
+                    _, _, task = task_queue.get_nowait()
+                except queue.Empty:
+                    break
+                # 跳过已经被取消的任务
+                if task.status == TaskStatus.CANCELED:
+                    continue
+                self._inflight[key] += 1
+                batch.append(task)
+        return batch
+
+    def _release_slot(self, task: Task) -> None:
+        """任务结束后释放执行器槽位并唤醒调度线程"""
+        with self._dispatch_cond:
+            key = self._executor_key(task.task_type)
+            self._inflight[key] = max(0, self._inflight[key] - 1)
+            self._dispatch_cond.notify()
+
+    def _on_future_done(self, future, task: Task) -> None:
+        self._release_slot(task)
+        self._task_done_callback(future, task)
+
+    def _dispatch(self, task: Task) -> None:
+        """将任务提交到对应的执行器"""
+        executor = self.io_executor if self._executor_key(task.task_type) == 'io' else self.cpu_executor
+        try:
+            future = executor.submit(self._execute_task, task)
+        except Exception:
+            self._release_slot(task)
+            raise
+        future.add_done_callback(lambda f, t=task: self._on_future_done(f, t))
+
     def _scheduler_loop(self) -> None:
-        """任务调度循环"""
+        """
+        任务调度循环
+
+        在条件变量上阻塞，只有提交新任务、任务完成释放槽位或关闭时才被唤醒；
+        每次唤醒派发所有可以派发的任务
+        """
         while self.running:
             try:
-                # 按优先级顺序检查队列
-                tasks_processed = False
-                for task_type in TaskType:
+                with self._dispatch_cond:
+                    batch = self._collect_dispatchable()
+                    if not batch:
+                        self._dispatch_cond.wait(timeout=self.scheduler_idle_timeout)
+                        self.scheduler_wakeups += 1
+                        continue
+
+                for index, task in enumerate(batch):
                     try:
-                        if not self.task_queues[task_type].empty():
-                            # 获取任务
-                            _, task = self.task_queues[task_type].get_nowait()
-                            
-                            # 检查任务是否已经被取消
-                            if task.status == TaskStatus.CANCELED:
-                                continue
-                                
-                            # 选择执行器
-                            executor = (self.io_executor 
-                                      if task.task_type in (TaskType.IO_BOUND, TaskType.HIGH_PRIORITY)
-                                      else self.cpu_executor)
-                            
-                            # 提交任务到执行器
-                            future = executor.submit(
-                                self._execute_task,
-                                task
-                            )
-                            
-                            # 添加回调
-                            future.add_done_callback(
-                                lambda f, t=task: self._task_done_callback(f, t)
-                            )
-                            
-                            tasks_processed = True
-                            break
+                        self._dispatch(task)
                     except Exception as e:
-                        self.logger.error(f"处理队列 {task_type.name} 任务时出错: {str(e)}")
+                        self.logger.error(f"派发任务 {task.task_id} 时出错: {str(e)}")
                         self.last_error_time = time.time()
                         self.error_count += 1
-                
-                # 如果没有处理任务，短暂休眠以避免CPU过度使用
-                if not tasks_processed:
-                    threading.Event().wait(0.01)
-                
+                        # 执行器不可用时将剩余任务放回队列，等待执行器重建后再派发
+                        with self._dispatch_cond:
+                            for pending in batch[index:]:
+                                if pending is not task:
+                                    self._inflight[self._executor_key(pending.task_type)] -= 1
+                                self.task_queues[pending.task_type].put(
+                                    (pending.priority, next(self._sequence), pending)
+                                )
+                        raise
+
             except Exception as e:
                 self.logger.error(f"调度器错误: {str(e)}")
                 self.last_error_time = time.time()
@@ -584,8 +786,11 @@ class EnhancedThreadPoolExecutor:
                 self.logger.warning(f"检测到可能导致线程自己加入自己的函数: {task.func}")
                 task.use_async_callback = True  # 强制使用异步回调
             
-            # 执行任务函数
-            result = task.func(*task.args, **task.kwargs)
+            # 执行任务函数：CPU密集型任务在进程池中执行，当前线程只等待结果
+            if task.task_type == TaskType.CPU_BOUND:
+                result = self.run_in_process(task.func, task.args, task.kwargs)
+            else:
+                result = task.func(*task.args, **task.kwargs)
             
             # 记录任务执行时间
             task.execution_time = time.time() - task.start_time
@@ -892,12 +1097,13 @@ class EnhancedThreadPoolExecutor:
         with self.lock:
             if not self.initialized:
                 return
-            
-            # 使用安全关闭机制
-            self.safe_shutdown(wait=wait, timeout=10.0)
-            
-            # 确保标记为未初始化
-            self.initialized = False
+        
+        # 使用安全关闭机制（不持有self.lock：等待工作线程结束时，
+        # 它们的完成回调需要获取self.lock，持有锁等待会导致死锁）
+        self.safe_shutdown(wait=wait, timeout=10.0)
+        
+        # 确保标记为未初始化
+        self.initialized = False
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -930,7 +1136,12 @@ class EnhancedThreadPoolExecutor:
                 'last_recovery_time': self.last_recovery_time,
                 'uptime': uptime,
                 'io_active_threads': self.get_io_active_count(),
-                'cpu_active_threads': self.get_cpu_active_count()
+                'cpu_active_threads': self.get_cpu_active_count(),
+                'process_pool_enabled': self.process_pool_enabled,
+                'process_workers': self.process_workers,
+                'process_pool_active': self.process_executor is not None,
+                'process_tasks_completed': self.process_tasks_completed,
+                'process_fallbacks': self.process_fallbacks
             }
             
     def get_io_active_count(self) -> int:
@@ -22,6 +22,13 @@ def now_with_timezone():
     return datetime.now()
 
 
+def datetime_from_timestamp(value):
+    """时间戳转换为与 now_with_timezone() 相同约定的时间（无时区信息），可以直接比较和写库"""
+    if not value:
+        return None
+    return datetime.fromtimestamp(value)
+
+
 def localize_datetime(dt, assume_timezone='UTC'):
     if dt is None:
         return None
@@ -0,0 +1,126 @@
+"""
+上传记录列表（翻译历史、PDF翻译历史、管理员文件列表）
+- 按 (upload_time, id) 倒序做游标分页（keyset），翻页耗时与页码无关，翻页期间新增记录不会导致重复或遗漏
+- 用户名通过连接查询获取，不再逐条查询用户
+- 文件是否存在读取 upload_records.file_state，由清理任务（refresh_file_states）、下载和删除接口维护，
+  列表接口不再逐条检查文件系统
+"""
+import os
+import base64
+import logging
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from ..models import UploadRecord, User, db
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(upload_time: datetime, record_id: int) -> str:
+    raw = f"{upload_time.isoformat()}|{record_id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        time_part, id_part = raw.rsplit('|', 1)
+        return datetime.fromisoformat(time_part), int(id_part)
+    except Exception as e:
+        raise ValueError(f"无效的分页游标: {cursor}") from e
+
+
+def page_size(value: Optional[int]) -> int:
+    if not value or value <= 0:
+        return DEFAULT_PAGE_SIZE
+    return min(value, MAX_PAGE_SIZE)
+
+
+def listing_query(user_id: Optional[int] = None, file_type: Optional[str] = None,
+                  status: Optional[str] = None):
+    """
+    上传记录和用户名的连接查询（查询结果为 (UploadRecord, username)）
+
+    Args:
+        user_id: 只查询该用户的记录
+        file_type: 按记录类型过滤（UploadRecord.TYPE_PPT / TYPE_PDF），使用 file_type 索引
+        status: 按状态过滤
+    """
+    query = db.session.query(UploadRecord, User.username).outerjoin(User, User.id == UploadRecord.user_id)
+    if user_id is not None:
+        query = query.filter(UploadRecord.user_id == user_id)
+    if file_type:
+        query = query.filter(UploadRecord.file_type == file_type)
+    if status:
+        query = query.filter(UploadRecord.status == status)
+    return query
+
+
+def keyset_page(query, limit: Optional[int], cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (upload_time, id) 倒序取一页
+
+    Args:
+        query: listing_query 返回的查询
+        limit: 每页条数，为 None 时返回全部记录（兼容未分页的旧调用方式）
+        cursor: 上一页返回的 next_cursor
+
+    Returns:
+        (记录列表, 下一页游标)，没有更多记录时游标为 None
+    """
+    if cursor:
+        upload_time, record_id = decode_cursor(cursor)
+        query = query.filter(db.or_(
+            UploadRecord.upload_time < upload_time,
+            db.and_(UploadRecord.upload_time == upload_time, UploadRecord.id < record_id)
+        ))
+    query = query.order_by(UploadRecord.upload_time.desc(), UploadRecord.id.desc())
+    if limit is None:
+        return query.all(), None
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1][0]
+    return rows, encode_cursor(last.upload_time, last.id)
+
+
+def set_file_state(record: UploadRecord, exists: bool) -> bool:
+    """更新记录的文件状态（不提交），状态有变化时返回 True"""
+    state = UploadRecord.FILE_PRESENT if exists else UploadRecord.FILE_MISSING
+    if record.file_state == state:
+        return False
+    record.file_state = state
+    return True
+
+
+def refresh_file_states(batch_size: int = 500) -> Tuple[int, int]:
+    """
+    按主键分批检查所有记录的文件是否存在并更新 file_state（由定时清理任务调用）
+
+    Returns:
+        (检查的记录数, 状态变化的记录数)
+    """
+    checked = changed = 0
+    last_id = 0
+    while True:
+        records = UploadRecord.query.filter(UploadRecord.id > last_id) \
+            .order_by(UploadRecord.id).limit(batch_size).all()
+        if not records:
+            break
+        for record in records:
+            if set_file_state(record, os.path.exists(record.full_path)):
+                changed += 1
+        db.session.commit()
+        checked += len(records)
+        last_id = records[-1].id
+    logger.info(f"文件状态检查完成: 检查 {checked} 条记录, 状态变化 {changed} 条")
+    return checked, changed
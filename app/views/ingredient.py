@@ -5,66 +5,58 @@ from urllib.parse import quote  # 用于在生成 URL 时编码中文
 from flask import Blueprint, request, jsonify, current_app, send_file
 from flask_login import login_required
 
+from ..utils.ingredient_index import ingredient_index_cache, NO_IMAGE_PATH
+from ..utils.ingredient_store import open_store, STORE_FILENAME
+
 ingredient = Blueprint('ingredient', __name__)
 
-# 缓存JSON数据
-_cached_registration_data = None
-_cached_filing_data = None
-_cached_combined_data = None
-_cache_registration_file_path = None
-_cache_filing_file_path = None
+REGISTRATION_FILE = '保健食品注册.json'
+FILING_FILE = '保健食品备案.json'
 
-def load_registration_data():
-    """加载保健食品注册数据"""
-    global _cached_registration_data, _cache_registration_file_path
-    json_file_path = os.path.join(current_app.root_path, 'Ingredient_Search', '保健食品注册.json')
-    json_file_path = os.path.abspath(json_file_path)
-    if _cached_registration_data and _cache_registration_file_path == json_file_path:
-        return _cached_registration_data
-    try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            _cached_registration_data = json.load(f)
-            _cache_registration_file_path = json_file_path
-            return _cached_registration_data
-    except Exception as e:
-        current_app.logger.error(f"加载注册JSON文件失败: {e}")
-        return {}
+def _dataset_path(filename):
+    return os.path.abspath(os.path.join(current_app.root_path, 'Ingredient_Search', filename))
 
-def load_filing_data():
-    """加载保健食品备案数据"""
-    global _cached_filing_data, _cache_filing_file_path
-    json_file_path = os.path.join(current_app.root_path, 'Ingredient_Search', '保健食品备案.json')
-    json_file_path = os.path.abspath(json_file_path)
-    if _cached_filing_data and _cache_filing_file_path == json_file_path:
-        return _cached_filing_data
+def _read_dataset(filename, label):
     try:
-        with open(json_file_path, 'r', encoding='utf-8') as f:
-            _cached_filing_data = json.load(f)
-            _cache_filing_file_path = json_file_path
-            return _cached_filing_data
+        with open(_dataset_path(filename), 'r', encoding='utf-8') as f:
+            return json.load(f)
     except Exception as e:
-        current_app.logger.error(f"加载备案JSON文件失败: {e}")
+        current_app.logger.error(f"加载{label}JSON文件失败: {e}")
         return {}
 
-def load_both_ingredient_data():
-    """加载保健食品注册和备案数据并合并"""
-    global _cached_combined_data
-    if _cached_combined_data:
-        return _cached_combined_data
-
-    registration_data = load_registration_data()
-    filing_data = load_filing_data()
-
-    combined_data = {}
-    for product_name, product_info in registration_data.items():
-        combined_data[product_name] = {**product_info, 'data_source': '注册'}
-    for product_name, product_info in filing_data.items():
-        if product_name in combined_data:
-            product_name = f"{product_name}(备案)"
-        combined_data[product_name] = {**product_info, 'data_source': '备案'}
+def load_registration_data():
+    """加载保健食品注册数据（只在建立搜索索引时读取，不常驻内存）"""
+    return _read_dataset(REGISTRATION_FILE, '注册')
 
-    _cached_combined_data = combined_data
-    return combined_data
+def load_filing_data():
+    """加载保健食品备案数据（只在建立搜索索引时读取，不常驻内存）"""
+    return _read_dataset(FILING_FILE, '备案')
+
+def _data_file_key():
+    """数据文件标识（路径和修改时间），数据文件更新后重新建立搜索索引"""
+    key = []
+    for filename in (REGISTRATION_FILE, FILING_FILE):
+        json_file_path = _dataset_path(filename)
+        try:
+            key.append((json_file_path, os.path.getmtime(json_file_path)))
+        except OSError:
+            key.append((json_file_path, None))
+    return tuple(key)
+
+def get_ingredient_searcher():
+    """
+    成分搜索：优先查询 scripts/build_ingredient_store.py 构建的SQLite存储（不占用进程内存）；
+    未构建时在进程内建立索引
+    """
+    store = open_store(_dataset_path(STORE_FILENAME))
+    if store is not None:
+        if not store.stale_checked:
+            store.stale_checked = True
+            if store.is_stale([_dataset_path(REGISTRATION_FILE), _dataset_path(FILING_FILE)]):
+                current_app.logger.warning("成分数据JSON在存储文件构建后有更新，请重新运行 scripts/build_ingredient_store.py")
+        return store
+    return ingredient_index_cache.get(_data_file_key(),
+                                      lambda: (load_registration_data(), load_filing_data()))
 
 def _normalize_rel_url_path(p: str) -> str:
     """用于生成URL：把 \→/，去掉 ./ 前缀，不做安全判断（仅用于URL展示）"""
@@ -98,45 +90,27 @@ def search_ingredient():
         if not keyword:
             return jsonify({'success': False, 'message': '请输入搜索关键词'}), 400
 
-        if data_source == 'registration':
-            data = {k: {**v, 'data_source': '注册'} for k, v in load_registration_data().items()}
-        elif data_source == 'filing':
-            data = {k: {**v, 'data_source': '备案'} for k, v in load_filing_data().items()}
-        else:
-            data = load_both_ingredient_data()
-
-        if not data:
+        searcher = get_ingredient_searcher()
+        if not len(searcher):
             return jsonify({'success': False, 'message': '数据加载失败'}), 500
 
-        matched_products = []
-        for product_name, product_info in data.items():
-            ingredients = product_info.get('ingredient', '') or ''
-            data_source_label = product_info.get('data_source', '未知')
-            if keyword.lower() in ingredients.lower() or keyword.lower() in product_name.lower():
-                if ingredients:
-                    parts = [ing.strip() for ing in ingredients.split(',')]
-                    main_ingredients = parts[:3]
-                    main_ingredients_str = "、".join(main_ingredients) + ("等" if len(parts) > 3 else "")
-                else:
-                    main_ingredients_str = "无成分信息"
-
-                image_path = product_info.get('path', '无截图路径')
-                image_url = get_image_url(image_path) if image_path != '无截图路径' else None
-
-                matched_products.append({
-                    '产品名称': product_name,
-                    '主要成分': main_ingredients_str,
-                    '完整成分': ingredients,
-                    '截图路径': image_path,
-                    '图片URL': image_url,
-                    '数据源': data_source_label,
-                    'detail_url': product_info.get('detail_url', '')
-                })
-
-        total = len(matched_products)
+        # 先分页，只为当前页的产品生成结果
         start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        paginated_products = matched_products[start_index:end_index]
+        total, products = searcher.page(keyword, data_source, start_index, per_page)
+
+        paginated_products = []
+        for product in products:
+            image_path = product['path']
+            image_url = get_image_url(image_path) if image_path != NO_IMAGE_PATH else None
+            paginated_products.append({
+                '产品名称': product['name'],
+                '主要成分': product['summary'],
+                '完整成分': product['ingredients'],
+                '截图路径': image_path,
+                '图片URL': image_url,
+                '数据源': product['source'],
+                'detail_url': product['detail_url']
+            })
 
         return jsonify({
             'success': True,
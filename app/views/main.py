@@ -5,7 +5,7 @@ import pytz
 
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app, send_from_directory, \
-    jsonify, session, send_file
+    jsonify, session, send_file, Response
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
 from sqlalchemy.exc import SQLAlchemyError
@@ -25,8 +25,14 @@ import re
 from ..utils.task_queue import translation_queue as old_translation_queue
 from ..function.ppt_translate_async import process_presentation as process_presentation_async
 from ..function.ppt_translate_async import process_presentation_add_annotations as process_presentation_add_annotations_async
-from ..utils.enhanced_task_queue import EnhancedTranslationQueue, TranslationTask, translation_queue
+from ..utils.enhanced_task_queue import EnhancedTranslationQueue, TranslationTask, QueueFullError, translation_queue
 from ..utils.thread_pool_executor import thread_pool, TaskType
+from ..utils.task_events import task_events, stream_task_events
+from ..utils.glossary_search import ranked_search_query
+from ..utils.glossary_import import validate_excel_file, import_glossary_excel, import_progress
+from ..utils.glossary_cache import glossary_service, CompiledGlossary
+from ..utils.upload_listing import listing_query, keyset_page, page_size, set_file_state
+from ..utils import storage_accounting
 import openpyxl
 from io import BytesIO
 import logging
@@ -94,6 +100,24 @@ def get_unique_filename(filename):
     ext = filename.rsplit('.', 1)[1].lower()
     return f"{uuid.uuid4().hex}.{ext}"
 
+def _keyset_listing(query):
+    """
+    按请求参数 limit/cursor 取上传记录列表
+    两个参数都未提供时返回全部记录（兼容旧的调用方式），否则按游标分页
+
+    Returns:
+        (记录列表, 下一页游标, 是否分页)
+
+    Raises:
+        ValueError: 游标格式不正确
+    """
+    cursor = request.args.get('cursor') or None
+    limit = request.args.get('limit', type=int)
+    paginated = limit is not None or cursor is not None
+    rows, next_cursor = keyset_page(query, page_size(limit) if paginated else None, cursor)
+    return rows, next_cursor, paginated
+
+
 def custom_filename(name):
     # 移除危险的路径字符，仅保留基本合法字符 + 中文
     name = re.sub(r'[\\/:"*?<>|]+', '_', name)  # 替换非法字符
@@ -149,56 +173,25 @@ def upload_file():
             logger.info(f"  没有选择页面，将翻译所有页面")
             select_page = []
 
-        # 构建自定义翻译词典
-        custom_translations = {}
+        # 构建自定义翻译词典：按（用户、词条集合、语言方向、词库版本）缓存编译结果，未命中时才查询数据库
+        def load_vocabulary(ids):
+            # 查询词汇表数据（包含权限检查）
+            return Translation.query.filter(
+                Translation.id.in_(ids),
+                db.or_(
+                    db.and_(Translation.user_id == current_user.id, Translation.is_public == False),
+                    Translation.is_public == True
+                )
+            ).all()
+
+        try:
+            glossary = glossary_service.get(current_user.id, vocabulary_ids, user_language, target_language,
+                                            load_vocabulary)
+        except Exception as e:
+            logger.error(f"构建自定义词典失败: {str(e)}")
+            glossary = CompiledGlossary({}, user_language, target_language)
         if vocabulary_ids:
-            try:
-                # 查询词汇表数据（包含权限检查）
-                translations = Translation.query.filter(
-                    Translation.id.in_(vocabulary_ids),
-                    db.or_(
-                        db.and_(Translation.user_id == current_user.id, Translation.is_public == False),
-                        Translation.is_public == True
-                    )
-                ).all()
-                
-                logger.info(f"从数据库查询到 {len(translations)} 个词汇条目")
-                
-                # 根据翻译方向构建词典
-                for trans in translations:
-                    source_text = None
-                    target_text = None
-                    
-                    # 根据语言方向映射源文本和目标文本
-                    if user_language == 'English' and target_language == 'Chinese':
-                        source_text = trans.english
-                        target_text = trans.chinese
-                    elif user_language == 'Chinese' and target_language == 'English':
-                        source_text = trans.chinese
-                        target_text = trans.english
-                    elif user_language == 'English' and target_language == 'Dutch':
-                        source_text = trans.english
-                        target_text = trans.dutch
-                    elif user_language == 'Dutch' and target_language == 'English':
-                        source_text = trans.dutch
-                        target_text = trans.english
-                    elif user_language == 'Chinese' and target_language == 'Dutch':
-                        source_text = trans.chinese
-                        target_text = trans.dutch
-                    elif user_language == 'Dutch' and target_language == 'Chinese':
-                        source_text = trans.dutch
-                        target_text = trans.chinese
-                    
-                    # 添加到词典（确保源文本和目标文本都存在且不为空）
-                    if source_text and target_text and source_text.strip() and target_text.strip():
-                        custom_translations[source_text.strip()] = target_text.strip()
-                
-                logger.info(f"构建自定义词典完成，包含 {len(custom_translations)} 个词汇对")
-                logger.info(f"词典示例: {dict(list(custom_translations.items())[:3])}..." if custom_translations else "词典为空")
-                
-            except Exception as e:
-                logger.error(f"构建自定义词典失败: {str(e)}")
-                custom_translations = {}
+            logger.info(f"自定义词典包含 {len(glossary)} 个词汇对")
 
         # 其他参数处理
         stop_words_input = request.form.get('stop_words', '')
@@ -206,6 +199,7 @@ def upload_file():
 
         custom_translations_input = request.form.get('custom_translations', '')
         # 合并用户输入的翻译和词汇表翻译
+        manual_translations = {}
         for line in custom_translations_input.split('\n'):
             line = line.strip()
             if not line:
@@ -213,7 +207,8 @@ def upload_file():
             parts = line.split('->')
             if len(parts) == 2:
                 eng, chi = parts[0].strip(), parts[1].strip()
-                custom_translations[eng] = chi
+                manual_translations[eng] = chi
+        glossary = glossary.merged(manual_translations)
 
         # 获取上传的文件
         file = request.files.get('file')
@@ -259,6 +254,7 @@ def upload_file():
         
         stored_filename = get_unique_filename(new_filename)
         file_path = os.path.join(user_upload_dir, stored_filename)
+        record_committed = False
 
         try:
             # 保存PPT文件
@@ -272,11 +268,14 @@ def upload_file():
                 stored_filename=stored_filename,
                 file_path=user_upload_dir,
                 file_size=file_size,
-                status='pending'
+                status='pending',
+                file_type=UploadRecord.TYPE_PPT
             )
 
             db.session.add(record)
+            storage_accounting.file_added(current_user.id, file_path, file_size)
             db.session.commit()
+            record_committed = True
 
             # 添加翻译任务到队列
             priority = 0  # 默认优先级
@@ -287,9 +286,9 @@ def upload_file():
             logger.info(f"  - 模型: {model}")
             logger.info(f"  - 文本分割: {enable_text_splitting}")
             logger.info(f"  - UNO转换: {enable_uno_conversion}")
-            logger.info(f"  - 自定义词典条目数: {len(custom_translations)}")
+            logger.info(f"  - 自定义词典条目数: {len(glossary)}")
             
-            queue_position = translation_queue.add_task(
+            task_id = translation_queue.add_task(
                 user_id=current_user.id,
                 user_name=current_user.username,
                 file_path=file_path,
@@ -301,13 +300,22 @@ def upload_file():
                 model=model,
                 enable_text_splitting=enable_text_splitting,
                 enable_uno_conversion=enable_uno_conversion,
-                custom_translations=custom_translations  # 传递自定义词典
+                custom_translations=glossary.to_dict(),  # 传递自定义词典
+                glossary_fingerprint=glossary.fingerprint
             )
 
+            # 超出并发预算的大任务同样入队，返回本任务的预计开始时间
+            estimated_wait = translation_queue.estimate_wait_seconds(task_id)
+            msg = '文件上传成功，已加入翻译队列'
+            if estimated_wait:
+                msg += f'，预计约 {max(1, round(estimated_wait / 60))} 分钟后开始翻译'
+
             return jsonify({
                 'code': 200,
-                'msg': '文件上传成功，已加入翻译队列',
-                'queue_position': queue_position,
+                'msg': msg,
+                'task_id': task_id,
+                'queue_position': translation_queue.get_waiting_count(),
+                'estimated_wait_seconds': estimated_wait,
                 'record_id': record.id
             })
 
@@ -319,6 +327,24 @@ def upload_file():
             # 回滚数据库事务
             db.session.rollback()
 
+            # 上传记录和用量计数已提交（入队失败）时一并撤销
+            if record_committed:
+                try:
+                    db.session.delete(record)
+                    storage_accounting.file_removed(current_user.id, file_path, file_size)
+                    db.session.commit()
+                except Exception as cleanup_error:
+                    db.session.rollback()
+                    logger.error(f"撤销上传记录失败: {str(cleanup_error)}")
+
+            if isinstance(e, QueueFullError):
+                # 队列积压是暂时的，返回 503 和预计等待时间，客户端按 Retry-After 重试
+                response = jsonify({'code': 503, 'msg': str(e),
+                                    'estimated_wait_seconds': round(e.backlog_seconds),
+                                    'retry_after_seconds': e.retry_after_seconds})
+                response.headers['Retry-After'] = str(e.retry_after_seconds)
+                return response, 503
+
             logger.error(f"文件上传失败: {str(e)}")
             return jsonify({'code': 500, 'msg': f'文件上传失败: {str(e)}'}), 500
 
@@ -409,6 +435,41 @@ def get_task_status():
     return jsonify({'status': 'no_task'})
 
 
+@main.route('/api/tasks/<task_id>/events')
+@login_required
+def task_events_stream(task_id):
+    """
+    任务进度事件流（Server-Sent Events）
+
+    推送任务状态快照（event: status 状态变化 / progress 进度更新），任务结束后关闭；
+    客户端重连时携带 Last-Event-ID，状态未变化则不重复推送
+    """
+    owner_id = translation_queue.get_task_owner(task_id)
+    if owner_id is None:
+        return jsonify({'status': 'not_found', 'error': '任务不存在'}), 404
+    if owner_id != current_user.id and not current_user.is_administrator():
+        return jsonify({'status': 'forbidden', 'error': '无权访问该任务'}), 403
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    # 任务可能由其他服务进程执行，此时本进程收不到事件，按间隔读取共享存储
+    poll_interval = translation_queue.store_poll_interval if translation_queue.store.shared else None
+
+    events = stream_task_events(
+        task_id,
+        translation_queue.get_task_snapshot,
+        task_events,
+        last_event_id=last_event_id,
+        max_rate=float(os.getenv('TASK_EVENTS_MAX_RATE', 2)),
+        poll_interval=poll_interval,
+        keepalive_interval=float(os.getenv('TASK_EVENTS_KEEPALIVE', 15)),
+        max_duration=float(os.getenv('TASK_EVENTS_MAX_DURATION', 600))
+    )
+    return Response(events, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 禁止Nginx缓冲事件流
+    })
+
+
 @main.route('/queue_status')
 @login_required
 def get_queue_status():
@@ -463,13 +524,13 @@ def get_queue_status():
 def get_history():
     try:
         # 只返回状态为 completed 的记录
-        records = UploadRecord.query.filter_by(user_id=current_user.id, status='completed') \
-            .order_by(UploadRecord.upload_time.desc()).all()
+        rows, next_cursor, paginated = _keyset_listing(
+            listing_query(user_id=current_user.id, status='completed'))
 
         history_records = []
-        for record in records:
-            # 检查文件是否仍然存在
-            file_exists = os.path.exists(os.path.join(record.file_path, record.stored_filename))
+        for record, _ in rows:
+            # 文件是否存在读取记录中的文件状态
+            file_exists = record.file_exists
 
             # 使用ISO格式返回时间，让前端正确处理时区
             upload_time = datetime_to_isoformat(record.upload_time)
@@ -484,8 +545,13 @@ def get_history():
                 'file_exists': file_exists
             })
 
+        if paginated:
+            return jsonify({'records': history_records, 'next_cursor': next_cursor,
+                            'has_more': next_cursor is not None})
         return jsonify(history_records)
 
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         print(f"History error: {str(e)}")
         return jsonify({
@@ -497,7 +563,9 @@ def get_history():
             # 删除物理文件
             file_path = os.path.join(record.file_path, record.stored_filename)
             if os.path.exists(file_path):
+                file_size = os.path.getsize(file_path)
                 os.remove(file_path)
+                storage_accounting.file_removed(record.user_id, file_path, file_size)
 
             # 删除数据库记录
             db.session.delete(record)
@@ -752,17 +820,23 @@ def get_translations():
             )
         )
 
-    if search:
-        query = query.filter(
-            db.or_(
-                Translation.english.ilike(f'%{search}%'),
-                Translation.chinese.ilike(f'%{search}%'),
-                Translation.dutch.ilike(f'%{search}%'),
-                Translation.category.ilike(f'%{search}%')
+    # 优先使用全文索引检索并按相关度排序，关键词过短或索引不可用时按子串扫描
+    ranked_query = ranked_search_query(query, Translation, search) if search else None
+    if ranked_query is not None:
+        query = ranked_query
+    else:
+        if search:
+            query = query.filter(
+                db.or_(
+                    Translation.english.ilike(f'%{search}%'),
+                    Translation.chinese.ilike(f'%{search}%'),
+                    Translation.dutch.ilike(f'%{search}%'),
+                    Translation.category.ilike(f'%{search}%')
+                )
             )
-        )
+        query = query.order_by(Translation.id.desc())
 
-    pagination = query.order_by(Translation.id.desc()).paginate(
+    pagination = query.paginate(
         page=page, per_page=per_page, error_out=False
     )
 
@@ -892,7 +966,9 @@ def delete_translation(id):
             return jsonify({'error': '无权删除此翻译'}), 403
 
     try:
+        owner_id, was_public = translation.user_id, translation.is_public
         db.session.delete(translation)
+        glossary_service.invalidate(owner_id, public=was_public)
         db.session.commit()
         return jsonify({'message': '删除成功'})
     except Exception as e:
@@ -953,9 +1029,11 @@ def update_translation(id):
         translation.category = data.get('category')
         
         # Only admins can change public status
+        was_public = translation.is_public
         if current_user.is_administrator() and 'is_public' in data:
             translation.is_public = is_public
-            
+
+        glossary_service.invalidate(translation.user_id, public=was_public or translation.is_public)
         db.session.commit()
 
         return jsonify({
@@ -1858,6 +1936,8 @@ def system_status():
                 'health': thread_pool_health
             },
             'task_queue': queue_stats,
+            # 任务耗时预测模型各阶段的拟合参数（固定开销、单位耗时、样本数）
+            'eta_model': translation_queue.eta_model.rates(),
             'database': db_stats,
             'memory': memory_stats,
             'cpu': cpu_stats,
@@ -3093,7 +3173,8 @@ def translate_pdf():
                 file_path=pdf_output_dir,
                 user_id=current_user.id,
                 file_size=os.path.getsize(docx_path),
-                status='completed'
+                status='completed',
+                file_type=UploadRecord.TYPE_PDF
             )
             db.session.add(record)
             db.session.commit()
@@ -3310,8 +3391,11 @@ def download_translated_file(record_id):
             except Exception:
                 pass
 
-        # 最终检查
-        if not os.path.exists(file_path):
+        # 最终检查，同时更新记录的文件状态
+        file_found = os.path.exists(file_path)
+        if set_file_state(record, file_found):
+            db.session.commit()
+        if not file_found:
             flash('文件不存在', 'error')
             return redirect(url_for('main.index'))
         
@@ -3354,18 +3438,19 @@ def get_admin_files():
         return jsonify({'error': '没有权限访问此API'}), 403
         
     try:
-        # 查询所有文件记录
-        records = UploadRecord.query.order_by(UploadRecord.upload_time.desc()).all()
+        # 查询文件记录，用户名通过连接查询获取
+        rows, next_cursor, paginated = _keyset_listing(listing_query(
+            user_id=request.args.get('user_id', type=int),
+            file_type=request.args.get('type') or None
+        ))
         
         # 构建文件列表，包含用户信息
         files = []
-        for record in records:
-            # 查询用户信息
-            user = User.query.get(record.user_id)
-            username = user.username if user else "未知用户"
+        for record, username in rows:
+            username = username or "未知用户"
             
-            # 检查文件是否存在
-            file_exists = os.path.exists(os.path.join(record.file_path, record.stored_filename))
+            # 文件是否存在读取记录中的文件状态
+            file_exists = record.file_exists
             
             # 使用ISO格式返回时间，让前端正确处理时区
             upload_time = datetime_to_isoformat(record.upload_time)
@@ -3381,14 +3466,23 @@ def get_admin_files():
                 'error_message': record.error_message,
                 'user_id': record.user_id,
                 'username': username,
+                'file_type': record.file_type,
                 'file_exists': file_exists
             })
             
+        if paginated:
+            return jsonify({
+                'files': files,
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None
+            })
         return jsonify({
             'files': files,
             'total': len(files)
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e), 'files': []}), 400
     except Exception as e:
         logger.error(f"获取管理员文件列表失败: {str(e)}")
         return jsonify({
@@ -3412,11 +3506,14 @@ def admin_delete_file(record_id):
         # 删除物理文件
         file_path = os.path.join(record.file_path, record.stored_filename)
         if os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
             os.remove(file_path)
+            storage_accounting.file_removed(record.user_id, file_path, file_size)
             logger.info(f"管理员删除文件: {file_path}")
         
         # 删除数据库记录
         db.session.delete(record)
+        db.session.commit()
     except Exception as e:
         db.session.rollback()
         logger.error(f"管理员删除文件失败: {str(e)}")
@@ -3424,7 +3521,6 @@ def admin_delete_file(record_id):
             'success': False,
             'error': f'删除文件失败: {str(e)}'
         }), 500
-        db.session.commit()
     return jsonify({
             'success': True,
             'message': '文件删除成功'
@@ -3434,49 +3530,16 @@ def admin_delete_file(record_id):
 @main.route('/api/translation_history')
 @login_required
 def translation_history():
-    """获取翻译历史记录"""
+    """获取翻译历史记录（PDF翻译生成的记录）"""
     try:
-        # 获取查询参数
-        file_type = request.args.get('type', '')
-        
-        # 构建查询 - 先按用户筛选，不强制状态=completed，避免写库异常导致历史缺失
-        query = UploadRecord.query.filter_by(user_id=current_user.id)
-        
-        # 按上传时间倒序排列
-        records = query.order_by(UploadRecord.upload_time.desc()).all()
+        # 先按用户筛选，不强制状态=completed，避免写库异常导致历史缺失；
+        # 记录类型使用 file_type 列在数据库中过滤（旧记录启动时已按 pdf_outputs 目录回填）
+        rows, next_cursor, paginated = _keyset_listing(
+            listing_query(user_id=current_user.id, file_type=UploadRecord.TYPE_PDF))
 
         # 格式化记录
         history_records = []
-        for record in records:
-            # 仅保留PDF翻译生成的记录（目录包含 pdf_outputs）
-            try:
-                if 'pdf_outputs' not in (record.file_path or ''):
-                    continue
-            except Exception:
-                pass
-            # 检查文件是否仍然存在
-            file_path = os.path.join(record.file_path, record.stored_filename)
-            file_exists = os.path.exists(file_path)
-            
-            # 如果文件不存在，尝试在pdf_outputs目录中查找
-            if not file_exists:
-                try:
-                    # 构建项目根目录和pdf_outputs路径
-                    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                    upload_folder = current_app.config['UPLOAD_FOLDER']
-                    if not os.path.isabs(upload_folder):
-                        upload_folder = os.path.join(project_root, upload_folder)
-                    pdf_output_dir = os.path.join(upload_folder, 'pdf_outputs')
-                    
-                    # 在pdf_outputs目录中查找文件
-                    potential_file_path = os.path.join(pdf_output_dir, record.stored_filename)
-                    if os.path.exists(potential_file_path):
-                        file_exists = True
-                        file_path = potential_file_path
-                        logger.info(f"在pdf_outputs目录中找到历史文件: {file_path}")
-                except Exception as e:
-                    logger.warning(f"查找历史文件时出错: {e}")
-
+        for record, _ in rows:
             # 使用ISO格式返回时间，让前端正确处理时区
             upload_time = datetime_to_isoformat(record.upload_time)
             
@@ -3488,26 +3551,16 @@ def translation_history():
                 'file_size': record.file_size,
                 'upload_time': upload_time,
                 'status': record.status,
-                'file_exists': file_exists
+                'file_exists': record.file_exists
             })
 
-        # 如果指定了文件类型，则在Python层面进行过滤（避免SQL层面的字段不存在错误）
-        if file_type:
-            filtered_records = []
-            for record in history_records:
-                # 由于数据库中可能没有file_type字段，我们只能通过文件名后缀等方式大致判断
-                # 这里简化处理，如果需要精确过滤，需要在数据库中添加file_type字段
-                if file_type == 'pdf_translation':
-                    # 简单地通过文件名判断是否为PDF翻译记录
-                    if record['filename'].endswith('.docx') or 'translated' in record['filename']:
-                        filtered_records.append(record)
-                else:
-                    # 对于其他类型，暂时不过滤
-                    filtered_records.append(record)
-            history_records = filtered_records
-
+        if paginated:
+            return jsonify({'records': history_records, 'next_cursor': next_cursor,
+                            'has_more': next_cursor is not None})
         return jsonify(history_records)
         
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"获取PDF翻译历史记录失败: {e}")
         import traceback
@@ -3546,53 +3599,14 @@ def pdf_translation_history():
     """获取PDF翻译历史记录"""
     try:
         logger.info("[PDF History] 开始查询历史记录")
-        # 构建查询 - 只返回状态为 completed 的记录
-        query = UploadRecord.query.filter_by(user_id=current_user.id, status='completed')
-        
-        # 按上传时间倒序排列
-        records = query.order_by(UploadRecord.upload_time.desc()).all()
-        logger.info(f"[PDF History] 查询到用户记录数: {len(records)}")
+        # 构建查询 - 只返回状态为 completed 的PDF翻译记录
+        rows, next_cursor, paginated = _keyset_listing(listing_query(
+            user_id=current_user.id, file_type=UploadRecord.TYPE_PDF, status='completed'))
+        logger.info(f"[PDF History] 查询到用户记录数: {len(rows)}")
 
         # 格式化记录
         history_records = []
-        for record in records:
-            try:
-                logger.info(f"[PDF History] 记录: id={record.id}, filename={record.filename}, stored={record.stored_filename}, path={record.file_path}")
-            except Exception:
-                pass
-
-            # 仅保留PDF翻译生成的记录（目录包含 pdf_outputs）
-            try:
-                if 'pdf_outputs' not in (record.file_path or ''):
-                    logger.info(f"[PDF History] 过滤非pdf_outputs记录: id={record.id}, path={record.file_path}")
-                    continue
-            except Exception:
-                pass
-
-            # 检查文件是否仍然存在
-            file_path = os.path.join(record.file_path, record.stored_filename)
-            file_exists = os.path.exists(file_path)
-            logger.info(f"[PDF History] 文件存在: {file_exists}, full_path={file_path}")
-            
-            # 如果文件不存在，尝试在pdf_outputs目录中查找
-            if not file_exists:
-                try:
-                    # 构建项目根目录和pdf_outputs路径
-                    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                    upload_folder = current_app.config['UPLOAD_FOLDER']
-                    if not os.path.isabs(upload_folder):
-                        upload_folder = os.path.join(project_root, upload_folder)
-                    pdf_output_dir = os.path.join(upload_folder, 'pdf_outputs')
-                    
-                    # 在pdf_outputs目录中查找文件
-                    potential_file_path = os.path.join(pdf_output_dir, record.stored_filename)
-                    if os.path.exists(potential_file_path):
-                        file_exists = True
-                        file_path = potential_file_path
-                        logger.info(f"在pdf_outputs目录中找到历史文件: {file_path}")
-                except Exception as e:
-                    logger.warning(f"查找历史文件时出错: {e}")
-
+        for record, _ in rows:
             # 使用ISO格式返回时间，让前端正确处理时区
             upload_time = datetime_to_isoformat(record.upload_time)
             
@@ -3604,9 +3618,13 @@ def pdf_translation_history():
                 'file_size': record.file_size,
                 'upload_time': upload_time,
                 'status': record.status,
-                'file_exists': file_exists
+                'file_exists': record.file_exists
             })
 
+        if paginated:
+            return jsonify({'records': history_records, 'next_cursor': next_cursor,
+                            'has_more': next_cursor is not None})
+
         # 如果通过数据库没有获取到任何PDF历史，回退到文件系统扫描
         if len(history_records) == 0:
             try:
@@ -3639,6 +3657,8 @@ def pdf_translation_history():
         logger.info(f"[PDF History] 返回记录数: {len(history_records)}")
         return jsonify(history_records)
         
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
     except Exception as e:
         logger.error(f"获取PDF翻译历史记录失败: {e}")
         import traceback
@@ -3745,8 +3765,9 @@ def batch_upload_translations():
             os.remove(file_path)  # 删除无效文件
             return jsonify({'error': f'文件格式无效: {str(e)}'}), 400
 
-        # 解析 Excel 文件
-        translations_data, errors = parse_excel_file(file_path)
+        # 逐行检查 Excel 文件（只读模式，不加载整个工作簿）
+        is_admin = current_user.is_administrator()
+        valid_rows, errors = validate_excel_file(file_path, is_admin)
 
         if errors:
             # 删除临时文件
@@ -3756,13 +3777,18 @@ def batch_upload_translations():
                 'details': errors[:10]  # 只返回前10个错误
             }), 400
 
-        if not translations_data:
+        if not valid_rows:
             # 删除临时文件
             os.remove(file_path)
             return jsonify({'error': '文件中没有有效的翻译数据'}), 400
 
-        # 批量插入数据库
-        success_count, error_count, error_details = batch_insert_translations(translations_data, current_user.id)
+        # 分批查重并批量插入数据库，import_id 用于前端轮询进度
+        import_id = request.form.get('import_id')
+        import_result = import_glossary_excel(file_path, current_user.id, is_admin,
+                                              total_rows=valid_rows, import_id=import_id)
+        success_count = import_result['success_count']
+        error_count = import_result['error_count']
+        error_details = import_result['errors']
 
         # 删除临时文件
         os.remove(file_path)
@@ -3789,160 +3815,13 @@ def batch_upload_translations():
             'file_path': file_path if 'file_path' in locals() else None
         }), 500
 
-def parse_excel_file(file_path):
-    """解析 Excel 文件，返回翻译数据和错误信息"""
-    translations = []
-    errors = []
-
-    try:
-        logger.info(f"开始解析 Excel 文件: {file_path}")
-
-        # 检查文件是否存在
-        if not os.path.exists(file_path):
-            errors.append(f"文件不存在: {file_path}")
-            return [], errors
-
-        # 检查文件大小
-        file_size = os.path.getsize(file_path)
-        logger.info(f"文件大小: {file_size} bytes")
-
-        if file_size == 0:
-            errors.append("文件为空")
-            return [], errors
-
-        logger.info("尝试加载 Excel 文件...")
-        wb = openpyxl.load_workbook(file_path, data_only=True)
-        logger.info("Excel 文件加载成功")
-
-        ws = wb.active
-        logger.info("获取活动工作表成功")
-
-        logger.info(f"工作表名称: {ws.title}")
-        logger.info(f"最大行数: {ws.max_row}, 最大列数: {ws.max_column}")
-
-        # 检查表头
-        expected_headers = ['english', 'chinese', 'dutch', 'category', 'is_public']
-        actual_headers = []
-
-        for col in range(1, len(expected_headers) + 1):
-            cell_value = ws.cell(row=1, column=col).value
-            if cell_value:
-                actual_headers.append(str(cell_value).strip().lower())
-            else:
-                actual_headers.append('')
-
-        logger.info(f"期望表头: {expected_headers}")
-        logger.info(f"实际表头: {actual_headers}")
-
-        if actual_headers != expected_headers:
-            errors.append(f"表头不匹配。期望: {expected_headers}, 实际: {actual_headers}")
-            return [], errors
-
-        # 解析数据行
-        for row_num in range(2, ws.max_row + 1):
-            try:
-                row_data = {}
-                has_data = False
-
-                for col_num, header in enumerate(expected_headers, 1):
-                    cell_value = ws.cell(row=row_num, column=col_num).value
-                    if cell_value is not None:
-                        if isinstance(cell_value, str):
-                            cell_value = cell_value.strip()
-                        row_data[header] = cell_value
-                        if header in ['english', 'chinese'] and cell_value:
-                            has_data = True
-                    else:
-                        row_data[header] = None
-
-                # 检查必填字段
-                if not row_data.get('english') or not row_data.get('chinese'):
-                    if has_data:  # 如果有其他数据但必填字段为空
-                        errors.append(f"第{row_num}行: 英文和中文为必填字段")
-                    continue
-
-                # 处理 is_public 字段
-                if row_data.get('is_public') is not None:
-                    if isinstance(row_data['is_public'], str):
-                        row_data['is_public'] = row_data['is_public'].lower() in ('1', 'true', 'yes', '是')
-                    elif isinstance(row_data['is_public'], (int, float)):
-                        row_data['is_public'] = bool(row_data['is_public'])
-                    else:
-                        row_data['is_public'] = False
-                else:
-                    row_data['is_public'] = False
-
-                # 普通用户不能添加公共翻译
-                if row_data['is_public'] and not current_user.is_administrator():
-                    row_data['is_public'] = False
-
-                translations.append(row_data)
-
-            except Exception as e:
-                errors.append(f"第{row_num}行解析失败: {str(e)}")
-                continue
-
-    except Exception as e:
-        logger.error(f"Excel 文件解析异常: {str(e)}")
-        logger.error(f"异常类型: {type(e).__name__}")
-        import traceback
-        logger.error(f"完整堆栈跟踪:\n{traceback.format_exc()}")
-        errors.append(f"文件解析失败: {str(e)}")
-
-    return translations, errors
-
-def batch_insert_translations(translations_data, user_id):
-    """批量插入翻译数据到数据库"""
-    success_count = 0
-    error_count = 0
-    error_details = []
-
-    for item in translations_data:
-        try:
-            # 检查是否已存在相同的翻译
-            existing = None
-            if item.get('is_public') and current_user.is_administrator():
-                # 管理员检查公共翻译
-                existing = Translation.query.filter_by(
-                    english=item['english'],
-                    is_public=True
-                ).first()
-            else:
-                # 普通用户检查自己的私有翻译
-                existing = Translation.query.filter_by(
-                    user_id=user_id,
-                    english=item['english']
-                ).first()
-
-            if existing:
-                error_count += 1
-                error_details.append(f"英文 '{item['english']}' 已存在")
-                continue
-
-            # 创建新的翻译记录
-            translation = Translation(
-                english=item['english'],
-                chinese=item['chinese'],
-                dutch=item.get('dutch'),
-                category=item.get('category'),
-                is_public=item['is_public'],
-                user_id=user_id
-            )
-
-            db.session.add(translation)
-            success_count += 1
-
-        except Exception as e:
-            error_count += 1
-            error_details.append(f"插入 '{item.get('english', 'N/A')}' 失败: {str(e)}")
-            continue
-
-    try:
-        db.session.commit()
-    except Exception as e:
-        db.session.rollback()
-        error_details.append(f"数据库提交失败: {str(e)}")
-        success_count = 0
-        error_count = len(translations_data)
-
-    return success_count, error_count, error_details
+@main.route('/api/translations/batch_upload/progress', methods=['GET'])
+@login_required
+def batch_upload_progress():
+    """查询批量上传的导入进度（上传请求处理期间由前端轮询）"""
+    import_id = request.args.get('import_id', '')
+    progress = import_progress.get(current_user.id, import_id) if import_id else None
+    if progress is None:
+        return jsonify({'found': False})
+    progress.pop('updated_at', None)
+    return jsonify(dict(progress, found=True))
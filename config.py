@@ -51,6 +51,11 @@ class Config:
     # 文件清理策略配置
     FILE_CLEANUP_DAYS = int(os.environ.get('FILE_CLEANUP_DAYS', 7))  # 默认7天后清理
     TEMP_FILE_CLEANUP_HOURS = int(os.environ.get('TEMP_FILE_CLEANUP_HOURS', 24))  # 临时文件24小时后清理
+    STORAGE_RECONCILE_HOURS = int(os.environ.get('STORAGE_RECONCILE_HOURS', 6))  # 存储用量计数对账间隔
+    # 清理时的删除速率（每秒删除的文件数，0为不限制），工作时间段内使用较低的速率
+    CLEANUP_DELETES_PER_SECOND = float(os.environ.get('CLEANUP_DELETES_PER_SECOND', 50))
+    CLEANUP_BUSINESS_DELETES_PER_SECOND = float(os.environ.get('CLEANUP_BUSINESS_DELETES_PER_SECOND', 10))
+    CLEANUP_BUSINESS_HOURS = os.environ.get('CLEANUP_BUSINESS_HOURS', '9-18')
     
     # 文件类型配置
     ALLOWED_EXTENSIONS = {
@@ -1,9 +1,11 @@
 import os
 
-from app import create_app, db
+# CPU密集型任务的工作进程会以 __mp_main__ 的名字重新导入本脚本，此时不能再创建应用
+if __name__ != '__mp_main__':
+    from app import create_app, db
 
-# 创建应用实例
-app = create_app('development') # 使用开发配置
+    # 创建应用实例
+    app = create_app('development') # 使用开发配置
 
 if __name__ == '__main__':
     with app.app_context():
@@ -9,23 +9,26 @@ import uvicorn
 from hypercorn.config import Config
 from hypercorn.asyncio import serve
 
-from app import create_app, db
-from app.utils.enhanced_task_queue import translation_queue
-from app.utils.thread_pool_executor import thread_pool, TaskType
-from app.utils.logger import get_logger
+# CPU密集型任务的工作进程会以 __mp_main__ 的名字重新导入本脚本，此时不导入应用、任务队列和线程池，
+# 也不创建应用（下面的函数只在主进程中调用）
+if __name__ != '__mp_main__':
+    from app import create_app, db
+    from app.utils.enhanced_task_queue import translation_queue
+    from app.utils.thread_pool_executor import thread_pool, TaskType
+    from app.utils.logger import get_logger
 
-# 获取主应用日志记录器
-logger = get_logger('app.main')
+    # 获取主应用日志记录器
+    logger = get_logger('app.main')
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
-# 创建应用实例
-app = create_app('development')
+    # 创建应用实例
+    app = create_app('development')
 
 # 配置ASGI服务器（Hypercorn）
 config = Config()
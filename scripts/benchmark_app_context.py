@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+后台线程应用上下文开销基准测试
+比较每个任务调用 create_app() 创建应用上下文（原实现）与从应用上下文提供器推入上下文的耗时
+
+需要完整的运行环境（Flask及各扩展、可连接的数据库），在项目根目录执行:
+    python scripts/benchmark_app_context.py [--create-iterations 5] [--push-iterations 2000]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# 基准测试不需要共享任务存储
+os.environ.setdefault('TASK_QUEUE_BACKEND', 'memory')
+
+from app import create_app  # noqa: E402
+from app.utils.app_context import AppContextProvider  # noqa: E402
+
+
+def run_in_thread(func):
+    """在新线程中执行（与后台任务一样，线程中没有应用上下文）"""
+    result = {}
+
+    def target():
+        result['value'] = func()
+
+    thread = threading.Thread(target=target)
+    thread.start()
+    thread.join()
+    return result['value']
+
+
+def measure_create_app(iterations):
+    """原实现：每个任务在线程中调用 create_app() 并推入上下文"""
+    samples = []
+    for _ in range(iterations):
+        def job():
+            start = time.perf_counter()
+            ctx = create_app().app_context()
+            ctx.push()
+            ctx.pop()
+            return time.perf_counter() - start
+        samples.append(run_in_thread(job))
+    return samples
+
+
+def measure_provider(provider, iterations):
+    """新实现：从已注册的应用实例推入上下文"""
+    samples = []
+    for _ in range(iterations):
+        def job():
+            start = time.perf_counter()
+            with provider.app_context():
+                pass
+            return time.perf_counter() - start
+        samples.append(run_in_thread(job))
+    return samples
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p50 = statistics.median(samples) * 1000
+    p95 = samples[max(int(len(samples) * 0.95) - 1, 0)] * 1000
+    print(f"{name}: {len(samples)} 次, p50 {p50:.3f} ms, p95 {p95:.3f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="后台线程应用上下文开销基准测试")
+    parser.add_argument('--create-iterations', type=int, default=5)
+    parser.add_argument('--push-iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    provider = AppContextProvider()
+    provider.init_app(create_app())
+
+    old_p50 = summarize("create_app() 每任务创建", measure_create_app(args.create_iterations))
+    new_p50 = summarize("应用上下文提供器", measure_provider(provider, args.push_iterations))
+    print(f"每个任务节省: {old_p50 - new_p50:.3f} ms（原实现中每个成功的任务在执行、更新数据库、清理资源时各调用一次 create_app()）")
+
+
+if __name__ == '__main__':
+    main()
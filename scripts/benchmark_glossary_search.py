@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+词库搜索基准测试
+在临时SQLite数据库中生成合成词库（默认50万条），比较 /api/translations 原 ILIKE 扫描
+与 FTS5 trigram 全文索引（app/utils/glossary_search.py）的查询耗时
+
+用法:
+    python scripts/benchmark_glossary_search.py [--rows 500000] [--repeat 5]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'utils'))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+import glossary_search  # noqa: E402
+
+_rng = random.Random(11)
+WORDS = ["".join(_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_rng.randint(4, 11)))
+         for _ in range(5000)]
+HANZI = [chr(code) for code in range(0x4e00, 0x4e00 + 3000)]
+CATEGORIES = ["成分", "包装", "法规", "营养", "工艺", "设备", "市场"]
+
+CREATE_TABLE = """
+CREATE TABLE translation (
+    id INTEGER PRIMARY KEY,
+    english VARCHAR(500) NOT NULL,
+    chinese VARCHAR(500) NOT NULL,
+    dutch VARCHAR(500),
+    category VARCHAR(1000),
+    user_id INTEGER NOT NULL,
+    is_public BOOLEAN,
+    created_at DATETIME,
+    updated_at DATETIME
+)
+"""
+
+LIKE_QUERY = """
+SELECT id FROM translation
+WHERE (user_id = :user_id OR is_public = 1)
+  AND (english LIKE :pattern OR chinese LIKE :pattern OR dutch LIKE :pattern OR category LIKE :pattern)
+ORDER BY id DESC LIMIT 10
+"""
+
+INDEXED_QUERY = f"""
+SELECT translation.id FROM translation
+JOIN ({glossary_search.SQLITE_MATCH}) AS glossary_match ON translation.id = glossary_match.id
+WHERE (user_id = :user_id OR is_public = 1)
+ORDER BY glossary_match.score, translation.id DESC LIMIT 10
+"""
+
+
+def generate_rows(count, seed=42):
+    """生成词条：英文/荷兰文为2-4个随机词，中文为2-6个汉字"""
+    rng = random.Random(seed)
+    for row_id in range(1, count + 1):
+        english = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4)))
+        yield {
+            'id': row_id,
+            'english': english,
+            'chinese': "".join(rng.choice(HANZI) for _ in range(rng.randint(2, 6))),
+            'dutch': " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))),
+            'category': rng.choice(CATEGORIES),
+            'user_id': rng.randint(1, 50),
+            'is_public': rng.random() < 0.3,
+        }
+
+
+def build_database(path, rows, batch=20000):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.execute(text(CREATE_TABLE))
+    insert = text("INSERT INTO translation (id, english, chinese, dutch, category, user_id, is_public) "
+                  "VALUES (:id, :english, :chinese, :dutch, :category, :user_id, :is_public)")
+    buffer = []
+    with engine.begin() as conn:
+        for row in generate_rows(rows):
+            buffer.append(row)
+            if len(buffer) >= batch:
+                conn.execute(insert, buffer)
+                buffer = []
+        if buffer:
+            conn.execute(insert, buffer)
+    return engine
+
+
+def pick_terms(count, seed=7):
+    """搜索词：英文词的片段（3-6个字符）和中文词条中的三字片段"""
+    rng = random.Random(seed)
+    terms = []
+    for _ in range(count):
+        word = rng.choice(WORDS)
+        length = min(len(word), rng.randint(3, 6))
+        start = rng.randint(0, len(word) - length)
+        terms.append(word[start:start + length])
+    for _ in range(count // 2):
+        terms.append("".join(rng.choice(HANZI) for _ in range(3)))
+    return terms
+
+
+def time_queries(engine, sql, params_list, repeat):
+    samples = []
+    results = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results = [conn.execute(text(sql), params).fetchall() for params in params_list]
+            samples.append((time.perf_counter() - start) / len(params_list))
+    return samples, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词库搜索基准测试")
+    parser.add_argument('--rows', type=int, default=500000, help='生成的词条数量')
+    parser.add_argument('--terms', type=int, default=40, help='英文搜索词数量（另加一半数量的中文搜索词）')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, 'glossary.db')
+        start = time.perf_counter()
+        engine = build_database(db_path, args.rows)
+        print(f"生成 {args.rows} 条词条: {time.perf_counter() - start:.2f}秒")
+
+        start = time.perf_counter()
+        mode = glossary_search.init_glossary_search(engine, enabled=True)
+        print(f"建立全文索引（{mode}）: {time.perf_counter() - start:.2f}秒")
+        if mode != 'fts5':
+            print("当前SQLite不支持 FTS5 trigram 分词器（需要 3.34 及以上），无法比较")
+            return
+
+        terms = pick_terms(args.terms)
+        like_params = [{'user_id': 1, 'pattern': f'%{term}%'} for term in terms]
+        fts_params = [{'user_id': 1, 'match': glossary_search._match_expression(term)} for term in terms]
+
+        like_samples, like_results = time_queries(engine, LIKE_QUERY, like_params, args.repeat)
+        fts_samples, fts_results = time_queries(engine, INDEXED_QUERY, fts_params, args.repeat)
+
+        # 两种方式命中的词条集合应一致（只比较是否有结果，排序方式不同）
+        mismatched = sum(1 for a, b in zip(like_results, fts_results) if bool(a) != bool(b))
+
+        like_ms = statistics.median(like_samples) * 1000
+        fts_ms = statistics.median(fts_samples) * 1000
+        print(f"搜索词 {len(terms)} 个，重复 {args.repeat} 次，每次查询的中位耗时:")
+        print(f"  ILIKE 扫描:        {like_ms:.2f} ms")
+        print(f"  FTS5 trigram 索引: {fts_ms:.2f} ms")
+        print(f"  加速比: {like_ms / fts_ms:.1f}x")
+        print(f"  命中情况不一致的搜索词: {mismatched}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+成分搜索基准测试
+比较 /api/ingredient/search 原实现（每次遍历全部产品做子串匹配、为所有匹配结果生成字典后分页）
+与二元组倒排索引（app/utils/ingredient_index.py）的单次查询耗时，并检查两者返回的结果一致。
+默认读取 app/Ingredient_Search 中的注册和备案数据；数据文件不存在时生成合成数据
+
+用法:
+    python scripts/benchmark_ingredient_search.py [--data-dir app/Ingredient_Search] [--products 60000] [--repeat 5]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import statistics
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'app', 'utils'))
+
+import ingredient_index  # noqa: E402
+
+_rng = random.Random(5)
+HANZI = [chr(code) for code in range(0x4e00, 0x4e00 + 1500)]
+INGREDIENT_WORDS = ["".join(_rng.choice(HANZI) for _ in range(_rng.randint(2, 5))) for _ in range(3000)]
+LATIN_WORDS = ["Vitamin C", "Vitamin E", "DHA", "Coenzyme Q10", "Zinc", "Calcium carbonate", "L-Carnitine"]
+BRANDS = ["".join(_rng.choice(HANZI) for _ in range(_rng.randint(2, 4))) for _ in range(800)]
+FORMS = ["胶囊", "片", "口服液", "颗粒", "粉", "软胶囊"]
+
+
+def generate_dataset(count, seed=42):
+    """生成 {产品名称: {ingredient, path, detail_url}}，成分为逗号分隔的3-12个成分"""
+    rng = random.Random(seed)
+    data = {}
+    while len(data) < count:
+        name = f"{rng.choice(BRANDS)}牌{rng.choice(INGREDIENT_WORDS)}{rng.choice(FORMS)}"
+        parts = [rng.choice(INGREDIENT_WORDS) for _ in range(rng.randint(3, 12))]
+        if rng.random() < 0.2:
+            parts.append(rng.choice(LATIN_WORDS))
+        data[name] = {
+            'ingredient': ','.join(parts),
+            'path': f"./screenshots/{len(data)}.png",
+            'detail_url': f"https://example.com/{len(data)}",
+        }
+    return data
+
+
+def load_datasets(data_dir, products):
+    registration_path = os.path.join(data_dir, '保健食品注册.json')
+    filing_path = os.path.join(data_dir, '保健食品备案.json')
+    if os.path.exists(registration_path) and os.path.exists(filing_path):
+        with open(registration_path, 'r', encoding='utf-8') as f:
+            registration = json.load(f)
+        with open(filing_path, 'r', encoding='utf-8') as f:
+            filing = json.load(f)
+        return registration, filing, '数据文件'
+    data = generate_dataset(products)
+    names = list(data)
+    mid = len(names) // 2
+    registration = {name: data[name] for name in names[:mid]}
+    filing = {name: data[name] for name in names[mid:]}
+    # 部分备案产品与注册产品同名
+    for name in names[:mid:50]:
+        filing[name] = data[name]
+    return registration, filing, '合成数据'
+
+
+def linear_search(combined, keyword, page, per_page):
+    """原实现：遍历全部产品，为所有匹配结果生成字典后分页"""
+    matched_products = []
+    for product_name, product_info in combined.items():
+        ingredients = product_info.get('ingredient', '') or ''
+        if keyword.lower() in ingredients.lower() or keyword.lower() in product_name.lower():
+            if ingredients:
+                parts = [ing.strip() for ing in ingredients.split(',')]
+                main_ingredients_str = "、".join(parts[:3]) + ("等" if len(parts) > 3 else "")
+            else:
+                main_ingredients_str = "无成分信息"
+            matched_products.append({
+                '产品名称': product_name,
+                '主要成分': main_ingredients_str,
+                '完整成分': ingredients,
+                '截图路径': product_info.get('path', '无截图路径'),
+                '数据源': product_info.get('data_source', '未知'),
+                'detail_url': product_info.get('detail_url', '')
+            })
+    start = (page - 1) * per_page
+    return len(matched_products), matched_products[start:start + per_page]
+
+
+def indexed_search(index, keyword, page, per_page):
+    matched_ids = index.search(keyword)
+    start = (page - 1) * per_page
+    results = []
+    for doc_id in matched_ids[start:start + per_page]:
+        product = index.product(doc_id)
+        results.append({
+            '产品名称': product['name'],
+            '主要成分': product['summary'],
+            '完整成分': product['ingredients'],
+            '截图路径': product['path'],
+            '数据源': product['source'],
+            'detail_url': product['detail_url']
+        })
+    return len(matched_ids), results
+
+
+def pick_keywords(combined, count, seed=7):
+    """关键词：成分中的片段（1-4个字符）、产品名称片段和英文成分"""
+    rng = random.Random(seed)
+    values = list(combined.values())
+    names = list(combined)
+    keywords = []
+    for i in range(count):
+        if i % 5 == 4:
+            keywords.append(rng.choice(LATIN_WORDS).split()[0].lower())
+            continue
+        source = rng.choice(names) if i % 5 == 3 else (rng.choice(values).get('ingredient') or 'x')
+        length = min(len(source), rng.randint(1, 4))
+        start = rng.randint(0, len(source) - length)
+        keywords.append(source[start:start + length].strip(',') or source[0])
+    return keywords
+
+
+def time_calls(func, keywords, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for keyword in keywords:
+            func(keyword)
+        samples.append((time.perf_counter() - start) / len(keywords))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="成分搜索基准测试")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'app', 'Ingredient_Search'),
+                        help='保健食品注册.json 和 保健食品备案.json 所在目录')
+    parser.add_argument('--products', type=int, default=60000, help='没有数据文件时生成的产品数量')
+    parser.add_argument('--keywords', type=int, default=50, help='搜索关键词数量')
+    parser.add_argument('--per-page', type=int, default=12, help='每页条数')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数')
+    args = parser.parse_args()
+
+    registration, filing, label = load_datasets(args.data_dir, args.products)
+    merged = ingredient_index.merge_sources(registration, filing)
+    combined = {name: {**info, 'data_source': source} for name, _, info, source in merged}
+    print(f"{label}: 注册 {len(registration)} 个, 备案 {len(filing)} 个, 合并后 {len(combined)} 个产品")
+
+    start = time.perf_counter()
+    index = ingredient_index.IngredientIndex(merged)
+    print(f"建立索引: {time.perf_counter() - start:.2f}秒, {index.stats()}")
+
+    keywords = pick_keywords(combined, args.keywords)
+    mismatched = 0
+    for keyword in keywords:
+        for page in (1, 3):
+            if linear_search(combined, keyword, page, args.per_page) != \
+                    indexed_search(index, keyword, page, args.per_page):
+                mismatched += 1
+
+    linear_samples = time_calls(lambda kw: linear_search(combined, kw, 1, args.per_page), keywords, args.repeat)
+    indexed_samples = time_calls(lambda kw: indexed_search(index, kw, 1, args.per_page), keywords, args.repeat)
+
+    linear_ms = statistics.median(linear_samples) * 1000
+    indexed_ms = statistics.median(indexed_samples) * 1000
+    print(f"关键词 {len(keywords)} 个，重复 {args.repeat} 次，每次查询（第1页）的中位耗时:")
+    print(f"  原实现（遍历）: {linear_ms:.2f} ms")
+    print(f"  倒排索引:       {indexed_ms:.2f} ms")
+    print(f"  加速比: {linear_ms / indexed_ms:.1f}x")
+    print(f"  结果不一致的查询: {mismatched}")
+
+
+if __name__ == '__main__':
+    main()
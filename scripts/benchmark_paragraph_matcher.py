@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+段落-翻译匹配器基准测试
+在合成的500段落幻灯片上比较原逐一比较实现与索引匹配器的耗时
+
+用法:
+    python scripts/benchmark_paragraph_matcher.py [--paragraphs 500] [--repeat 3]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'app', 'function'))
+
+from paragraph_matcher import ParagraphTranslationMatcher, normalize_text, similarity_score  # noqa: E402
+
+_word_rng = random.Random(7)
+WORDS = ["".join(_word_rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(_word_rng.randint(3, 10)))
+         for _ in range(2000)]
+
+
+@dataclass(eq=True)
+class FakeParagraph:
+    text: str
+    shape_index: int
+    paragraph_index: int
+    is_translatable: bool = True
+
+
+def build_slide(n, seed=42):
+    """生成n个段落及翻译字典：约60%精确、20%标准化差异、20%需要相似度匹配"""
+    rng = random.Random(seed)
+    paragraphs, translations = [], {}
+    for i in range(n):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 12))]
+        original = f"{i} " + " ".join(words)
+        bucket = i % 5
+        if bucket < 3:
+            key = original
+        elif bucket == 3:
+            key = original.upper() + "."
+        else:
+            key = original.replace(words[0], rng.choice(WORDS), 1) + " extra"
+        translations[key] = f"译文{i}"
+        paragraphs.append(FakeParagraph(original, i // 10, i % 10))
+    return paragraphs, translations
+
+
+def naive_match(paragraphs, translation_dict):
+    """原实现：list.index + 对所有未使用翻译逐一计算相似度"""
+    translatable = [p for p in paragraphs if p.is_translatable]
+    matches, used = {}, set()
+    for para in translatable:
+        text = para.text.strip()
+        if text in translation_dict and text not in used:
+            matches[paragraphs.index(para)] = translation_dict[text]
+            used.add(text)
+    normalized_dict = {}
+    for orig, trans in translation_dict.items():
+        norm = normalize_text(orig)
+        if norm and norm not in normalized_dict:
+            normalized_dict[norm] = (orig, trans)
+    for para in translatable:
+        idx = paragraphs.index(para)
+        if idx in matches:
+            continue
+        norm = normalize_text(para.text.strip())
+        if norm in normalized_dict and normalized_dict[norm][0] not in used:
+            matches[idx] = normalized_dict[norm][1]
+            used.add(normalized_dict[norm][0])
+    remaining = [(p, paragraphs.index(p)) for p in translatable if paragraphs.index(p) not in matches]
+    unused = [(o, t) for o, t in translation_dict.items() if o not in used]
+    for para, idx in remaining:
+        best, best_trans, best_orig = 0.0, None, None
+        for orig, trans in unused:
+            if orig in used:
+                continue
+            score = similarity_score(para.text.strip(), orig)
+            if score > best and score > 0.3:
+                best, best_trans, best_orig = score, trans, orig
+        if best_trans:
+            matches[idx] = best_trans
+            used.add(best_orig)
+    return matches
+
+
+def timed(func, repeat):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="段落-翻译匹配器基准测试")
+    parser.add_argument('--paragraphs', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    paragraphs, translations = build_slide(args.paragraphs)
+
+    naive_time, naive_result = timed(lambda: naive_match(paragraphs, translations), args.repeat)
+    indexed_time, (indexed_result, stats) = timed(
+        lambda: ParagraphTranslationMatcher(translations).match(paragraphs), args.repeat)
+
+    agreement = sum(1 for k, v in naive_result.items() if indexed_result.get(k) == v)
+    print(f"段落数: {len(paragraphs)}，翻译条目: {len(translations)}")
+    print(f"原实现:     {naive_time * 1000:8.1f} ms，匹配 {len(naive_result)}")
+    print(f"索引匹配器: {indexed_time * 1000:8.1f} ms，匹配 {len(indexed_result)} "
+          f"(精确 {stats['exact']} / 标准化 {stats['normalized']} / 相似度 {stats['similarity']})")
+    print(f"加速比: {naive_time / max(indexed_time, 1e-9):.1f}x，结果一致: {agreement}/{len(naive_result)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+构建成分搜索的SQLite存储文件
+把 app/Ingredient_Search 中的 保健食品注册.json 和 保健食品备案.json 转换为 ingredient_store.sqlite3，
+成分搜索接口直接查询该文件，工作进程不再加载JSON。数据文件更新后重新运行即可（运行中的进程会自动切换到新文件）
+
+用法:
+    python scripts/build_ingredient_store.py [--data-dir app/Ingredient_Search] [--output 路径]
+"""
+import os
+import sys
+import time
+import argparse
+import sqlite3
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+# 将项目根目录添加到路径中
+sys.path.insert(0, ROOT)
+
+from app.utils.ingredient_store import build_store, IngredientStore, STORE_FILENAME  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="构建成分搜索的SQLite存储文件")
+    parser.add_argument('--data-dir', default=os.path.join(ROOT, 'app', 'Ingredient_Search'),
+                        help='保健食品注册.json 和 保健食品备案.json 所在目录')
+    parser.add_argument('--output', default=None, help='输出文件路径，默认为数据目录下的 ingredient_store.sqlite3')
+    args = parser.parse_args()
+
+    registration_path = os.path.join(args.data_dir, '保健食品注册.json')
+    filing_path = os.path.join(args.data_dir, '保健食品备案.json')
+    output_path = args.output or os.path.join(args.data_dir, STORE_FILENAME)
+
+    for path in (registration_path, filing_path):
+        if not os.path.exists(path):
+            print(f"数据文件不存在: {path}")
+            sys.exit(1)
+
+    start = time.perf_counter()
+    stats = build_store(registration_path, filing_path, output_path)
+    print(f"构建完成: {output_path}")
+    print(f"  产品 {stats['products']} 个, 二元组 {stats['grams']} 个, 倒排记录 {stats['postings']} 条")
+    print(f"  文件大小 {os.path.getsize(output_path) / 1024 / 1024:.1f} MB, 耗时 {time.perf_counter() - start:.2f}秒")
+
+    start = time.perf_counter()
+    store = IngredientStore(output_path)
+    print(f"  打开存储耗时 {(time.perf_counter() - start) * 1000:.1f} ms, 产品 {len(store)} 个 (sqlite {sqlite3.sqlite_version})")
+
+
+if __name__ == '__main__':
+    main()
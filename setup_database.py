@@ -145,9 +145,25 @@ def create_tables():
                     `upload_time` DATETIME DEFAULT CURRENT_TIMESTAMP,
                     `status` VARCHAR(20) DEFAULT 'pending',
                     `error_message` VARCHAR(255),
+                    `file_type` VARCHAR(50),
+                    `file_state` VARCHAR(20) NOT NULL DEFAULT 'present',
                     INDEX `idx_user_id` (`user_id`),
                     INDEX `idx_upload_time` (`upload_time`),
                     INDEX `idx_status` (`status`),
+                    INDEX `idx_upload_user_time` (`user_id`, `upload_time`, `id`),
+                    INDEX `idx_upload_type_time` (`file_type`, `upload_time`, `id`),
+                    FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
+            """)
+
+            # 创建用户存储用量表
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS `user_storage_usage` (
+                    `user_id` INT PRIMARY KEY,
+                    `bytes_used` BIGINT NOT NULL DEFAULT 0,
+                    `file_count` INT NOT NULL DEFAULT 0,
+                    `reconciled_at` DATETIME,
+                    `updated_at` DATETIME,
                     FOREIGN KEY (`user_id`) REFERENCES `users`(`id`) ON DELETE CASCADE
                 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
             """)
@@ -430,10 +446,34 @@ MAIL_PASSWORD=your-email-password
 # API配置
 DASHSCOPE_API_KEY=your-dashscope-api-key
 
+# CPU密集型阶段（python-pptx解析/保存、段落匹配）的工作进程数，false时在线程中执行
+THREAD_POOL_PROCESS_WORKERS=4
+THREAD_POOL_PROCESS_ENABLED=true
+
 # 任务队列配置 - 限制最大并发翻译任务为10个
 TASK_QUEUE_MAX_CONCURRENT=10
 TASK_QUEUE_TIMEOUT=3600
 TASK_QUEUE_RETRY_TIMES=3
+# 任务存储后端 (sqlite: 多进程共享, memory: 仅本进程)
+TASK_QUEUE_BACKEND=sqlite
+TASK_QUEUE_LEASE_SECONDS=60
+# 已结束任务保留时长（分钟）和最大条数，超出后归档
+TASK_QUEUE_RETENTION_MINUTES=30
+TASK_QUEUE_RETENTION_MAX_ENTRIES=1000
+# 按任务预计成本调度：同时执行任务的LLM tokens、OCR调用次数、Office处理秒数上限（0表示不限制）
+TASK_QUEUE_BUDGET_LLM_TOKENS=400000
+TASK_QUEUE_BUDGET_OCR_CALLS=200
+TASK_QUEUE_BUDGET_OFFICE_SECONDS=900
+# 排队任务预计剩余耗时超过该值（秒）时拒绝新任务
+TASK_QUEUE_MAX_BACKLOG_SECONDS=14400
+# 任务进度事件流（SSE）：每个连接每秒最多推送次数、保活间隔（秒）、单个连接最长时间（秒）
+TASK_EVENTS_MAX_RATE=2
+TASK_EVENTS_KEEPALIVE=15
+TASK_EVENTS_MAX_DURATION=600
+# PPT翻译流水线：每页翻译完成后立即写入PPTX，同时翻译的页数和待写入页面的队列容量
+PPT_PIPELINE_ENABLED=true
+PPT_PIPELINE_TRANSLATE_WORKERS=3
+PPT_PIPELINE_QUEUE_SIZE=4
 MAX_CONCURRENT_TASKS=10
 TASK_TIMEOUT=3600
 TASK_RETRY_TIMES=3
@@ -454,14 +494,28 @@ LOG_LEVEL=INFO
 LOG_FILE=app.log
 LOG_MAX_SIZE=10485760
 LOG_BACKUP_COUNT=5
+LOG_ASYNC=true
+LOG_QUEUE_SIZE=10000
+LOG_SAMPLING=app.function.local_qwen_async=20,app.function.ppt_translate_async=50
 
 # 文件清理配置
 CLEANUP_ENABLED=True
 CLEANUP_DAYS=30
+# 存储用量计数的对账间隔（小时）
+STORAGE_RECONCILE_HOURS=6
+# 清理时每秒删除的文件数（0为不限制），工作时间段内使用较低的速率
+CLEANUP_DELETES_PER_SECOND=50
+CLEANUP_BUSINESS_DELETES_PER_SECOND=10
+CLEANUP_BUSINESS_HOURS=9-18
 
 # 翻译配置
 TRANSLATION_TIMEOUT=300
 TRANSLATION_MAX_RETRIES=3
+# 词库搜索使用全文索引（SQLite: FTS5 trigram，MySQL: FULLTEXT ngram），false时使用LIKE扫描
+GLOSSARY_SEARCH_INDEX=true
+# 上传翻译时编译词库的缓存条目数和有效期（秒，多进程部署时其他进程修改词库后的最长生效延迟）
+GLOSSARY_CACHE_SIZE=256
+GLOSSARY_CACHE_TTL=300
 
 # PDF配置
 PDF_MAX_SIZE=52428800
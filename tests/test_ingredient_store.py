@@ -0,0 +1,53 @@
+"""
+成分数据存储（app/utils/ingredient_store.py）与进程内索引的查询结果一致性
+"""
+import json
+
+import pytest
+
+from app.utils.ingredient_index import IngredientIndex, merge_sources
+from app.utils.ingredient_store import IngredientStore, build_store
+
+REGISTRATION = {
+    '哈哈牌维生素C片': {'ingredient': '维生素C,淀粉', 'path': './r0.png', 'detail_url': ''},
+    'aab胶囊': {'ingredient': 'aa,bb', 'path': './r1.png', 'detail_url': ''},
+    '同名产品': {'ingredient': '钙,镁', 'path': './r2.png', 'detail_url': ''},
+}
+FILING = {
+    '哈哈哈软糖': {'ingredient': '明胶,白砂糖', 'path': './f0.png', 'detail_url': ''},
+    'aaa口服液': {'ingredient': 'aaaa,水', 'path': './f1.png', 'detail_url': ''},
+    '同名产品': {'ingredient': '锌', 'path': './f2.png', 'detail_url': ''},
+}
+
+KEYWORDS = ['a', 'aa', 'aaa', 'aaaa', '哈', '哈哈', '哈哈哈', '哈哈哈哈', '备案', '(备', '同名', '钙']
+
+
+@pytest.fixture
+def store_and_index(tmp_path):
+    registration_path = tmp_path / '保健食品注册.json'
+    filing_path = tmp_path / '保健食品备案.json'
+    registration_path.write_text(json.dumps(REGISTRATION, ensure_ascii=False), encoding='utf-8')
+    filing_path.write_text(json.dumps(FILING, ensure_ascii=False), encoding='utf-8')
+    output_path = tmp_path / 'ingredient_store.sqlite3'
+    build_store(str(registration_path), str(filing_path), str(output_path))
+    return IngredientStore(str(output_path)), IngredientIndex(merge_sources(REGISTRATION, FILING))
+
+
+@pytest.mark.parametrize('data_source', ['all', 'registration', 'filing'])
+def test_search_matches_index(store_and_index, data_source):
+    store, index = store_and_index
+    for keyword in KEYWORDS:
+        assert store.search(keyword, data_source) == index.search(keyword, data_source), keyword
+
+
+def test_repeated_characters_need_full_keyword(store_and_index):
+    store, index = store_and_index
+    # “哈哈哈”只有一个二元组，“哈哈牌维生素C片”含有该二元组但不含完整关键词
+    assert [store.products([doc_id])[0]['name'] for doc_id in store.search('哈哈哈')] == ['哈哈哈软糖']
+    assert store.search('aaa') == index.search('aaa')
+
+
+def test_page_matches_index(store_and_index):
+    store, index = store_and_index
+    for keyword in KEYWORDS:
+        assert store.page(keyword, 'all', 0, 2) == index.page(keyword, 'all', 0, 2), keyword
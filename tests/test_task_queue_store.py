@@ -0,0 +1,148 @@
+"""
+任务队列存储（app/utils/task_queue_store.py）：进程内存储与SQLite存储的行为一致
+"""
+import time
+
+import pytest
+
+from app.utils.task_queue_store import MemoryTaskStore, SQLiteTaskStore
+
+
+def make_record(task_id, user_id=1, priority=0, created_at=None):
+    return {
+        'task_id': task_id,
+        'user_id': user_id,
+        'user_name': f'user{user_id}',
+        'task_type': 'ppt_translate',
+        'priority': priority,
+        'retry_count': 0,
+        'created_at': created_at if created_at is not None else time.time(),
+        'cost_seconds': 60,
+        'cost_slides': 10,
+        'payload': {'file_path': f'/tmp/{task_id}.pptx'},
+    }
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        store = MemoryTaskStore()
+    else:
+        store = SQLiteTaskStore(str(tmp_path / 'task_queue.db'))
+    yield store
+    store.close()
+
+
+def enqueue_all(store, *task_ids):
+    base = time.time()
+    for offset, task_id in enumerate(task_ids):
+        accepted, _ = store.enqueue(make_record(task_id, created_at=base + offset))
+        assert accepted
+
+
+def test_enqueue_and_waiting_position(store):
+    enqueue_all(store, 't1', 't2', 't3')
+    assert [store.waiting_position(task_id) for task_id in ('t1', 't2', 't3')] == [1, 2, 3]
+    assert store.count_by_status()['waiting'] == 3
+    assert store.get('t1')['status'] == 'waiting'
+    assert store.get('missing') is None
+
+
+def test_waiting_position_follows_priority(store):
+    base = time.time()
+    for offset, (task_id, priority) in enumerate([('t1', 1), ('t2', 0), ('t3', 1), ('t4', 0)]):
+        store.enqueue(make_record(task_id, priority=priority, created_at=base + offset))
+    assert [store.waiting_position(task_id) for task_id in ('t2', 't4', 't1', 't3')] == [1, 2, 3, 4]
+
+
+def test_enqueue_rejects_backlog(store):
+    enqueue_all(store, 't1', 't2')
+    accepted, backlog = store.enqueue(make_record('t3'), max_backlog_seconds=90)
+    assert not accepted
+    assert backlog == pytest.approx(120)
+    assert store.get('t3') is None
+
+
+def test_claim_respects_order_and_limit(store):
+    enqueue_all(store, 't1', 't2', 't3')
+    first = store.claim('w1', max_active=2)
+    second = store.claim('w2', max_active=2)
+    assert (first['task_id'], second['task_id']) == ('t1', 't2')
+    assert store.claim('w1', max_active=2) is None
+    assert store.waiting_position('t3') == 1
+    assert store.waiting_position('t1') == 0
+    counts = store.count_by_status()
+    assert (counts['waiting'], counts['processing']) == (1, 2)
+
+
+def test_heartbeat_reports_lost_lease(store):
+    enqueue_all(store, 't1', 't2')
+    store.claim('w1', max_active=2)
+    store.claim('w2', max_active=2)
+    assert store.heartbeat(['t1', 't2', 'missing'], 'w1') == ['t2', 'missing']
+
+
+def test_finish_and_requeue(store):
+    enqueue_all(store, 't1', 't2')
+    store.claim('w1', max_active=2)
+    store.claim('w1', max_active=2)
+    store.finish('t1', 'completed')
+    store.requeue('t2', retry_count=1, error='网络错误')
+
+    finished = store.get('t1')
+    assert finished['status'] == 'completed'
+    assert finished['worker_id'] is None and finished['completed_at']
+    requeued = store.get('t2')
+    assert (requeued['status'], requeued['retry_count'], requeued['error']) == ('waiting', 1, '网络错误')
+    assert store.waiting_position('t2') == 1
+    counts = store.count_by_status()
+    assert (counts['waiting'], counts['processing'], counts['completed']) == (1, 0, 1)
+
+
+def test_cancel_only_waiting(store):
+    enqueue_all(store, 't1', 't2')
+    store.claim('w1', max_active=1)
+    assert not store.cancel('t1')
+    assert store.cancel('t2')
+    assert not store.cancel('t2')
+    assert store.get('t2')['status'] == 'canceled'
+    assert store.claim('w1', max_active=5) is None
+    assert store.count_by_status()['canceled'] == 1
+
+
+def test_recover_expired(store):
+    enqueue_all(store, 't1', 't2')
+    store.claim('w1', max_active=2, lease_seconds=-1)
+    store.claim('w1', max_active=2, lease_seconds=-1)
+    store.requeue('t2', retry_count=2)
+    store.claim('w1', max_active=2, lease_seconds=-1)
+
+    requeued, failed = store.recover_expired(max_retries=2)
+    assert (requeued, failed) == (['t1'], ['t2'])
+    assert store.get('t1')['retry_count'] == 1
+    assert store.get('t1')['status'] == 'waiting'
+    assert store.get('t2')['status'] == 'failed'
+    # 已回收的任务不再由原持有者续约
+    assert store.heartbeat(['t1'], 'w1') == ['t1']
+
+
+def test_get_after_archive(store):
+    enqueue_all(store, 't1', 't2')
+    store.claim('w1', max_active=2)
+    store.update_progress('t1', 100, 12, 12)
+    store.finish('t1', 'completed')
+
+    assert store.archive_finished(max_age_seconds=3600, max_entries=0) == ['t1']
+    archived = store.get('t1')
+    assert archived['status'] == 'completed'
+    assert (archived['progress'], archived['current_slide'], archived['total_slides']) == (100, 12, 12)
+    assert archived['payload'] is None
+    # 用户最新的任务仍在活动表中
+    assert store.get_latest_for_user(1)['task_id'] == 't2'
+    assert store.count_by_status()['completed'] == 1
+
+    store.claim('w1', max_active=2)
+    store.finish('t2', 'failed', '转换失败')
+    assert store.archive_finished(max_age_seconds=3600, max_entries=0) == ['t2']
+    latest = store.get_latest_for_user(1)
+    assert (latest['task_id'], latest['status'], latest['error'], latest['progress']) == ('t2', 'failed', '转换失败', 0)